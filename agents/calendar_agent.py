@@ -1,25 +1,52 @@
 import os
 import pickle
 import json
+import re
+from collections import Counter
 from typing import Optional
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
-import dateparser
-
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from zoneinfo import ZoneInfo  # Python 3.9+ timezone support
 
 from core.prompt_templates.calendar_template import calendar_prompt
+from memory.llm_cache import LLMCache, cached_llm_call
+from memory.retrieval_context import RetrievalPolicy
+from services.calendar_batch import CalendarBatch
+from services.calendar_index import CalendarIndex
+from services.calendar_intents import CalendarIntentParser
+from services.calendar_mirror import CalendarMirror
+from services.date_parser import DateParser
+from services.ics import parse_ics
 from langchain_google_genai import ChatGoogleGenerativeAI
 from typing import Optional
 from datetime import datetime, timedelta
+import config
 
 load_dotenv()
 
+# Only an explicit bulk phrase deletes by time range: "delete all events tomorrow", "clear my calendar on Friday"
+BULK_DELETE = re.compile(
+    r"^(?:please\s+)?(?:(?:delete|clear|cancel|remove)\s+(?:all|every)\s+(?:of\s+)?(?:my\s+)?(?:events|meetings)\b"
+    r"|clear\s+(?:my\s+)?calendar\b)"
+)
+# "yes, delete these events", worded so the router sends it back to the calendar agent; a bare
+# "sure" or "ok, ..." is some other request, never a confirmation
+CONFIRM = re.compile(
+    r"^(?:(?:yes|yep|yeah|ok|okay|sure|confirm)\W+)?(?:(?:please|go ahead and)\s+)?"
+    r"delete\s+(?:them|these|those|(?:these|those|the|all)\s+(?:\d+\s+)?events)[\s.!]*$"
+)
+
 class CalendarAgent:
+    # The Google API client is not thread safe; the orchestrator serializes calls.
+    thread_safe = False
+    # Events come from the prompt alone; conversation memory is never read.
+    retrieval_policy = RetrievalPolicy.none()
+
     SCOPES = [
         "https://www.googleapis.com/auth/gmail.modify",
         "https://www.googleapis.com/auth/gmail.readonly",
@@ -29,8 +56,27 @@ class CalendarAgent:
         "openid"
     ]
 
-    def __init__(self, llm: ChatGoogleGenerativeAI, credentials_path=None, token_path="token.pickle"):
+    WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+    # Hours covered by "Tuesday afternoon" and the like
+    DAY_PARTS = {"morning": (6, 12), "afternoon": (12, 17), "evening": (17, 21), "night": (21, 24)}
+
+    def __init__(self, llm: ChatGoogleGenerativeAI, credentials_path=None, token_path="token.pickle",
+                 llm_cache: Optional[LLMCache] = None, mirror: Optional[CalendarMirror] = None):
         self.llm = llm
+        self.llm_cache = llm_cache
+        # Reads and event lookups are answered from a local copy of the calendar
+        self.mirror = mirror if mirror is not None else CalendarMirror(
+            config.CALENDAR_MIRROR_PATH, max_age=config.CALENDAR_SYNC_INTERVAL
+        )
+        self._index: Optional[CalendarIndex] = None
+        self.dates = DateParser(
+            tz="Asia/Kolkata", languages=config.DATE_PARSER_LANGUAGES, cache_size=config.DATE_PARSER_CACHE_SIZE
+        )
+        # Well-formed commands are extracted by rules; extraction_stats counts "rules" vs "llm"
+        self.intents = CalendarIntentParser(self.dates)
+        self.extraction_stats = Counter()
+        # Event ids a bulk delete listed, deleted only if the next prompt confirms
+        self.pending_deletion: Optional[list] = None
         self.credentials_path = credentials_path or os.getenv("GOOGLE_CALENDAR_CREDENTIALS")
         self.token_path = token_path
         self.creds = None
@@ -58,25 +104,49 @@ class CalendarAgent:
         self.service = build("calendar", "v3", credentials=self.creds, cache_discovery=False)
         self.authenticated = True
 
+    def _refresh_mirror(self) -> None:
+        """Pull remote changes into the mirror if it is stale; a failed sync leaves the last copy in use."""
+        self.authenticate_if_needed()
+        try:
+            self.mirror.sync_if_stale(self.service)
+        except Exception as e:
+            print(f"[ERROR] Calendar sync failed, using the local copy: {e}")
+
+    def _calendar_index(self) -> CalendarIndex:
+        """Interval and title index over the mirror: changes are applied in place, a full resync rebuilds it."""
+        self._refresh_mirror()
+        if self._index is None or not self._index.catch_up(self.mirror):
+            self._index = CalendarIndex.from_mirror(self.mirror)
+        return self._index
+
     def extract_event_details(self, text: str) -> Optional[dict]:
         """
-        Use LLM to extract event details in JSON format.
+        Extract event details with the deterministic CalendarIntentParser
+        when the command is well formed, otherwise with the LLM in JSON format.
         If start or end datetime is missing or relative terms are used,
-        parse date/time from text using dateparser with timezone Asia/Kolkata.
+        parse date/time from text with the layered DateParser (timezone Asia/Kolkata).
         """
+        event_data = self.intents.extract(text)
+        if event_data is not None:
+            self.extraction_stats["rules"] += 1
+            return event_data
+        self.extraction_stats["llm"] += 1
+
+        def generate():
+            response = self.llm.invoke(calendar_prompt.format(text=text))
+            return response.content if hasattr(response, "content") else str(response)
+
         try:
-            prompt_filled = calendar_prompt.format(text=text)
-            response = self.llm.invoke(prompt_filled)
-            content = response.content if hasattr(response, "content") else str(response)
+            # The prompt resolves 'tomorrow' against today, so the date is part of the cache key
+            content = cached_llm_call(
+                self.llm_cache, "calendar_extraction", calendar_prompt,
+                {"text": text, "today": datetime.now().date().isoformat()}, self.llm, generate,
+                accept=self._is_event_json
+            )
 
             print("[DEBUG] LLM Output:", content)
 
-            import re
-            match = re.search(r'\{.*\}', content, re.DOTALL)
-            if match:
-                content = match.group(0)
-
-            event_data = json.loads(content)
+            event_data = self._event_json(content)
 
             # Post-process start_datetime and end_datetime for better date/time parsing
             event_data = self._post_process_event_data(event_data, fallback_text=text)
@@ -87,34 +157,43 @@ class CalendarAgent:
             print(f"[ERROR] Failed to extract event details: {e}")
             return None
 
+    @staticmethod
+    def _event_json(content: str) -> dict:
+        match = re.search(r'\{.*\}', content, re.DOTALL)
+        return json.loads(match.group(0) if match else content)
+
+    @classmethod
+    def _is_event_json(cls, content: str) -> bool:
+        try:
+            return isinstance(cls._event_json(content), dict)
+        except ValueError:
+            return False
+
     def _post_process_event_data(self, event_data: dict, fallback_text: str) -> dict:
         """
         Ensure start_datetime and end_datetime are ISO strings with timezone info.
         If missing, parse from fallback_text.
         If end_datetime missing, default to 1 hour after start_datetime.
+        An update or delete with no date at all keeps start_datetime None,
+        so the event is looked up by title alone.
         """
 
-        def parse_datetime(dt_str):
-            # Use dateparser to parse date/time string with Asia/Kolkata timezone awareness
-            if not dt_str:
-                return None
-            dt = dateparser.parse(dt_str, settings={"TIMEZONE": "Asia/Kolkata", "RETURN_AS_TIMEZONE_AWARE": True})
-            return dt
-
         start = event_data.get("start_datetime")
         end = event_data.get("end_datetime")
 
-        # Parse start datetime if missing or invalid
-        start_dt = parse_datetime(start)
-        if not start_dt:
-            start_dt = dateparser.parse(fallback_text, settings={"TIMEZONE": "Asia/Kolkata", "RETURN_AS_TIMEZONE_AWARE": True})
+        # ISO strings and common phrases parse without dateparser; see DateParser
+        start_dt = self.dates.parse(start) or self.dates.parse(fallback_text)
+
+        if not start_dt and (event_data.get("action") or "create").lower() in ("update", "delete"):
+            event_data["start_datetime"] = event_data["end_datetime"] = None
+            return event_data
 
         # If still None, fallback to now + 5 minutes
         if not start_dt:
             start_dt = datetime.now(tz=ZoneInfo("Asia/Kolkata")) + timedelta(minutes=5)
 
         # Parse end datetime or default to 1 hour after start
-        end_dt = parse_datetime(end)
+        end_dt = self.dates.parse(end)
         if not end_dt:
             end_dt = start_dt + timedelta(hours=1)
 
@@ -123,9 +202,8 @@ class CalendarAgent:
 
         return event_data
 
-    def create_event(self, event_data: dict) -> dict:
-        self.authenticate_if_needed()
-
+    def _event_body(self, event_data: dict) -> dict:
+        """The events.insert body for extracted event details."""
         recurrence = event_data.get("recurrence") or ""  # Use empty string if None
         is_yearly_recurring = recurrence.lower() == "yearly"
 
@@ -192,25 +270,103 @@ class CalendarAgent:
             if rrule:
                 body["recurrence"] = [rrule]
 
-        return self.service.events().insert(calendarId="primary", body=body).execute()
+        return body
 
-    def list_events(self, max_results=10) -> list:
+    def create_event(self, event_data: dict) -> dict:
         self.authenticate_if_needed()
-        now = datetime.utcnow().isoformat() + "Z"
-        result = self.service.events().list(
-            calendarId="primary",
-            timeMin=now,
-            maxResults=max_results,
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
-        return result.get("items", [])
+        event = self.service.events().insert(calendarId="primary", body=self._event_body(event_data)).execute()
+        self.mirror.upsert(event)
+        return event
+
+    def list_events(self, max_results=10) -> list:
+        """The next max_results occurrences, soonest first; a recurring series appears once per occurrence."""
+        index = self._calendar_index()
+        return [
+            self._occurrence(self.mirror.get(event_id), occurrence_start, occurrence_end)
+            for occurrence_start, occurrence_end, event_id
+            in index.upcoming(datetime.now(tz=ZoneInfo("Asia/Kolkata")), max_results)
+        ]
+
+    def events_between(self, start: datetime, end: datetime) -> list:
+        """Events overlapping [start, end), soonest first; a recurring series appears once per occurrence."""
+        index = self._calendar_index()
+        return [
+            self._occurrence(self.mirror.get(event_id), occurrence_start, occurrence_end)
+            for occurrence_start, occurrence_end, event_id in index.overlapping(start, end)
+        ]
+
+    def find_conflicts(self, start: datetime, end: datetime, exclude_id: Optional[str] = None) -> list:
+        """Busy events overlapping [start, end), one per occurrence."""
+        index = self._calendar_index()
+        return [
+            self._occurrence(self.mirror.get(event_id), occurrence_start, occurrence_end)
+            for occurrence_start, occurrence_end, event_id in index.conflicts(start, end, exclude_id)
+        ]
+
+    @staticmethod
+    def _occurrence(event: dict, start: datetime, end: datetime) -> dict:
+        """A recurring series as the single occurrence at start, the way events.list(singleEvents=True) shows it."""
+        if not event.get("recurrence"):
+            return event
+        tz = ZoneInfo("Asia/Kolkata")
+        if "date" in event["start"]:
+            times = {"date": start.astimezone(tz).date().isoformat()}, {"date": end.astimezone(tz).date().isoformat()}
+        else:
+            times = (
+                {"dateTime": start.astimezone(tz).isoformat(), "timeZone": "Asia/Kolkata"},
+                {"dateTime": end.astimezone(tz).isoformat(), "timeZone": "Asia/Kolkata"},
+            )
+        return {**event, "start": times[0], "end": times[1], "recurringEventId": event["id"]}
+
+    @classmethod
+    def _read_window(cls, text: str, now: datetime):
+        """
+        The time range a read request asks about ("what's on Tuesday
+        afternoon", "meetings tomorrow", "this week", "2026-03-12"), as a
+        (start, end) pair in now's time zone; None when it names no day.
+        """
+        lowered = text.lower()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        days = 1
+        iso_date = re.search(r"\b(\d{4}-\d{2}-\d{2})\b", lowered)
+        weekday = re.search(r"\b(" + "|".join(cls.WEEKDAYS) + r")\b", lowered)
+        if iso_date:
+            day = datetime.fromisoformat(iso_date.group(1)).replace(tzinfo=now.tzinfo)
+        elif "next week" in lowered:
+            day, days = today + timedelta(days=7 - today.weekday()), 7
+        elif "this week" in lowered:
+            day, days = today, 7 - today.weekday()
+        elif "tomorrow" in lowered:
+            day = today + timedelta(days=1)
+        elif "today" in lowered or "tonight" in lowered:
+            day = today
+        elif weekday:
+            day = today + timedelta(days=(cls.WEEKDAYS.index(weekday.group(1)) - today.weekday()) % 7)
+        else:
+            return None
+
+        part = next((hours for name, hours in cls.DAY_PARTS.items() if name in lowered), None)
+        if part and days == 1:
+            return day + timedelta(hours=part[0]), day + timedelta(hours=part[1])
+        return day, day + timedelta(days=days)
 
     def update_event(self, event_id: str, event_data: dict) -> dict:
         self.authenticate_if_needed()
 
-        event = self.service.events().get(calendarId='primary', eventId=event_id).execute()
+        event = self.mirror.get(event_id) or self.service.events().get(calendarId='primary', eventId=event_id).execute()
+
+        updated_event = self.service.events().update(
+            calendarId='primary',
+            eventId=event_id,
+            body=self._apply_update(event, event_data)
+        ).execute()
+        self.mirror.upsert(updated_event)
+
+        return updated_event
 
+    @staticmethod
+    def _apply_update(event: dict, event_data: dict) -> dict:
+        """Apply extracted event details to an existing event body, in place."""
         if "title" in event_data:
             event["summary"] = event_data["title"] or event.get("summary")
         if "description" in event_data:
@@ -305,13 +461,7 @@ class CalendarAgent:
         else:
             event.pop("recurrence", None)
 
-        updated_event = self.service.events().update(
-            calendarId='primary',
-            eventId=event_id,
-            body=event
-        ).execute()
-
-        return updated_event
+        return event
 
     def search_on_date_and_update(self, title: str, search_date: str, update_date: str, update_time: Optional[str] = None):
         """
@@ -350,52 +500,172 @@ class CalendarAgent:
     def delete_event(self, event_id: str) -> None:
         self.authenticate_if_needed()
         self.service.events().delete(calendarId="primary", eventId=event_id).execute()
+        self.mirror.remove(event_id)
+
+    # ---- bulk operations, one batch request per chunk of events ---------
+
+    def _batch(self) -> CalendarBatch:
+        return CalendarBatch(self.service, chunk_size=config.CALENDAR_BATCH_SIZE,
+                             min_interval=config.CALENDAR_BATCH_INTERVAL)
 
-    
+    def _write_batch(self, requests: list) -> tuple:
+        """Run insert/import/update requests in batches; (events written, errors), mirroring the writes."""
+        results = self._batch().execute(requests)
+        events = [result for result in results if isinstance(result, dict)]
+        self.mirror.upsert_many(events)
+        return events, [result for result in results if isinstance(result, Exception)]
 
-    def find_event_id(self, title: str, start_date: Optional[str] = None) -> Optional[str]:
+    def create_events(self, events_data: list) -> tuple:
+        """Create many events; returns (created events, errors)."""
+        self.authenticate_if_needed()
+        events = self.service.events()
+        return self._write_batch([
+            events.insert(calendarId="primary", body=self._event_body(event_data)) for event_data in events_data
+        ])
+
+    def update_events(self, updates: list) -> tuple:
+        """Apply (event_id, event_data) updates; returns (updated events, errors)."""
+        self.authenticate_if_needed()
+        events = self.service.events()
+        current = {event_id: self.mirror.get(event_id) for event_id, _ in updates}
+        missing = [event_id for event_id, event in current.items() if event is None]
+        if missing:
+            fetched = self._batch().execute([events.get(calendarId="primary", eventId=event_id) for event_id in missing])
+            current.update(zip(missing, fetched))
+
+        requests, errors = [], []
+        for event_id, event_data in updates:
+            event = current[event_id]
+            if isinstance(event, Exception):
+                errors.append(event)
+                continue
+            # Copied, so two updates of one event each start from the stored version
+            body = self._apply_update(json.loads(json.dumps(event)), event_data)
+            requests.append(events.update(calendarId="primary", eventId=event_id, body=body))
+        updated, failed = self._write_batch(requests)
+        return updated, errors + failed
+
+    def delete_events(self, event_ids: list) -> tuple:
+        """Delete many events; returns (deleted ids, errors). Events already gone count as deleted."""
+        self.authenticate_if_needed()
+        events = self.service.events()
+        results = self._batch().execute([events.delete(calendarId="primary", eventId=event_id) for event_id in event_ids])
+        deleted, errors = [], []
+        for event_id, result in zip(event_ids, results):
+            if isinstance(result, HttpError) and result.resp.status in (404, 410):
+                result = None
+            if isinstance(result, Exception):
+                errors.append(result)
+            else:
+                deleted.append(event_id)
+        self.mirror.remove_many(deleted)
+        return deleted, errors
+
+    def import_ics(self, path: str) -> tuple:
         """
-        Search events for one matching the title and optionally datetime (ISO format).
-        Return eventId if found, else None.
+        Import the events of an .ics file with events.import, batched;
+        events keep their iCalendar UID, so importing a file again updates
+        them instead of adding copies. Returns (imported events, errors).
         """
         self.authenticate_if_needed()
+        with open(path, encoding="utf-8") as ics_file:
+            bodies = parse_ics(ics_file.read(), tz="Asia/Kolkata")
+        events = self.service.events()
+        return self._write_batch([events.import_(calendarId="primary", body=body) for body in bodies])
 
-        now = datetime.utcnow().isoformat() + "Z"
-        one_year_later = (datetime.utcnow() + timedelta(days=365)).isoformat() + "Z"
-
-        events = self.service.events().list(
-            calendarId="primary",
-            timeMin=now,
-            timeMax=one_year_later,
-            maxResults=100,
-            singleEvents=False
-        ).execute().get("items", [])
-
-        for event in events:
-            ev_title = event.get("summary", "").lower()
-            ev_start = event["start"].get("dateTime") or event["start"].get("date")
-            if not ev_start:
-                continue
+    def _bulk_command(self, text: str) -> Optional[str]:
+        """
+        Commands that act on many events and bypass the LLM: "import
+        timetable.ics", and "delete all events <when>" / "clear my
+        calendar <when>", which asks for confirmation before deleting
+        more than one event.
+        """
+        lowered = text.lower()
+        match = re.search(r"\bimport\b.*?([^\s'\"]+\.ics)\b", text, re.IGNORECASE)
+        if match:
+            path = match.group(1)
+            if not os.path.exists(path):
+                path = os.path.join(config.UPLOADS_DIR, os.path.basename(path))
+            if not os.path.exists(path):
+                return f"❗ Could not find {match.group(1)}."
+            imported, errors = self.import_ics(path)
+            return f"📥 Imported {len(imported)} events." + self._failure_note(errors)
+
+        if BULK_DELETE.match(lowered):
+            window = self._read_window(text, datetime.now(tz=ZoneInfo("Asia/Kolkata")))
+            if not window:
+                return None
+            events = self.events_between(*window)
+            # Only single events: a weekly series overlapping the window is not "this week's" to delete
+            singles = list({e["id"]: e for e in events if not e.get("recurrence")}.values())
+            skipped = len({e["id"] for e in events if e.get("recurrence")})
+            note = f"\nℹ️ Left {skipped} recurring series alone; delete them by name." if skipped else ""
+            if not singles:
+                return "📭 No events to delete in that time." + note
+            if len(singles) == 1:
+                return self._delete_many([singles[0]["id"]]) + note
+            # More than one event: nothing is deleted until the next prompt confirms
+            self.pending_deletion = [e["id"] for e in singles]
+            listing = "\n".join(
+                f"📅 {e.get('summary', 'No Title')} — {e['start'].get('dateTime', e['start'].get('date', ''))}"
+                for e in singles
+            )
+            return (f"⚠️ This will delete {len(singles)} events:\n{listing}{note}\n"
+                    "Reply 'yes, delete these events' to confirm.")
+        return None
+
+    def _confirm_deletion(self, text: str) -> Optional[str]:
+        """Answer a pending bulk delete: 'yes' deletes the listed events, any other prompt drops them."""
+        event_ids, self.pending_deletion = self.pending_deletion, None
+        if not event_ids or not CONFIRM.match(text.strip().lower()):
+            return None
+        return self._delete_many(event_ids)
 
-            ev_start_dt = datetime.fromisoformat(ev_start)
+    def _delete_many(self, event_ids: list) -> str:
+        deleted, errors = self.delete_events(event_ids)
+        noun = "event" if len(deleted) == 1 else "events"
+        return f"🗑️ Deleted {len(deleted)} {noun}." + self._failure_note(errors)
 
-            if title.lower() == ev_title:
-                if start_date:
-                    try:
-                        input_dt = datetime.fromisoformat(start_date)
-                    except ValueError:
-                        continue
+    @staticmethod
+    def _failure_note(errors: list) -> str:
+        if not errors:
+            return ""
+        return f"\n❗ {len(errors)} failed: {errors[0]}"
 
-                    # Match date
-                    if input_dt.date() != ev_start_dt.date():
-                        continue
 
-                    # If time provided, match time too
-                    has_time = "T" in start_date and start_date.split("T")[1].strip()
-                    if has_time and input_dt.time() != ev_start_dt.time():
-                        continue
+    def find_event_id(self, title: str, start_date: Optional[str] = None, fuzzy: bool = False) -> Optional[str]:
+        """
+        Search events for one matching the title and optionally datetime (ISO format).
+        Titles match exactly after normalization, or, if fuzzy (never for
+        an update or delete), else by similarity; a date is looked up as a
+        window in the interval index, so occurrences of recurring series
+        are found too, by the id of that one instance. Without a date,
+        the closest title wins, and among its events the one happening
+        soonest, then past ones.
+        Return eventId if found, else None.
+        """
+        index = self._calendar_index()
+        candidates = index.find_title(title, now=datetime.now(tz=ZoneInfo("Asia/Kolkata")), exact=not fuzzy)
+        if not candidates or not start_date:
+            return candidates[0] if candidates else None
 
-                return event["id"]
+        try:
+            input_dt = datetime.fromisoformat(start_date)
+        except ValueError:
+            return None
+        tz = ZoneInfo("Asia/Kolkata")
+        day = datetime.combine(input_dt.date(), datetime.min.time(), tzinfo=tz)
+        # If time provided, match time too
+        has_time = "T" in start_date and start_date.split("T")[1].strip()
+
+        candidates = set(candidates)
+        for occurrence_start, _, event_id in index.overlapping(day, day + timedelta(days=1)):
+            local_start = occurrence_start.astimezone(tz)
+            if event_id not in candidates or local_start.date() != input_dt.date():
+                continue
+            if has_time and local_start.time() != input_dt.time():
+                continue
+            return index.occurrence_id(event_id, occurrence_start)
 
         return None
 
@@ -403,6 +673,13 @@ class CalendarAgent:
     def process(self, text: str, context: dict = {}) -> str:
         self.authenticate_if_needed()
 
+        try:
+            response = self._confirm_deletion(text) or self._bulk_command(text)
+        except Exception as e:
+            return f"❌ An error occurred: {str(e)}"
+        if response:
+            return response
+
         event_data = self.extract_event_details(text)
         if not event_data:
             return "❌ Sorry, I couldn't understand the event details."
@@ -412,14 +689,26 @@ class CalendarAgent:
 
         try:
             if action == "create":
+                conflicts = []
+                if (event_data.get("recurrence") or "").lower() != "yearly":
+                    conflicts = self.find_conflicts(
+                        datetime.fromisoformat(event_data["start_datetime"]),
+                        datetime.fromisoformat(event_data["end_datetime"])
+                    )
                 event = self.create_event(event_data)
                 start = event['start'].get('dateTime') or event['start'].get('date')
-                return f"✅ Event created: {event.get('summary')} at {start}"
+                response = f"✅ Event created: {event.get('summary')} at {start}"
+                if conflicts:
+                    response += "\n⚠️ Overlaps with: " + ", ".join(
+                        f"{e.get('summary', 'No Title')} at {e['start'].get('dateTime')}" for e in conflicts
+                    )
+                return response
 
             elif action == "read":
-                events = self.list_events()
+                window = self._read_window(text, datetime.now(tz=ZoneInfo("Asia/Kolkata")))
+                events = self.events_between(*window) if window else self.list_events()
                 if not events:
-                    return "📭 No upcoming events found."
+                    return "📭 No events found for that time." if window else "📭 No upcoming events found."
                 return "\n".join(
                     f"📅 {e.get('summary', 'No Title')} — {e['start'].get('dateTime', e['start'].get('date', ''))}"
                     for e in events
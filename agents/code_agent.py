@@ -1,7 +1,9 @@
 # agents/code_agent.py
 
 import os
+from typing import AsyncIterator
 from dotenv import load_dotenv
+from memory.retrieval_context import RetrievalPolicy
 from langchain_google_genai import ChatGoogleGenerativeAI
 from core.prompt_templates.code_template import (
     code_generate_prompt,
@@ -12,6 +14,9 @@ from core.prompt_templates.code_template import (
 load_dotenv()
 
 class CodeAgent:
+    # Code prompts are self-contained; conversation memory is never read.
+    retrieval_policy = RetrievalPolicy.none()
+
     def __init__(self, llm: ChatGoogleGenerativeAI):
         """
         Initializes the CodeAgent with a Gemini LLM instance.
@@ -29,6 +34,17 @@ class CodeAgent:
         except Exception as e:
             return f"❌ LLM invocation error: {e}"
 
+    async def _ainvoke_llm(self, prompt: str) -> str:
+        """
+        Async counterpart of _invoke_llm, awaiting the LLM's ainvoke.
+        """
+        try:
+            response = await self.llm.ainvoke(prompt)
+            result = getattr(response, "content", str(response)).strip()
+            return result
+        except Exception as e:
+            return f"❌ LLM invocation error: {e}"
+
     def generate_code(self, request: str) -> str:
         """
         Generates code based on a text request.
@@ -50,17 +66,42 @@ class CodeAgent:
         prompt = code_explain_prompt.format(text=code_snippet)
         return self._invoke_llm(prompt)
 
+    def _task_prompt(self, text: str) -> str:
+        """
+        Picks the debug, explain or generate template based on intent in the text.
+        """
+        text_lower = text.lower()
+        if "debug" in text_lower or "fix" in text_lower:
+            return code_debug_prompt.format(text=text)
+        elif "explain" in text_lower or "what does" in text_lower:
+            return code_explain_prompt.format(text=text)
+        else:
+            return code_generate_prompt.format(text=text)
+
     def process(self, text: str, context: dict = {}) -> str:
         """
         Processes a general code-related task based on intent in the text.
         """
-        text_lower = text.lower()
         try:
-            if "debug" in text_lower or "fix" in text_lower:
-                return self.debug_code(text)
-            elif "explain" in text_lower or "what does" in text_lower:
-                return self.explain_code(text)
-            else:
-                return self.generate_code(text)
+            return self._invoke_llm(self._task_prompt(text))
+        except Exception as e:
+            return f"❌ Error processing code task: {e}"
+
+    async def aprocess(self, text: str, context: dict = {}) -> str:
+        """
+        Async counterpart of process.
+        """
+        try:
+            return await self._ainvoke_llm(self._task_prompt(text))
         except Exception as e:
             return f"❌ Error processing code task: {e}"
+
+    async def astream(self, text: str, context: dict = {}) -> AsyncIterator[str]:
+        """
+        Streams the response to a code task chunk by chunk as the LLM generates it.
+        """
+        try:
+            async for chunk in self.llm.astream(self._task_prompt(text)):
+                yield getattr(chunk, "content", str(chunk))
+        except Exception as e:
+            yield f"❌ LLM invocation error: {e}"
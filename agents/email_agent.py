@@ -9,9 +9,15 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from core.prompt_templates.email_template import email_prompt_template
 from langchain.prompts import PromptTemplate
+from memory.retrieval_context import RetrievalPolicy
 
 
 class EmailAgent:
+    # The Google API client is not thread safe; the orchestrator serializes calls.
+    thread_safe = False
+    # Drafts come from the prompt alone; conversation memory is never read.
+    retrieval_policy = RetrievalPolicy.none()
+
     SCOPES = [
         "https://www.googleapis.com/auth/gmail.modify",
         "https://www.googleapis.com/auth/gmail.readonly",
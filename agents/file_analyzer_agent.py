@@ -1,20 +1,71 @@
+import asyncio
 import os
 import re
 import logging
+import threading
+from typing import AsyncIterator, Optional, Tuple
 from langchain.prompts import PromptTemplate
 from core.prompt_templates.file_analyzer_template import file_analysis_prompt_template
 from PyPDF2 import PdfReader
+from memory.retrieval_context import RetrievalPolicy
 
 class FileAnalyzerAgent:
+    # Works on the file it is pointed at; conversation memory is never read.
+    retrieval_policy = RetrievalPolicy.none()
+
     def __init__(self, llm):
         self.logger = logging.getLogger(__name__)
         self.llm = llm
         self.awaiting_file_path = False
+        # Guards awaiting_file_path when prompts are processed concurrently
+        self._state_lock = threading.Lock()
 
         # Load the prompt template once
         self.prompt_template = PromptTemplate.from_template(file_analysis_prompt_template)
 
     def process(self, prompt: str, context: dict) -> str:
+        file_path, reply = self._resolve_file_path(prompt)
+        if reply is not None:
+            return reply
+        return self._read_and_analyze(file_path)
+
+    async def aprocess(self, prompt: str, context: dict) -> str:
+        file_path, reply = self._resolve_file_path(prompt)
+        if reply is not None:
+            return reply
+
+        content, error = await asyncio.to_thread(self._read_file, file_path)
+        if error is not None:
+            return error
+
+        formatted_prompt = self.prompt_template.format(file_content=content)
+        response = await self.llm.ainvoke(formatted_prompt)
+        return self._response_text(response)
+
+    async def astream(self, prompt: str, context: dict) -> AsyncIterator[str]:
+        file_path, reply = self._resolve_file_path(prompt)
+        if reply is not None:
+            yield reply
+            return
+
+        content, error = await asyncio.to_thread(self._read_file, file_path)
+        if error is not None:
+            yield error
+            return
+
+        formatted_prompt = self.prompt_template.format(file_content=content)
+        async for chunk in self.llm.astream(formatted_prompt):
+            yield getattr(chunk, "content", str(chunk))
+
+    def _resolve_file_path(self, prompt: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Return (file_path, None) when a file should be analyzed, or
+        (None, reply) when the user needs to be answered first.
+        """
+        with self._state_lock:
+            return self._resolve_file_path_locked(prompt)
+
+    def _resolve_file_path_locked(self, prompt: str) -> Tuple[Optional[str], Optional[str]]:
         prompt_lower = prompt.lower()
 
         # Check if prompt contains 'analyze this file' AND a file path inline
@@ -22,31 +73,36 @@ class FileAnalyzerAgent:
         if match:
             file_path = match.group(1).strip().strip('"').strip("'")
             if os.path.isfile(file_path):
-                return self._read_and_analyze(file_path)
+                self.awaiting_file_path = False
+                return file_path, None
             else:
                 self.awaiting_file_path = True
-                return f"❌ File not found: {file_path}. Please provide a valid file path."
+                return None, f"❌ File not found: {file_path}. Please provide a valid file path."
 
-        # If waiting for file path (after user was prompted)
+        # If waiting for file path (after user was prompted); the pending
+        # request is consumed here so only one prompt can claim it
         if self.awaiting_file_path:
+            self.awaiting_file_path = False
             file_path = prompt.strip().strip('"').strip("'")
-            return self._read_and_analyze(file_path)
+            return file_path, None
 
         # If user just says "analyze this file" without path
         if "analyze this file" in prompt_lower:
             self.awaiting_file_path = True
-            return "📂 Please provide the full path to the file you want me to analyze."
+            return None, "📂 Please provide the full path to the file you want me to analyze."
 
         # Default fallback
-        return (
+        return None, (
             "I can help you analyze files. Please say 'analyze this file' "
             "to start the process."
         )
 
-    def _read_and_analyze(self, file_path: str) -> str:
+    def _read_file(self, file_path: str) -> Tuple[str, Optional[str]]:
+        """
+        Read a PDF or text file. Returns (content, None) or ("", error_message).
+        """
         if not os.path.isfile(file_path):
-            self.awaiting_file_path = False
-            return f"❌ File not found: {file_path}. Please try again."
+            return "", f"❌ File not found: {file_path}. Please try again."
 
         try:
             content = ""
@@ -59,16 +115,23 @@ class FileAnalyzerAgent:
                 with open(file_path, 'r', encoding='utf-8') as f:
                     content = f.read()
         except Exception as e:
-            self.awaiting_file_path = False
             self.logger.error(f"Error reading file {file_path}: {e}")
-            return f"❌ Error reading file: {e}"
+            return "", f"❌ Error reading file: {e}"
 
-        self.awaiting_file_path = False
+        return content, None
+
+    def _read_and_analyze(self, file_path: str) -> str:
+        content, error = self._read_file(file_path)
+        if error is not None:
+            return error
 
         # Format prompt and send to LLM
         formatted_prompt = self.prompt_template.format(file_content=content)
         response = self.llm.invoke(formatted_prompt)
+        return self._response_text(response)
 
+    @staticmethod
+    def _response_text(response) -> str:
         if hasattr(response, "content"):
             return response.content.strip()
         else:
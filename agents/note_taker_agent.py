@@ -1,15 +1,33 @@
+import asyncio
+import math
 import re
-import json
 import os
-from datetime import datetime
-from typing import Dict, Any, Optional
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Any, Iterator, Optional
 
 from langchain.chains import LLMChain
+from langchain.docstore.document import Document
 from langchain.prompts import PromptTemplate
 from core.base_agent import BaseAgent
+from memory.hybrid_search import fuse, is_lexical_query
+from memory.llm_cache import LLMCache, cached_llm_call
+from memory.note_index import parse_query
+from memory.note_store import NoteStore, migrate_json_notes, note_id, open_note_store
+from memory.retrieval_context import RetrievalPolicy
 from core.prompt_templates.note_taker_template import note_taker_prompt
+import config
 
 class NoteTakerAgent(BaseAgent):
+    # Only earlier note-taking turns are useful context for a new note.
+    retrieval_policy = RetrievalPolicy.filtered(k=3, agent="NoteTakerAgent")
+
+    # Command words stripped from a search prompt; AND/OR and #tags are kept for the query
+    SEARCH_COMMAND_WORDS = {"find", "search", "look", "up", "all", "my", "notes", "note", "memos",
+                            "memo", "about", "related", "to", "of", "with", "for", "tagged", "the", "a", "an"}
+
+    # Saved notes, not the agent's conversation turns, carry a note_id
+    NOTE_VECTOR_FILTER = {"agent": "NoteTakerAgent", "note_id": {"$neq": None}}
+
     def __init__(
         self,
         llm,
@@ -18,20 +36,26 @@ class NoteTakerAgent(BaseAgent):
         vectorstore,
         note_file: str = "data/notes.json",
         prompt_template: Optional[Any] = None,
+        note_store: Optional[NoteStore] = None,
+        llm_cache: Optional[LLMCache] = None,
     ):
         template = prompt_template if prompt_template is not None else note_taker_prompt
 
         super().__init__(llm, memory, template, embeddings, vectorstore)
 
+        # Notes live in the configured NoteStore next to note_file; a legacy
+        # notes.json found there is imported once and renamed
         self.note_file = note_file
-        os.makedirs(os.path.dirname(note_file), exist_ok=True)
-        if not os.path.exists(note_file):
-            with open(note_file, 'w') as f:
-                json.dump([], f)
+        self.notes = note_store if note_store is not None else open_note_store(
+            config.NOTES_BACKEND, os.path.dirname(note_file) or "."
+        )
+        migrate_json_notes(note_file, self.notes)
 
         self.chain = LLMChain(llm=llm, prompt=template)
         self.embeddings = embeddings
         self.vectorstore = vectorstore
+        # Command classification is cached; note writing is free-form and never is
+        self.llm_cache = llm_cache
 
         classification_prompt_text = """
 You are a note-taking assistant. Given a user's input, classify the command into one of these:
@@ -57,11 +81,27 @@ Command:
         print(f"[DEBUG] Received prompt: {prompt}")
         command = self._parse_command(prompt)
         print(f"[DEBUG] Parsed command: {command}")
+        return self._run_command(command, prompt, context)
 
+    async def astream(self, prompt: str, context: Optional[Any] = None) -> AsyncIterator[str]:
+        """Streams a note listing one note at a time after its page header; other commands arrive whole."""
+        command = await asyncio.to_thread(self._parse_command, prompt)
+        if command != "list":
+            yield await asyncio.to_thread(self._run_command, command, prompt, context)
+            return
+        chunks = self._iter_note_list(prompt)
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    def _run_command(self, command: str, prompt: str, context: Optional[Any] = None) -> str:
         if command == "take":
-            return self._take_note(prompt, context if context is not None else [])
+            history = context.get("history", []) if isinstance(context, dict) else context
+            return self._take_note(prompt, history or [])
         elif command == "list":
-            return self._list_notes()
+            return self._list_notes(prompt)
         elif command == "search":
             return self._search_notes(prompt)
         elif command == "delete":
@@ -81,9 +121,15 @@ Command:
         if re.search(r"\b(delete|remove|erase)\b.*\b(note|memo)?\b", prompt_lower):
             return "delete"
 
+        commands = {"take", "list", "search", "delete", "unknown"}
         try:
-            command = self.classification_chain.run({"input": prompt}).strip().lower()
-            if command not in {"take", "list", "search", "delete", "unknown"}:
+            variables = {"input": prompt}
+            command = cached_llm_call(
+                self.llm_cache, "note_classification", self.classification_template, variables, self.llm,
+                lambda: self.classification_chain.run(variables),
+                accept=lambda response: response.strip().lower() in commands
+            ).strip().lower()
+            if command not in commands:
                 command = "unknown"
             print(f"[DEBUG] LLM classified command: {command}")
             return command
@@ -120,28 +166,41 @@ Command:
 
         return f"✅ Note taken: {note_data['title']}" if note_data else "Failed to save note."
 
+    @staticmethod
+    def _memory_id(note_data: Dict[str, str]) -> str:
+        # The note store's id, so deleting the note can find its vector
+        return note_data.get("id") or note_id(note_data)
+
     def _save_to_memory(self, note_data: Dict[str, str]):
         if not self.vectorstore or not self.embeddings:
             print("[DEBUG] Vectorstore or embeddings not configured, skipping save to memory.")
             return
-        from langchain.docstore.document import Document
+        memory_id = self._memory_id(note_data)
+        if self.vectorstore.get_by_ids([memory_id]):
+            return
         content = f"Title: {note_data['title']}\nDate: {note_data['date']}\nTags: {note_data['tags']}\nContent: {note_data['content']}"
-        doc = Document(page_content=content)
-        self.vectorstore.add_documents([doc])
+        doc = Document(
+            id=memory_id,
+            page_content=content,
+            metadata={"agent": self.__class__.__name__, "note_id": memory_id, "date": note_data["date"]}
+        )
+        self.vectorstore.add_documents([doc], ids=[memory_id])
         print(f"[DEBUG] Saved note titled '{note_data['title']}' to vectorstore.")
 
+    def _delete_from_memory(self, notes) -> None:
+        if not self.vectorstore:
+            return
+        ids = [self._memory_id(note) for note in notes]
+        # Notes saved before vectors had ids cannot be found and stay in memory
+        stored = [doc.id for doc in self.vectorstore.get_by_ids(ids)]
+        if stored:
+            self.vectorstore.delete(stored)
+            print(f"[DEBUG] Removed {len(stored)} note(s) from vectorstore.")
+
     def _save_to_local(self, note_data: Dict[str, str]):
         try:
-            with open(self.note_file, 'r+') as f:
-                try:
-                    notes = json.load(f)
-                except json.JSONDecodeError:
-                    notes = []
-                notes.append(note_data)
-                f.seek(0)
-                f.truncate()
-                json.dump(notes, f, indent=2)
-            print(f"[DEBUG] Saved note titled '{note_data['title']}' to local JSON.")
+            note_data["id"] = self.notes.add(note_data)
+            print(f"[DEBUG] Saved note titled '{note_data['title']}' to the note store.")
         except Exception as e:
             print(f"[ERROR] Failed to save note locally: {e}")
 
@@ -165,59 +224,130 @@ Command:
             print(f"[ERROR] Failed to parse note output: {e}")
             return {}
 
-    def _list_notes(self) -> str:
+    @staticmethod
+    def _list_options(prompt: str, today: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Page, filters and order of a list prompt, e.g. "show notes tagged
+        #work from 2026-01-01 to 2026-01-31 newest first page 2". Dates are
+        ISO dates, 'today', 'yesterday', 'this week', 'this month' or
+        'last N days'.
+        """
+        today = (today or datetime.now()).date()
+        lower = prompt.lower()
+        page = re.search(r"\bpage\s+(\d+)", lower)
+        tags = re.findall(r"#([\w-]+)", lower) + re.findall(r"\btagged\s+(?!#)([\w-]+)", lower)
+
+        date_from = date_to = None
+        dates = re.findall(r"\d{4}-\d{2}-\d{2}", lower)
+        if re.search(r"\b(from|between)\b", lower) and len(dates) >= 2:
+            date_from, date_to = dates[0], dates[1]
+        elif re.search(r"\b(since|after|from)\s+\d{4}-", lower):
+            date_from = dates[0]
+        elif re.search(r"\b(before|until)\s+\d{4}-", lower):
+            date_to = dates[0]
+        elif re.search(r"\bon\s+\d{4}-", lower):
+            date_from = date_to = dates[0]
+        elif re.search(r"\btoday\b", lower):
+            date_from = date_to = today.isoformat()
+        elif re.search(r"\byesterday\b", lower):
+            date_from = date_to = (today - timedelta(days=1)).isoformat()
+        elif re.search(r"\bthis week\b", lower):
+            date_from = (today - timedelta(days=today.weekday())).isoformat()
+        elif re.search(r"\bthis month\b", lower):
+            date_from = today.replace(day=1).isoformat()
+        else:
+            recent = re.search(r"\b(?:last|past)\s+(\d+)\s+days?\b", lower)
+            if recent:
+                date_from = (today - timedelta(days=int(recent.group(1)) - 1)).isoformat()
+
+        return {
+            "page": max(1, int(page.group(1))) if page else 1,
+            "tags": tags,
+            "date_from": date_from,
+            "date_to": date_to,
+            "newest_first": bool(re.search(r"\b(newest|latest|recent|descending)\b", lower)),
+        }
+
+    def _iter_note_list(self, prompt: str = "") -> Iterator[str]:
+        """A header with the total count, then one formatted note per chunk, read a page at a time."""
+        options = self._list_options(prompt)
+        filters = {key: options[key] for key in ("date_from", "date_to", "tags")}
+        page_size = config.NOTES_PAGE_SIZE
         try:
-            with open(self.note_file, 'r') as f:
-                notes = json.load(f)
-        except Exception:
-            notes = []
-
-        if not notes:
-            return "No notes found."
-
-        return "\n\n".join(
-            f"📝 {note['title']} ({note['date']})\nTags: {note['tags']}\n{note['content']}"
-            for note in notes
-        )
-
-    import json
-
-    def _search_notes(self, prompt: str) -> str:
-        print(f"[DEBUG] Received prompt: {prompt}")
-        words = prompt.lower().split()
-        stopwords = ["find", "search", "look", "up", "all", "notes", "note", "memos", 
-                    "memo", "about", "related", "to", "of", "with", "for", "and", "or", 
-                    "the", "a", "an"]
-
-        keywords = [word for word in words if word not in stopwords]
-        print(f"[DEBUG] Extracted keywords: {keywords}")
+            total = self.notes.count(**filters)
+        except Exception as e:
+            print(f"[ERROR] Failed to count notes: {e}")
+            total = 0
+        if not total:
+            yield "No notes found."
+            return
 
-        if not keywords:
+        pages = math.ceil(total / page_size)
+        page = min(options["page"], pages)
+        offset = (page - 1) * page_size
+        yield f"📒 Notes {offset + 1}–{min(offset + page_size, total)} of {total} (page {page} of {pages})"
+        for note in self.notes.iter_notes(
+            offset=offset, limit=page_size, newest_first=options["newest_first"], **filters
+        ):
+            yield f"\n\n📝 {note['title']} ({note['date']})\nTags: {note['tags']}\n{note['content']}"
+
+    def _list_notes(self, prompt: str = "") -> str:
+        return "".join(self._iter_note_list(prompt))
+
+    def _search_notes(self, prompt: str, k: int = 10) -> str:
+        query = " ".join(word for word in prompt.split() if word.lower() not in self.SEARCH_COMMAND_WORDS)
+        if not query:
             return "Please specify keywords to search for notes."
 
         try:
-            with open(self.note_file, 'r') as f:
-                notes = json.load(f)
+            keyword_hits = [note for note, _ in self.notes.search(query, k=k)]
         except Exception as e:
-            print(f"[DEBUG] Error loading notes file: {e}")
+            print(f"[ERROR] Note search failed: {e}")
             return "No notes found."
 
-        matching_notes = []
-        for note in notes:
-            combined_text = (note.get('title', '') + " " + note.get('tags', '') + " " + note.get('content', '')).lower()
-            print(f"[DEBUG] Checking note: {note.get('title', '')}")
-            print(f"[DEBUG] Combined text: {combined_text}")
-            # Instead of requiring all keywords, check if ANY keyword is in the note (you can change to ALL if you want)
-            if any(k in combined_text for k in keywords):
-                matching_notes.append(
-                    f"📝 {note.get('title', '')} ({note.get('date', '')})\nTags: {note.get('tags', '')}\n{note.get('content', '')}"
-                )
-
-        if matching_notes:
-            return "\n\n".join(matching_notes)
-        else:
-            return f"No relevant notes found for '{' '.join(keywords)}'."
+        results = keyword_hits
+        if self._wants_semantic_search(query, keyword_hits):
+            try:
+                results = self._merge_note_hits(self._semantic_note_hits(query, k), keyword_hits, k)
+            except Exception as e:
+                print(f"[ERROR] Semantic note search failed: {e}")
 
+        if not results:
+            return f"No relevant notes found for '{query}'."
+        return "\n\n".join(
+            f"📝 {note.get('title', '')} ({note.get('date', '')})\nTags: {note.get('tags', '')}\n{note.get('content', '')}"
+            for note in results
+        )
+
+    def _wants_semantic_search(self, query: str, keyword_hits) -> bool:
+        if not self.vectorstore or not self.embeddings:
+            return False
+        # Boolean and tag queries are exact constraints; exact tokens that matched need no embedding
+        _, tags = parse_query(query)
+        if tags or {"AND", "OR"} & set(query.split()):
+            return False
+        return not (keyword_hits and is_lexical_query(query))
+
+    def _semantic_note_hits(self, query: str, k: int):
+        """Notes whose vectors are nearest the query, restricted to saved notes."""
+        docs = self.vectorstore.similarity_search(query, k=k, filter=self.NOTE_VECTOR_FILTER, fetch_k=max(20, 4 * k))
+        notes = []
+        for doc in docs:
+            note = self.notes.get(doc.metadata["note_id"])
+            # A vector whose note was deleted elsewhere is skipped
+            if note is not None:
+                notes.append(note)
+        return notes
+
+    @staticmethod
+    def _merge_note_hits(semantic_hits, keyword_hits, k: int):
+        notes = {note["id"]: note for note in semantic_hits + keyword_hits}
+        ranked = fuse(
+            [Document(id=note["id"], page_content="") for note in semantic_hits],
+            [Document(id=note["id"], page_content="") for note in keyword_hits],
+            k
+        )
+        return [notes[doc.id] for doc in ranked]
 
     def _delete_note(self, prompt: str) -> str:
     # Extract potential keyword (e.g., "kabir") from prompt
@@ -225,24 +355,15 @@ Command:
         if not keyword:
             return "Please specify which note to delete, e.g., 'delete note about Kabir'."
 
-        keyword_lower = keyword.lower()
         try:
-            with open(self.note_file, 'r+') as f:
-                notes = json.load(f)
-                matched_notes = [
-                    n for n in notes if (
-                        keyword_lower in n['title'].lower()
-                        or keyword_lower in n['tags'].lower()
-                        or keyword_lower in n['content'].lower()
-                    )
-                ]
-                remaining_notes = [n for n in notes if n not in matched_notes]
-
-                f.seek(0)
-                f.truncate()
-                json.dump(remaining_notes, f, indent=2)
+            # An exact title is an index lookup; otherwise the notes with every word of it, from the NoteIndex
+            matched_notes = self.notes.find_by_title(keyword) or [
+                note for note, _ in self.notes.search(" AND ".join(keyword.split()), k=len(self.notes))
+            ]
+            self.notes.delete(n['id'] for n in matched_notes)
 
             if matched_notes:
+                self._delete_from_memory(matched_notes)
                 deleted_titles = ', '.join(n['title'] for n in matched_notes)
                 return f"🗑️ Deleted {len(matched_notes)} note(s) related to '{keyword}': {deleted_titles}"
             else:
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from datetime import datetime
 from typing import Optional, Dict, Any
@@ -9,21 +10,30 @@ from langchain.chains import LLMChain
 from langchain_google_genai import ChatGoogleGenerativeAI
 from serpapi import GoogleSearch
 
+from memory.llm_cache import LLMCache, acached_llm_call, cached_llm_call
+from memory.retrieval_context import RetrievalPolicy
+
 # Assuming you have a BaseAgent class somewhere
 class BaseAgent:
     pass
 
 class WebSearchAgent(BaseAgent):
+    # Recent conversation helps disambiguate follow-up searches.
+    retrieval_policy = RetrievalPolicy.top_k(3)
+
     def __init__(
         self,
         llm: ChatGoogleGenerativeAI,
         memory: Optional[Any] = None,
         prompt_template: Any = None,
         serpapi_api_key: Optional[str] = None,
+        llm_cache: Optional[LLMCache] = None,
     ):
         self.llm = llm
         self.memory = memory
         self.chain = LLMChain(llm=self.llm, prompt=prompt_template)
+        # Keyed on the inputs, which include the retrieved context and today's date
+        self.llm_cache = llm_cache
         self.api_key = serpapi_api_key or os.getenv("SERPAPI_API_KEY")
         if not self.api_key:
             raise ValueError("SERPAPI_API_KEY not set in environment")
@@ -39,35 +49,64 @@ class WebSearchAgent(BaseAgent):
         results = search.get_dict()
         return results
 
-    def process(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
-        print("🔍 [WebSearchAgent] Processing prompt:", prompt)
-        context_str = context.get("context") if context else "None"
-
-        # Step 1: Prepare LLM inputs
-        prompt_inputs = {
+    def _prompt_inputs(self, prompt: str, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        history = context.get("history") if context else None
+        context_str = "\n".join(
+            doc.page_content if hasattr(doc, "page_content") else str(doc) for doc in history
+        ) if history else "None"
+        return {
             "input": prompt,
             "context": context_str,
             "current_date": datetime.now().strftime("%Y-%m-%d"),
         }
+
+    @staticmethod
+    def _extract_query(search_strategy: str) -> Optional[str]:
+        # Expects a line like "Query: some search terms"
+        query_line = next(
+            (line for line in search_strategy.splitlines() if line.lower().startswith("query:")),
+            None,
+        )
+        return query_line.split(":", 1)[1].strip() if query_line else None
+
+    @staticmethod
+    def _format_results(search_strategy: str, results: dict) -> str:
+        organic = results.get("organic_results", [])
+        if not organic:
+            return f"{search_strategy}\n\n---\nNo relevant search results found."
+
+        formatted_results = ""
+        for idx, res in enumerate(organic[:10], 1):
+            title = res.get("title", "No Title")
+            snippet = res.get("snippet", "No description available.")
+            link = res.get("link", res.get("url", "No link available."))
+            formatted_results += f"{idx}. **{title}**\n{snippet}\n🔗 {link}\n\n"
+
+        return f"{search_strategy}\n\n---\n🔍 Top Search Results:\n{formatted_results.strip()}"
+
+    def process(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
+        print("🔍 [WebSearchAgent] Processing prompt:", prompt)
+
+        # Step 1: Prepare LLM inputs
+        prompt_inputs = self._prompt_inputs(prompt, context)
         print("🧠 Prompt Inputs to LLM:", prompt_inputs)
 
         # Step 2: Generate search strategy / query from LLM
         try:
-            llm_response = self.chain.invoke(prompt_inputs)
-            search_strategy = llm_response["text"].strip()
+            search_strategy = cached_llm_call(
+                self.llm_cache, "web_search_query", self.chain.prompt, prompt_inputs, self.llm,
+                lambda: self.chain.invoke(prompt_inputs)["text"],
+                accept=lambda text: self._extract_query(text) is not None
+            ).strip()
             print("✅ LLM Output Generated.")
         except Exception as e:
             print("❌ Error during LLM generation:", e)
             return "Failed to generate search strategy."
 
-        # Step 3: Extract the Query line from LLM output (expects a line like "Query: some search terms")
-        query_line = next(
-            (line for line in search_strategy.splitlines() if line.lower().startswith("query:")),
-            None,
-        )
-        if not query_line:
+        # Step 3: Extract the Query line from LLM output
+        query = self._extract_query(search_strategy)
+        if not query:
             return f"❌ Could not find 'Query:' in LLM output.\n\n{search_strategy}"
-        query = query_line.split(":", 1)[1].strip()
         print(f"🌐 Extracted Query for search: {query}")
 
         # Step 4: Perform SerpAPI search and get JSON results
@@ -78,16 +117,33 @@ class WebSearchAgent(BaseAgent):
             print("❌ Error during SerpAPI web search:", e)
             return "Failed to fetch search results."
 
-        organic = results.get("organic_results", [])
-        if not organic:
-            return f"{search_strategy}\n\n---\nNo relevant search results found."
-
         # Step 5: Format results with title, snippet, and link
-        formatted_results = ""
-        for idx, res in enumerate(organic[:10], 1):
-            title = res.get("title", "No Title")
-            snippet = res.get("snippet", "No description available.")
-            link = res.get("link", res.get("url", "No link available."))
-            formatted_results += f"{idx}. **{title}**\n{snippet}\n🔗 {link}\n\n"
+        return self._format_results(search_strategy, results)
 
-        return f"{search_strategy}\n\n---\n🔍 Top Search Results:\n{formatted_results.strip()}"
+    async def aprocess(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
+        """Async counterpart of process; SerpAPI's blocking client runs in a thread."""
+        prompt_inputs = self._prompt_inputs(prompt, context)
+
+        async def generate():
+            return (await self.chain.ainvoke(prompt_inputs))["text"]
+
+        try:
+            search_strategy = (await acached_llm_call(
+                self.llm_cache, "web_search_query", self.chain.prompt, prompt_inputs, self.llm, generate,
+                accept=lambda text: self._extract_query(text) is not None
+            )).strip()
+        except Exception as e:
+            print("❌ Error during LLM generation:", e)
+            return "Failed to generate search strategy."
+
+        query = self._extract_query(search_strategy)
+        if not query:
+            return f"❌ Could not find 'Query:' in LLM output.\n\n{search_strategy}"
+
+        try:
+            results = await asyncio.to_thread(self.serpapi_search, query)
+        except Exception as e:
+            print("❌ Error during SerpAPI web search:", e)
+            return "Failed to fetch search results."
+
+        return self._format_results(search_strategy, results)
@@ -0,0 +1,183 @@
+"""
+Bulk calendar writes: one request per event versus batch requests.
+
+Runs the CalendarAgent against an in-process fake of the Calendar API
+that sleeps for a fixed round-trip latency on every HTTP request, then
+times creating, updating and deleting N events one call at a time (the
+create_event/update_event/delete_event path) and through the batched
+create_events/update_events/delete_events, plus importing an .ics file
+of N events. Quota pacing between batches is disabled so the numbers
+show transport cost only.
+
+Usage:
+    python -m benchmarks.bench_calendar_batch [--events 500] [--latency 0.02]
+"""
+
+import argparse
+import email.parser
+import itertools
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+from urllib.parse import urlparse
+
+import httplib2
+from googleapiclient.discovery import build
+
+import core  # noqa: F401  (agents import core first)
+import config
+from agents.calendar_agent import CalendarAgent
+from services.calendar_mirror import CalendarMirror
+
+EVENT_PATH = re.compile(r"^/calendar/v3/calendars/[^/]+/events(?:/(?P<id>[^/?]+))?$")
+RATE_LIMITED = {"error": {"code": 403, "message": "Rate Limit Exceeded",
+                          "errors": [{"domain": "usageLimits", "reason": "rateLimitExceeded"}]}}
+
+
+class FakeCalendarHttp:
+    """
+    httplib2.Http stand-in serving events insert/import/get/update/delete,
+    alone or inside batch requests, from a dict; each request() costs
+    latency seconds. The first rate_limited calls are answered with a
+    403 rateLimitExceeded.
+    """
+
+    def __init__(self, latency: float = 0.0, rate_limited: int = 0):
+        self.latency = latency
+        self.rate_limited = rate_limited
+        self.events = {}
+        self.round_trips = 0
+        self.calls = 0
+        self._ids = itertools.count(1)
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+        path = urlparse(uri).path
+        if path.endswith("/batch/calendar/v3"):
+            return self._batch(body, headers)
+        status, content = self._call(method, path, body)
+        return httplib2.Response({"status": str(status), "content-type": "application/json"}), content.encode("utf-8")
+
+    def _call(self, method, path, body):
+        self.calls += 1
+        if self.calls <= self.rate_limited:
+            return 403, json.dumps(RATE_LIMITED)
+        if path.endswith("/events/import"):
+            match, event_id = True, None
+        else:
+            match = EVENT_PATH.match(path)
+            event_id = match.group("id") if match else None
+        if not match:
+            return 404, json.dumps({"error": {"code": 404, "message": "Not Found"}})
+        if method == "POST":
+            event = dict(json.loads(body), id=f"ev{next(self._ids)}", status="confirmed")
+            self.events[event["id"]] = event
+            return 200, json.dumps(event)
+        if event_id not in self.events:
+            return 404, json.dumps({"error": {"code": 404, "message": "Not Found"}})
+        if method == "DELETE":
+            del self.events[event_id]
+            return 204, ""
+        if method == "PUT":
+            self.events[event_id] = dict(json.loads(body), id=event_id)
+        return 200, json.dumps(self.events[event_id])
+
+    def _batch(self, body, headers):
+        message = email.parser.Parser().parsestr(f"content-type: {headers['content-type']}\r\n\r\n{body}")
+        parts = []
+        for part in message.get_payload():
+            request = part.get_payload()
+            head, _, payload = re.split(r"(\r?\n\r?\n)", request, 1)
+            method, target, _ = head.splitlines()[0].split(" ")
+            status, content = self._call(method, urlparse(target).path, payload or None)
+            content_id = part["Content-ID"].strip("<>")
+            parts.append(
+                f"--batch_boundary\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\n"
+                f"Content-Type: application/json\r\n\r\n{content}\r\n"
+            )
+        content = "".join(parts) + "--batch_boundary--\r\n"
+        response = httplib2.Response({"status": "200", "content-type": "multipart/mixed; boundary=batch_boundary"})
+        return response, content.encode("utf-8")
+
+
+def calendar_agent(tmp, http):
+    agent = CalendarAgent(llm=None, mirror=CalendarMirror(os.path.join(tmp, "calendar.sqlite3")))
+    agent.service = build("calendar", "v3", http=http, static_discovery=True)
+    agent.authenticated = True
+    return agent
+
+
+def synthetic_events(count):
+    start = datetime(2030, 1, 6, 9)
+    return [
+        {"title": f"Lecture {i}", "start_datetime": (start + timedelta(hours=2 * i)).isoformat() + "+05:30",
+         "end_datetime": (start + timedelta(hours=2 * i + 1)).isoformat() + "+05:30"}
+        for i in range(count)
+    ]
+
+
+def synthetic_ics(count):
+    start = datetime(2030, 1, 6, 9)
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0"]
+    for i in range(count):
+        moment = start + timedelta(hours=2 * i)
+        lines += ["BEGIN:VEVENT", f"UID:lecture-{i}@example.edu", f"SUMMARY:Lecture {i}",
+                  f"DTSTART;TZID=Asia/Kolkata:{moment:%Y%m%dT%H%M%S}", "DURATION:PT1H", "END:VEVENT"]
+    return "\r\n".join(lines + ["END:VCALENDAR"]) + "\r\n"
+
+
+def timed(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per HTTP round trip")
+    args = parser.parse_args()
+    events = synthetic_events(args.events)
+
+    print(f"{args.events} events, {args.latency * 1000:.0f}ms per round trip, {config.CALENDAR_BATCH_SIZE} calls per batch")
+    print(f"{'operation':<10} {'per event':>10} {'trips':>6} {'batched':>9} {'trips':>6} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(config, "CALENDAR_BATCH_INTERVAL", 0.0):
+        single_http = FakeCalendarHttp(args.latency)
+        single = calendar_agent(os.path.join(tmp, "single"), single_http)
+        batch_http = FakeCalendarHttp(args.latency)
+        batched = calendar_agent(os.path.join(tmp, "batched"), batch_http)
+
+        created = []
+        cases = [
+            ("create", lambda: created.extend(single.create_event(dict(e))["id"] for e in events),
+             lambda: batched.create_events([dict(e) for e in events])),
+            ("update", lambda: [single.update_event(event_id, {"title": "Moved"}) for event_id in created],
+             lambda: batched.update_events([(event_id, {"title": "Moved"}) for event_id in list(batch_http.events)])),
+            ("delete", lambda: [single.delete_event(event_id) for event_id in created],
+             lambda: batched.delete_events(list(batch_http.events))),
+        ]
+        for name, one_by_one, in_batches in cases:
+            trips = single_http.round_trips, batch_http.round_trips
+            single_time, batch_time = timed(one_by_one), timed(in_batches)
+            print(f"{name:<10} {single_time:9.2f}s {single_http.round_trips - trips[0]:6d} "
+                  f"{batch_time:8.2f}s {batch_http.round_trips - trips[1]:6d} {single_time / batch_time:7.1f}x")
+
+        path = os.path.join(tmp, "timetable.ics")
+        with open(path, "w", encoding="utf-8") as ics_file:
+            ics_file.write(synthetic_ics(args.events))
+        trips = batch_http.round_trips
+        import_time = timed(lambda: batched.import_ics(path))
+        print(f"{'ics import':<10} {'':>10} {'':>6} {import_time:8.2f}s {batch_http.round_trips - trips:6d}")
+        single.mirror.close()
+        batched.mirror.close()
+
+
+if __name__ == "__main__":
+    main()
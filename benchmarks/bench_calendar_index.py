@@ -0,0 +1,165 @@
+"""
+Calendar queries: interval index versus a linear scan of every event.
+
+Builds a synthetic calendar (single events of mixed lengths over several
+years plus weekly and daily recurring series, a few of them with moved
+instances) and times three queries against both the CalendarIndex and a
+scan of all rows: a conflict check for a new one-hour event, "what's on
+<day> afternoon" windows, and fuzzy title lookups. The scan expands
+recurring series over the query window on every call, the way a client
+without an index has to. Then it times the first conflict check after a
+write, with the write applied to the index in place versus rebuilding
+the index from every row.
+
+Usage:
+    python -m benchmarks.bench_calendar_index [--events 50000] [--series 200] [--repeat 200]
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from difflib import SequenceMatcher
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from dateutil.rrule import rrulestr
+
+from services.calendar_index import CalendarIndex, normalize_title
+
+IST = ZoneInfo("Asia/Kolkata")
+ORIGIN = datetime(2026, 1, 1, tzinfo=IST)
+YEARS = 3
+WORDS = "project design client budget weekly review sync planning interview lunch call retro demo".split()
+MINUTES = [15, 30, 30, 60, 60, 60, 90, 120, 240, 60 * 24]
+
+
+def synthetic_rows(events, series, seed=0):
+    """CalendarMirror.index_rows()-shaped rows."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(events):
+        start = ORIGIN + timedelta(minutes=15 * rng.randrange(0, YEARS * 365 * 24 * 4))
+        end = start + timedelta(minutes=rng.choice(MINUTES))
+        rows.append((
+            f"e{i}", " ".join(rng.choices(WORDS, k=3)).capitalize(),
+            start.astimezone(timezone.utc).replace(tzinfo=None).isoformat(),
+            end.astimezone(timezone.utc).replace(tzinfo=None).isoformat(),
+            None, None, None, 1,
+        ))
+    for i in range(series):
+        start = ORIGIN + timedelta(days=rng.randrange(0, 365), hours=rng.randrange(8, 19))
+        rule = "RRULE:FREQ=DAILY" if i % 4 == 0 else "RRULE:FREQ=WEEKLY;BYDAY=" + rng.choice(["MO", "TU", "WE", "TH", "FR"])
+        event = {
+            "id": f"s{i}", "summary": f"{rng.choice(WORDS).capitalize()} standup {i}",
+            "start": {"dateTime": start.isoformat(), "timeZone": "Asia/Kolkata"},
+            "end": {"dateTime": (start + timedelta(minutes=30)).isoformat(), "timeZone": "Asia/Kolkata"},
+            "recurrence": [rule],
+        }
+        utc = start.astimezone(timezone.utc).replace(tzinfo=None)
+        rows.append((event["id"], event["summary"], utc.isoformat(), (utc + timedelta(minutes=30)).isoformat(),
+                     json.dumps(event), None, None, 1))
+    return rows
+
+
+class LinearScan:
+    """Every query walks every row; recurring series are expanded over the window each time."""
+
+    def __init__(self, rows):
+        self.singles, self.series = [], []
+        for id_, title, start, end, series, _, _, _ in rows:
+            if series:
+                event = json.loads(series)
+                first = datetime.fromisoformat(event["start"]["dateTime"])
+                self.series.append((id_, title, rrulestr(event["recurrence"][0], dtstart=first), timedelta(minutes=30)))
+            else:
+                self.singles.append((
+                    id_, title,
+                    datetime.fromisoformat(start).replace(tzinfo=timezone.utc),
+                    datetime.fromisoformat(end).replace(tzinfo=timezone.utc),
+                ))
+
+    def overlapping(self, a, b):
+        found = [(start, end, id_) for id_, _, start, end in self.singles if start < b and end > a]
+        for id_, _, rule, duration in self.series:
+            found.extend((start, start + duration, id_) for start in rule.between(a - duration, b) if start + duration > a)
+        return sorted(found)
+
+    def find_title(self, title, cutoff=0.75):
+        key = normalize_title(title)
+        rows = self.singles + [(id_, title_, None, None) for id_, title_, _, _ in self.series]
+        return [id_ for id_, title_, _, _ in rows if SequenceMatcher(None, key, normalize_title(title_)).ratio() >= cutoff]
+
+
+def measure(run, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        run(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--series", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    rows = synthetic_rows(args.events, args.series)
+    start = time.perf_counter()
+    index = CalendarIndex(rows)
+    build = time.perf_counter() - start
+    # Expanding each year of series happens once, on first use; do it before timing
+    start = time.perf_counter()
+    index.overlapping(ORIGIN, ORIGIN.replace(year=ORIGIN.year + YEARS))
+    expand = time.perf_counter() - start
+    scan = LinearScan(rows)
+
+    slots = [ORIGIN + timedelta(minutes=30 * rng.randrange(0, YEARS * 365 * 48)) for _ in range(args.repeat)]
+    conflicts = [(slot, slot + timedelta(hours=1)) for slot in slots]
+    afternoons = [(slot.replace(hour=12, minute=0), slot.replace(hour=17, minute=0)) for slot in slots]
+    titles = [rows[rng.randrange(len(rows))][1].replace("e", "", 1) for _ in range(args.repeat)]
+    few = max(5, args.repeat // 20)
+
+    print(f"{args.events:,} events + {args.series} recurring series over {YEARS} years")
+    print(f"index build {build * 1000:.0f}ms, series expansion for all {YEARS} years {expand * 1000:.0f}ms")
+    print(f"{'query':<22} {'index p50':>10} {'p95':>9} {'scan p50':>10} {'p95':>9}")
+    cases = [
+        ("conflict check (1h)", lambda q: index.conflicts(*q), lambda q: scan.overlapping(*q), conflicts),
+        ("afternoon window", lambda q: index.overlapping(*q), lambda q: scan.overlapping(*q), afternoons),
+        ("fuzzy title lookup", index.find_title, scan.find_title, titles),
+    ]
+    for name, indexed, linear, queries in cases:
+        p50, p95 = measure(indexed, queries)
+        scan_p50, scan_p95 = measure(linear, queries[:few])
+        print(f"{name:<22} {p50:8.3f}ms {p95:7.3f}ms {scan_p50:8.1f}ms {scan_p95:7.1f}ms")
+
+    # Each write moves a random single event; the check right after it has to see the move
+    moves = []
+    for query in conflicts:
+        row = rows[rng.randrange(args.events)]
+        start = query[0].astimezone(timezone.utc).replace(tzinfo=None)
+        moves.append(((row[0], row[1], start.isoformat(), (start + timedelta(hours=1)).isoformat(), *row[4:]), query))
+
+    def in_place(move):
+        row, query = move
+        index.apply([row], [], [row[0]])
+        assert row[0] in {event_id for _, _, event_id in index.conflicts(*query)}
+
+    def rebuild(move):
+        row, query = move
+        rows[int(row[0][1:])] = row
+        CalendarIndex(rows).conflicts(*query)
+
+    p50, p95 = measure(in_place, moves)
+    rebuild_p50, rebuild_p95 = measure(rebuild, moves[:few])
+    print(f"{'write + conflict check':<22} {p50:8.3f}ms {p95:7.3f}ms {rebuild_p50:8.1f}ms {rebuild_p95:7.1f}ms"
+          "  (in place vs rebuild)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Calendar extraction: the LLM for every request versus rules first.
+
+Runs CalendarAgent.extract_event_details over a mix of calendar requests
+(well-formed create/delete/reschedule/read commands and free-form ones)
+with a stand-in LLM that waits a fixed latency per call, once with the
+rule-based CalendarIntentParser disabled and once enabled. Reports how
+many requests skipped the LLM and the p50/p95 extraction latency of each.
+
+Usage:
+    python -m benchmarks.bench_calendar_intents [--requests 400] [--llm-latency 0.8]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+
+import core  # noqa: F401  (agents import core first)
+from agents.calendar_agent import CalendarAgent
+from services.calendar_mirror import CalendarMirror
+
+TITLES = ["Team Sync", "Design review", "Dentist", "1:1 with Priya", "Budget planning", "Trip to Goa", "Standup"]
+DAYS = ["tomorrow", "on Friday", "next monday", "on 2030-03-14", "on jan 20", "today"]
+TIMES = ["10am", "at 3:30pm", "at noon", "16:00"]
+WELL_FORMED = [
+    lambda r: f"schedule {r.choice(TITLES)} {r.choice(DAYS)} {r.choice(TIMES)}",
+    lambda r: f"add {r.choice(TITLES)} {r.choice(DAYS)} from 2pm to 3pm",
+    lambda r: f"create an event called {r.choice(TITLES)} {r.choice(DAYS)} at 9am for 30 minutes",
+    lambda r: f"delete event {r.choice(TITLES)} {r.choice(DAYS)}",
+    lambda r: f"reschedule {r.choice(TITLES)} on 2030-03-14 to {r.choice(['friday 4pm', 'jan 22', 'tomorrow 11am'])}",
+    lambda r: f"what's on {r.choice(['tuesday afternoon', 'my calendar tomorrow', 'friday'])}",
+]
+FREE_FORM = [
+    "can you set up something with Priya sometime next week to go over the budget",
+    "remind me about mom's birthday on may 5",
+    "I have a standup every weekday at 9:30, put it in",
+    "move my dentist thing to later in the afternoon",
+    "lunch with the team tomorrow around one at the cafe",
+    "block two hours for deep work on thursday morning",
+    "cancel whatever I had with Rahul last week",
+]
+
+
+class SlowLLM:
+    """Answers every extraction with the same JSON after `latency` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency)
+        return json.dumps({"action": "create", "title": "Untitled", "start_datetime": "2030-03-14T10:00:00+05:30",
+                           "end_datetime": None, "recurrence": None})
+
+
+def requests(count, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(WELL_FORMED)(rng) if rng.random() < 0.7 else rng.choice(FREE_FORM) for _ in range(count)]
+
+
+def run(agent, texts):
+    latencies = []
+    with redirect_stdout(StringIO()):  # the extraction prints the raw LLM output
+        for text in texts:
+            start = time.perf_counter()
+            agent.extract_event_details(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), np.percentile(latencies, 95), sum(latencies) / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="seconds per LLM call")
+    args = parser.parse_args()
+    texts = requests(args.requests)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{len(texts)} calendar requests, LLM at {args.llm_latency * 1000:.0f}ms per call")
+        print(f"{'extraction':<14} {'LLM calls':>9} {'skipped':>8} {'p50':>10} {'p95':>10} {'total':>8}")
+        for name, rules in [("LLM only", False), ("rules + LLM", True)]:
+            llm = SlowLLM(args.llm_latency)
+            agent = CalendarAgent(llm=llm, mirror=CalendarMirror(os.path.join(tmp, f"{name}.sqlite3")))
+            with mock.patch.object(agent.intents, "extract", return_value=None) if not rules else mock.MagicMock():
+                p50, p95, total = run(agent, texts)
+            skipped = len(texts) - llm.calls
+            print(f"{name:<14} {llm.calls:9d} {skipped / len(texts):7.0%} {p50:8.2f}ms {p95:8.2f}ms {total:7.1f}s")
+            agent.mirror.close()
+
+
+if __name__ == "__main__":
+    main()
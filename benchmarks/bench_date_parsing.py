@@ -0,0 +1,121 @@
+"""
+Calendar date parsing: dateparser on every string versus the layered DateParser.
+
+Cold: a fresh interpreter imports the parser and handles one request's
+worth of strings (start, end and, when those fail, the whole prompt),
+timed from before the import, for each kind of request. Warm: one
+process parses a mixed corpus of LLM outputs and phrases over and over.
+The old path is _post_process_event_data's: dateparser.parse with
+Asia/Kolkata settings and every language enabled.
+
+Usage:
+    python -m benchmarks.bench_date_parsing [--repeat 5] [--corpus 2000]
+"""
+
+import argparse
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+SETTINGS = {"TIMEZONE": "Asia/Kolkata", "RETURN_AS_TIMEZONE_AWARE": True}
+# (start, end, prompt) as the extraction step hands them over
+REQUESTS = {
+    "LLM ISO output": ("2030-01-07T10:00:00+05:30", "2030-01-07T11:00:00+05:30", "Standup on Monday 10am"),
+    "phrase": ("next monday 10am", None, "Standup next monday 10am"),
+    "nothing to parse": (None, None, "lunch with priya"),
+}
+PHRASES = ["tomorrow 5pm", "next monday", "friday at 10:30am", "in 2 hours", "jan 15 3pm", "at noon on thursday"]
+FALLBACK = ["next week", "01/20/2030 4pm", "in 3 weeks", "2 days ago"]
+
+OLD = """
+import dateparser
+for text in {texts!r}:
+    if text:
+        dateparser.parse(text, settings={settings!r})
+"""
+NEW = """
+from services.date_parser import DateParser
+parser = DateParser()
+for text in {texts!r}:
+    parser.parse(text)
+"""
+
+
+def cold(template, texts, repeat):
+    """Seconds from a fresh interpreter's first import to the last parse."""
+    timings = []
+    for _ in range(repeat):
+        code = "import time; _start = time.perf_counter()\n" + template.format(texts=texts, settings=SETTINGS) \
+            + "\nprint(time.perf_counter() - _start)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.split()[-1]))
+    return np.median(timings)
+
+
+def request_texts(start, end, prompt):
+    """What _post_process_event_data parses: the start (or the prompt if it fails) and the end."""
+    return [start, prompt if start is None else None, end]
+
+
+def corpus(size, seed=0):
+    rng = random.Random(seed)
+    texts = []
+    base = datetime(2030, 1, 1, 9)
+    for _ in range(size):
+        kind = rng.random()
+        if kind < 0.6:
+            texts.append((base + timedelta(minutes=30 * rng.randrange(5000))).isoformat() + "+05:30")
+        elif kind < 0.9:
+            texts.append(rng.choice(PHRASES))
+        else:
+            texts.append(rng.choice(FALLBACK))
+    return texts
+
+
+def warm(parse, texts):
+    parse(texts[0])
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        parse(text)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return np.percentile(latencies, 50), np.percentile(latencies, 95), sum(latencies) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per cold measurement")
+    parser.add_argument("--corpus", type=int, default=2000)
+    args = parser.parse_args()
+
+    print("cold: fresh interpreter, import + one request")
+    print(f"{'request':<20} {'dateparser':>11} {'layered':>9}")
+    for name, request in REQUESTS.items():
+        texts = request_texts(*request)
+        old = cold(OLD, texts, args.repeat)
+        # The layered parser falls back to the prompt only when the start does not parse
+        new = cold(NEW, [text for text in texts if text], args.repeat)
+        print(f"{name:<20} {old * 1000:9.0f}ms {new * 1000:7.0f}ms")
+
+    import dateparser
+
+    from services.date_parser import DateParser
+
+    texts = corpus(args.corpus)
+    layered = DateParser()
+    print(f"\nwarm: {len(texts)} strings (60% ISO, 30% common phrases, 10% other)")
+    print(f"{'parser':<20} {'p50':>9} {'p95':>9} {'total':>8}")
+    for name, parse in [("dateparser", lambda text: dateparser.parse(text, settings=SETTINGS)),
+                        ("layered", layered.parse)]:
+        p50, p95, total = warm(parse, texts)
+        print(f"{name:<20} {p50:7.1f}us {p95:7.1f}us {total:7.2f}s")
+    info = layered.cache_info()
+    print(f"layers: {dict(layered.stats)}; dateparser cache {info.hits} hits / {info.misses} misses")
+
+
+if __name__ == "__main__":
+    main()
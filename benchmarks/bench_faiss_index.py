@@ -0,0 +1,105 @@
+"""
+Recall and latency of the approximate FAISS indexes against exact search.
+
+Builds a flat baseline and each IndexSpec from memory/index_factory.py on
+clustered synthetic vectors, then reports build time, recall@k against the
+flat results and per-query latency (queries are issued one at a time, as
+the orchestrator does). Builds use every core, searches --threads.
+
+Usage:
+    python -m benchmarks.bench_faiss_index [--sizes 10000,100000,1000000]
+        [--dim 128] [--queries 500] [--k 5] [--threads 1]
+
+1M vectors at --dim 768 (the Gemini embedding size) need ~3 GB per copy;
+the default --dim 128 keeps the largest run within a few GB of memory.
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from memory.index_factory import IndexSpec
+
+SPECS = [
+    ("hnsw", IndexSpec("hnsw", ef_search=64)),
+    ("ivf nprobe=8", IndexSpec("ivf", nprobe=8)),
+    ("ivf nprobe=32", IndexSpec("ivf", nprobe=32)),
+    ("ivf+pq nprobe=32", IndexSpec("ivf", nprobe=32, pq_m=16)),
+]
+
+
+def synthetic_vectors(n, n_queries, dim, clusters=256, seed=0):
+    """
+    Normalized vectors drawn around random topic centres, like embeddings.
+    Returns (vectors, queries); queries come from the same topics.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    points = centres[rng.integers(0, clusters, n + n_queries)]
+    points += 0.6 * rng.standard_normal(points.shape).astype(np.float32)
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    return points[:n], points[n:]
+
+
+def timed_search(index, queries, k):
+    """Search one query at a time; returns (ids, per-query latencies in ms)."""
+    found = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found[i] = ids[0]
+    return found, np.asarray(latencies)
+
+
+def recall_at_k(found, truth):
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def report(name, build_s, latencies, recall, flat_p50=None):
+    p50, p95 = np.percentile(latencies, [50, 95])
+    speedup = f"{flat_p50 / p50:6.1f}x" if flat_p50 else "     -"
+    print(f"  {name:<18} build {build_s:7.2f}s  recall {recall:.3f}  "
+          f"p50 {p50:7.3f} ms  p95 {p95:7.3f} ms  {speedup}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=1, help="FAISS threads while searching")
+    args = parser.parse_args()
+    build_threads = faiss.omp_get_max_threads()
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        vectors, queries = synthetic_vectors(size, args.queries, args.dim)
+        print(f"{size:,} vectors x {args.dim} dims, {args.queries} queries, k={args.k}")
+
+        start = time.perf_counter()
+        flat = faiss.IndexFlatL2(args.dim)
+        flat.add(vectors)
+        flat_build = time.perf_counter() - start
+        faiss.omp_set_num_threads(args.threads)
+        truth, flat_latencies = timed_search(flat, queries, args.k)
+        report("flat", flat_build, flat_latencies, 1.0)
+        flat_p50 = float(np.percentile(flat_latencies, 50))
+
+        for name, spec in SPECS:
+            faiss.omp_set_num_threads(build_threads)
+            start = time.perf_counter()
+            index = spec.build(vectors)
+            build_s = time.perf_counter() - start
+            faiss.omp_set_num_threads(args.threads)
+            found, latencies = timed_search(index, queries, args.k)
+            report(name, build_s, latencies, recall_at_k(found, truth), flat_p50)
+            del index
+        print()
+
+
+if __name__ == "__main__":
+    main()
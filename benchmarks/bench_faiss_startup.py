@@ -0,0 +1,96 @@
+"""
+Vectorstore startup: pickled index.pkl versus a mapped snapshot.
+
+Writes the same synthetic store both ways, then times opening it and the
+first similarity search and reports resident memory growth (Linux). Each
+open runs in a fresh subprocess. Mapped pages touched by a flat search
+count towards RSS but are shared, reclaimable page cache.
+
+Usage:
+    python -m benchmarks.bench_faiss_startup [--sizes 10000,100000] [--dim 768]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from memory.embedder import HashingEmbeddings
+from memory.faiss_journal import FaissJournal
+from memory.faiss_store import ThreadSafeFAISS
+
+
+def build(directory, size, dim):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((size, dim)).astype(np.float32).tolist()
+    texts = [f"User: synthetic prompt {i}\nAssistant: synthetic answer {i} " * 4 for i in range(size)]
+    metadatas = [{"agent": "note_taker", "turn": i} for i in range(size)]
+    embeddings = HashingEmbeddings(dim)
+
+    ThreadSafeFAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas).save_local(
+        os.path.join(directory, "pickle")
+    )
+    journal = FaissJournal(os.path.join(directory, "mapped"), snapshot_interval=3600)
+    store = journal.load(ThreadSafeFAISS, embeddings)
+    store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas)
+    journal.close()
+
+
+def rss_mb():
+    """Current resident set size (Linux)."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def measure(mode, directory, dim):
+    """Runs in the child process; prints a JSON line."""
+    embeddings = HashingEmbeddings(dim)
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    if mode == "pickle":
+        store = ThreadSafeFAISS.load_local(
+            os.path.join(directory, "pickle"), embeddings, allow_dangerous_deserialization=True
+        )
+    else:
+        journal = FaissJournal(os.path.join(directory, "mapped"), snapshot_interval=3600)
+        store = journal.load(ThreadSafeFAISS, embeddings)
+    opened = time.perf_counter() - start
+    store.similarity_search_by_vector(np.ones(dim, dtype=np.float32).tolist(), k=5)
+    first_search = time.perf_counter() - start - opened
+    print(json.dumps({"open": opened, "first_search": first_search, "rss_mb": rss_mb() - rss_before}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        measure(args.child[0], args.child[1], args.dim)
+        return
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as directory:
+            build(directory, size, args.dim)
+            print(f"{size:,} documents x {args.dim} dims")
+            for mode in ("pickle", "mapped"):
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_faiss_startup",
+                     "--dim", str(args.dim), "--child", mode, directory],
+                    check=True, capture_output=True, text=True
+                ).stdout.strip().splitlines()[-1]
+                result = json.loads(output)
+                print(f"  {mode:<7} open {result['open'] * 1000:9.1f} ms  "
+                      f"first search {result['first_search'] * 1000:8.1f} ms  "
+                      f"RSS +{result['rss_mb']:7.1f} MB")
+        print()
+
+
+if __name__ == "__main__":
+    main()
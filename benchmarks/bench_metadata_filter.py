@@ -0,0 +1,140 @@
+"""
+Filtered vector search: LangChain post-filtering versus metadata prefiltering.
+
+Builds a synthetic store of conversation turns whose agents are heavily
+skewed (most turns are notes, a handful are email) and spread over a
+year, then runs filtered searches such as "calendar turns from last week"
+both ways. Post-filtering fetches fetch_k candidates and discards the
+non-matching ones; prefiltering searches only the positions the
+agent/timestamp indexes select. Reports p50 latency, how many of the k
+results came back, and recall@k against exact search over the matching
+vectors.
+
+Usage:
+    python -m benchmarks.bench_metadata_filter [--size 500000] [--dim 128]
+        [--queries 100] [--k 5] [--index flat,hnsw]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.bench_faiss_index import synthetic_vectors
+from memory.embedder import HashingEmbeddings
+from memory.faiss_store import ThreadSafeFAISS
+from memory.index_factory import IndexSpec, migrate_store
+
+AGENT_SHARES = {
+    "NoteTakerAgent": 0.55,
+    "WebSearchAgent": 0.25,
+    "CodeAgent": 0.12,
+    "FileAnalyzerAgent": 0.05,
+    "CalendarAgent": 0.025,
+    "EmailAgent": 0.005,
+}
+START = datetime(2025, 1, 1)
+DAYS = 365
+
+
+def day(n):
+    return (START + timedelta(days=n)).isoformat()
+
+
+FILTERS = [
+    ("notes", {"agent": "NoteTakerAgent"}),
+    ("web search, last 30 days", {"agent": "WebSearchAgent", "timestamp": {"$gte": day(DAYS - 30)}}),
+    ("calendar, last 7 days", {"agent": "CalendarAgent", "timestamp": {"$gte": day(DAYS - 7)}}),
+    ("email", {"agent": "EmailAgent"}),
+]
+
+
+def build_store(size, dim):
+    vectors, queries = synthetic_vectors(size, 1000, dim)
+    rng = np.random.default_rng(1)
+    agents = rng.choice(list(AGENT_SHARES), size=size, p=list(AGENT_SHARES.values()))
+    # Turns are appended in time order, as the orchestrator writes them
+    seconds = np.sort(rng.uniform(0, DAYS * 86400, size))
+    metadatas = [
+        {"agent": agent, "timestamp": (START + timedelta(seconds=float(s))).isoformat()}
+        for agent, s in zip(agents, seconds)
+    ]
+    texts = [f"User: synthetic prompt {i}\nAssistant: synthetic answer {i}" for i in range(size)]
+    store = ThreadSafeFAISS.from_embeddings(list(zip(texts, vectors)), HashingEmbeddings(dim), metadatas=metadatas)
+    return store, vectors, queries, metadatas
+
+
+def exact_ids(store, vectors, matching, query, k):
+    distances = ((vectors[matching] - query) ** 2).sum(axis=1)
+    top = matching[np.argsort(distances)[:k]]
+    return {store.index_to_docstore_id[int(position)] for position in top}
+
+
+def run(search, queries, truths, k):
+    latencies, returned, recalls = [], [], []
+    for query, truth in zip(queries, truths):
+        start = time.perf_counter()
+        docs = search(query.tolist())
+        latencies.append((time.perf_counter() - start) * 1000)
+        returned.append(len(docs))
+        recalls.append(len({doc.id for doc, _ in docs} & truth) / max(1, min(k, len(truth))))
+    return np.percentile(latencies, 50), np.mean(returned), np.mean(recalls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size", type=int, default=500000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--index", default="flat,hnsw")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store, vectors, queries, metadatas = build_store(args.size, args.dim)
+    queries = queries[:args.queries]
+    print(f"{args.size:,} turns x {args.dim} dims built in {time.perf_counter() - start:.1f}s, "
+          f"{args.queries} queries per filter, k={args.k}")
+    start = time.perf_counter()
+    store.metadata_index
+    print(f"metadata index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for kind in args.index.split(","):
+        if kind != "flat":
+            faiss.omp_set_num_threads(faiss.omp_get_max_threads())
+            start = time.perf_counter()
+            migrate_store(store, IndexSpec(kind))
+            print(f"\n{kind} index built in {time.perf_counter() - start:.1f}s")
+        else:
+            print("\nflat index")
+        faiss.omp_set_num_threads(1)
+
+        for name, filter in FILTERS:
+            matches = FAISS._create_filter_func(filter)
+            matching = np.flatnonzero([matches(metadata) for metadata in metadatas])
+            truths = [exact_ids(store, vectors, matching, query, args.k) for query in queries]
+            print(f"  {name:<26} {len(matching):>7,} matching ({len(matching) / args.size:6.2%})")
+
+            def postfilter(fetch_k):
+                return lambda query: FAISS.similarity_search_with_score_by_vector(
+                    store, query, k=args.k, filter=filter, fetch_k=fetch_k
+                )
+
+            def prefilter(query):
+                return store.similarity_search_with_score_by_vector(query, k=args.k, filter=filter)
+
+            searches = (
+                ("post-filter fetch_k=20", postfilter(20)),
+                ("post-filter fetch_k=2000", postfilter(2000)),
+                ("prefilter", prefilter),
+            )
+            for label, search in searches:
+                p50, returned, recall = run(search, queries, truths, args.k)
+                print(f"    {label:<24} p50 {p50:8.3f} ms  returned {returned:4.1f}/{args.k}  recall {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
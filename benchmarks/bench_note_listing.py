@@ -0,0 +1,99 @@
+"""
+Note listing: formatting every note into one string versus reading one page.
+
+Fills a note store with synthetic notes, then times the old list command
+(load all notes, format them all) against a count plus one page read
+through iter_notes: the first page, a deep page, and a page filtered by
+tag and date range. Peak memory of each is measured with tracemalloc.
+
+Usage:
+    python -m benchmarks.bench_note_listing [--notes 50000] [--backend sqlite] [--repeat 20]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+
+from memory.note_store import open_note_store
+
+TAGS = ["work", "personal", "finance", "travel", "health", "ideas", "meeting", "reading"]
+WORDS = "plan review budget launch call draft meeting notes follow up client design team report".split()
+PAGE_SIZE = 20
+
+
+def synthetic_notes(count, seed=0):
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    return [
+        {
+            "title": " ".join(rng.choices(WORDS, k=4)).capitalize(),
+            "date": (start + timedelta(days=i * 730 // count)).isoformat(),
+            "tags": " ".join(f"#{tag}" for tag in rng.sample(TAGS, 2)),
+            "content": " ".join(rng.choices(WORDS, k=60)),
+        }
+        for i in range(count)
+    ]
+
+
+def format_note(note):
+    return f"📝 {note['title']} ({note['date']})\nTags: {note['tags']}\n{note['content']}"
+
+
+def list_all(store):
+    """The original _list_notes: every note, formatted into one string."""
+    return "\n\n".join(format_note(note) for note in store.all())
+
+
+def list_page(store, page, **filters):
+    total = store.count(**filters)
+    notes = store.iter_notes(offset=(page - 1) * PAGE_SIZE, limit=PAGE_SIZE, **filters)
+    return total, "\n\n".join(format_note(note) for note in notes)
+
+
+def measure(run, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return np.percentile(latencies, 50), np.percentile(latencies, 95), peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--notes", type=int, default=50000)
+    parser.add_argument("--backend", default="sqlite", choices=["sqlite", "jsonl"])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = open_note_store(args.backend, tmp)
+        store.add_many(synthetic_notes(args.notes))
+        deep_page = args.notes // PAGE_SIZE // 2
+        cases = [
+            ("all notes (old)", lambda: list_all(store), max(3, args.repeat // 5)),
+            ("page 1", lambda: list_page(store, 1), args.repeat),
+            (f"page {deep_page}", lambda: list_page(store, deep_page), args.repeat),
+            ("#finance in Q1 2025, p1", lambda: list_page(
+                store, 1, tags=["finance"], date_from="2025-01-01", date_to="2025-03-31"), args.repeat),
+            ("#finance newest, p1", lambda: list_page(store, 1, tags=["finance"]), args.repeat),
+        ]
+        print(f"{args.notes:,} notes, {args.backend} backend, {PAGE_SIZE} per page")
+        print(f"{'listing':<26} {'p50':>9} {'p95':>9} {'peak memory':>12}")
+        for name, run, repeat in cases:
+            p50, p95, peak = measure(run, repeat)
+            print(f"{name:<26} {p50:7.1f}ms {p95:7.1f}ms {peak:9.1f} MiB")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
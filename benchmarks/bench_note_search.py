@@ -0,0 +1,163 @@
+"""
+Note search: the original linear substring scan versus the ranked inverted index.
+
+Generates synthetic notes whose words follow a Zipf distribution (so some
+query terms appear in a large share of notes), then times queries of each
+kind against NoteIndex and against the old scan over every note's
+lowercased title/tags/content. Also times index build and the
+incremental add/remove that follow each note taken or deleted, and the
+same queries through SQLiteNoteStore.search, including the catch-up after
+another connection writes, and the first search of a new process, which
+loads the index the store saved (for both store backends).
+
+Usage:
+    python -m benchmarks.bench_note_search [--notes 100000] [--queries 200]
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from memory.note_index import NoteIndex
+from memory.note_store import JSONLNoteStore, SQLiteNoteStore
+
+VOCABULARY = [f"w{i}" for i in range(20000)]
+TAGS = ["work", "personal", "finance", "travel", "health", "ideas", "meeting", "reading"]
+QUERIES = [
+    ("rare term", lambda rng: f"w{rng.randint(5000, 19999)}"),
+    ("common term", lambda rng: f"w{rng.randint(0, 20)}"),
+    ("three terms (any)", lambda rng: " ".join(f"w{rng.randint(0, 3000)}" for _ in range(3))),
+    ("two terms (AND)", lambda rng: f"w{rng.randint(0, 200)} AND w{rng.randint(0, 200)}"),
+    ("term + tag", lambda rng: f"w{rng.randint(0, 500)} #{rng.choice(TAGS)}"),
+    ("tag only", lambda rng: f"#{rng.choice(TAGS)}"),
+]
+
+
+def synthetic_notes(count, seed=0):
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, len(VOCABULARY) + 1)
+    weights /= weights.sum()
+    words = rng.choice(len(VOCABULARY), size=count * 45, p=weights)
+    notes = []
+    for i in range(count):
+        chunk = words[i * 45:(i + 1) * 45]
+        notes.append({
+            "id": f"note-{i}",
+            "title": " ".join(VOCABULARY[w] for w in chunk[:5]),
+            "date": "2026-01-01",
+            "tags": " ".join(f"#{tag}" for tag in rng.choice(TAGS, size=2, replace=False)),
+            "content": " ".join(VOCABULARY[w] for w in chunk[5:]),
+        })
+    return notes
+
+# Run in a new interpreter: prints how long opening the store and its first search took, in ms
+FRESH_PROCESS = """
+import sys, time
+from memory.note_store import open_note_store
+start = time.perf_counter()
+store = open_note_store(sys.argv[1], sys.argv[2])
+opened = time.perf_counter()
+store.search(sys.argv[3])
+print((opened - start) * 1000, (time.perf_counter() - opened) * 1000)
+"""
+
+
+def fresh_process_search(backend, directory, query="w1"):
+    """(open ms, first search ms) of the store in a new Python process, imports excluded."""
+    output = subprocess.run(
+        [sys.executable, "-c", FRESH_PROCESS, backend, directory, query], check=True, capture_output=True, text=True
+    ).stdout
+    return tuple(float(ms) for ms in output.split())
+
+
+def legacy_search(notes, query):
+    """The original _search_notes loop: any keyword as a substring of any field."""
+    keywords = query.lower().split()
+    return [
+        note for note in notes
+        if any(k in (note["title"] + " " + note["tags"] + " " + note["content"]).lower() for k in keywords)
+    ]
+
+
+def timed(search, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--notes", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    notes = synthetic_notes(args.notes)
+    start = time.perf_counter()
+    index = NoteIndex.build(notes)
+    print(f"{args.notes:,} notes indexed in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(1)
+    print(f"{'query':<20} {'index p50':>10} {'p95':>8} {'scan p50':>10} {'speedup':>8}")
+    for name, make in QUERIES:
+        queries = [make(rng) for _ in range(args.queries)]
+        p50, p95 = timed(lambda query: index.search(query, k=10), queries)
+        # The scan takes long enough that a handful of queries give a stable median
+        scan_p50, _ = timed(lambda query: legacy_search(notes, query), queries[:5])
+        print(f"{name:<20} {p50:8.3f}ms {p95:6.3f}ms {scan_p50:8.1f}ms {scan_p50 / p50:7.0f}x")
+
+    extra = synthetic_notes(1000, seed=2)
+    for note in extra:
+        note["id"] = "extra-" + note["id"]
+    start = time.perf_counter()
+    for note in extra:
+        index.add(note)
+    add_ms = (time.perf_counter() - start) * 1000 / len(extra)
+    start = time.perf_counter()
+    for note in extra:
+        index.remove(note["id"])
+    remove_ms = (time.perf_counter() - start) * 1000 / len(extra)
+    print(f"incremental update: add {add_ms:.3f} ms, remove {remove_ms:.3f} ms per note")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteNoteStore(os.path.join(tmp, "notes.sqlite3"))
+        store.add_many(notes)
+        start = time.perf_counter()
+        store.search("w1")
+        print(f"SQLiteNoteStore: first search without a saved index (builds and saves it) "
+              f"{time.perf_counter() - start:.1f}s")
+        _, search_ms = fresh_process_search("sqlite", tmp)
+        print(f"SQLiteNoteStore: first search in a new process (loads the saved index) {search_ms:.1f} ms")
+        queries = [make(rng) for name, make in QUERIES for _ in range(args.queries // len(QUERIES))]
+        p50, p95 = timed(lambda query: store.search(query, k=10), queries)
+        print(f"SQLiteNoteStore.search, mixed queries: p50 {p50:.3f} ms, p95 {p95:.3f} ms")
+        other = SQLiteNoteStore(store.path)
+        other.add(extra[0])
+        start = time.perf_counter()
+        store.search("w1")
+        print(f"SQLiteNoteStore: search after another connection's write {(time.perf_counter() - start) * 1000:.1f} ms")
+        other.add_many(extra[1:500])
+        _, search_ms = fresh_process_search("sqlite", tmp)
+        print(f"SQLiteNoteStore: first search in a new process, 500 writes after the save {search_ms:.1f} ms")
+        other.close()
+        store.close()
+
+        store = JSONLNoteStore(os.path.join(tmp, "notes.jsonl"))
+        store.add_many(notes)
+        store.search("w1")
+        open_ms, search_ms = fresh_process_search("jsonl", tmp)
+        print(f"JSONLNoteStore: first search in a new process {search_ms:.1f} ms "
+              f"(after {open_ms:.0f} ms reading the log)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Micro-benchmark for AgentRouter.route.
+
+Compares the compiled single-pass matcher against the original sequential
+``any(keyword in prompt_lower ...)`` cascade on a synthetic prompt corpus and
+checks that both pick the same agent for every prompt.
+
+Usage:
+    python -m benchmarks.bench_router [--prompts 5000] [--repeat 5]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from core.agent_router import (
+    AgentRouter,
+    NOTE_KEYWORDS,
+    EMAIL_KEYWORDS,
+    CODE_INTENT_PATTERNS,
+    WEB_SEARCH_KEYWORDS,
+    FILE_ANALYZER_KEYWORDS,
+    CALENDAR_KEYWORDS,
+)
+
+AGENT_KEYS = ["note_taker", "email", "code", "web_search", "file_analyzer", "calendar", "default"]
+
+TEMPLATES = [
+    "take a note about {x}",
+    "show my notes on {x}",
+    "send an email to raj@example.com regarding {x}",
+    "check inbox for {x}",
+    "write python code for {x}",
+    "debug this code: {x}",
+    "explain this code {x}",
+    "search for {x}",
+    "who is {x}",
+    "analyze this file report_{x}.pdf",
+    "schedule a meeting with Sam next Thursday at 3 PM about {x}",
+    "what's on my agenda tomorrow",
+    "remind me to {x}",
+    "hello there {x}",
+    "thanks {x}",
+]
+
+WORDS = (
+    "alpha beta gamma delta project launch budget review kabir sprint "
+    "quarterly goals roadmap fastapi backend demo video invoice"
+).split()
+
+
+def legacy_route(agents_map, prompt):
+    """The original keyword cascade, kept here as the baseline."""
+    prompt_lower = prompt.lower()
+    if any(keyword in prompt_lower for keyword in NOTE_KEYWORDS):
+        return agents_map.get("note_taker")
+    if any(keyword in prompt_lower for keyword in EMAIL_KEYWORDS):
+        return agents_map.get("email")
+    if ("debug" in prompt_lower and "code" in prompt_lower) or any(
+        re.search(p, prompt.lower()) for p in CODE_INTENT_PATTERNS
+    ):
+        return agents_map.get("code")
+    if any(keyword in prompt_lower for keyword in WEB_SEARCH_KEYWORDS):
+        return agents_map.get("web_search")
+    if any(keyword in prompt_lower for keyword in FILE_ANALYZER_KEYWORDS):
+        return agents_map.get("file_analyzer")
+    if any(keyword in prompt_lower for keyword in CALENDAR_KEYWORDS):
+        return agents_map.get("calendar")
+    return agents_map.get("default", None)
+
+
+def build_corpus(size, seed=42):
+    rng = random.Random(seed)
+    return [
+        rng.choice(TEMPLATES).format(x=" ".join(rng.sample(WORDS, 3)))
+        for _ in range(size)
+    ]
+
+
+def measure(fn, corpus, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for prompt in corpus:
+            fn(prompt)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AgentRouter micro-benchmark")
+    parser.add_argument("--prompts", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    router = AgentRouter()
+    for key in AGENT_KEYS:
+        router.register_agent(key, key)
+
+    corpus = build_corpus(args.prompts)
+    mismatches = [
+        p for p in corpus if router.route(p) != legacy_route(router.agents_map, p)
+    ]
+    if mismatches:
+        raise SystemExit(f"Routing mismatch on {len(mismatches)} prompts, e.g. {mismatches[0]!r}")
+
+    before = measure(lambda p: legacy_route(router.agents_map, p), corpus, args.repeat)
+    after = measure(router.route, corpus, args.repeat)
+
+    print(f"corpus: {len(corpus)} prompts, identical routing")
+    print(f"before (keyword cascade): {before:,.0f} prompts/sec")
+    print(f"after  (compiled matcher): {after:,.0f} prompts/sec")
+    print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
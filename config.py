@@ -19,16 +19,62 @@ TEXT_GENERATION_MODEL = "facebook/opt-350m"  # Free HuggingFace model
 # FAISS Configuration
 FAISS_INDEX_PATH = "data/faiss_index"
 DIMENSION = 384  # Dimension for sentence-transformers embeddings
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "hnsw")  # flat, hnsw or ivf
+FAISS_MIGRATION_THRESHOLD = int(os.getenv("FAISS_MIGRATION_THRESHOLD", "50000"))  # Vectors before leaving flat
+FAISS_IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", "0"))  # 0 picks ~4*sqrt(n) lists
+FAISS_IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "16"))  # Lists scanned per IVF query
+FAISS_HNSW_M = 32  # Graph neighbours per HNSW node
+FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))  # HNSW search beam width
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "0"))  # PQ sub-quantizers; 0 stores full vectors
+FAISS_COMPACTION_TOMBSTONES = int(os.getenv("FAISS_COMPACTION_TOMBSTONES", "512"))  # Deleted vectors before an approximate index is rebuilt
+
+# Memory Retention (conversation turns only; notes are deleted explicitly)
+MEMORY_RETENTION_DAYS = float(os.getenv("MEMORY_RETENTION_DAYS", "90"))  # Age at which turns are evicted; 0 keeps them
+MEMORY_RETENTION_MAX_TURNS = int(os.getenv("MEMORY_RETENTION_MAX_TURNS", "20000"))  # Newest turns kept per agent; 0 for no cap
+MEMORY_RETENTION_AGENTS = {  # Per-agent overrides of days / max_turns
+    "CalendarAgent": {"days": 30},
+    "EmailAgent": {"days": 30},
+    "WebSearchAgent": {"days": 30, "max_turns": 5000},
+}
+MEMORY_RETENTION_INTERVAL = 3600  # Seconds between eviction sweeps
+
+# Hybrid Retrieval (BM25 over the same documents, fused with the vector results)
+MEMORY_HYBRID_SEARCH = os.getenv("MEMORY_HYBRID_SEARCH", "true").lower() == "true"
+MEMORY_LEXICAL_WEIGHT = float(os.getenv("MEMORY_LEXICAL_WEIGHT", "1.0"))  # BM25 weight in rank fusion; vectors weigh 1.0
+
+# LLM Response Cache (classification and extraction calls only; free-form generation is never cached)
+LLM_CACHE = os.getenv("LLM_CACHE", "true").lower() == "true"
+LLM_CACHE_PATH = "data/llm_cache.sqlite3"
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))  # Seconds a cached response stays valid
+LLM_CACHE_MAX_ENTRIES = 1000  # Responses kept in memory; the SQLite file holds the rest
+
+# Semantic Routing
+SEMANTIC_ROUTING = os.getenv("SEMANTIC_ROUTING", "false").lower() == "true"
+SEMANTIC_ROUTING_THRESHOLD = float(os.getenv("SEMANTIC_ROUTING_THRESHOLD", "0.6"))
+ROUTER_CENTROIDS_PATH = "data/router_centroids.npz"
 
 # Application Settings
 MAX_HISTORY_LENGTH = 10
 MEMORY_K = 5  # Number of relevant memories to retrieve
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "32"))  # Threads for agents without async support
+MEMORY_WRITE_BATCH_SIZE = 32  # Turns embedded and indexed per background batch
+MEMORY_WRITE_MAX_DELAY = 0.5  # Seconds a turn may wait before its batch is written
 LOG_FILE = "logs/assistant.log"
 
 # File Paths
-NOTES_FILE = "data/notes.json"
+NOTES_FILE = "data/notes.json"  # Legacy notes, imported into the note store once
+NOTES_BACKEND = os.getenv("NOTES_BACKEND", "sqlite")  # sqlite (WAL database) or jsonl (append-only log)
+NOTES_PAGE_SIZE = 20  # Notes per page of a list command
 UPLOADS_DIR = "data/uploads"
 
+# Calendar Mirror (local copy of the Google Calendar for reads and event lookups)
+CALENDAR_MIRROR_PATH = "data/calendar_mirror.sqlite3"
+CALENDAR_SYNC_INTERVAL = float(os.getenv("CALENDAR_SYNC_INTERVAL", "60"))  # Seconds before a read pulls remote changes
+CALENDAR_BATCH_SIZE = 50  # Calls per batch request for bulk create/update/delete and .ics imports
+CALENDAR_BATCH_INTERVAL = float(os.getenv("CALENDAR_BATCH_INTERVAL", "1.0"))  # Min seconds between batch requests
+DATE_PARSER_LANGUAGES = os.getenv("DATE_PARSER_LANGUAGES", "en").split(",")  # Locales dateparser may load
+DATE_PARSER_CACHE_SIZE = 1024  # dateparser results cached per (text, day, timezone)
+
 # Prompt Template Paths
 PROMPT_TEMPLATE_DIR = "core/prompt_templates"
 
@@ -1,110 +1,215 @@
+import logging
 import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+NOTE_KEYWORDS = ["note", "take note", "notes", "reminder"]
+
+EMAIL_KEYWORDS = [
+    "send email", "send mail", "email to", "send an email to",
+    "compose email", "compose mail", "email someone", "email",
+    "mail", "gmail", "inbox", "check inbox",
+    "read emails", "read latest email", "read latest emails",
+    "get emails", "emails from", "messages from",
+    "check gmail", "get gmail", "fetch email", "fetch gmail",
+    "email message", "email conversation", "mail from"
+]
+
+CODE_INTENT_PATTERNS = [
+    r"\b(write|generate|create|make)\s+(a\s+)?(python|c\+\+|java|js|javascript|html)?\s*code",
+    r"\b(debug|fix)\b.*?\bcode\b",
+    r"\bwhat\s+does\s+(this\s+)?code\s+do",
+    r"\bexplain\s+(this\s+)?code",
+    r"\b(program|function)\s+(to|in)\b",
+    r"\b(code|script)\s+(for|in|to)\b",
+]
+
+WEB_SEARCH_KEYWORDS = [
+    "search for", "look up", "find", "find images of", "show pictures of",
+    "find news about", "what's happening with", "find research papers about",
+    "look for scholarly articles on", "search for", "find best price for",
+    "find", "near me", "what's nearby", "restaurants in", "how to", "guide to",
+    "who is", "biography of", "define", "what does", "compare", "difference between",
+    "reviews of", "what people say about", "weather in", "events in", "time in",
+    "news", "information", "trending", "web", "google"
+]
+
+FILE_ANALYZER_KEYWORDS = ["file", "analyze", "document", "pdf", "text"]
+
+CALENDAR_KEYWORDS = {
+    "calendar", "schedule", "scheduling", "meeting", "appointment", "event", "reminder",
+    "set", "add", "make", "mark", "create", "log", "note down", "add to calendar",
+    "remind me", "remind", "block time", "save the date",
+    "my mom's birthday", "dad's birthday", "anniversary", "friend's birthday",
+    "bday", "birthday", "exam on", "test on", "interview on", "presentation on",
+    "submit on", "due on", "last date", "deadline", "function on", "holiday on",
+    "leave on", "trip to", "flight on", "train on", "doctor appointment",
+    "dentist appointment", "call with", "zoom with", "teams call", "google meet",
+    "on", "at", "from", "to", "between", "next", "tomorrow", "today", "tonight",
+    "upcoming", "early morning", "evening", "afternoon", "noon", "midnight",
+    "reschedule", "postpone", "change", "move", "update event", "cancel", "delete event",
+    "what's on", "what's planned", "what's my schedule", "show calendar", "next event",
+    "list my meetings", "my agenda", "show my plan", "event list", "my plans",
+    "plan for", "meeting with", "event with", "add note", "reminder for",
+    "set reminder", "schedule with", "add appointment", "fix time",
+    "diwali", "eid", "christmas", "new year", "raksha bandhan", "holi", "navratri"
+}
+
+# Routing precedence, highest first. The code tier has no keywords; it is
+# decided by CODE_INTENT_PATTERNS when nothing above it matched.
+ROUTING_TABLE: List[Tuple[str, Iterable[str]]] = [
+    ("note_taker", NOTE_KEYWORDS),
+    ("email", EMAIL_KEYWORDS),
+    ("code", ()),
+    ("web_search", WEB_SEARCH_KEYWORDS),
+    ("file_analyzer", FILE_ANALYZER_KEYWORDS),
+    ("calendar", CALENDAR_KEYWORDS),
+]
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over prioritized keyword groups.
+
+    Scans the text once and reports the highest-priority group with at least
+    one keyword occurring anywhere in it (plain substring semantics, exactly
+    like ``keyword in text``).
+    """
+
+    def __init__(self, groups: Sequence[Iterable[str]]):
+        self.no_match = len(groups)
+        goto: List[Dict[str, int]] = [{}]
+        priority = [self.no_match]
+
+        for rank, keywords in enumerate(groups):
+            for keyword in keywords:
+                state = 0
+                for ch in keyword:
+                    nxt = goto[state].get(ch)
+                    if nxt is None:
+                        goto.append({})
+                        priority.append(self.no_match)
+                        nxt = len(goto) - 1
+                        goto[state][ch] = nxt
+                    state = nxt
+                priority[state] = min(priority[state], rank)
+
+        # Expand goto/fail into a DFA so the scan is one dict lookup per char.
+        alphabet = {ch for state in goto for ch in state}
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [{} for _ in goto]
+        delta[0] = {ch: goto[0].get(ch, 0) for ch in alphabet}
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            priority[state] = min(priority[state], priority[fail[state]])
+            for ch in alphabet:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    fail[nxt] = delta[fail[state]][ch]
+                    queue.append(nxt)
+                    delta[state][ch] = nxt
+                else:
+                    delta[state][ch] = delta[fail[state]][ch]
+
+        # Transitions back to the root are the .get() default.
+        self._delta = [{ch: nxt for ch, nxt in d.items() if nxt} for d in delta]
+        self._priority = priority
+
+    def best_match(self, text: str) -> int:
+        """
+        Return the index of the highest-priority group found in ``text``,
+        or ``self.no_match`` if none of the keywords occur.
+        """
+        delta = self._delta
+        priority = self._priority
+        state = 0
+        best = self.no_match
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if priority[state] < best:
+                best = priority[state]
+                if best == 0:
+                    break
+        return best
+
 
 class AgentRouter:
     """
     AgentRouter routes the user's prompt to the appropriate agent
-    based on comprehensive keyword matching.
+    based on comprehensive keyword matching, optionally preceded by an
+    embedding-based semantic tier.
     """
 
-    def __init__(self, agents_map=None):
+    def __init__(self, agents_map=None, semantic_router=None):
         """
         agents_map: dict[str, agent_instance]
             Maps agent keys to their instances.
+        semantic_router: SemanticRouter, optional
+            When set, prompts are routed by exemplar similarity first and
+            fall back to the keyword cascade below its confidence threshold.
         """
         if agents_map is None:
             agents_map = {}
         self.agents_map = agents_map
+        self.semantic_router = semantic_router
+        self.logger = logging.getLogger(__name__)
+        self._route_keys = [key for key, _ in ROUTING_TABLE]
+        self._code_rank = self._route_keys.index("code")
+        self._matcher: Optional[KeywordMatcher] = None
+        self._code_pattern: Optional[re.Pattern] = None
 
-    def register_agent(self, key, agent):
+    def register_agent(self, key, agent, exemplars=None):
         """
         Register an agent with a key like 'note_taker', 'email', etc.
+        exemplars: optional example prompts used by the semantic tier.
         """
         self.agents_map[key] = agent
+        if exemplars and self.semantic_router is not None:
+            self.semantic_router.set_exemplars(key, exemplars)
+        self._compile_matchers()
 
-    def matches_code_intent(self, text: str):
-        text_lower = text.lower()
-        if "debug" in text_lower and "code" in text_lower:
-            return True
-
-        patterns = [
-            r"\b(write|generate|create|make)\s+(a\s+)?(python|c\+\+|java|js|javascript|html)?\s*code",
-            r"\b(debug|fix)\b.*?\bcode\b",  # updated regex here
-            r"\bwhat\s+does\s+(this\s+)?code\s+do",
-            r"\bexplain\s+(this\s+)?code",
-            r"\b(program|function)\s+(to|in)\b",
-            r"\b(code|script)\s+(for|in|to)\b",
-        ]
-        return any(re.search(p, text.lower()) for p in patterns)
+    def _compile_matchers(self):
+        """Build the keyword automaton and code-intent regex once per router."""
+        if self._matcher is None:
+            self._matcher = KeywordMatcher([keywords for _, keywords in ROUTING_TABLE])
+        if self._code_pattern is None:
+            combined = [r"(?s:debug.*code|code.*debug)"] + CODE_INTENT_PATTERNS
+            self._code_pattern = re.compile("|".join(f"(?:{p})" for p in combined))
 
+    def matches_code_intent(self, text: str):
+        self._compile_matchers()
+        return self._code_pattern.search(text.lower()) is not None
 
     def route(self, prompt: str):
         """
         Determine the appropriate agent for a prompt.
 
+        Precedence: semantic match (if configured and confident), then
+        note → email → code → web_search → file_analyzer → calendar → default.
+
         Returns:
             agent instance or None if no suitable agent found.
         """
+        if self.semantic_router is not None:
+            try:
+                key, score = self.semantic_router.classify(prompt)
+            except Exception as e:
+                self.logger.warning(f"Semantic routing failed, using keywords: {e}")
+                key = None
+            if key is not None and self.agents_map.get(key) is not None:
+                return self.agents_map[key]
+
+        self._compile_matchers()
         prompt_lower = prompt.lower()
 
-        # Note Taker
-        if any(keyword in prompt_lower for keyword in ["note", "take note", "notes", "reminder"]):
-            return self.agents_map.get("note_taker")
-
-        # Email
-        email_keywords = [
-            "send email", "send mail", "email to", "send an email to",
-            "compose email", "compose mail", "email someone", "email",
-            "mail", "gmail", "inbox", "check inbox",
-            "read emails", "read latest email", "read latest emails",
-            "get emails", "emails from", "messages from",
-            "check gmail", "get gmail", "fetch email", "fetch gmail",
-            "email message", "email conversation", "mail from"
-        ]
-        if any(keyword in prompt_lower for keyword in email_keywords):
-            return self.agents_map.get("email")
-
-        # ✅ Code intent (placed early to avoid calendar false matches)
-        if self.matches_code_intent(prompt):
-            return self.agents_map.get("code")
-
-        # Web Search
-        web_search_keywords = [
-            "search for", "look up", "find", "find images of", "show pictures of", 
-            "find news about", "what's happening with", "find research papers about", 
-            "look for scholarly articles on", "search for", "find best price for", 
-            "find", "near me", "what's nearby", "restaurants in", "how to", "guide to",
-            "who is", "biography of", "define", "what does", "compare", "difference between",
-            "reviews of", "what people say about", "weather in", "events in", "time in",
-            "news", "information", "trending", "web", "google"
-        ]
-        if any(keyword in prompt_lower for keyword in web_search_keywords):
-            return self.agents_map.get("web_search")
-
-        # File Analyzer
-        if any(keyword in prompt_lower for keyword in ["file", "analyze", "document", "pdf", "text"]):
-            return self.agents_map.get("file_analyzer")
-        
-        # Calendar
-        calendar_keywords = {
-            "calendar", "schedule", "scheduling", "meeting", "appointment", "event", "reminder",
-            "set", "add", "make", "mark", "create", "log", "note down", "add to calendar", 
-            "remind me", "remind", "block time", "save the date",
-            "my mom's birthday", "dad's birthday", "anniversary", "friend's birthday",
-            "bday", "birthday", "exam on", "test on", "interview on", "presentation on",
-            "submit on", "due on", "last date", "deadline", "function on", "holiday on",
-            "leave on", "trip to", "flight on", "train on", "doctor appointment",
-            "dentist appointment", "call with", "zoom with", "teams call", "google meet",
-            "on", "at", "from", "to", "between", "next", "tomorrow", "today", "tonight",
-            "upcoming", "early morning", "evening", "afternoon", "noon", "midnight",
-            "reschedule", "postpone", "change", "move", "update event", "cancel", "delete event",
-            "what's on", "what's planned", "what's my schedule", "show calendar", "next event",
-            "list my meetings", "my agenda", "show my plan", "event list", "my plans",
-            "plan for", "meeting with", "event with", "add note", "reminder for", 
-            "set reminder", "schedule with", "add appointment", "fix time",
-            "diwali", "eid", "christmas", "new year", "raksha bandhan", "holi", "navratri"
-        }
-        if any(keyword in prompt_lower for keyword in calendar_keywords):
-            return self.agents_map.get("calendar")
+        rank = self._matcher.best_match(prompt_lower)
+        if rank > self._code_rank and self._code_pattern.search(prompt_lower):
+            rank = self._code_rank
+
+        if rank < len(self._route_keys):
+            return self.agents_map.get(self._route_keys[rank])
 
         # Fallback
         return self.agents_map.get("default", None)
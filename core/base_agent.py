@@ -10,6 +10,8 @@ from langchain.embeddings.base import Embeddings
 from langchain_community.vectorstores import FAISS
 from langchain.prompts import PromptTemplate
 
+from memory.hybrid_search import hybrid_search
+
 
 class BaseAgent(ABC):
     """
@@ -53,12 +55,18 @@ class BaseAgent(ABC):
         except Exception as e:
             self.logger.error(f"Memory saving failed: {e}")
 
-    def get_relevant_context(self, prompt: str, k: int = 3) -> List[str]:
+    def get_relevant_context(self, prompt: str, k: int = 3, context: Dict[str, Any] = None) -> List[str]:
         """
-        Retrieve the top-k most relevant memory snippets from FAISS based on similarity.
+        Retrieve the top-k most relevant memory snippets from FAISS, fusing
+        similarity with BM25 matches so exact names, addresses and titles are
+        found. Pass the orchestrator's context to reuse the request's retrieval
+        instead of searching the prompt again.
         """
         try:
-            return self.vectorstore.similarity_search(prompt, k=k)
+            retrieval = (context or {}).get('retrieval')
+            if retrieval is not None and retrieval.query == prompt:
+                return retrieval.search(k)
+            return hybrid_search(self.vectorstore, prompt, k=k)
         except Exception as e:
             self.logger.warning(f"Failed context retrieval from FAISS: {e}")
             return []
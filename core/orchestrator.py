@@ -1,12 +1,21 @@
+import asyncio
+import inspect
 import logging
 import json
+import threading
 import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Any, Iterator, List, Optional
 
 from dotenv import load_dotenv
+import config
 from core.agent_router import AgentRouter
+from core.semantic_router import SemanticRouter
 from memory.faiss_store import setup_vectorstore
+from memory.llm_cache import LLMCache
+from memory.memory_writer import MemoryWriter
+from memory.retrieval_context import DEFAULT_RETRIEVAL_POLICY, RetrievalScope
 
 # Import all agents and prompt templates
 from agents.note_taker_agent import NoteTakerAgent
@@ -26,12 +35,61 @@ from core.prompt_templates.web_search_template import web_search_prompt
 load_dotenv()
 
 class Orchestrator:
-    def __init__(self):
+    def __init__(self, embeddings=None, vectorstore=None, router=None, llm_cache=None):
+        """
+        embeddings, vectorstore: optional pre-built memory backend; by default
+            the FAISS store from memory.faiss_store is loaded.
+        router: optional pre-populated AgentRouter; by default the Gemini LLM
+            is created and all agents are registered.
+        llm_cache: optional LLMCache for the agents' deterministic LLM
+            sub-calls; by default the one at config.LLM_CACHE_PATH, opened
+            only when the default agents are registered.
+        """
         self.logger = logging.getLogger(__name__)
-        self.router = AgentRouter()
 
         # Initialize embeddings and vectorstore
-        self.embeddings, self.vectorstore = setup_vectorstore()
+        if vectorstore is None:
+            self.embeddings, self.vectorstore = setup_vectorstore()
+        else:
+            self.embeddings, self.vectorstore = embeddings, vectorstore
+
+        # Turns are indexed in batches in the background
+        self.memory_writer = MemoryWriter(
+            self.vectorstore,
+            max_batch_size=config.MEMORY_WRITE_BATCH_SIZE,
+            max_delay=config.MEMORY_WRITE_MAX_DELAY
+        )
+        # Each prompt is embedded and searched once (lexical queries not at all); consumers share slices
+        self.retrieval = RetrievalScope(
+            self.memory_writer, fetch_k=config.MEMORY_K, hybrid=config.MEMORY_HYBRID_SEARCH
+        )
+
+        # Shared by the agents' deterministic LLM sub-calls
+        self.llm_cache = llm_cache
+
+        self.conversation_history = []
+        self._history_lock = threading.Lock()
+        self.last_batch_stats: Dict[str, Any] = {}
+
+        # Background event loop backing the synchronous wrappers
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+        # Agents declaring thread_safe = False are called one at a time
+        self._agent_locks: Dict[int, threading.Lock] = {}
+
+        if router is not None:
+            self.router = router
+            return
+
+        semantic_router = None
+        if config.SEMANTIC_ROUTING:
+            semantic_router = SemanticRouter(
+                self.embeddings,
+                threshold=config.SEMANTIC_ROUTING_THRESHOLD,
+                cache_path=config.ROUTER_CENTROIDS_PATH
+            )
+        self.router = AgentRouter(semantic_router=semantic_router)
 
         # Initialize LLM with safe configuration
         try:
@@ -45,13 +103,16 @@ class Orchestrator:
             traceback.print_exc()
             raise
 
-        memory = VectorStoreRetrieverMemory(retriever=self.vectorstore.as_retriever())
+        memory = VectorStoreRetrieverMemory(retriever=self.retrieval.as_retriever())
+
+        if self.llm_cache is None and config.LLM_CACHE:
+            self.llm_cache = LLMCache(
+                config.LLM_CACHE_PATH, max_entries=config.LLM_CACHE_MAX_ENTRIES, ttl=config.LLM_CACHE_TTL
+            )
 
         # Register all available agents
         self._register_agents(llm, memory)
 
-        self.conversation_history = []
-
     def _register_agents(self, llm, memory):
         """Register all agents for routing."""
         note_taker = NoteTakerAgent(
@@ -59,19 +120,22 @@ class Orchestrator:
             memory=memory,
             embeddings=self.embeddings,
             vectorstore=self.vectorstore,
-            prompt_template=note_taker_prompt
+            prompt_template=note_taker_prompt,
+            llm_cache=self.llm_cache
         )
         self.router.register_agent("note_taker", note_taker)
 
         web_search_agent = WebSearchAgent(
             llm=llm,
             memory=memory,
-            prompt_template=web_search_prompt
+            prompt_template=web_search_prompt,
+            llm_cache=self.llm_cache
         )
         self.router.register_agent("web_search", web_search_agent)
 
         calendar_agent = CalendarAgent(
             llm=llm,
+            llm_cache=self.llm_cache
         )
         self.router.register_agent("calendar", calendar_agent)
 
@@ -85,86 +149,269 @@ class Orchestrator:
         self.router.register_agent("file_analyzer", file_analyzer_agent)
 
         
-    def process_prompt(self, prompt: str) -> Dict[str, Any]:
-        """Process user prompt and return response."""
-        start_time = time.time()
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Return the background event loop, starting it on first use."""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop.set_default_executor(
+                    ThreadPoolExecutor(max_workers=config.WORKER_THREADS, thread_name_prefix="agent")
+                )
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name="orchestrator-loop",
+                    daemon=True
+                ).start()
+            return self._loop
+
+    def _run_sync(self, coro):
+        """Run a coroutine on the background loop and block for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop()).result()
+
+    def _call_agent(self, agent, prompt: str, context: Dict[str, Any]) -> str:
+        """Call agent.process, serialized per agent unless it is thread safe."""
+        if getattr(agent, "thread_safe", True):
+            return agent.process(prompt, context)
+        with self._loop_lock:
+            lock = self._agent_locks.setdefault(id(agent), threading.Lock())
+        with lock:
+            return agent.process(prompt, context)
+
+    async def _run_agent(self, agent, prompt: str, context: Dict[str, Any]) -> str:
+        """Await the agent's aprocess coroutine, or run process() in a thread."""
+        aprocess = getattr(agent, "aprocess", None)
+        if aprocess is not None and asyncio.iscoroutinefunction(aprocess):
+            return await aprocess(prompt, context)
+        return await asyncio.to_thread(self._call_agent, agent, prompt, context)
+
+    def process_prompt(self, prompt: str, agent: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process user prompt and return response.
+        agent: optional router key (e.g. 'note_taker') to bypass routing.
+        """
+        return self._run_sync(self.process_prompt_async(prompt, agent=agent))
+
+    def stream_prompt(self, prompt: str, agent: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Blocking iterator over stream_prompt_async events: {'chunk', 'agent'}
+        dicts as text arrives, then the final process_prompt result dict.
+        """
+        loop = self._get_loop()
+        events = self.stream_prompt_async(prompt, agent=agent)
         try:
-            self.conversation_history.append({
-                'role': 'user',
-                'content': prompt,
-                'timestamp': datetime.now().isoformat()
-            })
+            while True:
+                try:
+                    event = asyncio.run_coroutine_threadsafe(events.__anext__(), loop).result()
+                except StopAsyncIteration:
+                    break
+                yield event
+        finally:
+            asyncio.run_coroutine_threadsafe(events.aclose(), loop).result()
+
+    def process_prompts(self, prompts: List[str], max_workers: int = 8) -> List[Dict[str, Any]]:
+        """
+        Process a batch of prompts with at most max_workers in flight.
+        Results are returned in input order, one process_prompt dict each.
+        """
+        return self._run_sync(self.process_prompts_async(prompts, max_workers))
+
+    async def process_prompts_async(self, prompts: List[str], max_workers: int = 8) -> List[Dict[str, Any]]:
+        """Async counterpart of process_prompts."""
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def run_one(prompt):
+            async with semaphore:
+                return await self.process_prompt_async(prompt)
 
-            relevant_history = self.vectorstore.similarity_search(prompt, k=3)
-            agent = self.router.route(prompt)
+        start_time = time.time()
+        results = list(await asyncio.gather(*(run_one(p) for p in prompts)))
+        elapsed = time.time() - start_time
+
+        self.last_batch_stats = {
+            'prompts': len(prompts),
+            'errors': sum(1 for r in results if 'error' in r),
+            'max_workers': max_workers,
+            'elapsed': elapsed,
+            'prompts_per_sec': len(prompts) / elapsed if elapsed > 0 else 0.0
+        }
+        self.logger.info(
+            f"Processed {len(prompts)} prompts in {elapsed:.2f}s "
+            f"({self.last_batch_stats['prompts_per_sec']:.2f} prompts/sec, "
+            f"{self.last_batch_stats['errors']} errors)"
+        )
+        return results
+
+    async def process_prompt_async(self, prompt: str, agent: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process user prompt without blocking the event loop, so many prompts
+        can be in flight on one loop. Returns the same dict as process_prompt.
+        """
+        result = {}
+        async for event in self.stream_prompt_async(prompt, agent=agent):
+            if 'chunk' not in event:
+                result = event
+        return result
 
+    async def _stream_agent(self, agent, prompt: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield chunks from the agent's astream, or its whole response at once."""
+        astream = getattr(agent, "astream", None)
+        if astream is not None and inspect.isasyncgenfunction(astream):
+            async for chunk in astream(prompt, context):
+                if chunk:
+                    yield chunk
+        else:
+            yield await self._run_agent(agent, prompt, context)
+
+    async def stream_prompt_async(self, prompt: str, agent: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process user prompt, yielding {'chunk', 'agent'} events as the agent
+        produces text and finally the result dict, which adds
+        time_to_first_token and the request's retrieval counters to the
+        usual response/agent/processing_time.
+        Memory is persisted once the stream has completed.
+        """
+        start_time = time.time()
+        time_to_first_token = None
+        user_turn = {
+            'role': 'user',
+            'content': prompt,
+            'timestamp': datetime.now().isoformat()
+        }
+        retrieval = self.retrieval.open(prompt)
+        try:
             if agent is None:
+                selected = await asyncio.to_thread(self.router.route, prompt)
+            else:
+                selected = self.router.agents_map.get(agent)
+
+            if selected is None:
                 raise ValueError("No suitable agent found for this prompt.")
+            agent_name = selected.__class__.__name__
+
+            # Route first, then fetch only the memory this agent reads
+            policy = getattr(selected, "retrieval_policy", DEFAULT_RETRIEVAL_POLICY)
+            relevant_history = await retrieval.aretrieve(policy)
 
-            response = agent.process(prompt, {
+            chunks = []
+            async for chunk in self._stream_agent(selected, prompt, {
                 'history': relevant_history,
+                'retrieval': retrieval,
                 'timestamp': datetime.now().isoformat()
-            })
+            }):
+                if time_to_first_token is None:
+                    time_to_first_token = time.time() - start_time
+                chunks.append(chunk)
+                yield {'chunk': chunk, 'agent': agent_name}
+            response = "".join(chunks)
+        except Exception as e:
+            with self._history_lock:
+                self.conversation_history.append(user_turn)
+            self.logger.error(f"Processing failed: {str(e)}")
+            yield {
+                'error': str(e),
+                'processing_time': time.time() - start_time,
+                'time_to_first_token': time_to_first_token,
+                'retrieval': retrieval.stats()
+            }
+            return
+        finally:
+            self.retrieval.close(retrieval)
 
-            self.conversation_history.append({
+        # Append both turns together so concurrent prompts keep their pairing
+        with self._history_lock:
+            self.conversation_history.extend([user_turn, {
                 'role': 'assistant',
                 'content': response,
                 'timestamp': datetime.now().isoformat(),
-                'agent': agent.__class__.__name__
-            })
-
-            self.vectorstore.add_texts(
-                texts=[f"User: {prompt}\nAssistant: {response}"],
-                metadatas=[{
-                    'timestamp': datetime.now().isoformat(),
-                    'agent': agent.__class__.__name__
-                }]
-            )
+                'agent': agent_name
+            }])
 
-            return {
-                'response': response,
-                'agent': agent.__class__.__name__,
-                'processing_time': time.time() - start_time
+        # Indexed in the background; still visible to searches while queued
+        self.memory_writer.add(
+            f"User: {prompt}\nAssistant: {response}",
+            {
+                'timestamp': datetime.now().isoformat(),
+                'agent': agent_name
             }
+        )
 
-        except Exception as e:
-            self.logger.error(f"Processing failed: {str(e)}")
-            return {
-                'error': str(e),
-                'processing_time': time.time() - start_time
-            }
+        yield {
+            'response': response,
+            'agent': agent_name,
+            'processing_time': time.time() - start_time,
+            'time_to_first_token': time_to_first_token,
+            'retrieval': retrieval.stats()
+        }
+
+    def flush(self) -> None:
+        """Block until all queued memory writes are in the vectorstore."""
+        self.memory_writer.flush()
+
+    def llm_cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """Hit rates of the LLM response cache per call site; empty when it is disabled."""
+        return self.llm_cache.stats() if self.llm_cache is not None else {}
+
+    def shutdown(self) -> None:
+        """Flush pending memory writes and stop background workers."""
+        self.memory_writer.close()
+        if self.llm_cache is not None:
+            self.logger.info(f"LLM cache: {self.llm_cache.stats()['total']}")
+            self.llm_cache.close()
+        retention = getattr(self.vectorstore, "retention", None)
+        if retention is not None:
+            retention.close()
+        journal = getattr(self.vectorstore, "journal", None)
+        if journal is not None:
+            journal.close()
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
 
     def get_conversation_history(self, limit: Optional[int] = None) -> list:
         """Get past conversation history."""
-        return self.conversation_history[-limit:] if limit else self.conversation_history
+        with self._history_lock:
+            return self.conversation_history[-limit:] if limit else list(self.conversation_history)
 
     def save_history(self, filepath: str) -> None:
         """Save conversation history to a file."""
         try:
+            with self._history_lock:
+                history = list(self.conversation_history)
             with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(self.conversation_history, f, indent=2)
+                json.dump(history, f, indent=2)
         except Exception as e:
             self.logger.error(f"Failed to save history: {str(e)}")
             raise
 
     def load_history(self, filepath: str) -> None:
-        """Load conversation history from a file and restore vectorstore."""
+        """
+        Load conversation history from a file and add its turns to the
+        vectorstore. Memory already in the store (notes, earlier turns)
+        is kept; turns that were in the history being replaced are
+        already stored and are not added again.
+        """
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
-                self.conversation_history = json.load(f)
+                history = json.load(f)
+            with self._history_lock:
+                known = {(turn.get('role'), turn.get('content'), turn.get('timestamp'))
+                         for turn in self.conversation_history}
+                self.conversation_history = history
 
-            conversations = [
-                f"User: {turn['content']}\nAssistant: {next_turn['content']}"
-                for turn, next_turn in zip(
-                    self.conversation_history[::2],
-                    self.conversation_history[1::2]
-                )
-            ]
-
-            self.vectorstore = self.vectorstore.from_texts(
-                conversations,
-                embedding=self.embeddings
-            )
+            # A failed prompt leaves a user turn without an answer, so turns are paired by role
+            for turn, next_turn in zip(history, history[1:]):
+                if turn.get('role') != 'user' or next_turn.get('role') != 'assistant':
+                    continue
+                if (next_turn.get('role'), next_turn.get('content'), next_turn.get('timestamp')) in known:
+                    continue
+                metadata = {'timestamp': next_turn.get('timestamp') or datetime.now().isoformat()}
+                if next_turn.get('agent'):
+                    metadata['agent'] = next_turn['agent']
+                self.memory_writer.add(f"User: {turn['content']}\nAssistant: {next_turn['content']}", metadata)
+            self.memory_writer.flush()
 
         except Exception as e:
             self.logger.error(f"Failed to load history: {str(e)}")
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+
+# Path to the cached centroid matrix, kept next to data/faiss_index.
+CENTROIDS_PATH = os.path.join("data", "router_centroids.npz")
+
+DEFAULT_EXEMPLARS: Dict[str, List[str]] = {
+    "note_taker": [
+        "take a note: migrate backend to FastAPI",
+        "note that the demo is on friday",
+        "show my notes",
+        "find notes about the product launch",
+        "delete note about Kabir",
+        "write down that I need to renew my passport",
+    ],
+    "email": [
+        "send an email to raj@example.com about the demo video",
+        "compose a mail to my manager regarding leave",
+        "check my inbox",
+        "show me unread emails from Google",
+        "what did John mail me last week",
+        "read my latest emails",
+    ],
+    "code": [
+        "write a Flask API for a to-do app",
+        "debug this script and suggest improvements",
+        "what does this python function do",
+        "explain this code",
+        "fix the bug in my javascript code",
+        "generate a function to reverse a linked list",
+    ],
+    "web_search": [
+        "search for best practices in prompt engineering",
+        "look up the latest AI breakthroughs",
+        "who is the CEO of Google",
+        "what's the weather in Mumbai",
+        "find news about the Google I/O event",
+        "compare iPhone and Pixel cameras",
+    ],
+    "file_analyzer": [
+        "analyze this PDF for budget highlights",
+        "analyze this file",
+        "summarize this document",
+        "what are the key points of this report",
+        "list all deadlines mentioned in the contract",
+        "read this csv and tell me what is in it",
+    ],
+    "calendar": [
+        "schedule a call with Sam next Thursday at 3 PM",
+        "what's on my schedule this week",
+        "add my mom's birthday to my calendar",
+        "reschedule the team sync to Monday",
+        "cancel the dentist appointment",
+        "book a meeting with Ravi on Tuesday at 10 AM",
+    ],
+}
+
+
+class SemanticRouter:
+    """
+    Embedding-based routing tier.
+
+    Exemplar prompts for each agent are embedded once, averaged into one
+    unit-length centroid per agent and stacked into a single matrix. A
+    prompt is classified by one matrix-vector product against that matrix.
+    Centroids are cached on disk and reused while the exemplars and the
+    embedding model stay the same.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        exemplars: Optional[Dict[str, List[str]]] = None,
+        threshold: float = 0.35,
+        cache_path: Optional[str] = CENTROIDS_PATH,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.embeddings = embeddings
+        self.exemplars = {k: list(v) for k, v in (exemplars or DEFAULT_EXEMPLARS).items()}
+        self.threshold = threshold
+        self.cache_path = cache_path
+        self.keys: List[str] = []
+        self.centroids: Optional[np.ndarray] = None
+
+    def set_exemplars(self, key: str, exemplars: List[str]) -> None:
+        """Replace the exemplars for one agent key; centroids are rebuilt lazily."""
+        self.exemplars[key] = list(exemplars)
+        self.centroids = None
+
+    def _fingerprint(self) -> str:
+        model = getattr(self.embeddings, "model", None) or self.embeddings.__class__.__name__
+        payload = json.dumps({"model": model, "exemplars": self.exemplars}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load_cache(self, fingerprint: str) -> bool:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                if str(data["fingerprint"]) != fingerprint:
+                    return False
+                self.keys = [str(k) for k in data["keys"]]
+                self.centroids = data["centroids"].astype(np.float32)
+            return True
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable router centroid cache: {e}")
+            return False
+
+    def _save_cache(self, fingerprint: str) -> None:
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = self.cache_path + ".tmp.npz"
+            np.savez(
+                tmp_path,
+                fingerprint=np.array(fingerprint),
+                keys=np.array(self.keys),
+                centroids=self.centroids,
+            )
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            self.logger.warning(f"Failed to save router centroid cache: {e}")
+
+    def build(self) -> None:
+        """Load centroids from the disk cache, or embed the exemplars and cache them."""
+        fingerprint = self._fingerprint()
+        if self._load_cache(fingerprint):
+            return
+
+        keys = [k for k, texts in self.exemplars.items() if texts]
+        texts = [text for k in keys for text in self.exemplars[k]]
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+
+        centroids = np.zeros((len(keys), vectors.shape[1]), dtype=np.float32)
+        offset = 0
+        for row, key in enumerate(keys):
+            count = len(self.exemplars[key])
+            centroids[row] = vectors[offset:offset + count].mean(axis=0)
+            offset += count
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        self.keys = keys
+        self.centroids = centroids / norms
+        self._save_cache(fingerprint)
+
+    def scores(self, prompt: str) -> Dict[str, float]:
+        """Cosine similarity between the prompt and every agent centroid."""
+        if self.centroids is None:
+            self.build()
+        query = np.asarray(self.embeddings.embed_query(prompt), dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return {key: 0.0 for key in self.keys}
+        sims = self.centroids @ (query / norm)
+        return dict(zip(self.keys, sims.tolist()))
+
+    def classify(self, prompt: str) -> Tuple[Optional[str], float]:
+        """
+        Return (agent_key, score) for the closest centroid, or (None, score)
+        when the best score is below the confidence threshold.
+        """
+        scores = self.scores(prompt)
+        if not scores:
+            return None, 0.0
+        key = max(scores, key=scores.get)
+        score = scores[key]
+        return (key if score >= self.threshold else None), score
@@ -12,5 +12,22 @@ class CLI:
                 print("Exiting CLI.")
                 break
 
-            response = self.orchestrator.process_prompt(user_input)
-            print(f"Assistant ({response.get('agent', 'unknown')}): {response.get('response', 'No response')}")
+            self._stream_response(user_input)
+
+    def _stream_response(self, user_input):
+        """Print the assistant's reply incrementally as chunks arrive."""
+        started = False
+        result = {}
+        for event in self.orchestrator.stream_prompt(user_input):
+            if 'chunk' in event:
+                if not started:
+                    print(f"Assistant ({event.get('agent', 'unknown')}): ", end="", flush=True)
+                    started = True
+                print(event['chunk'], end="", flush=True)
+            else:
+                result = event
+
+        if started:
+            print()
+        else:
+            print(f"Assistant ({result.get('agent', 'unknown')}): {result.get('response', 'No response')}")
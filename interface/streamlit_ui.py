@@ -9,6 +9,16 @@ def get_base64_image(image_path):
         encoded = base64.b64encode(image_file.read()).decode()
     return f"data:image/png;base64,{encoded}"
 
+# Sidebar agent labels mapped to AgentRouter keys
+AGENT_KEYS = {
+    "NoteTaker": "note_taker",
+    "EmailAgent": "email",
+    "CalendarAgent": "calendar",
+    "WebSearch": "web_search",
+    "FileAnalyzer": "file_analyzer",
+    "CodeAgent": "code",
+}
+
 class StreamlitUI:
     def __init__(self, orchestrator):
         self.orchestrator = orchestrator
@@ -57,34 +67,48 @@ class StreamlitUI:
 
         # On submit
         if st.button("Submit") and prompt.strip():
+            agent_key = AGENT_KEYS.get(selected_agent)
+            header = st.empty()
+            body = st.empty()
+            response_text = ""
+            result = {}
             with st.spinner("Processing your request..."):
                 try:
-                    if selected_agent != "Auto":
-                        result = self.orchestrator.process_prompt(prompt, agent=selected_agent)
-                    else:
-                        result = self.orchestrator.process_prompt(prompt)
+                    for event in self.orchestrator.stream_prompt(prompt, agent=agent_key):
+                        if 'chunk' in event:
+                            if not response_text:
+                                header.markdown(f"### 🤖 Response from **{event.get('agent', 'Unknown')}**")
+                            response_text += event['chunk']
+                            body.markdown(response_text + "▌")
+                        else:
+                            result = event
                 except Exception as e:
                     st.error(f"An error occurred: {str(e)}")
                     st.text(traceback.format_exc())
                     return
 
-                response_text = result.get('response', 'No response.')
-                agent_used = result.get('agent', 'Unknown')
-                processing_time = result.get('processing_time', None)
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            response_text = result.get('response', response_text or 'No response.')
+            agent_used = result.get('agent', 'Unknown')
+            processing_time = result.get('processing_time', None)
+            time_to_first_token = result.get('time_to_first_token', None)
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-                st.session_state.history.append({
-                    "timestamp": timestamp,
-                    "prompt": prompt,
-                    "response": response_text,
-                    "agent": agent_used,
-                    "processing_time": processing_time,
-                })
+            st.session_state.history.append({
+                "timestamp": timestamp,
+                "prompt": prompt,
+                "response": response_text,
+                "agent": agent_used,
+                "processing_time": processing_time,
+                "time_to_first_token": time_to_first_token,
+            })
 
-                st.markdown(f"### 🤖 Response from **{agent_used}**")
-                st.markdown(response_text)
-                if processing_time is not None:
-                    st.caption(f"Processing time: {processing_time:.2f} seconds")
+            header.markdown(f"### 🤖 Response from **{agent_used}**")
+            body.markdown(response_text)
+            if processing_time is not None:
+                caption = f"Processing time: {processing_time:.2f} seconds"
+                if time_to_first_token is not None:
+                    caption += f" · First token after {time_to_first_token:.2f} seconds"
+                st.caption(caption)
         else:
             st.info("Please enter a prompt above and press Submit to get started.")
 
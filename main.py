@@ -52,6 +52,8 @@ def main():
         except Exception as e:
             logging.error(f"Unexpected CLI error: {e}", exc_info=True)
             print("An unexpected error occurred in CLI. Check logs.")
+        finally:
+            orchestrator.shutdown()
     else:
         interface = StreamlitUI(orchestrator)
         try:
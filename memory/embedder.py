@@ -0,0 +1,181 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic, offline embeddings based on the hashing trick.
+
+    Words and character trigrams are hashed into a fixed number of signed
+    buckets and the result is L2-normalized. It needs no network or model
+    download, which makes it handy for tests and for routing exemplars.
+    """
+
+    def __init__(self, dimension: int = 256):
+        self.dimension = dimension
+        self.model = f"hashing-{dimension}"
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"[a-z0-9']+", text.lower())
+        features = list(words)
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text).tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text).tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Caching wrapper around another LangChain embeddings model.
+
+    Vectors are keyed by a hash of the model name, the embedding kind
+    (query or document) and the text. Lookups go to a bounded in-process
+    LRU first, then to a SQLite file; remaining misses are embedded with a
+    single embed_documents call and written back to both tiers.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache_path: Optional[str] = None, max_entries: int = 10000):
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, "model", None) or embeddings.__class__.__name__
+        self.max_entries = max_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._db = None
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    def _key(self, kind: str, text: str) -> str:
+        payload = f"{self.model}\0{kind}\0{text}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Return cached vectors for the given keys from memory, then disk."""
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vector
+            missing = [k for k in keys if k not in found]
+            if self._db is not None and missing:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                        found[key] = vector
+                        self._remember(key, vector)
+                        self.disk_hits += 1
+        return found
+
+    def _store(self, items: Dict[str, List[float]]) -> None:
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            if self._db is not None and items:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(k, np.asarray(v, dtype=np.float32).tobytes()) for k, v in items.items()]
+                )
+                self._db.commit()
+
+    def _partition(self, kind: str, texts: List[str]):
+        keys = [self._key(kind, text) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+        pending: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                pending.setdefault(key, text)
+        with self._lock:
+            self.hits += len(texts) - len(pending)
+            self.misses += len(pending)
+        return keys, found, pending
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, pending = self._partition("document", texts)
+        if pending:
+            vectors = self.embeddings.embed_documents(list(pending.values()))
+            new_items = dict(zip(pending.keys(), vectors))
+            self._store(new_items)
+            found.update(new_items)
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, pending = self._partition("document", texts)
+        if pending:
+            vectors = await self.embeddings.aembed_documents(list(pending.values()))
+            new_items = dict(zip(pending.keys(), vectors))
+            self._store(new_items)
+            found.update(new_items)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        (key,), found, pending = self._partition("query", [text])
+        if pending:
+            vector = self.embeddings.embed_query(text)
+            self._store({key: vector})
+            return vector
+        return found[key]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        (key,), found, pending = self._partition("query", [text])
+        if pending:
+            vector = await self.embeddings.aembed_query(text)
+            self._store({key: vector})
+            return vector
+        return found[key]
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters; hits include disk_hits."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'memory_entries': len(self._lru),
+            }
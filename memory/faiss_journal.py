@@ -0,0 +1,403 @@
+import glob
+import json
+import logging
+import os
+import shutil
+import struct
+import threading
+import zlib
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from memory.index_factory import (
+    IndexSpec,
+    OverlayIndex,
+    maybe_migrate,
+    merged_index,
+    read_index_mmap,
+    reconstruct_range,
+)
+from memory.lexical_index import LEXICAL_FILE, LexicalIndex, write_lexical_snapshot
+from memory.sqlite_docstore import (
+    DOCSTORE_FILE,
+    SQLiteDocstore,
+    SQLiteIndexMap,
+    snapshot_state,
+    write_snapshot,
+)
+
+
+# crc32 of the payload, length of the JSON metadata, length of the vector bytes
+RECORD_HEADER = struct.Struct("<III")
+
+MANIFEST_FILE = "MANIFEST.json"
+SNAPSHOT_DIR = "snapshots"
+
+
+def _fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class FaissJournal:
+    """
+    Durable, incremental persistence for a ThreadSafeFAISS store.
+
+    Every add/delete is appended to journal-<n>.log and fsynced once per
+    batch. A background thread periodically compacts: it rotates the log,
+    captures the changes since the last snapshot under the store lock,
+    writes index.faiss, docstore.sqlite3 and lexical.sqlite3 (the BM25
+    index) to a temp dir that is renamed into snapshots/<n>, then
+    atomically replaces MANIFEST.json.
+
+    Snapshots are opened memory-mapped (index) and lazily by id (SQLite
+    docstore) or term (lexical index), so startup cost does not grow with the store; the store is
+    re-pointed at every new snapshot, with later appends kept in memory.
+    Startup replays the logs written after the manifest's snapshot.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        snapshot_interval: float = 300.0,
+        max_log_bytes: int = 64 * 1024 * 1024,
+        index_spec: Optional[IndexSpec] = None,
+        migration_threshold: int = 50000
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        self.max_log_bytes = max_log_bytes
+        self.index_spec = index_spec
+        self.migration_threshold = migration_threshold
+        self.store = None
+
+        self._log = None
+        self._log_number = 0
+        self._log_bytes = 0
+        self._dirty = False
+        self._io_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- log ------------------------------------------------------------
+
+    def _log_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"journal-{number:06d}.log")
+
+    def _log_numbers(self) -> List[int]:
+        numbers = []
+        for path in glob.glob(os.path.join(self.directory, "journal-*.log")):
+            try:
+                numbers.append(int(os.path.basename(path)[8:-4]))
+            except ValueError:
+                continue
+        return sorted(numbers)
+
+    def _open_log(self, number: int) -> None:
+        self._log_number = number
+        self._log = open(self._log_path(number), "ab")
+        self._log_bytes = self._log.tell()
+
+    @staticmethod
+    def _encode(meta: Dict[str, Any], vector: Optional[List[float]] = None) -> bytes:
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        vector_bytes = b"" if vector is None else np.asarray(vector, dtype=np.float32).tobytes()
+        payload = meta_bytes + vector_bytes
+        return RECORD_HEADER.pack(zlib.crc32(payload), len(meta_bytes), len(vector_bytes)) + payload
+
+    def _append(self, records: bytes) -> None:
+        if self._log is None:
+            return
+        with self._io_lock:
+            self._log.write(records)
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log_bytes += len(records)
+            oversized = self._log_bytes >= self.max_log_bytes
+        if oversized:
+            self._wake.set()
+
+    def log_add(self, ids, texts, vectors, metadatas) -> None:
+        """Append one batch of added vectors; fsynced once for the whole batch."""
+        metadatas = metadatas or [{} for _ in ids]
+        self._append(b"".join(
+            self._encode({"op": "add", "id": id_, "text": text, "metadata": metadata}, vector)
+            for id_, text, vector, metadata in zip(ids, texts, vectors, metadatas)
+        ))
+
+    def log_delete(self, ids) -> None:
+        self._append(self._encode({"op": "delete", "ids": list(ids)}))
+
+    def log_compaction(self) -> None:
+        """The index was rebuilt in place; nothing to replay, but the next snapshot should keep it."""
+        self._dirty = True
+        self._wake.set()
+
+    def _read_log(self, path: str):
+        """Yield (meta, vector) records, truncating a torn or corrupt tail."""
+        valid_bytes = 0
+        with open(path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            crc, meta_len, vector_len = RECORD_HEADER.unpack_from(data, offset)
+            start = offset + RECORD_HEADER.size
+            end = start + meta_len + vector_len
+            if end > len(data) or zlib.crc32(data[start:end]) != crc:
+                break
+            meta = json.loads(data[start:start + meta_len].decode("utf-8"))
+            vector = np.frombuffer(data[start + meta_len:end], dtype=np.float32) if vector_len else None
+            yield meta, vector
+            offset = valid_bytes = end
+        if valid_bytes < len(data):
+            self.logger.warning(f"Truncating {len(data) - valid_bytes} trailing bytes of {path}")
+            with open(path, "r+b") as f:
+                f.truncate(valid_bytes)
+                os.fsync(f.fileno())
+
+    def _replay(self, store, path: str) -> int:
+        applied = 0
+        pending: List[Any] = []
+
+        def apply_adds():
+            if pending:
+                store.add_embeddings(
+                    [(meta["text"], vector.tolist()) for meta, vector in pending],
+                    metadatas=[meta.get("metadata") or {} for meta, _ in pending],
+                    ids=[meta["id"] for meta, _ in pending]
+                )
+                pending.clear()
+
+        def stored(id_):
+            return not isinstance(store.docstore.search(id_), str)
+
+        for meta, vector in self._read_log(path):
+            if meta.get("op") == "add":
+                if not stored(meta["id"]):
+                    pending.append((meta, vector))
+            elif meta.get("op") == "delete":
+                apply_adds()
+                ids = [i for i in meta["ids"] if stored(i)]
+                if ids:
+                    store.delete(ids)
+            applied += 1
+        apply_adds()
+        return applied
+
+    # ---- load / attach --------------------------------------------------
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _is_legacy(path: str) -> bool:
+        return not os.path.exists(os.path.join(path, DOCSTORE_FILE))
+
+    def _open_snapshot(self, store_cls, embeddings, path: str):
+        """Map a snapshot's index and open its docstore without reading either."""
+        db_path = os.path.join(path, DOCSTORE_FILE)
+        store = store_cls(
+            embeddings,
+            OverlayIndex(read_index_mmap(os.path.join(path, "index.faiss"))),
+            SQLiteDocstore(db_path),
+            SQLiteIndexMap(db_path)
+        )
+        # Snapshots from before the lexical index get it built by the next snapshot
+        if os.path.exists(os.path.join(path, LEXICAL_FILE)):
+            store.lexical_index = LexicalIndex(os.path.join(path, LEXICAL_FILE))
+        return store
+
+    def load(self, store_cls, embeddings):
+        """
+        Open the store from the latest snapshot plus the log tail, creating
+        a new store if the directory is empty. Returns the attached store.
+        Pickled (index.pkl) stores from older versions are read once and
+        rewritten as a snapshot.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = self._read_manifest()
+        first_log = 0
+        legacy = False
+        if manifest:
+            path = os.path.join(self.directory, manifest["snapshot"])
+            legacy = self._is_legacy(path)
+            if legacy:
+                store = store_cls.load_local(path, embeddings, allow_dangerous_deserialization=True)
+            else:
+                store = self._open_snapshot(store_cls, embeddings, path)
+            first_log = manifest["journal"]
+        elif os.path.exists(os.path.join(self.directory, "index.faiss")):
+            store = store_cls.load_local(self.directory, embeddings, allow_dangerous_deserialization=True)
+        else:
+            store = store_cls.from_texts(["initial dummy text"], embeddings)
+
+        replayed = 0
+        numbers = [n for n in self._log_numbers() if n >= first_log]
+        for number in numbers:
+            replayed += self._replay(store, self._log_path(number))
+        if replayed:
+            self.logger.info(f"Replayed {replayed} journal records into the vectorstore")
+
+        self._open_log(numbers[-1] if numbers else first_log)
+        self.attach(store)
+        if self.index_spec is not None:
+            self.index_spec.configure(store.index)
+        if manifest is None or legacy or maybe_migrate(store, self.index_spec, self.migration_threshold):
+            self.snapshot()
+        return store
+
+    def attach(self, store) -> None:
+        """Journal every subsequent add/delete made on this store."""
+        if self.store is not None and self.store is not store:
+            self.store.journal = None
+        self.store = store
+        store.journal = self
+
+    # ---- snapshots ------------------------------------------------------
+
+    def snapshot(self) -> None:
+        """Write a compacted snapshot and drop the logs it covers."""
+        with self._snapshot_lock:
+            store = self.store
+            maybe_migrate(store, self.index_spec, self.migration_threshold)
+            with store._lock:
+                with self._io_lock:
+                    self._log.close()
+                    self._open_log(self._log_number + 1)
+                    self._dirty = False
+                    generation = self._log_number
+                ntotal = store.index.ntotal
+                delete_count = store.delete_count
+                if isinstance(store.index, OverlayIndex):
+                    # The mapped base is immutable, so only the delta is copied
+                    base, delta = store.index.base, reconstruct_range(store.index.delta, 0, store.index.delta.ntotal)
+                    index_bytes = None
+                else:
+                    index_bytes = faiss.serialize_index(store.index)
+                state = snapshot_state(store.docstore, store.index_to_docstore_id)
+                lexical_state = store.lexical_index.changes()
+
+            snapshots = os.path.join(self.directory, SNAPSHOT_DIR)
+            os.makedirs(snapshots, exist_ok=True)
+            name = f"{generation:06d}"
+            tmp_dir = os.path.join(snapshots, f".{name}.tmp")
+            final_dir = os.path.join(snapshots, name)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+
+            index_path = os.path.join(tmp_dir, "index.faiss")
+            if index_bytes is None:
+                faiss.write_index(merged_index(base, delta), index_path)
+            else:
+                with open(index_path, "wb") as f:
+                    f.write(index_bytes.tobytes())
+                del index_bytes
+            with open(index_path, "rb+") as f:
+                os.fsync(f.fileno())
+            write_snapshot(os.path.join(tmp_dir, DOCSTORE_FILE), state)
+            write_lexical_snapshot(os.path.join(tmp_dir, LEXICAL_FILE), lexical_state)
+            _fsync_dir(tmp_dir)
+            shutil.rmtree(final_dir, ignore_errors=True)
+            os.rename(tmp_dir, final_dir)
+            _fsync_dir(snapshots)
+
+            manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+            with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"snapshot": os.path.join(SNAPSHOT_DIR, name), "journal": generation}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(manifest_path + ".tmp", manifest_path)
+            _fsync_dir(self.directory)
+            self._remap(store, final_dir, ntotal, delete_count)
+
+            for number in self._log_numbers():
+                if number < generation:
+                    os.remove(self._log_path(number))
+            # A store that could not be remapped still reads its snapshot; it goes once a later remap succeeds
+            keep = {name} | self._mapped_snapshots(store, self.store)
+            for entry in os.listdir(snapshots):
+                if entry not in keep:
+                    shutil.rmtree(os.path.join(snapshots, entry), ignore_errors=True)
+            self.logger.info(f"Wrote vectorstore snapshot {name} ({ntotal} vectors)")
+
+    @staticmethod
+    def _mapped_snapshots(*stores) -> set:
+        """Names of the snapshot dirs the stores' docstores are opened on."""
+        with_path = [getattr(store.docstore, "path", None) for store in stores if store is not None]
+        return {os.path.basename(os.path.dirname(path)) for path in with_path if path}
+
+    def _remap(self, store, path: str, ntotal: int, delete_count: int) -> None:
+        """
+        Point the store at the snapshot just written. Vectors appended while
+        it was written stay in memory; if a delete renumbered positions in
+        the meantime the store is left as is until the next snapshot.
+        """
+        with store._lock:
+            if store.delete_count != delete_count or self.store is not store:
+                return
+            db_path = os.path.join(path, DOCSTORE_FILE)
+            index = OverlayIndex(read_index_mmap(os.path.join(path, "index.faiss")))
+            tail_ids = [store.index_to_docstore_id[i] for i in range(ntotal, store.index.ntotal)]
+            if tail_ids:
+                index.add(reconstruct_range(store.index, ntotal, store.index.ntotal))
+            docstore = SQLiteDocstore(db_path)
+            docstore.add({id_: store.docstore.search(id_) for id_ in tail_ids})
+            index_to_docstore_id = SQLiteIndexMap(db_path)
+            index_to_docstore_id.update({ntotal + i: id_ for i, id_ in enumerate(tail_ids)})
+            lexical_index = LexicalIndex(os.path.join(path, LEXICAL_FILE))
+            lexical_index.add(tail_ids, [docstore.search(id_).page_content for id_ in tail_ids])
+            if self.index_spec is not None:
+                self.index_spec.configure(index)
+            store.index = index
+            store.docstore = docstore
+            store.index_to_docstore_id = index_to_docstore_id
+            store.lexical_index = lexical_index
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.snapshot_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            if self._log_bytes > 0 or self._dirty:
+                try:
+                    self.snapshot()
+                except Exception as e:
+                    self.logger.error(f"Vectorstore snapshot failed: {e}")
+
+    def start(self) -> None:
+        """Start background compaction."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="faiss-snapshot", daemon=True)
+            self._thread.start()
+
+    def close(self, final_snapshot: bool = True) -> None:
+        """Stop background compaction, optionally compacting the log one last time."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if final_snapshot and (self._log_bytes > 0 or self._dirty) and self.store is not None:
+            self.snapshot()
+        with self._io_lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
@@ -1,7 +1,30 @@
+import logging
+import operator
 import os
+import threading
+import faiss
+import numpy as np
 from dotenv import load_dotenv
+from langchain.docstore.document import Document
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+from memory.embedder import CachedEmbeddings
+from memory.faiss_journal import FaissJournal
+from memory.lexical_index import LexicalIndex
+from memory.index_factory import (
+    IndexSpec,
+    OverlayIndex,
+    index_kind,
+    reconstruct_all,
+    reconstruct_range,
+    rebuild_index,
+    search_selected,
+)
+from memory.metadata_index import MetadataIndex, Prefilter
+from memory.retention import RetentionManager, RetentionPolicy, RetentionRule
+import config
 
 # Load environment variables
 load_dotenv()
@@ -9,9 +32,307 @@ load_dotenv()
 # Path to save/load FAISS index files
 FAISS_INDEX_DIR = os.path.join("data", "faiss_index")
 
+# Persistent embedding cache shared by retrieval, add_texts and load_history
+EMBEDDING_CACHE_PATH = os.path.join("data", "embedding_cache.sqlite3")
+EMBEDDING_CACHE_SIZE = 10000
+
+# Background snapshot cadence and the journal size that forces an early one
+FAISS_SNAPSHOT_INTERVAL = 300.0
+FAISS_MAX_LOG_BYTES = 64 * 1024 * 1024
+
+# Docstore entry that deleted positions of an approximate index point at
+TOMBSTONE_ID = "__tombstone__"
+TOMBSTONE_KEY = "__tombstone__"
+
+
+def index_spec_from_config() -> IndexSpec:
+    """The approximate index the store migrates to, as set in config.py."""
+    return IndexSpec(
+        config.FAISS_INDEX_TYPE,
+        nlist=config.FAISS_IVF_NLIST,
+        nprobe=config.FAISS_IVF_NPROBE,
+        hnsw_m=config.FAISS_HNSW_M,
+        ef_search=config.FAISS_HNSW_EF_SEARCH,
+        pq_m=config.FAISS_PQ_M
+    )
+
+
+def retention_policy_from_config() -> RetentionPolicy:
+    """Per-agent eviction rules for conversation turns, as set in config.py."""
+    def rule(days, max_turns):
+        return RetentionRule(max_age=days * 86400 if days else None, max_count=max_turns or None)
+
+    default = rule(config.MEMORY_RETENTION_DAYS, config.MEMORY_RETENTION_MAX_TURNS)
+    per_agent = {
+        agent: rule(
+            overrides.get("days", config.MEMORY_RETENTION_DAYS),
+            overrides.get("max_turns", config.MEMORY_RETENTION_MAX_TURNS)
+        )
+        for agent, overrides in config.MEMORY_RETENTION_AGENTS.items()
+    }
+    return RetentionPolicy(default, per_agent)
+
+
+class ThreadSafeFAISS(FAISS):
+    """
+    FAISS vectorstore that can be shared between threads.
+
+    Embedding calls happen outside the lock; only index/docstore reads and
+    writes are serialized, so slow embedding RPCs never block searches.
+    When a FaissJournal is attached, every add and delete is made durable.
+
+    Deletes on a flat index remove the vectors at once (a memory-mapped
+    one is copied into memory first). Approximate indexes (HNSW, IVF, PQ)
+    cannot renumber ids in place, so deleted positions are tombstoned:
+    the documents leave the docstore, the positions point at a shared
+    sentinel that searches skip, and compact() later rebuilds the index
+    without them.
+
+    Filters on 'agent' and 'timestamp' are answered from a MetadataIndex
+    (built on the first such search, then kept up to date), so only the
+    matching vectors are searched instead of fetch_k candidates being
+    fetched and mostly discarded.
+
+    A LexicalIndex (BM25) covers the same documents for exact-token
+    lookups; it is updated under the same lock as the vectors, before the
+    batch is journaled, and written into each snapshot next to index.faiss.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.RLock()
+        self.journal = None
+        self.retention = None
+        self.delete_count = 0
+        self.tombstones = set()
+        self._metadata_index = None
+        self._lexical_index = None
+        # Tombstones survive snapshots as positions mapped to the sentinel
+        if isinstance(self.docstore.search(TOMBSTONE_ID), Document):
+            self.tombstones = {
+                position for position, id_ in self.index_to_docstore_id.items() if id_ == TOMBSTONE_ID
+            }
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        embeddings = self._embed_documents(texts)
+        return self.add_embeddings(zip(texts, embeddings), metadatas=metadatas, ids=ids, **kwargs)
+
+    async def aadd_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        embeddings = await self._aembed_documents(texts)
+        return self.add_embeddings(zip(texts, embeddings), metadatas=metadatas, ids=ids, **kwargs)
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs):
+        text_embeddings = list(text_embeddings)
+        with self._lock:
+            ids = super().add_embeddings(text_embeddings, metadatas=metadatas, ids=ids, **kwargs)
+            if self._metadata_index is not None:
+                self._metadata_index.add(list(metadatas) if metadatas else [{} for _ in ids])
+            if self._lexical_index is not None:
+                self._lexical_index.add(ids, [text for text, _ in text_embeddings])
+            if self.journal is not None:
+                texts, vectors = zip(*text_embeddings)
+                self.journal.log_add(ids, texts, vectors, metadatas)
+            return ids
+
+    def _skip_tombstones(self, k, filter, fetch_k):
+        """Widen the search past tombstoned positions and filter them out."""
+        if not self.tombstones:
+            return filter, fetch_k
+        matches = self._create_filter_func(filter) if filter is not None else None
+
+        def live(metadata):
+            return not metadata.get(TOMBSTONE_KEY) and (matches is None or matches(metadata))
+
+        return live, max(fetch_k, k) + len(self.tombstones)
+
+    @property
+    def metadata_index(self) -> MetadataIndex:
+        with self._lock:
+            if self._metadata_index is None:
+                self._metadata_index = MetadataIndex.build(
+                    self.docstore, self.index_to_docstore_id, self.index.ntotal, skip=self.tombstones
+                )
+            return self._metadata_index
+
+    @property
+    def lexical_index(self) -> LexicalIndex:
+        with self._lock:
+            if self._lexical_index is None:
+                ids = [id_ for id_ in set(self.index_to_docstore_id.values()) if id_ != TOMBSTONE_ID]
+                self._lexical_index = LexicalIndex.build(self.docstore, ids)
+            return self._lexical_index
+
+    @lexical_index.setter
+    def lexical_index(self, index: LexicalIndex) -> None:
+        with self._lock:
+            self._lexical_index = index
+
+    def lexical_search(self, query, k=4, filter=None, extra=None):
+        """
+        BM25 search over the stored texts; no embedding is computed. Returns
+        (document, score) pairs, higher is better. extra documents that are
+        not stored yet (a write buffer) are ranked alongside.
+        """
+        extra = list(extra or ())
+        pending = {doc.id: doc for doc in extra}
+        matches = self._create_filter_func(filter) if filter is not None else None
+        docs = []
+        with self._lock:
+            for id_, score in self.lexical_index.search(query, extra=extra):
+                doc = pending[id_] if id_ in pending else self.docstore.search(id_)
+                if isinstance(doc, Document) and (matches is None or matches(doc.metadata)):
+                    docs.append((doc, score))
+                    if len(docs) == k:
+                        break
+        return docs
+
+    def _prefiltered_search(self, embedding, k, filter, prefilter, fetch_k, **kwargs):
+        positions = self.metadata_index.select(prefilter)
+        if not len(positions):
+            return []
+        vector = np.array([embedding], dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(vector)
+        fetch = max(fetch_k, k) if prefilter.residual else k
+        scores, found = search_selected(self.index, vector, min(fetch, len(positions)), positions)
+        matches = self._create_filter_func(filter)
+        docs = []
+        for score, position in zip(scores[0], found[0]):
+            if position < 0:
+                continue
+            doc = self.docstore.search(self.index_to_docstore_id[position])
+            if isinstance(doc, Document) and matches(doc.metadata):
+                docs.append((doc, score))
+        score_threshold = kwargs.get("score_threshold")
+        if score_threshold is not None:
+            higher_is_better = self.distance_strategy in (
+                DistanceStrategy.MAX_INNER_PRODUCT, DistanceStrategy.JACCARD
+            )
+            cmp = operator.ge if higher_is_better else operator.le
+            docs = [(doc, score) for doc, score in docs if cmp(score, score_threshold)]
+        return docs[:k]
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, filter=None, fetch_k=20, **kwargs):
+        with self._lock:
+            prefilter = Prefilter.parse(filter)
+            if prefilter is not None:
+                return self._prefiltered_search(embedding, k, filter, prefilter, fetch_k, **kwargs)
+            filter, fetch_k = self._skip_tombstones(k, filter, fetch_k)
+            return super().similarity_search_with_score_by_vector(
+                embedding, k=k, filter=filter, fetch_k=fetch_k, **kwargs
+            )
+
+    def max_marginal_relevance_search_with_score_by_vector(self, embedding, *, k=4, fetch_k=20, filter=None, **kwargs):
+        with self._lock:
+            filter, fetch_k = self._skip_tombstones(k, filter, fetch_k)
+            return super().max_marginal_relevance_search_with_score_by_vector(
+                embedding, k=k, fetch_k=fetch_k, filter=filter, **kwargs
+            )
+
+    def delete(self, ids=None, **kwargs):
+        with self._lock:
+            if ids and index_kind(self.index) != "flat":
+                result = self._tombstone(ids)
+            else:
+                if ids and isinstance(self.index, OverlayIndex):
+                    self.index = self.index.materialize()
+                doomed = set(ids or ())
+                removed = [p for p, id_ in self.index_to_docstore_id.items() if id_ in doomed]
+                result = super().delete(ids=ids, **kwargs)
+                if self._metadata_index is not None:
+                    self._metadata_index.remove(removed)
+            if self._lexical_index is not None and ids:
+                self._lexical_index.remove(ids)
+            self.delete_count += 1
+            if self.journal is not None and ids:
+                self.journal.log_delete(ids)
+            return result
+
+    def _tombstone(self, ids):
+        doomed = set(ids)
+        positions = [position for position, id_ in self.index_to_docstore_id.items() if id_ in doomed]
+        missing_ids = doomed.difference(self.index_to_docstore_id[position] for position in positions)
+        if missing_ids:
+            raise ValueError(
+                f"Some specified ids do not exist in the current store. Ids not found: {missing_ids}"
+            )
+        if not self.tombstones:
+            self.docstore.add({TOMBSTONE_ID: Document(
+                id=TOMBSTONE_ID, page_content="", metadata={TOMBSTONE_KEY: True}
+            )})
+        self.docstore.delete(list(doomed))
+        for position in positions:
+            self.index_to_docstore_id[position] = TOMBSTONE_ID
+        self.tombstones.update(positions)
+        if self._metadata_index is not None:
+            self._metadata_index.discard(positions)
+        return True
+
+    def compact(self, spec: IndexSpec = None) -> int:
+        """
+        Rebuild the index without tombstoned positions; returns how many
+        were dropped. Vectors are copied under the lock and the new index
+        is built outside it, like a migration; the rebuilt index is retrained
+        from spec when it matches, otherwise it keeps the current training.
+        If a delete lands during the build, nothing changes and the next
+        compaction retries.
+        """
+        with self._lock:
+            if not self.tombstones:
+                return 0
+            generation = self.delete_count
+            ntotal = self.index.ntotal
+            metric = self.index.metric_type
+            keep = [position for position in range(ntotal) if position not in self.tombstones]
+            vectors = reconstruct_all(self.index)[np.asarray(keep, dtype=np.int64)]
+            retrain = spec is not None and spec.kind == index_kind(self.index) and spec.can_train(len(keep))
+            template = None if retrain else rebuild_index(self.index, vectors[:0])
+
+        index = spec.build(vectors, metric) if retrain else rebuild_index(template, vectors)
+
+        with self._lock:
+            if self.delete_count != generation:
+                return 0
+            if self.index.ntotal > ntotal:
+                index.add(reconstruct_range(self.index, ntotal, self.index.ntotal))
+            positions = keep + list(range(ntotal, self.index.ntotal))
+            self.index_to_docstore_id = {
+                i: self.index_to_docstore_id[position] for i, position in enumerate(positions)
+            }
+            self.index = index
+            self.docstore.delete([TOMBSTONE_ID])
+            if self._metadata_index is not None:
+                self._metadata_index.remove(self.tombstones)
+            dropped = len(self.tombstones)
+            self.tombstones = set()
+            # Positions were renumbered, just as a flat delete does
+            self.delete_count += 1
+            if self.journal is not None:
+                self.journal.log_compaction()
+        logging.getLogger(__name__).info(f"Compacted vectorstore: dropped {dropped} deleted vectors")
+        return dropped
+
+    def merge_from(self, target):
+        with self._lock:
+            self._metadata_index = None
+            self._lexical_index = None
+            return super().merge_from(target)
+
+    def get_by_ids(self, ids):
+        with self._lock:
+            return super().get_by_ids(ids)
+
+    def save_local(self, folder_path, index_name="index"):
+        with self._lock:
+            return super().save_local(folder_path, index_name=index_name)
+
+
 def setup_vectorstore():
     """
     Initialize or load FAISS vector store and embeddings with Google embeddings.
+    Embeddings are wrapped in CachedEmbeddings so repeated texts are not re-embedded.
     Returns:
         embeddings: LangChain embeddings instance
         vectorstore: LangChain FAISS vectorstore instance
@@ -19,13 +340,32 @@ def setup_vectorstore():
     # Make sure GOOGLE_API_KEY is available in env
     assert os.getenv("GOOGLE_API_KEY"), "GOOGLE_API_KEY not found in environment!"
 
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+    embeddings = CachedEmbeddings(
+        GoogleGenerativeAIEmbeddings(model="models/embedding-001"),
+        cache_path=EMBEDDING_CACHE_PATH,
+        max_entries=EMBEDDING_CACHE_SIZE
+    )
+
+    # Latest snapshot plus the journal tail; later writes are journaled.
+    # The flat index is swapped for the configured one past the threshold.
+    journal = FaissJournal(
+        FAISS_INDEX_DIR,
+        snapshot_interval=FAISS_SNAPSHOT_INTERVAL,
+        max_log_bytes=FAISS_MAX_LOG_BYTES,
+        index_spec=index_spec_from_config(),
+        migration_threshold=config.FAISS_MIGRATION_THRESHOLD
+    )
+    vectorstore = journal.load(ThreadSafeFAISS, embeddings)
+    journal.start()
 
-    if os.path.exists(FAISS_INDEX_DIR) and os.listdir(FAISS_INDEX_DIR):
-        vectorstore = FAISS.load_local(FAISS_INDEX_DIR, embeddings, allow_dangerous_deserialization=True)
-    else:
-        vectorstore = FAISS.from_texts(["initial dummy text"], embeddings)
-        os.makedirs(FAISS_INDEX_DIR, exist_ok=True)
-        vectorstore.save_local(FAISS_INDEX_DIR)
+    # Old conversation turns are evicted and tombstones compacted periodically
+    vectorstore.retention = RetentionManager(
+        vectorstore,
+        retention_policy_from_config(),
+        interval=config.MEMORY_RETENTION_INTERVAL,
+        compaction_threshold=config.FAISS_COMPACTION_TOMBSTONES,
+        index_spec=journal.index_spec
+    )
+    vectorstore.retention.start()
 
     return embeddings, vectorstore
@@ -0,0 +1,73 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain.docstore.document import Document
+
+import config
+
+
+# Rank offset of reciprocal rank fusion; 60 is the value from the original paper
+RRF_K = 60
+
+# Tokens embeddings handle poorly: email addresses, URLs, anything with digits, identifiers, @handles and #tags
+EXACT_TOKEN = re.compile(
+    r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"
+    r"|https?://\S+"
+    r"|[@#]\w+"
+    r"|\S*\d\S*"
+    r"|\w+[_.]\w[\w.]*"
+)
+
+
+def is_lexical_query(query: str) -> bool:
+    """
+    True for queries better answered by exact token matches than by
+    meaning: a single quoted phrase, or nothing but exact tokens such as
+    'alice@example.com' or 'INV-2041'.
+    """
+    query = query.strip()
+    if len(query) > 2 and query[0] == query[-1] and query[0] in "\"'":
+        return True
+    tokens = query.split()
+    return bool(tokens) and all(EXACT_TOKEN.fullmatch(token.strip(",;:!?()")) for token in tokens)
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[List[Document]], k: int, weights: Optional[Sequence[float]] = None
+) -> List[Document]:
+    """Merge ranked lists by summed weight / (RRF_K + rank), de-duplicated by document id."""
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[Any, float] = {}
+    docs: Dict[Any, Document] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc in enumerate(ranking):
+            key = doc.id or doc.page_content
+            scores[key] = scores.get(key, 0.0) + weight / (RRF_K + rank + 1)
+            docs.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ranked[:k]]
+
+
+def fuse(vector_docs: List[Document], lexical_docs: List[Document], k: int) -> List[Document]:
+    """Vector and BM25 results combined with the weights set in config.py."""
+    if not lexical_docs:
+        return vector_docs[:k]
+    if not vector_docs:
+        return lexical_docs[:k]
+    return reciprocal_rank_fusion(
+        [vector_docs, lexical_docs], k, weights=[1.0, config.MEMORY_LEXICAL_WEIGHT]
+    )
+
+
+def hybrid_search(vectorstore, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+    """
+    BM25 plus similarity search over a vectorstore. Lexical queries that
+    match something are answered from the inverted index alone, without
+    embedding the query; stores without one get a plain similarity search.
+    """
+    if not config.MEMORY_HYBRID_SEARCH or not hasattr(vectorstore, "lexical_search"):
+        return vectorstore.similarity_search(query, k=k, filter=filter)
+    lexical_docs = [doc for doc, _ in vectorstore.lexical_search(query, k=k, filter=filter)]
+    if lexical_docs and is_lexical_query(query):
+        return lexical_docs
+    return fuse(vectorstore.similarity_search(query, k=k, filter=filter), lexical_docs, k)
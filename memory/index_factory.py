@@ -0,0 +1,360 @@
+import logging
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+
+# k-means warns below ~39 points per centroid and gains little above ~64
+MIN_POINTS_PER_CENTROID = 39
+MAX_POINTS_PER_CENTROID = 64
+
+# Selections up to this size are searched exactly over their own vectors
+EXACT_SEARCH_LIMIT = 20000
+# Widest HNSW beam used to make up for neighbours an IDSelector rejects
+MAX_FILTERED_EF_SEARCH = 1024
+
+
+def index_kind(index) -> str:
+    """Classify a FAISS index as flat, hnsw, ivf, ivfpq, hnswpq or pq."""
+    if isinstance(index, OverlayIndex):
+        index = index.base
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnswpq" if isinstance(index, faiss.IndexHNSWPQ) else "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivfpq" if isinstance(index, faiss.IndexIVFPQ) else "ivf"
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    if isinstance(index, faiss.IndexFlat):
+        return "flat"
+    return type(index).__name__
+
+
+def reconstruct_all(index) -> np.ndarray:
+    """
+    Return every stored vector in id order. IVF indexes get a direct map on
+    first use; PQ-compressed indexes return their (lossy) decoded vectors.
+    """
+    return reconstruct_range(index, 0, index.ntotal)
+
+
+def reconstruct_range(index, start: int, stop: int) -> np.ndarray:
+    """Stored vectors with ids start..stop-1."""
+    if stop <= start:
+        return np.empty((0, index.d), dtype=np.float32)
+    if isinstance(index, OverlayIndex):
+        return index.reconstruct_n(start, stop - start)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+    return index.reconstruct_n(start, stop - start)
+
+
+def reconstruct_positions(index, positions: np.ndarray) -> np.ndarray:
+    """Stored vectors at the given sorted ids."""
+    if len(positions) == 0:
+        return np.empty((0, index.d), dtype=np.float32)
+    if isinstance(index, OverlayIndex):
+        split = int(np.searchsorted(positions, index.base.ntotal))
+        return np.vstack([
+            reconstruct_positions(index.base, positions[:split]),
+            reconstruct_positions(index.delta, positions[split:] - index.base.ntotal),
+        ])
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+    return index.reconstruct_batch(np.ascontiguousarray(positions, dtype=np.int64))
+
+
+def merge_results(metric: int, k: int, parts):
+    """Combine (distances, ids) pairs from several searches into one top-k."""
+    distances = np.hstack([d for d, _ in parts])
+    ids = np.hstack([i for _, i in parts])
+    # Missing results (-1) must sort last whichever way the metric goes
+    if metric == faiss.METRIC_INNER_PRODUCT:
+        keys = np.where(ids >= 0, -distances, np.inf)
+    else:
+        keys = np.where(ids >= 0, distances, np.inf)
+    order = np.argsort(keys, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(distances, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+
+def _exact_search(index, vectors: np.ndarray, k: int, positions: np.ndarray):
+    flat = faiss.IndexFlat(index.d, index.metric_type)
+    flat.add(reconstruct_positions(index, positions))
+    distances, found = flat.search(vectors, k)
+    return distances, np.where(found >= 0, positions[np.maximum(found, 0)], -1)
+
+
+def search_selected(index, vectors: np.ndarray, k: int, positions: np.ndarray):
+    """
+    Search only the vectors at positions (sorted ids), like index.search.
+
+    Small selections are scored exactly over their own vectors. Larger
+    ones go through the index with an IDSelectorBitmap, so non-matching
+    vectors are skipped inside FAISS rather than fetched and discarded;
+    HNSW widens its beam in proportion to how much the selector rejects.
+    IndexPQ has no selector support and is always searched exactly.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if isinstance(index, OverlayIndex):
+        split = int(np.searchsorted(positions, index.base.ntotal))
+        parts = [search_selected(index.base, vectors, k, positions[:split])]
+        if split < len(positions):
+            distances, found = _exact_search(index.delta, vectors, k, positions[split:] - index.base.ntotal)
+            parts.append((distances, np.where(found >= 0, found + index.base.ntotal, -1)))
+        return merge_results(index.metric_type, k, parts)
+
+    if len(positions) == 0:
+        return (np.full((len(vectors), k), np.inf, dtype=np.float32),
+                np.full((len(vectors), k), -1, dtype=np.int64))
+    downcast = faiss.downcast_index(index)
+    if len(positions) <= EXACT_SEARCH_LIMIT or isinstance(downcast, faiss.IndexPQ):
+        return _exact_search(index, vectors, k, positions)
+
+    mask = np.zeros(index.ntotal, dtype=bool)
+    mask[positions] = True
+    bitmap = np.packbits(mask, bitorder="little")
+    selector = faiss.IDSelectorBitmap(bitmap)
+    ivf = faiss.try_extract_index_ivf(index)
+    if isinstance(downcast, faiss.IndexHNSW):
+        selectivity = len(positions) / max(index.ntotal, 1)
+        ef_search = max(downcast.hnsw.efSearch, k)
+        params = faiss.SearchParametersHNSW(
+            sel=selector, efSearch=min(int(ef_search / selectivity), max(MAX_FILTERED_EF_SEARCH, ef_search))
+        )
+    elif ivf is not None:
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return index.search(vectors, k, params=params)
+
+
+def read_index_mmap(path: str):
+    """
+    Open an index file memory-mapped and read-only; pages load on first touch.
+
+    IO_FLAG_MMAP_IFC only exists in FAISS builds newer than the pinned
+    1.7.4; without it the file is read into memory with a plain
+    read_index, which OverlayIndex wraps just the same.
+    """
+    mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+    if mmap_flag is None:
+        return faiss.read_index(path)
+    return faiss.read_index(path, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+
+
+class OverlayIndex:
+    """
+    Copy-on-write view of a memory-mapped index.
+
+    The mapped base is never written (FAISS aborts on writes to a mapped
+    index); appended vectors go to a small in-memory flat delta that is
+    searched alongside it, with delta ids following the base ids. The
+    journal folds the delta into the next snapshot and re-maps that file.
+    Only the parts of faiss.Index that the LangChain FAISS store uses are
+    provided; materialize() returns an ordinary in-memory index.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.d = base.d
+        self.metric_type = base.metric_type
+        self.is_trained = True
+        self.delta = faiss.IndexFlat(base.d, base.metric_type)
+
+    @property
+    def ntotal(self) -> int:
+        return self.base.ntotal + self.delta.ntotal
+
+    def add(self, vectors: np.ndarray) -> None:
+        self.delta.add(np.ascontiguousarray(vectors, dtype=np.float32))
+
+    def search(self, vectors: np.ndarray, k: int):
+        distances, ids = self.base.search(vectors, k)
+        if self.delta.ntotal == 0:
+            return distances, ids
+        delta_distances, delta_ids = self.delta.search(vectors, k)
+        delta_ids = np.where(delta_ids >= 0, delta_ids + self.base.ntotal, -1)
+        return merge_results(self.metric_type, k, [(distances, ids), (delta_distances, delta_ids)])
+
+    def reconstruct(self, i: int) -> np.ndarray:
+        return self.reconstruct_n(i, 1)[0]
+
+    def reconstruct_n(self, start: int, n: int) -> np.ndarray:
+        base_total = self.base.ntotal
+        parts = []
+        if start < base_total:
+            parts.append(reconstruct_range(self.base, start, min(start + n, base_total)))
+        if start + n > base_total:
+            delta_start = max(start - base_total, 0)
+            parts.append(self.delta.reconstruct_n(delta_start, start + n - base_total - delta_start))
+        return np.vstack(parts) if parts else np.empty((0, self.d), dtype=np.float32)
+
+    def remove_ids(self, ids) -> int:
+        raise RuntimeError("OverlayIndex is read-only; materialize() it before removing vectors")
+
+    def materialize(self):
+        """In-memory copy of base plus delta."""
+        return merged_index(self.base, self.delta.reconstruct_n(0, self.delta.ntotal))
+
+
+def merged_index(base, vectors: np.ndarray):
+    """In-memory copy of base (mapped or not) with vectors appended."""
+    index = faiss.deserialize_index(faiss.serialize_index(base))
+    if len(vectors):
+        index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+    return index
+
+
+def rebuild_index(index, vectors: np.ndarray):
+    """Empty copy of a trained index (same quantizer and codebooks) holding only vectors."""
+    if isinstance(index, OverlayIndex):
+        # A clone of a mapped index still views the mapping and cannot grow
+        index = index.materialize()
+    rebuilt = faiss.clone_index(index)
+    rebuilt.reset()
+    if len(vectors):
+        rebuilt.add(np.ascontiguousarray(vectors, dtype=np.float32))
+    return rebuilt
+
+
+class IndexSpec:
+    """
+    Which FAISS index to build once exact search gets too slow.
+
+    index_type is flat, hnsw or ivf; pq_m > 0 adds product quantization
+    (pq_m sub-quantizers of pq_bits each) to any of them. nlist = 0 picks
+    about 4 * sqrt(n) IVF lists, capped so k-means has enough training
+    points. nprobe and ef_search are search-time knobs and are re-applied
+    to loaded indexes, so they can be tuned without a rebuild.
+    """
+
+    def __init__(
+        self,
+        index_type: str = "flat",
+        nlist: int = 0,
+        nprobe: int = 16,
+        hnsw_m: int = 32,
+        ef_construction: int = 40,
+        ef_search: int = 64,
+        pq_m: int = 0,
+        pq_bits: int = 8
+    ):
+        index_type = index_type.lower()
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type {index_type!r}; expected one of {INDEX_TYPES}")
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.pq_m = pq_m
+        self.pq_bits = pq_bits
+
+    @property
+    def kind(self) -> str:
+        """The index_kind() of indexes this spec builds."""
+        if not self.pq_m:
+            return self.index_type
+        return "pq" if self.index_type == "flat" else self.index_type + "pq"
+
+    def nlist_for(self, ntotal: int) -> int:
+        if self.nlist:
+            return self.nlist
+        return max(1, min(int(4 * math.sqrt(ntotal)), ntotal // MIN_POINTS_PER_CENTROID))
+
+    def description(self, dimension: int, ntotal: int) -> str:
+        """faiss.index_factory string for a store of ntotal vectors."""
+        if self.pq_m and dimension % self.pq_m:
+            raise ValueError(f"pq_m={self.pq_m} must divide the embedding dimension {dimension}")
+        pq = f"PQ{self.pq_m}x{self.pq_bits}" if self.pq_m else ""
+        if self.index_type == "hnsw":
+            return f"HNSW{self.hnsw_m}_{pq}" if pq else f"HNSW{self.hnsw_m}"
+        if self.index_type == "ivf":
+            return f"IVF{self.nlist_for(ntotal)},{pq or 'Flat'}"
+        return pq or "Flat"
+
+    def configure(self, index) -> None:
+        """Apply the search-time parameters that fit this index."""
+        if isinstance(index, OverlayIndex):
+            index = index.base
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = self.nprobe
+        downcast = faiss.downcast_index(index)
+        if isinstance(downcast, faiss.IndexHNSW):
+            downcast.hnsw.efSearch = self.ef_search
+
+    def can_train(self, ntotal: int) -> bool:
+        """Whether ntotal vectors are enough to train this spec's quantizers."""
+        return ntotal >= max(MIN_POINTS_PER_CENTROID, 2 ** self.pq_bits if self.pq_m else 1)
+
+    def train(self, vectors: np.ndarray, metric: int = faiss.METRIC_L2):
+        """Create and train an empty index; training uses a sample of vectors."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        ntotal = len(vectors)
+        index = faiss.index_factory(vectors.shape[1], self.description(vectors.shape[1], ntotal), metric)
+        downcast = faiss.downcast_index(index)
+        if isinstance(downcast, faiss.IndexHNSW):
+            downcast.hnsw.efConstruction = self.ef_construction
+        if not index.is_trained:
+            sample_size = MAX_POINTS_PER_CENTROID * max(self.nlist_for(ntotal), 2 ** self.pq_bits)
+            if len(vectors) > sample_size:
+                rng = np.random.default_rng(0)
+                vectors = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+            index.train(vectors)
+        self.configure(index)
+        return index
+
+    def build(self, vectors: np.ndarray, metric: int = faiss.METRIC_L2):
+        """Create, train and fill an index with vectors (ids 0..n-1)."""
+        index = self.train(vectors, metric)
+        index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        return index
+
+
+def migrate_store(store, spec: IndexSpec) -> bool:
+    """
+    Replace a store's index with one built from spec, keeping ids and order.
+
+    Vectors are copied out under the store lock, but training and the bulk
+    add run outside it; writes that land meanwhile are appended before the
+    swap. If a delete renumbered the index in between, the new index is
+    refilled under the lock instead.
+    """
+    logger = logging.getLogger(__name__)
+    with store._lock:
+        if index_kind(store.index) == spec.kind:
+            return False
+        metric = store.index.metric_type
+        vectors = reconstruct_all(store.index)
+        ids = [store.index_to_docstore_id[i] for i in range(len(vectors))]
+
+    index = spec.build(vectors, metric)
+
+    with store._lock:
+        current = [store.index_to_docstore_id[i] for i in range(store.index.ntotal)]
+        if current[:len(ids)] == ids:
+            if len(current) > len(ids):
+                index.add(reconstruct_range(store.index, len(ids), len(current)))
+        else:
+            index = rebuild_index(index, reconstruct_all(store.index))
+        store.index = index
+    logger.info(f"Migrated vectorstore to a {spec.kind} index ({index.ntotal} vectors)")
+    return True
+
+
+def maybe_migrate(store, spec: Optional[IndexSpec], threshold: int) -> bool:
+    """Migrate a flat store to spec once it holds at least threshold vectors."""
+    if spec is None or spec.kind == "flat":
+        return False
+    with store._lock:
+        if index_kind(store.index) != "flat" or store.index.ntotal < threshold:
+            return False
+    return migrate_store(store, spec)
@@ -0,0 +1,240 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from langchain.docstore.document import Document
+
+from memory.sqlite_docstore import _open_readonly
+
+
+LEXICAL_FILE = "lexical.sqlite3"
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS documents (id TEXT PRIMARY KEY, length INTEGER NOT NULL, terms TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS postings (term TEXT PRIMARY KEY, docs TEXT NOT NULL)",
+)
+
+# BM25 term-frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+# Email addresses stay whole so they can be matched exactly; everything else splits on non-word characters
+TOKEN_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+|\w+")
+WORD_PATTERN = re.compile(r"\w+")
+
+# Common English words, plus the role labels every stored conversation turn starts with
+STOPWORDS = frozenset("""
+a about an and are as at be but by can could did do does for from had has have how i if in
+is it its me my of on or our so than that the their them then there these they this to
+us was we were what when where which who why will with would you your user assistant
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms of text; an email address yields itself and its parts."""
+    text = text.lower()
+    if "@" not in text:
+        return [token for token in WORD_PATTERN.findall(text) if token not in STOPWORDS]
+    tokens = []
+    for match in TOKEN_PATTERN.findall(text):
+        if "@" in match:
+            tokens.append(match)
+            tokens.extend(WORD_PATTERN.findall(match))
+        elif match not in STOPWORDS:
+            tokens.append(match)
+    return tokens
+
+
+def _chunks(items: List[str], size: int = 500) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over the texts of a vectorstore, keyed by docstore id.
+
+    Like SQLiteDocstore it reads a snapshot (lexical.sqlite3, written next
+    to index.faiss) lazily, fetching only the posting lists of the query's
+    terms, and keeps documents added or removed since then in memory until
+    write_lexical_snapshot() folds them into the next file. Ids, not index
+    positions, are indexed, so compaction and renumbering deletes leave it
+    untouched.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._conn = _open_readonly(path)
+        self._lock = threading.Lock()
+        self._docs: Dict[str, Tuple[Dict[str, int], int]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._removed: set = set()
+        self.count = 0
+        self.total_length = 0
+        if self._conn is not None:
+            count, total = self._conn.execute("SELECT COUNT(*), SUM(length) FROM documents").fetchone()
+            self.count, self.total_length = count, total or 0
+
+    @classmethod
+    def build(cls, docstore, ids: Iterable[str]) -> "LexicalIndex":
+        """Index the documents of an existing store (one that has no snapshot to read)."""
+        index = cls()
+        docs = [(id_, docstore.search(id_)) for id_ in ids]
+        docs = [(id_, doc) for id_, doc in docs if isinstance(doc, Document)]
+        index.add([id_ for id_, _ in docs], [doc.page_content for _, doc in docs])
+        return index
+
+    def add(self, ids: List[str], texts: List[str]) -> None:
+        for id_, text in zip(ids, texts):
+            if id_ in self._docs:
+                continue
+            counts = dict(Counter(tokenize(text)))
+            length = sum(counts.values())
+            self._docs[id_] = (counts, length)
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[id_] = tf
+            self.count += 1
+            self.total_length += length
+
+    def remove(self, ids: Iterable[str]) -> None:
+        base_ids = []
+        for id_ in ids:
+            entry = self._docs.pop(id_, None)
+            if entry is None:
+                base_ids.append(id_)
+                continue
+            counts, length = entry
+            for term in counts:
+                postings = self._postings[term]
+                del postings[id_]
+                if not postings:
+                    del self._postings[term]
+            self.count -= 1
+            self.total_length -= length
+
+        base_ids = [id_ for id_ in base_ids if id_ not in self._removed]
+        if self._conn is None or not base_ids:
+            return
+        with self._lock:
+            for chunk in _chunks(base_ids):
+                rows = self._conn.execute(
+                    f"SELECT id, length FROM documents WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for id_, length in rows:
+                    self._removed.add(id_)
+                    self.count -= 1
+                    self.total_length -= length
+
+    def _base_postings(self, terms: List[str]) -> Dict[str, list]:
+        if self._conn is None or not terms:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT term, docs FROM postings WHERE term IN ({','.join('?' * len(terms))})", terms
+            ).fetchall()
+        return {term: json.loads(docs) for term, docs in rows}
+
+    def search(self, query: str, k: Optional[int] = None, extra: Optional[List[Document]] = None) -> List[Tuple[str, float]]:
+        """
+        (id, BM25 score) of documents containing any query term, best
+        first. extra documents, not yet indexed, are scored as if they were.
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+        extra_counts = {}
+        for doc in extra or ():
+            if doc.id not in self._docs:
+                counts = Counter(tokenize(doc.page_content))
+                extra_counts[doc.id] = (counts, sum(counts.values()))
+        count = self.count + len(extra_counts)
+        if count == 0:
+            return []
+        average_length = (self.total_length + sum(length for _, length in extra_counts.values())) / count
+
+        base = self._base_postings(terms)
+        scores: Dict[str, float] = {}
+        for term in terms:
+            entries = [
+                (id_, tf, length) for id_, tf, length in base.get(term, ())
+                if id_ not in self._removed and id_ not in self._docs
+            ]
+            entries.extend((id_, tf, self._docs[id_][1]) for id_, tf in self._postings.get(term, {}).items())
+            entries.extend(
+                (id_, counts[term], length) for id_, (counts, length) in extra_counts.items() if term in counts
+            )
+            if not entries:
+                continue
+            idf = math.log(1 + (count - len(entries) + 0.5) / (len(entries) + 0.5))
+            for id_, tf, length in entries:
+                norm = tf + K1 * (1 - B + B * length / average_length)
+                scores[id_] = scores.get(id_, 0.0) + idf * tf * (K1 + 1) / norm
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked if k is None else ranked[:k]
+
+    def changes(self) -> Dict[str, object]:
+        """What write_lexical_snapshot needs; capture it while the store lock is held."""
+        return {'base': self.path, 'docs': dict(self._docs), 'removed': set(self._removed)}
+
+
+def write_lexical_snapshot(path: str, state: Dict[str, object]) -> None:
+    """
+    Write a new lexical index file from the previous one plus the captured
+    changes. Only the posting lists of terms that changed are rewritten.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        base = _open_readonly(state['base'])
+        if base is not None:
+            try:
+                base.backup(conn)
+            finally:
+                base.close()
+        for statement in SCHEMA:
+            conn.execute(statement)
+
+        removed = sorted(state['removed'] | set(state['docs']))
+        dropped: Dict[str, set] = {}
+        for chunk in _chunks(removed):
+            rows = conn.execute(
+                f"SELECT id, terms FROM documents WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for id_, terms in rows:
+                for term in json.loads(terms):
+                    dropped.setdefault(term, set()).add(id_)
+        added: Dict[str, list] = {}
+        for id_, (counts, length) in state['docs'].items():
+            for term, tf in counts.items():
+                added.setdefault(term, []).append([id_, tf, length])
+
+        with conn:
+            for term in set(dropped) | set(added):
+                row = conn.execute("SELECT docs FROM postings WHERE term = ?", (term,)).fetchone()
+                gone = dropped.get(term, ())
+                entries = [entry for entry in (json.loads(row[0]) if row else []) if entry[0] not in gone]
+                entries.extend(added.get(term, ()))
+                if entries:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO postings (term, docs) VALUES (?, ?)",
+                        (term, json.dumps(entries, ensure_ascii=False))
+                    )
+                else:
+                    conn.execute("DELETE FROM postings WHERE term = ?", (term,))
+            conn.executemany("DELETE FROM documents WHERE id = ?", [(id_,) for id_ in removed])
+            conn.executemany(
+                "INSERT INTO documents (id, length, terms) VALUES (?, ?, ?)",
+                [(id_, length, json.dumps(counts, ensure_ascii=False))
+                 for id_, (counts, length) in state['docs'].items()]
+            )
+    finally:
+        conn.close()
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class LLMCache:
+    """
+    Cache of LLM responses for call sites whose answer is a function of the
+    prompt alone (command classification, JSON extraction, query rewriting).
+
+    Responses are keyed by a hash of the prompt template, the variables
+    filled into it and the model's parameters. Lookups go to a bounded
+    in-process LRU first, then to a SQLite file; entries older than ttl
+    seconds count as misses. Call sites opt in one by one through
+    cached_llm_call(), and hit rates are kept per call site.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, max_entries: int = 1000, ttl: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lru: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.RLock()
+        self._db = None
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - ttl,))
+            self._db.commit()
+
+    @staticmethod
+    def model_params(llm: Any) -> Dict[str, Any]:
+        """What identifies a LangChain model's output: its name, temperature and so on."""
+        params = getattr(llm, "_identifying_params", None)
+        return dict(params) if isinstance(params, dict) else {"class": llm.__class__.__name__}
+
+    def key(self, template: Any, variables: Dict[str, Any], llm: Any) -> str:
+        payload = json.dumps(
+            {
+                "template": getattr(template, "template", template),
+                "variables": variables,
+                "model": self.model_params(llm),
+            },
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, site: str, outcome: str) -> None:
+        counts = self._counts.setdefault(site, {"hits": 0, "disk_hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def _remember(self, key: str, entry: Tuple[str, float]) -> None:
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str, site: str = "default") -> Optional[str]:
+        """The cached response, or None when missing or expired."""
+        oldest = time.time() - self.ttl
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and entry[1] >= oldest:
+                self._lru.move_to_end(key)
+                self._count(site, "hits")
+                return entry[0]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, created FROM responses WHERE key = ? AND created >= ?", (key, oldest)
+                ).fetchone()
+                if row is not None:
+                    self._remember(key, row)
+                    self._count(site, "hits")
+                    self._count(site, "disk_hits")
+                    return row[0]
+            self._count(site, "misses")
+            return None
+
+    def put(self, key: str, response: str) -> None:
+        entry = (response, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)", (key,) + entry
+                )
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Hit/miss counters per call site and in total; hits include disk_hits."""
+        with self._lock:
+            sites = {site: dict(counts) for site, counts in self._counts.items()}
+            sites["total"] = {
+                outcome: sum(counts[outcome] for counts in self._counts.values())
+                for outcome in ("hits", "disk_hits", "misses")
+            }
+            for counts in sites.values():
+                total = counts["hits"] + counts["misses"]
+                counts["hit_rate"] = counts["hits"] / total if total else 0.0
+            return sites
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def cached_llm_call(
+    cache: Optional[LLMCache],
+    site: str,
+    template: Any,
+    variables: Dict[str, Any],
+    llm: Any,
+    generate: Callable[[], str],
+    accept: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """
+    generate()'s response, from the cache when an earlier call had the same
+    template, variables and model. Without a cache it just calls generate.
+    Responses that accept rejects (unparseable output) are not cached.
+    """
+    if cache is None:
+        return generate()
+    key = cache.key(template, variables, llm)
+    response = cache.get(key, site)
+    if response is None:
+        response = generate()
+        if accept is None or accept(response):
+            cache.put(key, response)
+    return response
+
+
+async def acached_llm_call(
+    cache: Optional[LLMCache],
+    site: str,
+    template: Any,
+    variables: Dict[str, Any],
+    llm: Any,
+    generate: Callable[[], Awaitable[str]],
+    accept: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """Async counterpart of cached_llm_call."""
+    if cache is None:
+        return await generate()
+    key = cache.key(template, variables, llm)
+    response = cache.get(key, site)
+    if response is None:
+        response = await generate()
+        if accept is None or accept(response):
+            cache.put(key, response)
+    return response
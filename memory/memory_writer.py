@@ -0,0 +1,251 @@
+import asyncio
+import atexit
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+
+class MemoryWriter:
+    """
+    Write-behind buffer in front of a FAISS vectorstore.
+
+    add() returns immediately; a background thread collects turns until
+    max_batch_size is reached or the oldest one has waited max_delay
+    seconds, embeds the batch in one call and adds it to the index in bulk.
+    Searches merge index hits with the not-yet-written turns, so reads see
+    pending writes. Call flush() before shutdown.
+    """
+
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, vectorstore, max_batch_size: int = 32, max_delay: float = 0.5):
+        self.logger = logging.getLogger(__name__)
+        self.vectorstore = vectorstore
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+
+        self._pending: List[Dict[str, Any]] = []
+        self._in_flight: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+        self._flush_requests = 0
+        self._closed = False
+        self.batches_written = 0
+        self.items_written = 0
+        self.items_dropped = 0
+
+        self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, text: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Queue a text for indexing and return the id it will be stored under."""
+        item = {
+            'id': str(uuid.uuid4()),
+            'text': text,
+            'metadata': metadata or {},
+            'vector': None,
+            'queued_at': time.monotonic(),
+            'attempts': 0
+        }
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MemoryWriter is closed")
+            self._pending.append(item)
+            self._cond.notify_all()
+        return item['id']
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending) + len(self._in_flight)
+
+    def flush(self) -> None:
+        """Block until every queued turn has been written to the index."""
+        with self._cond:
+            self._flush_requests += 1
+            self._cond.notify_all()
+            try:
+                while (self._pending or self._in_flight) and self._thread.is_alive():
+                    self._cond.wait()
+            finally:
+                self._flush_requests -= 1
+
+    def close(self) -> None:
+        """Flush outstanding writes and stop the background thread."""
+        with self._cond:
+            if self._closed:
+                return
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                deadline = self._pending[0]['queued_at'] + self.max_delay
+                while (len(self._pending) < self.max_batch_size
+                       and not self._flush_requests and not self._closed):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:len(batch)]
+                self._in_flight = batch
+
+            failed = self._write(batch)
+
+            with self._cond:
+                self._in_flight = []
+                retry = []
+                for item in failed:
+                    item['attempts'] += 1
+                    if item['attempts'] < self.MAX_ATTEMPTS:
+                        retry.append(item)
+                    else:
+                        self.items_dropped += 1
+                self._pending[:0] = retry
+                self._cond.notify_all()
+            if failed:
+                time.sleep(min(self.max_delay, 1.0))
+
+    def _write(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Embed and index a batch; returns the items that could not be written."""
+        try:
+            missing = [item for item in batch if item['vector'] is None]
+            if missing:
+                vectors = self.vectorstore.embeddings.embed_documents([item['text'] for item in missing])
+                for item, vector in zip(missing, vectors):
+                    item['vector'] = vector
+            self.vectorstore.add_embeddings(
+                [(item['text'], item['vector']) for item in batch],
+                metadatas=[item['metadata'] for item in batch],
+                ids=[item['id'] for item in batch]
+            )
+        except Exception as e:
+            self.logger.error(f"Memory write of {len(batch)} turns failed: {e}")
+            return batch
+        self.batches_written += 1
+        self.items_written += len(batch)
+        return []
+
+    def _buffered(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            return self._in_flight + self._pending
+
+    def _score(self, query_vector: List[float], vectors: List[List[float]]) -> np.ndarray:
+        """Score buffered vectors the same way the FAISS index scores them."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if getattr(self.vectorstore, "_normalize_L2", False):
+            query = query / (np.linalg.norm(query) or 1.0)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1.0, norms)
+        if self.vectorstore.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT:
+            return matrix @ query
+        diff = matrix - query
+        return np.einsum("ij,ij->i", diff, diff)
+
+    def _merge(
+        self,
+        query_vector: List[float],
+        index_results: List[Tuple[Document, float]],
+        buffered: List[Dict[str, Any]],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        scored = list(index_results)
+        seen = {doc.id for doc, _ in index_results}
+        buffered = [item for item in buffered if item['id'] not in seen]
+        if filter is not None:
+            matches = self.vectorstore._create_filter_func(filter)
+            buffered = [item for item in buffered if matches(item['metadata'])]
+        if buffered:
+            scores = self._score(query_vector, [item['vector'] for item in buffered])
+            for item, score in zip(buffered, scores.tolist()):
+                doc = Document(id=item['id'], page_content=item['text'], metadata=dict(item['metadata']))
+                scored.append((doc, score))
+        higher_is_better = self.vectorstore.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT
+        scored.sort(key=lambda pair: pair[1], reverse=higher_is_better)
+        return [doc for doc, _ in scored[:k]]
+
+    def search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        Similarity search over the index plus turns that are still queued.
+        filter takes the same metadata filters as FAISS.similarity_search.
+        """
+        return self.search_by_vector(self.vectorstore.embeddings.embed_query(query), k=k, filter=filter)
+
+    def search_by_vector(
+        self, query_vector: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """search() for a query that has already been embedded."""
+        buffered = self._buffered()
+        missing = [item for item in buffered if item['vector'] is None]
+        if missing:
+            vectors = self.vectorstore.embeddings.embed_documents([item['text'] for item in missing])
+            for item, vector in zip(missing, vectors):
+                item['vector'] = vector
+        index_results = self.vectorstore.similarity_search_with_score_by_vector(query_vector, k=k, filter=filter)
+        return self._merge(query_vector, index_results, buffered, k, filter)
+
+    async def asearch(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Async counterpart of search."""
+        query_vector = await self.vectorstore.embeddings.aembed_query(query)
+        return await self.asearch_by_vector(query_vector, k=k, filter=filter)
+
+    async def asearch_by_vector(
+        self, query_vector: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """Async counterpart of search_by_vector."""
+        buffered = self._buffered()
+        missing = [item for item in buffered if item['vector'] is None]
+        if missing:
+            vectors = await self.vectorstore.embeddings.aembed_documents([item['text'] for item in missing])
+            for item, vector in zip(missing, vectors):
+                item['vector'] = vector
+        index_results = await asyncio.to_thread(
+            self.vectorstore.similarity_search_with_score_by_vector, query_vector, k=k, filter=filter
+        )
+        return self._merge(query_vector, index_results, buffered, k, filter)
+
+    def lexical_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """
+        BM25 search over the index plus queued turns; nothing is embedded.
+        Returns [] for vectorstores without a lexical index.
+        """
+        if not hasattr(self.vectorstore, "lexical_search"):
+            return []
+        buffered = [
+            Document(id=item['id'], page_content=item['text'], metadata=dict(item['metadata']))
+            for item in self._buffered()
+        ]
+        return [doc for doc, _ in self.vectorstore.lexical_search(query, k=k, filter=filter, extra=buffered)]
+
+    async def alexical_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """Async counterpart of lexical_search."""
+        return await asyncio.to_thread(self.lexical_search, query, k=k, filter=filter)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                'pending': len(self._pending) + len(self._in_flight),
+                'batches_written': self.batches_written,
+                'items_written': self.items_written,
+                'items_dropped': self.items_dropped,
+            }
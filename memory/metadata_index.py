@@ -0,0 +1,223 @@
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from langchain.docstore.document import Document
+
+
+class Prefilter:
+    """
+    The conditions of a metadata filter that the secondary indexes answer:
+    allowed agents and a timestamp range (ISO strings, compared as strings
+    exactly like the LangChain filter does). residual is True when the
+    filter has other conditions that only the documents can decide.
+    """
+
+    def __init__(self):
+        self.agents: Optional[Set[str]] = None
+        self.lower: Optional[str] = None
+        self.lower_inclusive = True
+        self.upper: Optional[str] = None
+        self.upper_inclusive = True
+        self.residual = False
+
+    @property
+    def constrained(self) -> bool:
+        return self.agents is not None or self.lower is not None or self.upper is not None
+
+    def _allow_agents(self, agents: Iterable[Any]) -> None:
+        agents = {agent for agent in agents if isinstance(agent, str)}
+        self.agents = agents if self.agents is None else self.agents & agents
+
+    def _bound_lower(self, value: str, inclusive: bool) -> None:
+        if self.lower is None or value > self.lower or (value == self.lower and not inclusive):
+            self.lower, self.lower_inclusive = value, inclusive
+
+    def _bound_upper(self, value: str, inclusive: bool) -> None:
+        if self.upper is None or value < self.upper or (value == self.upper and not inclusive):
+            self.upper, self.upper_inclusive = value, inclusive
+
+    def _add_agent(self, condition) -> None:
+        if isinstance(condition, str):
+            self._allow_agents([condition])
+        elif isinstance(condition, list):
+            self._allow_agents(condition)
+        elif isinstance(condition, dict) and set(condition) <= {"$eq", "$in"}:
+            if "$eq" in condition:
+                self._allow_agents([condition["$eq"]])
+            if "$in" in condition:
+                self._allow_agents(condition["$in"])
+        else:
+            self.residual = True
+
+    def _add_timestamp(self, condition) -> None:
+        if isinstance(condition, str):
+            condition = {"$eq": condition}
+        if not isinstance(condition, dict) or not all(isinstance(v, str) for v in condition.values()):
+            self.residual = True
+            return
+        for op, value in condition.items():
+            if op in ("$gte", "$gt", "$eq"):
+                self._bound_lower(value, op != "$gt")
+            if op in ("$lte", "$lt", "$eq"):
+                self._bound_upper(value, op != "$lt")
+            if op not in ("$gte", "$gt", "$lte", "$lt", "$eq"):
+                self.residual = True
+
+    def _add(self, filter: Dict[str, Any]) -> bool:
+        # Mirrors FAISS._create_filter_func: $and replaces the other keys, $or/$not cannot be narrowed
+        if "$and" in filter:
+            return all(isinstance(sub, dict) and self._add(sub) for sub in filter["$and"])
+        if "$or" in filter or "$not" in filter:
+            return False
+        for field, condition in filter.items():
+            if field == "agent":
+                self._add_agent(condition)
+            elif field == "timestamp":
+                self._add_timestamp(condition)
+            else:
+                self.residual = True
+        return True
+
+    @classmethod
+    def parse(cls, filter) -> Optional["Prefilter"]:
+        """A Prefilter for filter, or None if no indexed condition constrains it."""
+        if not isinstance(filter, dict):
+            return None
+        prefilter = cls()
+        if not prefilter._add(filter) or not prefilter.constrained:
+            return None
+        return prefilter
+
+
+def _metadatas(docstore, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+    if hasattr(docstore, "metadata_many"):
+        return docstore.metadata_many(ids)
+    docs = (docstore.search(id_) for id_ in ids)
+    return [doc.metadata if isinstance(doc, Document) else None for doc in docs]
+
+
+class MetadataIndex:
+    """
+    Secondary indexes over the 'agent' and 'timestamp' metadata of a FAISS
+    store, keyed by index position.
+
+    Each agent has a boolean bitmap of its positions; timestamps are kept
+    as a sorted array of (timestamp, position), so a time range is two
+    binary searches. A live bitmap drops tombstoned positions. select()
+    intersects these into the sorted positions a Prefilter allows, which
+    index_factory.search_selected then searches. The store keeps the
+    index in step with adds, tombstones and renumbering deletes.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self._live = np.zeros(0, dtype=bool)
+        self._agents: Dict[str, np.ndarray] = {}
+        self._time_keys = np.empty(0, dtype=str)
+        self._time_positions = np.empty(0, dtype=np.int64)
+        self._pending_times: List[tuple] = []
+
+    @classmethod
+    def build(cls, docstore, index_to_docstore_id, ntotal: int, skip=()) -> "MetadataIndex":
+        """Index every position of a store; positions in skip (tombstones) are not live."""
+        index = cls()
+        ids = [id_ for position, id_ in sorted(index_to_docstore_id.items()) if position < ntotal]
+        metadatas = _metadatas(docstore, ids)
+        index.add(metadatas)
+        dead = [position for position, metadata in enumerate(metadatas) if metadata is None]
+        index.discard(list(skip) + dead)
+        return index
+
+    def _grow(self, size: int) -> None:
+        capacity = len(self._live)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 1024)
+        self._live = np.concatenate([self._live, np.zeros(capacity - len(self._live), dtype=bool)])
+        for agent, bitmap in self._agents.items():
+            self._agents[agent] = np.concatenate([bitmap, np.zeros(capacity - len(bitmap), dtype=bool)])
+
+    def _bitmap(self, agent: str) -> np.ndarray:
+        if agent not in self._agents:
+            self._agents[agent] = np.zeros(len(self._live), dtype=bool)
+        return self._agents[agent]
+
+    def add(self, metadatas: List[Optional[Dict[str, Any]]]) -> None:
+        """Index positions size..size+len(metadatas)-1."""
+        start = self.size
+        self._grow(start + len(metadatas))
+        self._live[start:start + len(metadatas)] = True
+        for offset, metadata in enumerate(metadatas):
+            if not metadata:
+                continue
+            agent = metadata.get("agent")
+            if isinstance(agent, str):
+                self._bitmap(agent)[start + offset] = True
+            timestamp = metadata.get("timestamp")
+            if isinstance(timestamp, str):
+                self._pending_times.append((timestamp, start + offset))
+        self.size += len(metadatas)
+
+    def discard(self, positions: Iterable[int]) -> None:
+        """Positions that stay in the index but must never match (tombstones)."""
+        positions = np.fromiter(positions, dtype=np.int64)
+        self._live[positions] = False
+
+    def remove(self, positions: Iterable[int]) -> None:
+        """Drop positions and shift later ones down, as a FAISS delete or compaction does."""
+        removed = np.unique(np.fromiter(positions, dtype=np.int64))
+        if not len(removed):
+            return
+        keep = np.ones(self.size, dtype=bool)
+        keep[removed] = False
+        self._live = self._live[:self.size][keep]
+        self._agents = {agent: bitmap[:self.size][keep] for agent, bitmap in self._agents.items()}
+        self._sort_times()
+        kept = keep[self._time_positions]
+        positions = self._time_positions[kept]
+        self._time_keys = self._time_keys[kept]
+        self._time_positions = positions - np.searchsorted(removed, positions)
+        self.size = int(keep.sum())
+
+    def _sort_times(self) -> None:
+        if not self._pending_times:
+            return
+        pending, self._pending_times = self._pending_times, []
+        keys = np.array([timestamp for timestamp, _ in pending])
+        positions = np.fromiter((position for _, position in pending), dtype=np.int64, count=len(pending))
+        # Turns arrive in time order, so this is usually a plain append
+        if not _is_sorted(keys) or (len(self._time_keys) and keys[0] < self._time_keys[-1]):
+            keys = np.concatenate([self._time_keys, keys])
+            positions = np.concatenate([self._time_positions, positions])
+            order = np.argsort(keys, kind="stable")
+            self._time_keys, self._time_positions = keys[order], positions[order]
+        else:
+            self._time_keys = np.concatenate([self._time_keys, keys])
+            self._time_positions = np.concatenate([self._time_positions, positions])
+
+    def select(self, prefilter: Prefilter) -> np.ndarray:
+        """Sorted positions that satisfy the prefilter's agent and time conditions."""
+        mask = self._live[:self.size].copy()
+        if prefilter.agents is not None:
+            allowed = np.zeros(self.size, dtype=bool)
+            for agent in prefilter.agents:
+                if agent in self._agents:
+                    allowed |= self._agents[agent][:self.size]
+            mask &= allowed
+        if prefilter.lower is not None or prefilter.upper is not None:
+            self._sort_times()
+            start, stop = 0, len(self._time_keys)
+            if prefilter.lower is not None:
+                side = "left" if prefilter.lower_inclusive else "right"
+                start = int(np.searchsorted(self._time_keys, prefilter.lower, side=side))
+            if prefilter.upper is not None:
+                side = "right" if prefilter.upper_inclusive else "left"
+                stop = int(np.searchsorted(self._time_keys, prefilter.upper, side=side))
+            in_range = np.zeros(self.size, dtype=bool)
+            in_range[self._time_positions[start:max(start, stop)]] = True
+            mask &= in_range
+        return np.flatnonzero(mask)
+
+
+def _is_sorted(keys: np.ndarray) -> bool:
+    return bool(np.all(keys[:-1] <= keys[1:]))
@@ -0,0 +1,411 @@
+import json
+import math
+import mmap
+import os
+import re
+import struct
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from memory.lexical_index import B, K1, tokenize
+
+
+NOTE_INDEX_FIELDS = ("title", "tags", "content")
+
+# A query term in the title counts three times as much as one in the content
+FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "content": 1.0}
+
+TAG_PATTERN = re.compile(r"[\w-]+")
+
+# Postings pack the per-field term frequencies into one int, 10 bits each (capped at 1023)
+TF_BITS = 10
+TF_MASK = (1 << TF_BITS) - 1
+
+# A saved index: magic, the offset of a JSON header, then arrays aligned for mapping
+SNAPSHOT_MAGIC = b"NOTEIDX1"
+SNAPSHOT_ALIGN = 64
+
+
+def note_tags(tags: str) -> Set[str]:
+    """'#Meeting, #q3-plan' -> {'meeting', 'q3-plan'}."""
+    return set(TAG_PATTERN.findall(tags.lower()))
+
+
+def parse_query(query: str) -> Tuple[List[List[str]], Set[str]]:
+    """
+    Split a note query into (groups, tags). A note matches when it has all
+    terms of at least one group and every tag; '#tag' or 'tag:x' words are
+    tags. Without AND/OR every term is its own group (any term matches);
+    with them, OR separates groups and the terms in a group are all needed.
+    """
+    tags: Set[str] = set()
+    groups: List[List[str]] = [[]]
+    explicit = False
+    for word in query.split():
+        if word in ("AND", "OR"):
+            explicit = True
+            if word == "OR":
+                groups.append([])
+        elif word.startswith("#") or word.lower().startswith("tag:"):
+            tags.update(note_tags(word.split(":", 1)[-1]))
+        else:
+            groups[-1].extend(tokenize(word))
+    groups = [group for group in groups if group]
+    if not explicit:
+        groups = [[term] for group in groups for term in dict.fromkeys(group)]
+    return groups, tags
+
+
+def _write_arrays(path: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    layout = {}
+    with open(tmp_path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC + bytes(8))
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            f.write(bytes(-f.tell() % SNAPSHOT_ALIGN))
+            layout[name] = [array.dtype.str, list(array.shape), f.tell()]
+            f.write(array.tobytes())
+        header = f.tell()
+        f.write(json.dumps({"arrays": layout, "meta": meta}).encode("utf-8"))
+        f.seek(len(SNAPSHOT_MAGIC))
+        f.write(struct.pack("<Q", header))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_arrays(path: str) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """The arrays _write_arrays saved, as read-only views of the mapped file, and its meta."""
+    with open(path, "rb") as f:
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a saved NoteIndex")
+        (header,) = struct.unpack("<Q", f.read(8))
+        f.seek(header)
+        layout = json.loads(f.read())
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    arrays = {}
+    for name, (dtype, shape, offset) in layout["arrays"].items():
+        count = int(np.prod(shape))
+        arrays[name] = np.frombuffer(mapped, dtype=np.dtype(dtype), count=count, offset=offset).reshape(shape)
+    return arrays, layout["meta"]
+
+
+def _find(keys: np.ndarray, key: str) -> int:
+    """The position of key in keys, a sorted array of strings, or -1."""
+    if len(key) > keys.dtype.itemsize // 4:
+        # Longer than any of them, and searching would first copy keys to a wider dtype
+        return -1
+    i = int(np.searchsorted(keys, np.array(key, dtype=keys.dtype)))
+    return i if i < len(keys) and keys[i] == key else -1
+
+
+def _merged(overlay: Dict[str, Any], base: Optional[Dict[str, np.ndarray]], kind: str, dead: np.ndarray):
+    """
+    (keys, key numbers, slots, values) of every live posting of kind
+    ('term' or 'tag') in the base and the overlay; a key can be in both.
+    Values are the packed frequencies of terms.
+    """
+    keys = [np.array(list(overlay), dtype=str)]
+    numbers, slots, values = [np.zeros(0, np.int64)], [np.zeros(0, np.int64)], [np.zeros(0, np.int64)]
+    for number, entries in enumerate(overlay.values()):
+        numbers.append(np.full(len(entries), number, dtype=np.int64))
+        slots.append(np.fromiter(entries, dtype=np.int64, count=len(entries)))
+        if kind == "term":
+            values.append(np.fromiter(entries.values(), dtype=np.int64, count=len(entries)))
+    if base is not None:
+        keys.append(base[f"{kind}s"])
+        rows = np.repeat(np.arange(len(base[f"{kind}s"]), dtype=np.int64), np.diff(base[f"{kind}_offsets"]))
+        base_slots = base[f"{kind}_slots"]
+        alive = ~dead[base_slots]
+        numbers.append(rows[alive] + len(overlay))
+        slots.append(base_slots[alive].astype(np.int64))
+        if kind == "term":
+            values.append(base["term_values"][alive].astype(np.int64))
+    return np.concatenate(keys), np.concatenate(numbers), np.concatenate(slots), np.concatenate(values)
+
+
+class NoteIndex:
+    """
+    In-memory inverted index over notes, ranked with BM25F.
+
+    Every note gets a slot; each term maps slots to the term's frequency
+    in the title, tags and content (packed into one int), and per-field
+    lengths are kept per slot, so adding or removing a note only touches
+    its own terms. Scores
+    weight the fields by FIELD_WEIGHTS with per-field length
+    normalization. The first query on a term caches its postings as numpy
+    arrays (dropped when the term changes), so a query scores all the
+    matching notes in a few vector operations.
+
+    save() writes the index to one file that load() maps back instead of
+    reading: only the field lengths are loaded, while ids (binary-searched
+    in a sorted copy), a term's postings and a tag's notes are read from
+    the mapped file as needed, so a new process answers its first query
+    in milliseconds. Notes added after loading are indexed in memory on top
+    of the file, and notes removed since are skipped when it is read.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        weights = weights or FIELD_WEIGHTS
+        self.weights = np.array([weights[field] for field in NOTE_INDEX_FIELDS], dtype=np.float64)
+        self._slots: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._count = 0
+        self._lengths = np.zeros((0, len(NOTE_INDEX_FIELDS)), dtype=np.float64)
+        self._totals = np.zeros(len(NOTE_INDEX_FIELDS), dtype=np.float64)
+        self._terms: Dict[int, Tuple[str, ...]] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._tags: Dict[str, Set[int]] = {}
+        self._slot_tags: Dict[int, Set[str]] = {}
+        # The saved index this one was loaded from. Its notes take the first slots, and _dead marks
+        # those removed since; _slots, _ids and the rest hold the notes added since, from slot len(_dead)
+        self._base: Optional[Dict[str, np.ndarray]] = None
+        self._dead = np.zeros(0, dtype=bool)
+        self.meta: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, id_: str) -> bool:
+        return id_ in self._slots or self._base_slot(id_) is not None
+
+    def ids(self) -> List[str]:
+        base = self._base["ids"][~self._dead].tolist() if self._base is not None else []
+        return base + list(self._slots)
+
+    def _id(self, slot: int) -> Optional[str]:
+        if slot < len(self._dead):
+            return None if self._dead[slot] else str(self._base["ids"][slot])
+        return self._ids[slot - len(self._dead)]
+
+    @classmethod
+    def build(cls, notes: List[Dict[str, str]], weights: Optional[Dict[str, float]] = None) -> "NoteIndex":
+        index = cls(weights)
+        for note in notes:
+            index.add(note)
+        return index
+
+    def add(self, note: Dict[str, str]) -> None:
+        """Index a note (a dict with id, title, tags and content); re-adding an id replaces it."""
+        if note["id"] in self:
+            self.remove(note["id"])
+        slot = len(self._dead) + len(self._ids)
+        self._ids.append(note["id"])
+        self._slots[note["id"]] = slot
+        self._count += 1
+        if slot >= len(self._lengths):
+            grown = np.zeros((max(1024, 2 * len(self._lengths)), len(NOTE_INDEX_FIELDS)), dtype=np.float64)
+            grown[:len(self._lengths)] = self._lengths
+            self._lengths = grown
+
+        fields = [Counter(tokenize(note.get(name, ""))) for name in NOTE_INDEX_FIELDS]
+        lengths = [sum(counts.values()) for counts in fields]
+        self._lengths[slot] = lengths
+        self._totals += lengths
+        terms = tuple(set().union(*fields))
+        for term in terms:
+            packed = 0
+            for field, counts in enumerate(fields):
+                packed |= min(counts.get(term, 0), TF_MASK) << (TF_BITS * field)
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+            postings[slot] = packed
+            self._arrays.pop(term, None)
+        self._terms[slot] = terms
+
+        tags = note_tags(note.get("tags", ""))
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(slot)
+        self._slot_tags[slot] = tags
+
+    def remove(self, id_: str) -> bool:
+        slot = self._slots.pop(id_, None)
+        if slot is None:
+            slot = self._base_slot(id_)
+            if slot is None:
+                return False
+        self._count -= 1
+        self._totals -= self._lengths[slot]
+        if slot < len(self._dead):
+            # A note of the saved index: reads of the file skip it from now on
+            self._dead[slot] = True
+            for term in self._base_terms(slot):
+                self._arrays.pop(term, None)
+            return True
+        self._ids[slot - len(self._dead)] = None
+        for term in self._terms.pop(slot):
+            postings = self._postings[term]
+            del postings[slot]
+            if not postings:
+                del self._postings[term]
+            self._arrays.pop(term, None)
+        for tag in self._slot_tags.pop(slot):
+            self._tags[tag].discard(slot)
+            if not self._tags[tag]:
+                del self._tags[tag]
+        return True
+
+    # ---- saved index ------------------------------------------------------
+
+    def _base_slot(self, id_: str) -> Optional[int]:
+        if self._base is None:
+            return None
+        i = _find(self._base["sorted_ids"], id_)
+        if i < 0:
+            return None
+        slot = int(self._base["id_slots"][i])
+        return None if self._dead[slot] else slot
+
+    def _base_range(self, kind: str, key: str) -> Tuple[int, int]:
+        """Where the base's postings of a term or tag (kind 'term' or 'tag') are; empty if it has none."""
+        if self._base is None:
+            return 0, 0
+        i = _find(self._base[f"{kind}s"], key)
+        if i < 0:
+            return 0, 0
+        offsets = self._base[f"{kind}_offsets"]
+        return int(offsets[i]), int(offsets[i + 1])
+
+    def _base_tagged(self, tag: str) -> np.ndarray:
+        start, end = self._base_range("tag", tag)
+        if end == start:
+            return np.zeros(0, np.int64)
+        slots = self._base["tag_slots"][start:end]
+        return slots[~self._dead[slots]].astype(np.int64)
+
+    def _base_postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self._base_range("term", term)
+        if end == start:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+        slots = self._base["term_slots"][start:end]
+        alive = ~self._dead[slots]
+        return slots[alive].astype(np.int64), self._base["term_values"][start:end][alive].astype(np.int64)
+
+    def _base_terms(self, slot: int) -> List[str]:
+        offsets = self._base["slot_term_offsets"]
+        return self._base["terms"][self._base["slot_terms"][offsets[slot]:offsets[slot + 1]]].tolist()
+
+    def save(self, path: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Write the index to path (atomically, via a temporary file), with
+        meta, a JSON-able dict that load() puts back as .meta. Removed
+        notes are dropped, so slots are renumbered; the order is kept.
+        """
+        base = len(self._dead)
+        added = [slot for slot, id_ in enumerate(self._ids, base) if id_ is not None]
+        live = np.concatenate((np.flatnonzero(~self._dead), np.array(added, dtype=np.int64)))
+        renumber = np.full(base + len(self._ids), -1, dtype=np.int64)
+        renumber[live] = np.arange(len(live))
+        ids = np.array([id_ for id_ in self._ids if id_ is not None], dtype=str)
+        if self._base is not None:
+            ids = np.concatenate((self._base["ids"][~self._dead], ids))
+        # Sorted ids and their slots look an id up without a dict of every id
+        id_slots = np.argsort(ids, kind="stable")
+        arrays = {
+            "ids": ids,
+            "sorted_ids": ids[id_slots],
+            "id_slots": id_slots.astype(np.int32),
+            "lengths": self._lengths[live],
+        }
+        for kind, overlay in (("term", self._postings), ("tag", self._tags)):
+            keys, numbers, slots, values = _merged(overlay, self._base, kind, self._dead)
+            slots = renumber[slots]
+            # Number the keys that still have postings in sorted order, so load() can binary-search them
+            keys, sorted_numbers = np.unique(keys, return_inverse=True)
+            used, numbers = np.unique(sorted_numbers[numbers], return_inverse=True)
+            by_key = np.lexsort((slots, numbers))
+            arrays[f"{kind}s"] = keys[used]
+            arrays[f"{kind}_offsets"] = np.concatenate(([0], np.cumsum(np.bincount(numbers, minlength=len(used)))))
+            arrays[f"{kind}_slots"] = slots[by_key].astype(np.int32)
+            if kind == "term":
+                arrays["term_values"] = values[by_key].astype(np.int32)
+                # Removing a note of the file needs its terms
+                by_slot = np.lexsort((numbers, slots))
+                arrays["slot_term_offsets"] = np.concatenate(
+                    ([0], np.cumsum(np.bincount(slots, minlength=len(live))))
+                )
+                arrays["slot_terms"] = numbers[by_slot].astype(np.int32)
+        _write_arrays(path, arrays, meta or {})
+
+    @classmethod
+    def load(cls, path: str, weights: Optional[Dict[str, float]] = None) -> "NoteIndex":
+        """An index over what save() wrote to path; raises ValueError if it is not such a file."""
+        arrays, meta = _read_arrays(path)
+        index = cls(weights)
+        index._base = arrays
+        index.meta = meta
+        index._count = len(arrays["ids"])
+        index._lengths = np.array(arrays["lengths"], dtype=np.float64)
+        index._totals = index._lengths.sum(axis=0)
+        index._dead = np.zeros(len(arrays["ids"]), dtype=bool)
+        return index
+
+    # ---- search -----------------------------------------------------------
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term, {})
+            base_slots, base_packed = self._base_postings(term)
+            slots = np.concatenate((base_slots, np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))))
+            packed = np.concatenate((base_packed, np.fromiter(postings.values(), dtype=np.int64, count=len(postings))))
+            shifts = TF_BITS * np.arange(len(NOTE_INDEX_FIELDS))
+            tfs = ((packed[:, None] >> shifts) & TF_MASK).astype(np.float64)
+            arrays = self._arrays[term] = (slots, tfs)
+        return arrays
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        (note id, score) of the best k notes for a query (see parse_query),
+        best first. A tags-only query returns the tagged notes newest first
+        with score 0.
+        """
+        groups, tags = parse_query(query)
+        if not self._count or (not groups and not tags):
+            return []
+        size = len(self._dead) + len(self._ids)
+
+        allowed = None
+        if tags:
+            allowed = np.ones(size, dtype=bool)
+            for tag in tags:
+                tagged = self._tags.get(tag, set())
+                mask = np.zeros(size, dtype=bool)
+                mask[self._base_tagged(tag)] = True
+                mask[np.fromiter(tagged, dtype=np.int64, count=len(tagged))] = True
+                allowed &= mask
+            if not groups:
+                newest = np.flatnonzero(allowed)[::-1][:k]
+                return [(self._id(slot), 0.0) for slot in newest]
+
+        count = self._count
+        averages = np.where(self._totals > 0, self._totals / count, 1.0)
+        scores = np.zeros(size, dtype=np.float64)
+        present: Dict[str, np.ndarray] = {}
+        for term in {term for group in groups for term in group}:
+            slots, tfs = self._term_arrays(term)
+            mask = np.zeros(size, dtype=bool)
+            mask[slots] = True
+            present[term] = mask
+            if not len(slots):
+                continue
+            idf = math.log(1 + (count - len(slots) + 0.5) / (len(slots) + 0.5))
+            norms = 1 - B + B * self._lengths[slots] / averages
+            weighted = (tfs / norms) @ self.weights
+            scores[slots] += idf * weighted / (K1 + weighted)
+
+        matches = np.zeros(size, dtype=bool)
+        for group in groups:
+            matches |= np.logical_and.reduce([present[term] for term in group])
+        if allowed is not None:
+            matches &= allowed
+        candidates = np.flatnonzero(matches)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        ranked = candidates[np.lexsort((-candidates, -scores[candidates]))]
+        return [(self._id(slot), float(scores[slot])) for slot in ranked]
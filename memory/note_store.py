@@ -0,0 +1,666 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from memory.note_index import NoteIndex, note_tags
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are serialized within the process only
+    fcntl = None
+
+
+NOTE_FIELDS = ("title", "date", "tags", "content")
+NOTES_DB_FILE = "notes.sqlite3"
+NOTES_LOG_FILE = "notes.jsonl"
+
+
+def note_id(note: Dict[str, Any]) -> str:
+    """
+    Stable id derived from a note's fields. The same id keys the note's
+    vector in the vectorstore, so either side can find the other.
+    """
+    key = "\n".join(str(note.get(field, "")) for field in NOTE_FIELDS)
+    return "note-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _normalize(note: Dict[str, Any]) -> Dict[str, str]:
+    fields = {field: str(note.get(field, "")) for field in NOTE_FIELDS}
+    return {"id": note.get("id") or note_id(fields), **fields}
+
+
+class NoteStore(ABC):
+    """
+    Storage for NoteTakerAgent notes: dicts with id, title, date, tags and
+    content. Implementations make every write atomic and durable, and look
+    notes up by id or title without reading the whole collection.
+
+    search() ranks notes with a NoteIndex that is updated by each add and
+    delete, including those made by other processes sharing the store.
+    The index is saved next to the store (<path>.index.<n>, the newest
+    wins) once built and again every INDEX_SAVE_EVERY changes, so the
+    next process loads it and catches up instead of rebuilding it on its
+    first search.
+    """
+
+    INDEX_SAVE_EVERY = 1000
+
+    @abstractmethod
+    def add_many(self, notes: Iterable[Dict[str, Any]]) -> List[str]:
+        """Add notes in one atomic write; ids default to note_id(). Existing ids are left as they are."""
+
+    def add(self, note: Dict[str, Any]) -> str:
+        return self.add_many([note])[0]
+
+    @abstractmethod
+    def get(self, id_: str) -> Optional[Dict[str, str]]:
+        pass
+
+    @abstractmethod
+    def delete(self, ids: Iterable[str]) -> int:
+        """Delete notes by id in one atomic write; returns how many existed."""
+
+    @abstractmethod
+    def find_by_title(self, title: str) -> List[Dict[str, str]]:
+        """Notes whose title equals title, ignoring case."""
+
+    @abstractmethod
+    def all(self) -> List[Dict[str, str]]:
+        """Every note, oldest first."""
+
+    @abstractmethod
+    def search(self, query: str, k: int = 10) -> List[Tuple[Dict[str, str], float]]:
+        """(note, score) pairs for a NoteIndex query, best first."""
+
+    @abstractmethod
+    def iter_notes(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        tags: Iterable[str] = (),
+        newest_first: bool = False,
+    ) -> Iterator[Dict[str, str]]:
+        """
+        Notes dated within [date_from, date_to] (ISO dates, inclusive) that
+        carry every tag, sorted by date and then by when they were added.
+        Only the offset:offset+limit slice is read.
+        """
+
+    @abstractmethod
+    def count(self, date_from: Optional[str] = None, date_to: Optional[str] = None, tags: Iterable[str] = ()) -> int:
+        """How many notes iter_notes would yield with these filters and no limit."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def _load_index(self) -> Optional[NoteIndex]:
+        """The newest saved NoteIndex of the store at self.path, or None."""
+        snapshots = _index_snapshots(self.path)
+        if not snapshots:
+            return None
+        try:
+            return NoteIndex.load(snapshots[-1][1])
+        except (OSError, ValueError) as e:
+            # Another process may have replaced it since we listed it
+            logging.getLogger(__name__).warning(f"Rebuilding the note index, {snapshots[-1][1]} is unreadable: {e}")
+            return None
+
+    def _save_index(self, index: NoteIndex, **meta) -> None:
+        """Save index as the newest snapshot, then remove the older ones."""
+        snapshots = _index_snapshots(self.path)
+        path = f"{self.path}.index.{snapshots[-1][0] + 1 if snapshots else 1}"
+        try:
+            index.save(path, meta)
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"Could not save the note index to {path}: {e}")
+            return
+        for _, old in snapshots:
+            try:
+                os.remove(old)
+            except OSError:
+                pass  # Windows keeps a file another process has mapped; a later save removes it
+
+
+class SQLiteNoteStore(NoteStore):
+    """
+    Notes in a SQLite database in WAL mode. Lookups go through the primary
+    key and a case-insensitive title index; each write is one transaction,
+    and the busy timeout lets CLI and Streamlit processes share the file.
+
+    Tags are split into a note_tags table and dates are indexed, so
+    filtered listings page through SQL without reading other notes.
+
+    Triggers record the id of every inserted or deleted note in a change
+    log, so search() brings its in-memory NoteIndex up to date with writes
+    from any connection by replaying only the changes since its last look,
+    and rebuilds only when it fell behind more than CHANGE_LOG_LIMIT. A
+    saved index records the log position it is current to, so a new
+    process replays the log from there too.
+    """
+
+    CHANGE_LOG_LIMIT = 10000
+    PAGE_CHUNK = 500
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path: str, timeout: float = 10.0):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._index: Optional[NoteIndex] = None
+        self._index_seq = 0
+        self._saved_seq = 0
+        self._db = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS notes ("
+                "id TEXT PRIMARY KEY, title TEXT NOT NULL, date TEXT NOT NULL, "
+                "tags TEXT NOT NULL, content TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS notes_title ON notes (title COLLATE NOCASE)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS note_changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TRIGGER IF NOT EXISTS notes_inserted AFTER INSERT ON notes "
+                "BEGIN INSERT INTO note_changes (id) VALUES (new.id); END"
+            )
+            self._db.execute(
+                "CREATE TRIGGER IF NOT EXISTS notes_deleted AFTER DELETE ON notes "
+                "BEGIN INSERT INTO note_changes (id) VALUES (old.id); END"
+            )
+        self._migrate()
+
+    def _migrate(self) -> None:
+        if self._db.execute("PRAGMA user_version").fetchone()[0] >= self.SCHEMA_VERSION:
+            return
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the write lock
+            if self._db.execute("PRAGMA user_version").fetchone()[0] < 1:
+                self._db.execute("CREATE INDEX IF NOT EXISTS notes_date ON notes (date)")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS note_tags (tag TEXT NOT NULL, id TEXT NOT NULL, PRIMARY KEY (tag, id))"
+                )
+                self._db.execute(
+                    "CREATE TRIGGER IF NOT EXISTS note_tags_deleted AFTER DELETE ON notes "
+                    "BEGIN DELETE FROM note_tags WHERE id = old.id; END"
+                )
+                rows = self._db.execute("SELECT id, tags FROM notes").fetchall()
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO note_tags (tag, id) VALUES (?, ?)",
+                    [(tag, id_) for id_, tags in rows for tag in note_tags(tags)]
+                )
+            self._db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            self._db.commit()
+        except BaseException:
+            self._db.rollback()
+            raise
+
+    @staticmethod
+    def _row(row) -> Dict[str, str]:
+        return dict(zip(("id",) + NOTE_FIELDS, row))
+
+    def add_many(self, notes: Iterable[Dict[str, Any]]) -> List[str]:
+        notes = [_normalize(note) for note in notes]
+        with self._lock:
+            with self._db:
+                existing = set()
+                ids = list({note["id"] for note in notes})
+                for start in range(0, len(ids), self.PAGE_CHUNK):
+                    chunk = ids[start:start + self.PAGE_CHUNK]
+                    existing.update(row[0] for row in self._db.execute(
+                        f"SELECT id FROM notes WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                    ))
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO notes (id, title, date, tags, content) VALUES (?, ?, ?, ?, ?)",
+                    [(note["id"],) + tuple(note[field] for field in NOTE_FIELDS) for note in notes]
+                )
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO note_tags (tag, id) VALUES (?, ?)",
+                    [(tag, note["id"]) for note in notes if note["id"] not in existing for tag in note_tags(note["tags"])]
+                )
+                self._trim_changes()
+        return [note["id"] for note in notes]
+
+    def get(self, id_: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, title, date, tags, content FROM notes WHERE id = ?", (id_,)
+            ).fetchone()
+        return self._row(row) if row else None
+
+    def delete(self, ids: Iterable[str]) -> int:
+        ids = list(ids)
+        with self._lock:
+            with self._db:
+                deleted = self._db.executemany("DELETE FROM notes WHERE id = ?", [(id_,) for id_ in ids]).rowcount
+                self._trim_changes()
+            return deleted
+
+    def _trim_changes(self) -> None:
+        self._db.execute(
+            "DELETE FROM note_changes WHERE seq <= (SELECT MAX(seq) FROM note_changes) - ?",
+            (self.CHANGE_LOG_LIMIT,)
+        )
+
+    def find_by_title(self, title: str) -> List[Dict[str, str]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, title, date, tags, content FROM notes WHERE title = ? COLLATE NOCASE ORDER BY rowid",
+                (title,)
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def all(self) -> List[Dict[str, str]]:
+        with self._lock:
+            rows = self._db.execute("SELECT id, title, date, tags, content FROM notes ORDER BY rowid").fetchall()
+        return [self._row(row) for row in rows]
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[Dict[str, str], float]]:
+        with self._lock:
+            self._sync_index()
+            ranked = self._index.search(query, k)
+        found = ((self.get(id_), score) for id_, score in ranked)
+        return [(note, score) for note, score in found if note is not None]
+
+    @staticmethod
+    def _filters(date_from: Optional[str], date_to: Optional[str], tags: Iterable[str]) -> Tuple[str, list]:
+        # EXISTS probes the (tag, id) key per candidate, so the date index still drives the scan and the order
+        conditions, params = [], []
+        if date_from:
+            conditions.append("date >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("date <= ?")
+            params.append(date_to)
+        for tag in _tag_names(tags):
+            conditions.append("EXISTS (SELECT 1 FROM note_tags WHERE tag = ? AND id = notes.id)")
+            params.append(tag)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def iter_notes(self, offset=0, limit=None, date_from=None, date_to=None, tags=(), newest_first=False):
+        where, params = self._filters(date_from, date_to, tags)
+        order = " ORDER BY date DESC, rowid DESC" if newest_first else " ORDER BY date, rowid"
+        sql = "SELECT id, title, date, tags, content FROM notes" + where + order + " LIMIT ? OFFSET ?"
+        # Read in chunks so an unbounded listing never holds more than PAGE_CHUNK rows
+        while limit is None or limit > 0:
+            size = self.PAGE_CHUNK if limit is None else min(limit, self.PAGE_CHUNK)
+            with self._lock:
+                rows = self._db.execute(sql, params + [size, offset]).fetchall()
+            for row in rows:
+                yield self._row(row)
+            if len(rows) < size:
+                return
+            offset += size
+            if limit is not None:
+                limit -= size
+
+    def count(self, date_from=None, date_to=None, tags=()) -> int:
+        tags = _tag_names(tags)
+        if tags and not (date_from or date_to):
+            # Count the first tag's rows instead of probing every note
+            sql = "SELECT COUNT(*) FROM note_tags AS first WHERE tag = ?" + "".join(
+                " AND EXISTS (SELECT 1 FROM note_tags WHERE tag = ? AND id = first.id)" for _ in tags[1:]
+            )
+            params = tags
+        else:
+            where, params = self._filters(date_from, date_to, tags)
+            sql = "SELECT COUNT(*) FROM notes" + where
+        with self._lock:
+            return self._db.execute(sql, params).fetchone()[0]
+
+    def _sync_index(self) -> None:
+        loaded = self._index is None
+        if loaded:
+            self._index = self._load_index()
+            self._index_seq = self._saved_seq = self._index.meta.get("seq", 0) if self._index is not None else 0
+        changes = self._db.execute(
+            "SELECT seq, id FROM note_changes WHERE seq > ? ORDER BY seq", (self._index_seq,)
+        ).fetchall()
+        if self._index is None or (changes and changes[0][0] != self._index_seq + 1):
+            self._build_index()
+            return
+        self._replay(changes)
+        # A saved index of another database, e.g. one deleted and created again at the same path
+        if loaded and len(self._index) != self._db.execute("SELECT COUNT(*) FROM notes").fetchone()[0]:
+            self._build_index()
+        elif self._index_seq - self._saved_seq >= self.INDEX_SAVE_EVERY:
+            self._save_index(self._index, seq=self._index_seq)
+            self._saved_seq = self._index_seq
+
+    def _build_index(self) -> None:
+        # Read the log position first: changes committed while the notes are read get replayed, harmlessly
+        self._index_seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM note_changes").fetchone()[0]
+        rows = self._db.execute("SELECT id, title, date, tags, content FROM notes ORDER BY rowid").fetchall()
+        self._index = NoteIndex.build([self._row(row) for row in rows])
+        self._save_index(self._index, seq=self._index_seq)
+        self._saved_seq = self._index_seq
+
+    def _replay(self, changes: List[Tuple[int, str]]) -> None:
+        for seq, id_ in changes:
+            row = self._db.execute(
+                "SELECT id, title, date, tags, content FROM notes WHERE id = ?", (id_,)
+            ).fetchone()
+            if row is None:
+                self._index.remove(id_)
+            else:
+                self._index.add(self._row(row))
+            self._index_seq = seq
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class JSONLNoteStore(NoteStore):
+    """
+    Notes as an append-only JSON-lines log replayed into in-memory indexes
+    (by id, and by lowercased title).
+
+    Each write appends its lines with a single write() and fsyncs before
+    they are applied. An exclusive file lock serializes processes, and
+    every operation first applies lines other processes appended; a torn
+    last line left by a crash is truncated. Once deleted records outnumber
+    live ones the log is rewritten and atomically renamed into place, and
+    other processes reload it when they see the file was replaced.
+
+    A saved NoteIndex is brought up to date by comparing its ids with the
+    notes': ids default to note_id(), a hash of the note's fields, so an
+    id still present is still the same note.
+    """
+
+    COMPACT_MIN_RECORDS = 1000
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._inode = None
+        self._notes: Dict[str, Dict[str, str]] = {}
+        self._titles: Dict[str, List[str]] = {}
+        self._index: Optional[NoteIndex] = None
+        # Index changes since it was last saved
+        self._unsaved = 0
+        self._records = 0
+        self._offset = 0
+        with self._exclusive():
+            pass
+
+    # ---- log ------------------------------------------------------------
+
+    def _open(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, "a+b")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._notes, self._titles, self._index = {}, {}, None
+        self._records = self._offset = 0
+
+    def _replaced(self) -> bool:
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            return True
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the thread and file locks with every record so far applied."""
+        with self._lock:
+            while True:
+                if self._file is None or self._replaced():
+                    self._open()
+                if fcntl is None:
+                    break
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+                # The log may have been compacted while we waited for its lock
+                if not self._replaced():
+                    break
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            locked = self._file
+            try:
+                self._catch_up()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(locked.fileno(), fcntl.LOCK_UN)
+                if locked is not self._file:
+                    locked.close()
+
+    def _catch_up(self) -> None:
+        self._file.seek(self._offset)
+        data = self._file.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                self.logger.warning(f"Skipping unreadable line in {self.path}")
+        self._offset += end
+        if end < len(data):
+            # Writers hold the lock until their lines are complete, so this is a crash remnant
+            self.logger.warning(f"Truncating {len(data) - end} trailing bytes of {self.path}")
+            self._file.truncate(self._offset)
+            os.fsync(self._file.fileno())
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        self._records += 1
+        if record["op"] == "add":
+            note = record["note"]
+            if note["id"] not in self._notes:
+                self._notes[note["id"]] = note
+                self._titles.setdefault(note["title"].lower(), []).append(note["id"])
+                if self._index is not None:
+                    self._index.add(note)
+                    self._unsaved += 1
+        elif record["op"] == "delete":
+            for id_ in record["ids"]:
+                note = self._notes.pop(id_, None)
+                if note is not None:
+                    if self._index is not None:
+                        self._index.remove(id_)
+                        self._unsaved += 1
+                    titles = self._titles[note["title"].lower()]
+                    titles.remove(id_)
+                    if not titles:
+                        del self._titles[note["title"].lower()]
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._offset += len(data)
+        for record in records:
+            self._apply(record)
+
+    def _maybe_compact(self) -> None:
+        if self._records < self.COMPACT_MIN_RECORDS or self._records < 2 * len(self._notes):
+            return
+        tmp_path = self.path + ".tmp"
+        data = "".join(
+            json.dumps({"op": "add", "note": note}, ensure_ascii=False) + "\n" for note in self._notes.values()
+        ).encode("utf-8")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        _fsync_dir(os.path.dirname(self.path) or ".")
+        self.logger.info(f"Compacted {self.path} from {self._records} to {len(self._notes)} records")
+        # Keep the in-memory state and continue from the end of the new file;
+        # _exclusive releases the lock still held on the old one
+        self._file = open(self.path, "a+b")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._offset = len(data)
+        self._records = len(self._notes)
+
+    # ---- NoteStore ------------------------------------------------------
+
+    def add_many(self, notes: Iterable[Dict[str, Any]]) -> List[str]:
+        notes = [_normalize(note) for note in notes]
+        with self._exclusive():
+            new = {}
+            for note in notes:
+                if note["id"] not in self._notes:
+                    new.setdefault(note["id"], note)
+            if new:
+                self._append([{"op": "add", "note": note} for note in new.values()])
+        return [note["id"] for note in notes]
+
+    def get(self, id_: str) -> Optional[Dict[str, str]]:
+        with self._exclusive():
+            note = self._notes.get(id_)
+            return dict(note) if note else None
+
+    def delete(self, ids: Iterable[str]) -> int:
+        with self._exclusive():
+            ids = [id_ for id_ in dict.fromkeys(ids) if id_ in self._notes]
+            if ids:
+                self._append([{"op": "delete", "ids": ids}])
+                self._maybe_compact()
+            return len(ids)
+
+    def find_by_title(self, title: str) -> List[Dict[str, str]]:
+        with self._exclusive():
+            return [dict(self._notes[id_]) for id_ in self._titles.get(title.lower(), ())]
+
+    def all(self) -> List[Dict[str, str]]:
+        with self._exclusive():
+            return [dict(note) for note in self._notes.values()]
+
+    def _matching(self, date_from, date_to, tags) -> List[Dict[str, str]]:
+        tags = set(_tag_names(tags))
+        with self._exclusive():
+            return [
+                note for note in self._notes.values()
+                if (not date_from or note["date"] >= date_from)
+                and (not date_to or note["date"] <= date_to)
+                and (not tags or tags <= note_tags(note["tags"]))
+            ]
+
+    def iter_notes(self, offset=0, limit=None, date_from=None, date_to=None, tags=(), newest_first=False):
+        # The notes are in memory already; sorting is stable, so equal dates keep the log order
+        notes = sorted(self._matching(date_from, date_to, tags), key=lambda note: note["date"])
+        if newest_first:
+            notes.reverse()
+        for note in notes[offset:None if limit is None else offset + limit]:
+            yield dict(note)
+
+    def count(self, date_from=None, date_to=None, tags=()) -> int:
+        if not (date_from or date_to or tags):
+            return len(self)
+        return len(self._matching(date_from, date_to, tags))
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[Dict[str, str], float]]:
+        with self._exclusive():
+            if self._index is None:
+                self._index = self._load_index()
+                if self._index is None:
+                    self._index = NoteIndex.build(list(self._notes.values()))
+                    self._save_index(self._index)
+                    self._unsaved = 0
+                else:
+                    indexed = set(self._index.ids())
+                    stale = [id_ for id_ in indexed if id_ not in self._notes]
+                    missing = [note for id_, note in self._notes.items() if id_ not in indexed]
+                    for id_ in stale:
+                        self._index.remove(id_)
+                    for note in missing:
+                        self._index.add(note)
+                    self._unsaved = len(stale) + len(missing)
+            if self._unsaved >= self.INDEX_SAVE_EVERY:
+                self._save_index(self._index)
+                self._unsaved = 0
+            return [(dict(self._notes[id_]), score) for id_, score in self._index.search(query, k)]
+
+    def __len__(self) -> int:
+        with self._exclusive():
+            return len(self._notes)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _tag_names(tags: Iterable[str]) -> List[str]:
+    """['#Work', 'q3'] -> ['q3', 'work'], the form note_tags() stores."""
+    return sorted({tag.lower().lstrip("#") for tag in tags})
+
+
+def _index_snapshots(path: str) -> List[Tuple[int, str]]:
+    """(n, file) of every <path>.index.<n> NoteIndex saved for the store at path, oldest first."""
+    directory = os.path.dirname(path) or "."
+    prefix = os.path.basename(path) + ".index."
+    snapshots = []
+    for name in os.listdir(directory):
+        number = name[len(prefix):]
+        if name.startswith(prefix) and number.isdigit():
+            snapshots.append((int(number), os.path.join(directory, name)))
+    return sorted(snapshots)
+
+
+def _fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def open_note_store(backend: str, directory: str) -> NoteStore:
+    """The configured NoteStore ('sqlite' or 'jsonl') with its file in directory."""
+    if backend == "sqlite":
+        return SQLiteNoteStore(os.path.join(directory, NOTES_DB_FILE))
+    if backend == "jsonl":
+        return JSONLNoteStore(os.path.join(directory, NOTES_LOG_FILE))
+    raise ValueError(f"Unknown note store backend: {backend}")
+
+
+def migrate_json_notes(json_path: str, store: NoteStore) -> int:
+    """
+    One-time import of a legacy notes.json into store. The notes are added
+    in one atomic write, then the file is renamed to notes.json.migrated;
+    adds are idempotent, so a crash in between just repeats the import.
+    Returns how many notes were imported.
+    """
+    if not os.path.exists(json_path):
+        return 0
+    logger = logging.getLogger(__name__)
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            notes = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not read {json_path} for migration, leaving it in place: {e}")
+        return 0
+    notes = [note for note in notes if isinstance(note, dict)]
+    store.add_many(notes)
+    os.replace(json_path, json_path + ".migrated")
+    logger.info(f"Migrated {len(notes)} notes from {json_path}")
+    return len(notes)
@@ -0,0 +1,168 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from langchain.docstore.document import Document
+
+
+class RetentionRule:
+    """How long, and how many, conversation turns of one agent are kept."""
+
+    def __init__(self, max_age: Optional[float] = None, max_count: Optional[int] = None):
+        self.max_age = max_age  # seconds
+        self.max_count = max_count
+
+
+class RetentionPolicy:
+    """A default RetentionRule plus overrides keyed by the turn's 'agent' metadata."""
+
+    def __init__(self, default: Optional[RetentionRule] = None, per_agent: Optional[Dict[str, RetentionRule]] = None):
+        self.default = default or RetentionRule()
+        self.per_agent = per_agent or {}
+
+    def rule_for(self, agent: Optional[str]) -> RetentionRule:
+        return self.per_agent.get(agent, self.default)
+
+
+def _timestamp(metadata: Dict[str, Any]) -> Optional[datetime]:
+    try:
+        timestamp = datetime.fromisoformat(metadata["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+
+def expired_ids(store, policy: RetentionPolicy, now: Optional[datetime] = None) -> List[str]:
+    """
+    Ids of conversation turns the policy no longer keeps.
+
+    Turns are documents with a 'timestamp' in their metadata, grouped by
+    'agent'; notes (metadata with a 'note_id') and documents without a
+    timestamp are never expired. Per agent, all but the newest max_count
+    turns go, then any older than max_age.
+    """
+    now = now or datetime.now()
+    with store._lock:
+        entries = [
+            (position, id_) for position, id_ in sorted(store.index_to_docstore_id.items())
+            if position not in store.tombstones
+        ]
+
+    turns: Dict[Optional[str], List[tuple]] = {}
+    for _, id_ in entries:
+        doc = store.docstore.search(id_)
+        if not isinstance(doc, Document) or "note_id" in doc.metadata:
+            continue
+        timestamp = _timestamp(doc.metadata)
+        if timestamp is not None:
+            turns.setdefault(doc.metadata.get("agent"), []).append((id_, timestamp))
+
+    expired = []
+    for agent, items in turns.items():
+        rule = policy.rule_for(agent)
+        items.sort(key=lambda item: item[1])
+        if rule.max_count is not None and len(items) > rule.max_count:
+            cut = len(items) - rule.max_count
+            expired.extend(id_ for id_, _ in items[:cut])
+            items = items[cut:]
+        if rule.max_age is not None:
+            cutoff = now - timedelta(seconds=rule.max_age)
+            expired.extend(id_ for id_, timestamp in items if timestamp < cutoff)
+    return expired
+
+
+class RetentionManager:
+    """
+    Periodic eviction and compaction for a ThreadSafeFAISS store.
+
+    Every interval a sweep deletes the turns the policy has expired, in
+    one delete call, and compacts the index once compaction_threshold
+    tombstones have accumulated, so index size and the extra candidates
+    searches fetch past tombstones both stay bounded. Deletes go through
+    the store, so an attached journal records them.
+    """
+
+    def __init__(
+        self,
+        store,
+        policy: RetentionPolicy,
+        interval: float = 3600.0,
+        compaction_threshold: int = 512,
+        index_spec=None
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.store = store
+        self.policy = policy
+        self.interval = interval
+        self.compaction_threshold = compaction_threshold
+        self.index_spec = index_spec
+
+        self.sweeps = 0
+        self.evicted = 0
+        self.compactions = 0
+        self.compacted = 0
+        self.last_sweep_seconds = 0.0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def evict(self, ids: List[str]) -> int:
+        """Delete whichever of ids are still stored; returns how many were."""
+        with self.store._lock:
+            live = [id_ for id_ in ids if isinstance(self.store.docstore.search(id_), Document)]
+            if live:
+                self.store.delete(live)
+        return len(live)
+
+    def sweep(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Evict expired turns and compact if due; returns this sweep's counts."""
+        start = time.perf_counter()
+        evicted = self.evict(expired_ids(self.store, self.policy, now))
+        compacted = 0
+        if len(self.store.tombstones) >= self.compaction_threshold:
+            compacted = self.store.compact(self.index_spec)
+        elapsed = time.perf_counter() - start
+
+        self.sweeps += 1
+        self.evicted += evicted
+        self.compacted += compacted
+        self.compactions += bool(compacted)
+        self.last_sweep_seconds = elapsed
+        if evicted or compacted:
+            self.logger.info(
+                f"Retention sweep evicted {evicted} turns, compacted {compacted} vectors in {elapsed:.2f}s"
+            )
+        return {'evicted': evicted, 'compacted': compacted, 'seconds': elapsed}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sweeps': self.sweeps,
+            'evicted': self.evicted,
+            'compactions': self.compactions,
+            'compacted': self.compacted,
+            'last_sweep_seconds': self.last_sweep_seconds,
+            'vectors': self.store.index.ntotal,
+            'tombstones': len(self.store.tombstones),
+        }
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                self.logger.error(f"Retention sweep failed: {e}")
+
+    def start(self) -> None:
+        """Start periodic sweeps."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="memory-retention", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,280 @@
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.docstore.document import Document
+from langchain_core.vectorstores import VectorStoreRetriever
+
+from memory.hybrid_search import fuse, is_lexical_query
+
+
+class RetrievalPolicy:
+    """
+    What conversation memory an agent reads from context['history'].
+
+    Agents declare it as a class attribute (retrieval_policy), like
+    thread_safe. k = 0 means the agent ignores memory, so the orchestrator
+    skips the embedding and search entirely; filter restricts results by
+    metadata using the FAISS filter syntax, e.g. {'agent': 'NoteTakerAgent'}.
+    """
+
+    def __init__(self, k: int = 3, filter: Optional[Dict[str, Any]] = None):
+        self.k = k
+        self.filter = filter
+
+    @classmethod
+    def none(cls) -> "RetrievalPolicy":
+        return cls(k=0)
+
+    @classmethod
+    def top_k(cls, k: int = 3) -> "RetrievalPolicy":
+        return cls(k=k)
+
+    @classmethod
+    def filtered(cls, k: int = 3, **metadata) -> "RetrievalPolicy":
+        return cls(k=k, filter=metadata)
+
+    @property
+    def enabled(self) -> bool:
+        return self.k > 0
+
+    def describe(self) -> str:
+        if not self.enabled:
+            return "none"
+        if self.filter:
+            return f"top-{self.k} where {_filter_key(self.filter)}"
+        return f"top-{self.k}"
+
+
+# Agents that declare no policy keep reading the top 3 unfiltered memories
+DEFAULT_RETRIEVAL_POLICY = RetrievalPolicy.top_k(3)
+
+
+def _filter_key(filter) -> Optional[str]:
+    if filter is None:
+        return None
+    if callable(filter):
+        return f"callable:{id(filter)}"
+    return json.dumps(filter, sort_keys=True, default=str)
+
+
+class RetrievalContext:
+    """
+    Memory retrieval for a single request.
+
+    The query is embedded at most once and each distinct filter is searched
+    once at fetch_k; every consumer (orchestrator history,
+    BaseAgent.get_relevant_context, the agents' VectorStoreRetrieverMemory)
+    gets a slice of that result. Nothing runs until a consumer asks, so a
+    request whose agent ignores memory costs nothing. A consumer asking for
+    more than was fetched triggers one wider search that reuses the
+    embedding.
+
+    With hybrid set (and a searcher that has lexical_search), BM25 results
+    are fused with the vector results; a lexical query (see
+    is_lexical_query) that BM25 answers is never embedded at all.
+    """
+
+    def __init__(self, searcher, query: str, fetch_k: int = 5, hybrid: bool = True):
+        self.searcher = searcher
+        self.query = query
+        self.fetch_k = fetch_k
+        self.hybrid = hybrid and hasattr(searcher, "lexical_search")
+        self.lexical_only = self.hybrid and is_lexical_query(query)
+        self.policy: Optional[str] = None
+        self.embed_calls = 0
+        self.searches = 0
+        self.lookups = 0
+        self._vector: Optional[List[float]] = None
+        self._results: Dict[Optional[str], Tuple[List[Document], int]] = {}
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+
+    def _cached(self, key: Optional[str], k: int) -> Optional[List[Document]]:
+        entry = self._results.get(key)
+        if entry is not None:
+            results, fetched_k = entry
+            if k <= fetched_k or len(results) < fetched_k:
+                return list(results[:k])
+        return None
+
+    def _store(self, key: Optional[str], results: List[Document], fetch_k: int) -> List[Document]:
+        self._results[key] = (results, fetch_k)
+        self.searches += 1
+        return results
+
+    def search(self, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Top-k documents for the query, optionally restricted by metadata."""
+        key = _filter_key(filter)
+        with self._lock:
+            self.lookups += 1
+            cached = self._cached(key, k)
+            if cached is not None:
+                return cached
+            fetch_k = max(k, self.fetch_k)
+            lexical = self.searcher.lexical_search(self.query, k=fetch_k, filter=filter) if self.hybrid else []
+            if lexical and self.lexical_only:
+                return list(self._store(key, lexical, fetch_k)[:k])
+            if self._vector is None:
+                self._vector = self.searcher.vectorstore.embeddings.embed_query(self.query)
+                self.embed_calls += 1
+            results = self.searcher.search_by_vector(self._vector, k=fetch_k, filter=filter)
+            return list(self._store(key, fuse(results, lexical, fetch_k), fetch_k)[:k])
+
+    async def asearch(self, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Async counterpart of search."""
+        key = _filter_key(filter)
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            with self._lock:
+                self.lookups += 1
+                cached = self._cached(key, k)
+            if cached is not None:
+                return cached
+            fetch_k = max(k, self.fetch_k)
+            lexical = await self.searcher.alexical_search(self.query, k=fetch_k, filter=filter) if self.hybrid else []
+            if lexical and self.lexical_only:
+                with self._lock:
+                    return list(self._store(key, lexical, fetch_k)[:k])
+            if self._vector is None:
+                vector = await self.searcher.vectorstore.embeddings.aembed_query(self.query)
+                with self._lock:
+                    self._vector = vector
+                    self.embed_calls += 1
+            results = await self.searcher.asearch_by_vector(self._vector, k=fetch_k, filter=filter)
+            with self._lock:
+                return list(self._store(key, fuse(results, lexical, fetch_k), fetch_k)[:k])
+
+    async def aretrieve(self, policy: RetrievalPolicy) -> List[Document]:
+        """What an agent with this policy reads; [] without any lookup for none."""
+        self.policy = policy.describe()
+        if not policy.enabled:
+            return []
+        return await self.asearch(policy.k, filter=policy.filter)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'policy': self.policy,
+                'embed_calls': self.embed_calls,
+                'searches': self.searches,
+                'lookups': self.lookups,
+            }
+
+
+class RetrievalScope:
+    """
+    Registry of in-flight RetrievalContexts, keyed by query text.
+
+    Long-lived objects such as the agents' shared VectorStoreRetrieverMemory
+    use as_retriever(), which answers from the context of the request being
+    processed when its query matches and falls back to a plain search
+    otherwise. Totals across requests are kept for stats(); a request that
+    finished without embedding anything is an avoided retrieval, and one
+    answered from BM25 alone is also counted as lexical_only.
+    """
+
+    def __init__(self, searcher, fetch_k: int = 5, hybrid: bool = True):
+        self.logger = logging.getLogger(__name__)
+        self.searcher = searcher
+        self.fetch_k = fetch_k
+        self.hybrid = hybrid
+        self._active: Dict[str, List[RetrievalContext]] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.embed_calls = 0
+        self.searches = 0
+        self.lookups = 0
+        self.avoided = 0
+        self.lexical_only = 0
+        self.uncached_searches = 0
+        self.by_policy: Dict[str, int] = {}
+
+    def open(self, query: str) -> RetrievalContext:
+        context = RetrievalContext(self.searcher, query, fetch_k=self.fetch_k, hybrid=self.hybrid)
+        with self._lock:
+            self._active.setdefault(query, []).append(context)
+        return context
+
+    def close(self, context: RetrievalContext) -> None:
+        """Unregister a context and add its counters to the totals; idempotent."""
+        with self._lock:
+            contexts = self._active.get(context.query, [])
+            if context not in contexts:
+                return
+            contexts.remove(context)
+            if not contexts:
+                del self._active[context.query]
+            stats = context.stats()
+            self.requests += 1
+            self.embed_calls += stats['embed_calls']
+            self.searches += stats['searches']
+            self.lookups += stats['lookups']
+            if stats['embed_calls'] == 0:
+                self.avoided += 1
+                if stats['searches'] and context.lexical_only:
+                    self.lexical_only += 1
+            policy = stats['policy'] or "unrouted"
+            self.by_policy[policy] = self.by_policy.get(policy, 0) + 1
+        self.logger.debug(f"Retrieval for request: {stats}")
+
+    def current(self, query: str) -> Optional[RetrievalContext]:
+        with self._lock:
+            contexts = self._active.get(query)
+            return contexts[-1] if contexts else None
+
+    def search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        context = self.current(query)
+        if context is not None:
+            return context.search(k, filter=filter)
+        with self._lock:
+            self.uncached_searches += 1
+        return RetrievalContext(self.searcher, query, fetch_k=k, hybrid=self.hybrid).search(k, filter=filter)
+
+    async def asearch(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        context = self.current(query)
+        if context is not None:
+            return await context.asearch(k, filter=filter)
+        with self._lock:
+            self.uncached_searches += 1
+        context = RetrievalContext(self.searcher, query, fetch_k=k, hybrid=self.hybrid)
+        return await context.asearch(k, filter=filter)
+
+    def as_retriever(self, k: int = 4) -> "ScopedRetriever":
+        return ScopedRetriever(vectorstore=self.searcher.vectorstore, scope=self, search_kwargs={'k': k})
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals over closed requests; searches_per_request should stay at or below 1."""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'embed_calls': self.embed_calls,
+                'searches': self.searches,
+                'lookups': self.lookups,
+                'avoided_retrievals': self.avoided,
+                'avoided_rate': self.avoided / self.requests if self.requests else 0.0,
+                'lexical_only': self.lexical_only,
+                'uncached_searches': self.uncached_searches,
+                'searches_per_request': self.searches / self.requests if self.requests else 0.0,
+                'by_policy': dict(self.by_policy),
+            }
+
+
+class ScopedRetriever(VectorStoreRetriever):
+    """
+    VectorStoreRetriever that reads through a RetrievalScope; writes
+    (add_documents) still go straight to the vectorstore.
+    """
+
+    scope: Any
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None, **kwargs) -> List[Document]:
+        return self.scope.search(query, k=self.search_kwargs.get('k', 4), filter=self.search_kwargs.get('filter'))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None, **kwargs) -> List[Document]:
+        return await self.scope.asearch(
+            query, k=self.search_kwargs.get('k', 4), filter=self.search_kwargs.get('filter')
+        )
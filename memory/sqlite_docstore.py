@@ -0,0 +1,238 @@
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from langchain.docstore.document import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+
+DOCSTORE_FILE = "docstore.sqlite3"
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS documents (id TEXT PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS positions (position INTEGER PRIMARY KEY, id TEXT NOT NULL)",
+)
+
+
+def _open_readonly(path: Optional[str]) -> Optional[sqlite3.Connection]:
+    if not path:
+        return None
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    Docstore over a read-only SQLite snapshot plus in-memory changes.
+
+    Documents are fetched by id only when a search returns them, so opening
+    a snapshot costs the same whatever its size. Adds and deletes made
+    since the snapshot are kept in memory until write_snapshot() folds
+    them into the next file.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._conn = _open_readonly(path)
+        self._lock = threading.Lock()
+        self._added: Dict[str, Document] = {}
+        self._deleted: set = set()
+
+    def _base_ids(self, ids: List[str]) -> set:
+        if self._conn is None or not ids:
+            return set()
+        found = set()
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id FROM documents WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return found - self._deleted
+
+    def __contains__(self, id_: str) -> bool:
+        return id_ in self._added or bool(self._base_ids([id_]))
+
+    def search(self, search: str) -> Union[str, Document]:
+        if search in self._added:
+            return self._added[search]
+        if self._conn is None or search in self._deleted:
+            return f"ID {search} not found."
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, metadata FROM documents WHERE id = ?", (search,)
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def metadata_many(self, ids: List[str]) -> List[Optional[Dict]]:
+        """Metadata for each id (None if missing), fetched in bulk rather than per id."""
+        found: Dict[str, Dict] = {}
+        base_ids = [id_ for id_ in ids if id_ not in self._added and id_ not in self._deleted]
+        if self._conn is not None:
+            with self._lock:
+                for start in range(0, len(base_ids), 500):
+                    chunk = base_ids[start:start + 500]
+                    rows = self._conn.execute(
+                        f"SELECT id, metadata FROM documents WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    found.update((id_, json.loads(metadata)) for id_, metadata in rows)
+        for id_ in ids:
+            if id_ in self._added:
+                found[id_] = self._added[id_].metadata
+        return [found.get(id_) for id_ in ids]
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        overlapping = set(texts).intersection(self._added) | self._base_ids(list(texts))
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        self._added.update(texts)
+        self._deleted.difference_update(texts)
+
+    def delete(self, ids: List) -> None:
+        for id_ in ids:
+            if self._added.pop(id_, None) is None:
+                self._deleted.add(id_)
+
+    def changes(self) -> Tuple[Dict[str, Document], set]:
+        """Copy of (added documents, deleted ids) since the snapshot."""
+        return dict(self._added), set(self._deleted)
+
+
+class SQLiteIndexMap(MutableMapping):
+    """
+    index_to_docstore_id backed by the positions table of a snapshot.
+
+    Appended positions are kept in memory. Overwriting or removing a
+    snapshot position loads the whole map into memory until the next
+    snapshot (FAISS.delete replaces the map with a plain dict anyway).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._conn = _open_readonly(path)
+        self._lock = threading.Lock()
+        self._base_len = 0
+        if self._conn is not None:
+            self._base_len = self._conn.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+        self._extra: Dict[int, str] = {}
+        self._full: Optional[Dict[int, str]] = None
+
+    def _base_items(self) -> Iterator[Tuple[int, str]]:
+        if self._conn is None:
+            return iter(())
+        with self._lock:
+            rows = self._conn.execute("SELECT position, id FROM positions ORDER BY position").fetchall()
+        return iter(rows)
+
+    def _materialize(self) -> Dict[int, str]:
+        if self._full is None:
+            self._full = dict(self._base_items())
+            self._full.update(self._extra)
+            self._extra = {}
+        return self._full
+
+    def __getitem__(self, position: int) -> str:
+        # FAISS search results arrive as numpy integers, which sqlite3 would bind as blobs
+        position = int(position)
+        if self._full is not None:
+            return self._full[position]
+        if position in self._extra:
+            return self._extra[position]
+        if self._conn is None or not 0 <= position < self._base_len:
+            raise KeyError(position)
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM positions WHERE position = ?", (position,)).fetchone()
+        if row is None:
+            raise KeyError(position)
+        return row[0]
+
+    def __setitem__(self, position: int, id_: str) -> None:
+        if self._full is None and position >= self._base_len:
+            self._extra[position] = id_
+        else:
+            self._materialize()[position] = id_
+
+    def __delitem__(self, position: int) -> None:
+        del self._materialize()[position]
+
+    def __len__(self) -> int:
+        if self._full is not None:
+            return len(self._full)
+        return self._base_len + len(self._extra)
+
+    def __iter__(self) -> Iterator[int]:
+        return (position for position, _ in self.items())
+
+    def items(self) -> Iterable[Tuple[int, str]]:
+        if self._full is not None:
+            return list(self._full.items())
+        return list(self._base_items()) + sorted(self._extra.items())
+
+    def values(self) -> Iterable[str]:
+        return [id_ for _, id_ in self.items()]
+
+    def changes(self) -> Tuple[bool, Dict[int, str]]:
+        """(replaced, positions): the full map once materialized, else the appended positions."""
+        if self._full is not None:
+            return True, dict(self._full)
+        return False, dict(self._extra)
+
+
+def snapshot_state(docstore, index_to_docstore_id) -> Dict[str, object]:
+    """
+    Capture what write_snapshot needs while the store lock is held. Only
+    changes are copied for SQLite-backed structures; other docstores (an
+    InMemoryDocstore from a legacy index.pkl) are copied in full.
+    """
+    if isinstance(docstore, SQLiteDocstore):
+        base = docstore.path
+        added, deleted = docstore.changes()
+    else:
+        base = None
+        added, deleted = dict(docstore._dict), set()
+    if isinstance(index_to_docstore_id, SQLiteIndexMap) and index_to_docstore_id.path == base:
+        replaced, positions = index_to_docstore_id.changes()
+    else:
+        replaced, positions = True, dict(index_to_docstore_id)
+    return {'base': base, 'added': added, 'deleted': deleted, 'replaced': replaced, 'positions': positions}
+
+
+def write_snapshot(path: str, state: Dict[str, object]) -> None:
+    """
+    Write a new SQLite file from the previous one plus the captured changes.
+    The previous file is copied page by page, so no document is decoded.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        base = _open_readonly(state['base'])
+        if base is not None:
+            try:
+                base.backup(conn)
+            finally:
+                base.close()
+        for statement in SCHEMA:
+            conn.execute(statement)
+        with conn:
+            conn.executemany("DELETE FROM documents WHERE id = ?", [(id_,) for id_ in state['deleted']])
+            conn.executemany(
+                "INSERT OR REPLACE INTO documents (id, text, metadata) VALUES (?, ?, ?)",
+                [(id_, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False))
+                 for id_, doc in state['added'].items()]
+            )
+            if state['replaced']:
+                conn.execute("DELETE FROM positions")
+            conn.executemany(
+                "INSERT OR REPLACE INTO positions (position, id) VALUES (?, ?)",
+                sorted(state['positions'].items())
+            )
+    finally:
+        conn.close()
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
@@ -1,4 +1,5 @@
 from .calendar_api import CalendarService
+from .calendar_mirror import CalendarMirror
 from .gmail_api import GmailService
 from .web_search import WebSearchService
 from .tools import (
@@ -9,6 +10,7 @@ from .tools import (
 
 __all__ = [
     'CalendarService',
+    'CalendarMirror',
     'GmailService',
     'WebSearchService',
     'parse_datetime',
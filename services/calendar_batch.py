@@ -0,0 +1,99 @@
+import json
+import logging
+import random
+import time
+from typing import Any, Callable, List, Optional
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+# Reasons a 403 means "slow down" rather than "not allowed"
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for rate limiting and transient server errors."""
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    if status in RETRYABLE_STATUSES:
+        return True
+    if status != 403:
+        return False
+    try:
+        errors = json.loads(error.content)["error"].get("errors", [])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return False
+    return any(item.get("reason") in RATE_LIMIT_REASONS for item in errors)
+
+
+class CalendarBatch:
+    """
+    Executes many Calendar API requests as batch requests of chunk_size
+    calls each, one HTTP round trip per chunk instead of per call.
+
+    Each call succeeds or fails on its own. Calls that were rate limited
+    or hit a transient server error are sent again in a later round, after
+    an exponential backoff with jitter, up to max_retries times; chunks
+    are spaced at least min_interval seconds apart to stay under the
+    per-user request quota.
+    """
+
+    def __init__(self, service, chunk_size: int = 50, max_retries: int = 5, backoff: float = 1.0,
+                 min_interval: float = 0.0, sleep: Callable[[float], None] = time.sleep):
+        self.logger = logging.getLogger(__name__)
+        self.service = service
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.min_interval = min_interval
+        self.sleep = sleep
+        self._last_sent: Optional[float] = None
+        self.round_trips = 0
+
+    def _pace(self) -> None:
+        if self._last_sent is not None:
+            wait = self.min_interval - (time.monotonic() - self._last_sent)
+            if wait > 0:
+                self.sleep(wait)
+        self._last_sent = time.monotonic()
+
+    def execute(self, requests: List[HttpRequest]) -> List[Any]:
+        """
+        Run every request; returns, in the same order, each response (the
+        parsed JSON, or '' for deletes) or the exception it failed with.
+        """
+        results: List[Any] = [None] * len(requests)
+        pending = list(range(len(requests)))
+        for attempt in range(self.max_retries + 1):
+            retry = []
+
+            def done(request_id, response, exception):
+                index = int(request_id)
+                if exception is not None and is_retryable(exception) and attempt < self.max_retries:
+                    retry.append(index)
+                else:
+                    results[index] = exception if exception is not None else response
+
+            for start in range(0, len(pending), self.chunk_size):
+                chunk = pending[start:start + self.chunk_size]
+                batch = self.service.new_batch_http_request(callback=done)
+                for index in chunk:
+                    batch.add(requests[index], request_id=str(index))
+                self._pace()
+                self.round_trips += 1
+                try:
+                    batch.execute()
+                except HttpError as e:
+                    # The batch itself was refused; none of its calls ran
+                    for index in chunk:
+                        done(str(index), None, e)
+
+            if not retry:
+                break
+            delay = self.backoff * 2 ** attempt * (1 + random.random())
+            self.logger.info(f"{len(retry)} calendar calls throttled; retrying in {delay:.1f}s")
+            self.sleep(delay)
+            pending = sorted(retry)
+        return results
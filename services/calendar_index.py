@@ -0,0 +1,419 @@
+import json
+import logging
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from dateutil.rrule import rrulestr
+
+logger = logging.getLogger(__name__)
+
+# (start, end, event id) of one occurrence; start and end are aware UTC datetimes
+Occurrence = Tuple[datetime, datetime, str]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def normalize_title(title: str) -> str:
+    """'  Team Sync-up! ' -> 'team sync up'."""
+    return " ".join(re.findall(r"\w+", title.lower()))
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _seconds(value: datetime) -> int:
+    if value.tzinfo is None:
+        raise ValueError("Calendar index queries need timezone-aware datetimes")
+    return int((value - EPOCH).total_seconds())
+
+
+def _datetime(seconds) -> datetime:
+    return EPOCH + timedelta(seconds=int(seconds))
+
+
+class _Intervals:
+    """
+    Intervals sorted by start, with the longest duration among them: every
+    interval overlapping [a, b) starts in (a - longest, b), which two
+    binary searches find.
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, owners: np.ndarray):
+        order = np.argsort(starts, kind="stable")
+        self.starts, self.ends, self.owners = starts[order], ends[order], owners[order]
+        self.longest = int((self.ends - self.starts).max()) if len(starts) else 0
+
+    def overlapping(self, a: int, b: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        lo = np.searchsorted(self.starts, a - self.longest, side="right")
+        hi = np.searchsorted(self.starts, b, side="left")
+        hit = self.ends[lo:hi] > a
+        return self.starts[lo:hi][hit], self.ends[lo:hi][hit], self.owners[lo:hi][hit]
+
+
+class CalendarIndex:
+    """
+    In-memory interval and title index over a CalendarMirror's events.
+
+    Single events are split into duration classes (powers of two) so that
+    a long event cannot widen the search window of short ones; each class
+    is an _Intervals, and a range query costs a binary search per class
+    plus the k events returned. Recurring series are expanded lazily: the
+    first query touching a year materializes that year's instances of
+    every series into its own _Intervals. Instances that were moved,
+    edited (those are events of their own) or cancelled are skipped.
+
+    Writes are applied in place with apply(): changed and removed events
+    are tombstoned, new single events go to a small delta searched
+    alongside the classes, and new series are expanded per query. Once
+    COMPACT_AT events have piled up there, they are merged into the
+    classes.
+
+    Titles are normalized and indexed by trigram, so lookups tolerate
+    typos and word order.
+    """
+
+    COMPACT_AT = 512
+    # How far ahead upcoming() looks
+    HORIZON = timedelta(days=3650)
+
+    def __init__(self, rows: Iterable[Tuple], exclusions: Iterable[Tuple] = (), tz: str = "Asia/Kolkata",
+                 version: int = 0):
+        self.tz = ZoneInfo(tz)
+        self.version = version
+        self.ids: List[str] = []
+        self.busy: List[bool] = []
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._dead: Set[int] = set()
+        self._titles: Dict[str, List[int]] = {}
+        self._grams: Dict[str, List[str]] = {}
+        self._gram_keys: Set[str] = set()
+        # Single events as position -> (start, end) seconds; series as position -> (rules, floating, duration, first)
+        self._spans: Dict[int, Tuple[int, int]] = {}
+        self._series: Dict[int, Tuple] = {}
+        self._longest_series = 0
+        self._years: Dict[int, _Intervals] = {}
+        self._skipped: Dict[str, Set[int]] = {}
+        # Added since the classes and years were built
+        self._delta: List[int] = []
+        self._delta_intervals: Optional[_Intervals] = None
+        self._fresh: List[int] = []
+
+        singles = []
+        for row in rows:
+            position = self._add(*row)
+            if position is not None and position not in self._series:
+                singles.append((position, row[2], row[3] or row[2]))
+        self._exclude(exclusions)
+
+        positions = np.array([position for position, _, _ in singles], dtype=np.int64)
+        starts = np.array([start for _, start, _ in singles], dtype="datetime64[s]").astype(np.int64)
+        ends = np.array([end for _, _, end in singles], dtype="datetime64[s]").astype(np.int64)
+        ends = np.maximum(ends, starts + 1)
+        self._spans = dict(zip(positions.tolist(), zip(starts.tolist(), ends.tolist())))
+        self._classes = self._build_classes(positions, starts, ends)
+
+    @classmethod
+    def from_mirror(cls, mirror) -> "CalendarIndex":
+        version = mirror.version
+        return cls(mirror.index_rows(), mirror.exclusions(), tz=mirror.tz.key, version=version)
+
+    def catch_up(self, mirror) -> bool:
+        """
+        Apply the mirror's changes since this index's version. False when
+        the mirror was replaced wholesale (a full resync) since, and the
+        index has to be rebuilt with from_mirror().
+        """
+        version, changed = mirror.changes_since(self.version)
+        if changed is None:
+            return False
+        if changed:
+            self.apply(mirror.index_rows(changed), mirror.exclusions(changed), changed)
+        self.version = version
+        return True
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    @staticmethod
+    def _build_classes(positions: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> List[_Intervals]:
+        classes = np.ceil(np.log2(np.maximum(ends - starts, 60) / 60)).astype(np.int64)
+        return [
+            _Intervals(starts[classes == c], ends[classes == c], positions[classes == c])
+            for c in np.unique(classes)
+        ]
+
+    # ---- changes ---------------------------------------------------------
+
+    def _add(self, id_, title, start, end, series, parent, original, busy) -> Optional[int]:
+        """Register an event (an index_rows() row); its interval is left to the caller for single events."""
+        if not start:
+            return None
+        position = self._positions[id_] = len(self.ids)
+        self.ids.append(id_)
+        self.busy.append(bool(busy))
+        key = normalize_title(title or "")
+        self._keys.append(key)
+        if key not in self._gram_keys:
+            self._gram_keys.add(key)
+            for gram in _trigrams(key):
+                self._grams.setdefault(gram, []).append(key)
+        self._titles.setdefault(key, []).append(position)
+        if parent and original:
+            self._skipped.setdefault(parent, set()).add(self._original_seconds(original))
+        if series:
+            self._add_series(position, json.loads(series))
+        return position
+
+    def _exclude(self, exclusions: Iterable[Tuple]) -> None:
+        """Record cancelled instances, (id, series id, original start) rows, as skipped."""
+        for _, series_id, original in exclusions:
+            self._skipped.setdefault(series_id, set()).add(self._original_seconds(original))
+
+    def apply(self, rows: Iterable[Tuple], exclusions: Iterable[Tuple], changed: Iterable[str]) -> None:
+        """
+        Update the index for changed event ids: each is dropped, then rows
+        (their current index_rows(), none for deleted events) are added
+        back and exclusions (cancelled instances) recorded.
+        """
+        for event_id in changed:
+            position = self._positions.pop(event_id, None)
+            if position is None:
+                continue
+            self._dead.add(position)
+            self._spans.pop(position, None)
+            self._series.pop(position, None)
+            key = self._keys[position]
+            self._titles[key].remove(position)
+            if not self._titles[key]:
+                del self._titles[key]
+        for row in rows:
+            position = self._add(*row)
+            if position is None:
+                continue
+            if position in self._series:
+                self._fresh.append(position)
+            else:
+                start = _seconds(datetime.fromisoformat(row[2]).replace(tzinfo=timezone.utc))
+                end = _seconds(datetime.fromisoformat(row[3] or row[2]).replace(tzinfo=timezone.utc))
+                self._spans[position] = (start, max(end, start + 1))
+                self._delta.append(position)
+        self._exclude(exclusions)
+        self._delta_intervals = None
+        if len(self._delta) + len(self._fresh) >= self.COMPACT_AT:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Merge the delta and fresh series into the classes and years."""
+        spans = self._spans.items()
+        positions = np.fromiter((position for position, _ in spans), dtype=np.int64, count=len(spans))
+        starts = np.fromiter((start for _, (start, _) in spans), dtype=np.int64, count=len(spans))
+        ends = np.fromiter((end for _, (_, end) in spans), dtype=np.int64, count=len(spans))
+        self._classes = self._build_classes(positions, starts, ends)
+        self._delta, self._delta_intervals, self._fresh = [], None, []
+        self._years.clear()
+
+    # ---- recurring series ------------------------------------------------
+
+    def _original_seconds(self, original: str) -> int:
+        value = datetime.fromisoformat(original)
+        return _seconds(value if value.tzinfo else value.replace(tzinfo=self.tz))
+
+    def _add_series(self, position: int, event: Dict) -> None:
+        start, end = event.get("start", {}), event.get("end", {})
+        try:
+            if start.get("dateTime"):
+                first = datetime.fromisoformat(start["dateTime"])
+                zone = ZoneInfo(start["timeZone"]) if start.get("timeZone") else self.tz
+                # Expand in the event's own time zone so instances keep their wall-clock time
+                first = first.replace(tzinfo=zone) if first.tzinfo is None else first.astimezone(zone)
+                last = datetime.fromisoformat(end["dateTime"]) if end.get("dateTime") else first
+                duration = (last if last.tzinfo else last.replace(tzinfo=zone)) - first
+                floating = False
+            else:
+                # All-day series expand as naive dates, placed at midnight in the calendar's zone
+                first = datetime.fromisoformat(start["date"])
+                duration = (datetime.fromisoformat(end["date"]) if end.get("date") else first + timedelta(days=1)) - first
+                floating = True
+            rules = rrulestr("\n".join(event.get("recurrence", [])), dtstart=first, forceset=True, cache=True)
+        except (KeyError, ValueError, TypeError) as e:
+            logger.warning(f"Skipping recurring event {event.get('id')}: {e}")
+            return
+        duration = max(int(duration.total_seconds()), 1)
+        first_seconds = _seconds(first.replace(tzinfo=self.tz) if floating else first)
+        self._series[position] = (rules, floating, duration, first_seconds)
+        self._longest_series = max(self._longest_series, duration)
+
+    def _bound(self, value: datetime, floating: bool) -> datetime:
+        return value.astimezone(self.tz).replace(tzinfo=None) if floating else value
+
+    def _instance_seconds(self, instance: datetime, floating: bool) -> int:
+        return _seconds(instance.replace(tzinfo=self.tz) if floating else instance)
+
+    def _instances(self, position: int, lower: datetime, upper: datetime) -> List[int]:
+        """Start times of the series at position from lower through upper."""
+        rules, floating, _, _ = self._series[position]
+        return [
+            self._instance_seconds(instance, floating)
+            for instance in rules.between(self._bound(lower, floating), self._bound(upper, floating), inc=True)
+        ]
+
+    def _year(self, year: int) -> _Intervals:
+        """Every series instance starting in year (UTC), materialized on first use."""
+        intervals = self._years.get(year)
+        if intervals is not None:
+            return intervals
+        lower = datetime(year, 1, 1, tzinfo=timezone.utc)
+        upper = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+        fresh = set(self._fresh)
+        starts, durations, owners = [], [], []
+        for position, (_, _, duration, first) in self._series.items():
+            if first >= _seconds(upper) or position in fresh:
+                continue
+            for seconds in self._instances(position, lower, upper):
+                if lower <= _datetime(seconds) < upper:
+                    starts.append(seconds)
+                    durations.append(duration)
+                    owners.append(position)
+        starts = np.array(starts, dtype=np.int64)
+        intervals = self._years[year] = _Intervals(
+            starts, starts + np.array(durations, dtype=np.int64), np.array(owners, dtype=np.int64)
+        )
+        return intervals
+
+    # ---- queries ---------------------------------------------------------
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Occurrence]:
+        """Occurrences overlapping [start, end), by start time."""
+        a, b = _seconds(start), _seconds(end)
+        found = [intervals.overlapping(a, b) for intervals in self._classes]
+        if self._delta:
+            if self._delta_intervals is None:
+                live = [position for position in self._delta if position in self._spans]
+                self._delta_intervals = _Intervals(
+                    np.array([self._spans[position][0] for position in live], dtype=np.int64),
+                    np.array([self._spans[position][1] for position in live], dtype=np.int64),
+                    np.array(live, dtype=np.int64),
+                )
+            found.append(self._delta_intervals.overlapping(a, b))
+        if self._series:
+            for year in range(_datetime(a - self._longest_series).year, _datetime(b - 1).year + 1):
+                found.append(self._year(year).overlapping(a, b))
+        occurrences = [
+            (int(s), int(e), int(owner))
+            for starts, ends, owners in found
+            for s, e, owner in zip(starts, ends, owners)
+        ]
+        for position in self._fresh:
+            if position in self._series:
+                duration = self._series[position][2]
+                occurrences.extend(
+                    (s, s + duration, position)
+                    for s in self._instances(position, _datetime(a - duration), _datetime(b))
+                    if a - duration < s < b
+                )
+        occurrences = [
+            (s, e, owner) for s, e, owner in occurrences
+            if owner not in self._dead and not (owner in self._series and s in self._skipped.get(self.ids[owner], ()))
+        ]
+        occurrences.sort()
+        return [(_datetime(s), _datetime(e), self.ids[owner]) for s, e, owner in occurrences]
+
+    def upcoming(self, now: datetime, limit: int = 10) -> List[Occurrence]:
+        """The first limit occurrences not over by now, soonest first, looking up to HORIZON ahead."""
+        span = timedelta(days=30)
+        while True:
+            found = self.overlapping(now, now + span)
+            if len(found) >= limit or span >= self.HORIZON:
+                return found[:limit]
+            span = min(span * 4, self.HORIZON)
+
+    def conflicts(self, start: datetime, end: datetime, exclude: Optional[str] = None) -> List[Occurrence]:
+        """Busy occurrences overlapping [start, end); all-day and 'free' events never conflict."""
+        return [
+            occurrence for occurrence in self.overlapping(start, end)
+            if occurrence[2] != exclude and self.busy[self._positions[occurrence[2]]]
+        ]
+
+    def next_start(self, event_id: str, now: datetime) -> Optional[datetime]:
+        """Start of the event's first occurrence still going at now or later; None once it is over."""
+        position = self._positions.get(event_id)
+        if position is None:
+            return None
+        t = _seconds(now)
+        if position in self._spans:
+            start, end = self._spans[position]
+            return _datetime(start) if end > t else None
+        if position not in self._series:
+            return None
+        rules, floating, duration, _ = self._series[position]
+        skipped = self._skipped.get(event_id, ())
+        # Capped, so a series whose every later instance was cancelled cannot loop for ever
+        for instance in rules.xafter(self._bound(_datetime(t - duration), floating), count=1000):
+            seconds = self._instance_seconds(instance, floating)
+            if seconds + duration > t and seconds not in skipped:
+                return _datetime(seconds)
+        return None
+
+    def by_next_occurrence(self, event_ids: List[str], now: datetime) -> List[str]:
+        """event_ids ordered by their next occurrence from now; events that are over keep their order, last."""
+        starts = {event_id: self.next_start(event_id, now) for event_id in event_ids}
+        return sorted(event_ids, key=lambda event_id: (starts[event_id] is None, starts[event_id] or now))
+
+    def occurrence_id(self, event_id: str, start: datetime) -> str:
+        """
+        Google's id for the occurrence of event_id starting at start: for a
+        series, '<series id>_<UTC start>' (or '_<date>' if all-day), which
+        the API reads and writes as that one instance; otherwise event_id.
+        """
+        position = self._positions.get(event_id)
+        if position not in self._series:
+            return event_id
+        if self._series[position][1]:
+            return f"{event_id}_{start.astimezone(self.tz):%Y%m%d}"
+        return f"{event_id}_{start.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}"
+
+    def title_matches(self, title: str, cutoff: float = 0.75, exact: bool = False) -> List[str]:
+        """
+        Normalized titles close to title, best first: the exact one alone
+        if it exists, otherwise (unless exact) those sharing enough
+        trigrams whose similarity ratio reaches cutoff.
+        """
+        key = normalize_title(title)
+        if key in self._titles:
+            return [key]
+        if exact:
+            return []
+        grams = _trigrams(key)
+        shared = Counter(candidate for gram in grams for candidate in self._grams.get(gram, ()))
+        scored = []
+        for candidate, count in shared.items():
+            if candidate not in self._titles:
+                continue  # every event with this title is gone
+            # Dice coefficient on trigrams bounds the ratio cheaply before SequenceMatcher runs
+            if 2 * count / (len(grams) + len(_trigrams(candidate))) < cutoff / 2:
+                continue
+            matcher = SequenceMatcher(None, key, candidate)
+            if matcher.quick_ratio() >= cutoff and matcher.ratio() >= cutoff:
+                scored.append((matcher.ratio(), candidate))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [candidate for _, candidate in scored]
+
+    def find_title(self, title: str, cutoff: float = 0.75, now: Optional[datetime] = None,
+                   exact: bool = False) -> List[str]:
+        """
+        Ids of the events whose titles match title (see title_matches);
+        given now, the events of each title come by next occurrence.
+        """
+        found = []
+        for key in self.title_matches(title, cutoff, exact):
+            ids = [self.ids[position] for position in self._titles[key]]
+            found.extend(self.by_next_occurrence(ids, now) if now else ids)
+        return found
@@ -0,0 +1,137 @@
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from services.date_parser import DateParser
+
+TIME_TEXT = r"(?:noon|midnight|\d{1,2}(?::\d{2})?\s*[ap]\.?m\.?|\d{1,2}:\d{2})"
+
+CREATE = re.compile(r"(?:please\s+)?(?:schedule|add|create|book|set up|put)\s+(?P<rest>.+)", re.IGNORECASE)
+DELETE = re.compile(r"(?:please\s+)?(?:delete|remove|cancel)\s+(?P<rest>.+)", re.IGNORECASE)
+# Greedy up to the last " to ", so titles like "Trip to Goa" survive
+RESCHEDULE = re.compile(r"(?:please\s+)?(?:reschedule|move|postpone|shift)\s+(?P<rest>.+)\s+to\s+(?P<new>.+)",
+                        re.IGNORECASE)
+READ = re.compile(
+    r"(?:what'?s|what is|what do i have|show|list|any)\b.*\b(?:calendar|schedule|events?|meetings?|agenda|plans?|on)\b.*",
+    re.IGNORECASE
+)
+# Things the rules do not model: repetition, and anything they would have to guess
+RECURRING = re.compile(r"\b(?:every|each|daily|weekly|monthly|yearly|annually|birthday|anniversary)\b", re.IGNORECASE)
+DURATION = re.compile(r"\s+for\s+(?P<count>\d+|an?|one)\s*(?P<unit>minutes?|mins?|hours?|hrs?|h)$", re.IGNORECASE)
+RANGE = re.compile(rf"(?:\s+from)?\s+(?P<start>{TIME_TEXT})\s*(?:-|–|to|until|till)\s*(?P<end>{TIME_TEXT})$",
+                   re.IGNORECASE)
+HAS_TIME = re.compile(rf"{TIME_TEXT}|^in\s", re.IGNORECASE)
+TITLE_PREFIX = re.compile(r"^(?:(?:a|an|the|my)\s+)?(?:new\s+)?(?:(?:calendar\s+)?event\s+)?(?:(?:called|titled|named)\s+)?",
+                          re.IGNORECASE)
+TITLE_SUFFIX = re.compile(r"\s+(?:on|at|for|from|by)$", re.IGNORECASE)
+MAX_TITLE_WORDS = 8
+
+
+class CalendarIntentParser:
+    """
+    Deterministic extraction for well-formed calendar commands, tried
+    before the LLM:
+
+        schedule Team Sync tomorrow 10am-11am
+        add dentist on 2030-01-08 at 5pm for 30 minutes
+        delete event Team Sync on 2025-06-03
+        reschedule Team Sync on 2025-06-03 to Friday 4pm
+        what's on Tuesday afternoon
+
+    extract() returns the same event_data dict the LLM extraction does,
+    or None whenever the command is not one of these shapes or any part
+    would need a guess: no explicit date (and time, for create), a title
+    that is empty or long, repetition, or a date only dateparser could
+    read. Those go to the LLM.
+    """
+
+    def __init__(self, dates: DateParser, default_duration: timedelta = timedelta(hours=1)):
+        self.dates = dates
+        self.default_duration = default_duration
+
+    def extract(self, text: str, now: Optional[datetime] = None) -> Optional[Dict]:
+        text = " ".join(text.strip().split()).rstrip(".!?")
+        if not text or RECURRING.search(text):
+            return None
+        match = RESCHEDULE.fullmatch(text)
+        if match:
+            return self._reschedule(match["rest"], match["new"], now)
+        match = CREATE.fullmatch(text)
+        if match:
+            return self._create(match["rest"], now)
+        match = DELETE.fullmatch(text)
+        if match:
+            return self._delete(match["rest"], now)
+        if READ.fullmatch(text):
+            return self._event_data("read")
+        return None
+
+    @staticmethod
+    def _event_data(action: str, **fields) -> Dict:
+        event_data = {"action": action, "event_id": None, "title": None, "start_datetime": None,
+                      "end_datetime": None, "location": None, "description": None, "recurrence": None}
+        event_data.update(fields)
+        return event_data
+
+    @staticmethod
+    def _title(text: str) -> Optional[str]:
+        title = TITLE_SUFFIX.sub("", TITLE_PREFIX.sub("", text.strip())).strip("\"' ")
+        if not title or len(title.split()) > MAX_TITLE_WORDS:
+            return None
+        return title
+
+    def _split(self, text: str, now: Optional[datetime]) -> Optional[Tuple[str, str, datetime]]:
+        """'Team Sync on Friday 4pm' -> ('Team Sync', 'Friday 4pm', <Friday 16:00>): the longest trailing date."""
+        words = text.split()
+        for i in range(1, len(words)):
+            when = " ".join(words[i:])
+            value = self.dates.parse_strict(when, now)
+            if value is not None:
+                title = self._title(" ".join(words[:i]))
+                return (title, when, value) if title else None
+        return None
+
+    def _create(self, rest: str, now: Optional[datetime]) -> Optional[Dict]:
+        duration = self.default_duration
+        match = DURATION.search(rest)
+        if match:
+            count = int(match["count"]) if match["count"].isdigit() else 1
+            duration = timedelta(hours=count) if match["unit"].lower().startswith("h") else timedelta(minutes=count)
+            rest = rest[:match.start()]
+
+        match = RANGE.search(rest)
+        if match:
+            rest = rest[:match.start()]
+            split = self._split(rest, now)
+            title, day = (split[0], split[1]) if split else (self._title(rest), "")
+            # "tomorrow 9am from 10am to 11am" names the time twice
+            if not title or HAS_TIME.search(day):
+                return None
+            start = self.dates.parse_strict(f"{day} {match['start']}", now)
+            end = self.dates.parse_strict(f"{day} {match['end']}", now)
+        else:
+            split = self._split(rest, now)
+            if not split or not HAS_TIME.search(split[1]):
+                return None
+            title, _, start = split
+            end = start + duration
+        if start is None or end is None or end <= start:
+            return None
+        return self._event_data("create", title=title, start_datetime=start.isoformat(), end_datetime=end.isoformat())
+
+    def _delete(self, rest: str, now: Optional[datetime]) -> Optional[Dict]:
+        split = self._split(rest, now)
+        if not split:
+            return None
+        title, _, start = split
+        return self._event_data("delete", title=title, start_datetime=start.isoformat())
+
+    def _reschedule(self, rest: str, new: str, now: Optional[datetime]) -> Optional[Dict]:
+        split = self._split(rest, now)
+        moved = self.dates.parse_strict(new, now)
+        if not split or moved is None:
+            return None
+        title, _, old = split
+        # A date alone keeps the event's time of day (see _apply_update)
+        start = moved.isoformat() if HAS_TIME.search(new) else moved.date().isoformat()
+        return self._event_data("update", title=title, old_start_date=old.date().isoformat(), start_datetime=start)
@@ -0,0 +1,288 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from googleapiclient.errors import HttpError
+
+# Google's id for one instance of a series: '<series id>_<UTC start>', or '_<date>' for all-day series
+INSTANCE_ID = re.compile(r"^(?P<series>.+)_(?P<date>\d{8})(?:T(?P<time>\d{6})Z)?$")
+
+
+def _utc(when: Dict[str, str], tz: ZoneInfo) -> Optional[str]:
+    """An event's start or end as a naive UTC ISO string; all-day dates start at midnight in tz."""
+    if not when:
+        return None
+    if when.get("dateTime"):
+        value = datetime.fromisoformat(when["dateTime"])
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=ZoneInfo(when.get("timeZone") or tz.key))
+    elif when.get("date"):
+        value = datetime.fromisoformat(when["date"]).replace(tzinfo=tz)
+    else:
+        return None
+    return value.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+
+
+class CalendarMirror:
+    """
+    Local SQLite copy of one Google Calendar, kept current with incremental
+    sync: events.list with the syncToken of the previous sync returns only
+    what changed (cancelled events are deletions). A 410 Gone means the
+    token expired, and the whole calendar is fetched again.
+
+    Recurring events are stored once, as their series; a cancelled
+    instance of a series is kept as an exclusion (its series id and
+    original start), since the series itself still lists it. Reads and
+    lookups only touch the local database; sync_if_stale() refreshes it
+    when the last sync is older than max_age seconds, and the agent's own
+    writes are applied with upsert()/remove() as they happen.
+
+    Every change bumps version and records the ids it touched, so an index
+    built from the mirror can catch up with changes_since() instead of
+    rebuilding.
+    """
+
+    PAGE_SIZE = 2500
+    # Ids per "WHERE id IN (...)", under SQLite's variable limit
+    CHUNK = 500
+
+    def __init__(self, path: str, calendar_id: str = "primary", max_age: float = 60.0, tz: str = "Asia/Kolkata"):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.calendar_id = calendar_id
+        self.max_age = max_age
+        self.tz = ZoneInfo(tz)
+        self._lock = threading.Lock()
+        # Bumped on every change; _changes maps each changed id to the version that last changed it,
+        # and _reset_version is the last full resync, which changes everything
+        self.version = 0
+        self._changes: Dict[str, int] = {}
+        self._reset_version = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "id TEXT PRIMARY KEY, title TEXT NOT NULL, start TEXT, end TEXT, "
+                "recurring INTEGER NOT NULL, event TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS events_title ON events (title COLLATE NOCASE)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS events_start ON events (start)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS exclusions (id TEXT PRIMARY KEY, series TEXT NOT NULL, original TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS exclusions_series ON exclusions (series)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    # ---- sync -----------------------------------------------------------
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _row(self, event: Dict[str, Any]):
+        return (
+            event["id"], event.get("summary") or "", _utc(event.get("start"), self.tz),
+            _utc(event.get("end"), self.tz), int(bool(event.get("recurrence"))), json.dumps(event)
+        )
+
+    def _store(self, events: List[Dict[str, Any]]) -> None:
+        # A restored instance is an event again, not an exclusion
+        self._db.executemany("DELETE FROM exclusions WHERE id = ?", [(event["id"],) for event in events])
+        self._db.executemany(
+            "INSERT OR REPLACE INTO events (id, title, start, end, recurring, event) VALUES (?, ?, ?, ?, ?, ?)",
+            [self._row(event) for event in events]
+        )
+
+    def _cancel(self, events: List[Dict[str, Any]]) -> None:
+        """
+        Delete cancelled events. An instance of a series (recurringEventId
+        and originalStartTime set) becomes an exclusion; a deleted series
+        takes its exclusions with it.
+        """
+        self._db.executemany("DELETE FROM events WHERE id = ?", [(event["id"],) for event in events])
+        instances = [event for event in events if event.get("recurringEventId") and event.get("originalStartTime")]
+        self._db.executemany(
+            "INSERT OR REPLACE INTO exclusions (id, series, original) VALUES (?, ?, ?)",
+            [(event["id"], event["recurringEventId"],
+              event["originalStartTime"].get("dateTime") or event["originalStartTime"].get("date"))
+             for event in instances]
+        )
+        self._db.executemany(
+            "DELETE FROM exclusions WHERE series = ?",
+            [(event["id"],) for event in events if not event.get("recurringEventId")]
+        )
+
+    def _instance(self, event_id: str) -> Optional[Dict[str, Any]]:
+        """The cancelled-instance form of an instance id of a stored series, or None."""
+        match = INSTANCE_ID.match(event_id)
+        if not match or not self._db.execute(
+            "SELECT 1 FROM events WHERE id = ? AND recurring", (match["series"],)
+        ).fetchone():
+            return None
+        day, time_ = match["date"], match["time"]
+        date = f"{day[:4]}-{day[4:6]}-{day[6:]}"
+        original = {"dateTime": f"{date}T{time_[:2]}:{time_[2:4]}:{time_[4:]}+00:00"} if time_ else {"date": date}
+        return {"id": event_id, "recurringEventId": match["series"], "originalStartTime": original}
+
+    def _changed(self, event_ids: List[str]) -> None:
+        self.version += 1
+        for event_id in event_ids:
+            self._changes[event_id] = self.version
+
+    def _fetch(self, service, **params) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Every page of an events.list call: (items, nextSyncToken)."""
+        items, page_token = [], None
+        while True:
+            response = service.events().list(
+                calendarId=self.calendar_id, maxResults=self.PAGE_SIZE, pageToken=page_token, **params
+            ).execute()
+            items.extend(response.get("items", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return items, response.get("nextSyncToken")
+
+    def sync(self, service) -> int:
+        """Apply the changes since the last sync (all events the first time); returns how many."""
+        with self._lock:
+            token = self._meta("sync_token")
+            full = token is None
+            if not full:
+                try:
+                    items, next_token = self._fetch(service, syncToken=token, showDeleted=True)
+                except HttpError as e:
+                    if e.resp.status != 410:
+                        raise
+                    self.logger.info("Calendar sync token expired; resyncing everything")
+                    full = True
+            if full:
+                items, next_token = self._fetch(service)
+
+            with self._db:
+                if full:
+                    self._db.execute("DELETE FROM events")
+                    self._db.execute("DELETE FROM exclusions")
+                self._cancel([event for event in items if event.get("status") == "cancelled"])
+                self._store([event for event in items if event.get("status") != "cancelled"])
+                if next_token:
+                    self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('sync_token', ?)", (next_token,))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('synced_at', ?)", (str(time.time()),)
+                )
+            if full:
+                self._changes.clear()
+                self.version += 1
+                self._reset_version = self.version
+            elif items:
+                self._changed([event["id"] for event in items])
+            return len(items)
+
+    def sync_if_stale(self, service) -> bool:
+        """Sync when the last sync is older than max_age; True if it ran."""
+        with self._lock:
+            synced_at = self._meta("synced_at")
+        if synced_at is not None and time.time() - float(synced_at) < self.max_age:
+            return False
+        self.sync(service)
+        return True
+
+    # ---- writes made through the API ------------------------------------
+
+    def upsert(self, event: Dict[str, Any]) -> None:
+        self.upsert_many([event])
+
+    def upsert_many(self, events: List[Dict[str, Any]]) -> None:
+        with self._lock, self._db:
+            self._store(events)
+            self._changed([event["id"] for event in events])
+
+    def remove(self, event_id: str) -> None:
+        self.remove_many([event_id])
+
+    def remove_many(self, event_ids: List[str]) -> None:
+        with self._lock, self._db:
+            # Deleting an instance through the API cancels it, so it is excluded from its series like a synced
+            # one; an instance never stored on its own is known by its id alone
+            stored = []
+            for event_id in event_ids:
+                row = self._db.execute("SELECT event FROM events WHERE id = ?", (event_id,)).fetchone()
+                stored.append(json.loads(row[0]) if row else self._instance(event_id) or {"id": event_id})
+            self._cancel(stored)
+            self._changed(event_ids)
+
+    # ---- reads ----------------------------------------------------------
+
+    def get(self, event_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT event FROM events WHERE id = ?", (event_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_by_title(self, title: str) -> List[Dict[str, Any]]:
+        """Events whose title equals title, ignoring case, upcoming ones first."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT event FROM events WHERE title = ? COLLATE NOCASE ORDER BY end < ?, start",
+                (title, now)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def changes_since(self, version: int) -> Tuple[int, Optional[List[str]]]:
+        """
+        (current version, ids changed after version). The ids are None when
+        a full resync has happened since, which changes every event.
+        """
+        with self._lock:
+            if version < self._reset_version:
+                return self.version, None
+            if version >= self.version:
+                return self.version, []
+            return self.version, [event_id for event_id, changed in self._changes.items() if changed > version]
+
+    def _select(self, query: str, ids: Optional[List[str]]) -> List[Tuple]:
+        with self._lock:
+            if ids is None:
+                return self._db.execute(query).fetchall()
+            rows = []
+            for start in range(0, len(ids), self.CHUNK):
+                chunk = ids[start:start + self.CHUNK]
+                rows.extend(self._db.execute(f"{query} WHERE id IN ({', '.join('?' * len(chunk))})", chunk))
+            return rows
+
+    def index_rows(self, ids: Optional[List[str]] = None) -> List[Tuple]:
+        """
+        (id, title, start, end, series, recurring_event_id, original_start, busy)
+        for every event, or those of ids: series is the event JSON of
+        recurring series only, recurring_event_id and original_start are
+        set only for changed instances of a series, and busy is false for
+        all-day events and events marked free.
+        """
+        return self._select(
+            "SELECT id, title, start, end, CASE WHEN recurring THEN event END, "
+            "json_extract(event, '$.recurringEventId'), "
+            "COALESCE(json_extract(event, '$.originalStartTime.dateTime'), "
+            "json_extract(event, '$.originalStartTime.date')), "
+            "json_extract(event, '$.start.dateTime') IS NOT NULL "
+            "AND COALESCE(json_extract(event, '$.transparency'), 'opaque') != 'transparent' "
+            "FROM events", ids
+        )
+
+    def exclusions(self, ids: Optional[List[str]] = None) -> List[Tuple]:
+        """(id, series id, original start) of every cancelled instance of a series, or those of ids."""
+        return self._select("SELECT id, series, original FROM exclusions", ids)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,190 @@
+import re
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Optional, Sequence
+from zoneinfo import ZoneInfo
+
+ISO = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?(?:Z|[+-]\d{2}:?\d{2})?)?")
+
+WEEKDAYS = "monday|mon|tuesday|tues|tue|wednesday|wed|thursday|thurs|thur|thu|friday|fri|saturday|sat|sunday|sun"
+MONTHS = ("january|jan|february|feb|march|mar|april|apr|may|june|jun|july|jul|august|aug|"
+          "september|sept|sep|october|oct|november|nov|december|dec")
+DAY = (
+    r"(?P<iso_day>\d{4}-\d{2}-\d{2})"
+    r"|(?P<relative_day>today|tomorrow|day after tomorrow|yesterday)"
+    rf"|(?:(?P<which>this|next|coming)\s+)?(?P<weekday>{WEEKDAYS})"
+    rf"|(?P<month>{MONTHS})\.?\s+(?P<month_day>\d{{1,2}})(?:st|nd|rd|th)?(?:,?\s+(?P<year>\d{{4}}))?"
+    rf"|(?P<day_month>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<month2>{MONTHS})\.?(?:,?\s+(?P<year2>\d{{4}}))?"
+)
+TIME = (
+    r"(?P<named_time>noon|midnight)"
+    r"|(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<meridiem>[ap])\.?m\.?"
+    r"|(?P<hour24>\d{1,2}):(?P<minute24>\d{2})"
+)
+# "tomorrow at 5pm", "on Friday 10:30", "next Monday", "Jan 15" ... and "5pm tomorrow", "at noon on Friday"
+DAY_FIRST = re.compile(rf"(?:on\s+)?(?:{DAY})(?:,?\s+(?:at\s+)?(?:{TIME}))?")
+TIME_FIRST = re.compile(rf"(?:at\s+)?(?:{TIME})(?:,?\s+(?:on\s+)?(?:{DAY}))?")
+IN = re.compile(r"in\s+(?P<count>\d+|an?|one)\s+(?P<unit>minute|min|hour|hr|day|week)s?")
+UNITS = {"minute": "minutes", "min": "minutes", "hour": "hours", "hr": "hours", "day": "days", "week": "weeks"}
+
+
+class DateParser:
+    """
+    Layered date parsing, cheapest layer first:
+
+    1. strict ISO 8601, what the LLM is asked to return, with
+       datetime.fromisoformat;
+    2. a small compiled grammar for common phrases: "tomorrow 5pm",
+       "next Monday", "at 10:30 on Friday", "Jan 15", "2030-01-08 at
+       10am", "in 2 hours";
+    3. dateparser, limited to `languages` so it never loads every locale
+       it ships, behind an LRU cache keyed by (text, reference day, tz).
+
+    Results are aware datetimes in tz, or None. Unlike dateparser, the
+    grammar reads a weekday or a month and day as the next one to come:
+    on a Wednesday, "Monday" is five days ahead and "next Wednesday" a
+    week ahead, the way scheduling requests mean them.
+    """
+
+    def __init__(self, tz: str = "Asia/Kolkata", languages: Sequence[str] = ("en",), cache_size: int = 1024):
+        self.tz = ZoneInfo(tz)
+        self.languages = list(languages)
+        self.stats = Counter()
+        self._dateparser_cached = lru_cache(maxsize=cache_size)(self._dateparser)
+
+    def parse(self, text: Optional[str], now: Optional[datetime] = None) -> Optional[datetime]:
+        if not text or not text.strip():
+            return None
+        now = (now or datetime.now(self.tz)).astimezone(self.tz)
+        text = " ".join(text.strip().split())
+        for layer, parse in (("iso", self._iso), ("grammar", self._grammar)):
+            value = parse(text, now)
+            if value is not None:
+                self.stats[layer] += 1
+                return value
+
+        result = self._dateparser_cached(text.lower(), now.date(), self.tz.key)
+        self.stats["dateparser" if result else "unparsed"] += 1
+        if result is None:
+            return None
+        relative, value = result
+        return now + value if relative else value
+
+    def parse_strict(self, text: Optional[str], now: Optional[datetime] = None) -> Optional[datetime]:
+        """Like parse, with the ISO and grammar layers only: None rather than dateparser's guess."""
+        if not text or not text.strip():
+            return None
+        now = (now or datetime.now(self.tz)).astimezone(self.tz)
+        text = " ".join(text.strip().split())
+        return self._iso(text, now) or self._grammar(text, now)
+
+    def cache_info(self):
+        return self._dateparser_cached.cache_info()
+
+    # ---- layers ---------------------------------------------------------
+
+    def _iso(self, text: str, now: datetime) -> Optional[datetime]:
+        if not ISO.fullmatch(text):
+            return None
+        try:
+            value = datetime.fromisoformat(text)
+        except ValueError:
+            return None
+        return value.replace(tzinfo=self.tz) if value.tzinfo is None else value
+
+    def _grammar(self, text: str, now: datetime) -> Optional[datetime]:
+        text = text.lower().rstrip(".!?")
+        match = IN.fullmatch(text)
+        if match:
+            count = int(match["count"]) if match["count"].isdigit() else 1
+            return now + timedelta(**{UNITS[match["unit"]]: count})
+
+        match = DAY_FIRST.fullmatch(text) or TIME_FIRST.fullmatch(text)
+        if not match:
+            return None
+        groups = match.groupdict()
+        day = self._day(groups, now.date())
+        clock = self._time(groups)
+        named_day = any(groups[key] for key in ("iso_day", "relative_day", "weekday", "month", "month2"))
+        named_time = any(groups[key] for key in ("named_time", "hour", "hour24"))
+        # A day or time that matched but does not exist ("Feb 30", "13pm") fails the whole text
+        if (named_day and day is None) or (named_time and clock is None):
+            return None
+        if clock is None:
+            # Like dateparser: "tomorrow" keeps the current time, a named day starts at midnight
+            clock = now.time().replace(tzinfo=None) if groups["relative_day"] else time()
+        return datetime.combine(day or now.date(), clock, tzinfo=self.tz)
+
+    @staticmethod
+    def _day(groups: dict, today: date) -> Optional[date]:
+        if groups.get("iso_day"):
+            try:
+                return date.fromisoformat(groups["iso_day"])
+            except ValueError:
+                return None
+        if groups.get("relative_day"):
+            return today + timedelta(days={"today": 0, "tomorrow": 1, "day after tomorrow": 2,
+                                           "yesterday": -1}[groups["relative_day"]])
+        if groups.get("weekday"):
+            ahead = (_weekday_number(groups["weekday"]) - today.weekday()) % 7
+            if groups["which"] == "next" and ahead == 0:
+                ahead = 7
+            return today + timedelta(days=ahead)
+        month = groups.get("month") or groups.get("month2")
+        if month:
+            day = int(groups.get("month_day") or groups.get("day_month"))
+            year = groups.get("year") or groups.get("year2")
+            try:
+                value = date(int(year) if year else today.year, _month_number(month), day)
+                if not year and value < today:
+                    value = value.replace(year=today.year + 1)
+            except ValueError:
+                return None
+            return value
+        return None
+
+    @staticmethod
+    def _time(groups: dict) -> Optional[time]:
+        if groups.get("named_time"):
+            return time(12) if groups["named_time"] == "noon" else time(0)
+        if groups.get("hour"):
+            hour, minute = int(groups["hour"]), int(groups["minute"] or 0)
+            if not 1 <= hour <= 12 or minute > 59:
+                return None
+            return time(hour % 12 + (12 if groups["meridiem"] == "p" else 0), minute)
+        if groups.get("hour24"):
+            hour, minute = int(groups["hour24"]), int(groups["minute24"])
+            return time(hour, minute) if hour < 24 and minute < 60 else None
+        return None
+
+    # ---- dateparser -----------------------------------------------------
+
+    def _dateparser(self, text: str, day: date, tz: str):
+        """
+        dateparser's reading of text on day, as (relative, value): relative
+        results ("in 3 days", "next week") are an offset from now, the rest
+        a datetime. Parsing against two reference times that differ by a
+        minute tells them apart, so one cache entry serves the whole day.
+        """
+        # Imported on first use: the ISO and grammar layers never need it
+        import dateparser
+
+        midnight = datetime.combine(day, time())
+        settings = {"TIMEZONE": tz, "RETURN_AS_TIMEZONE_AWARE": True, "RELATIVE_BASE": midnight}
+        first = dateparser.parse(text, languages=self.languages, settings=settings)
+        if first is None:
+            return None
+        settings["RELATIVE_BASE"] = midnight + timedelta(minutes=1)
+        second = dateparser.parse(text, languages=self.languages, settings=settings)
+        if second is not None and second - first == timedelta(minutes=1):
+            return True, first - midnight.replace(tzinfo=ZoneInfo(tz))
+        return False, first
+
+
+def _weekday_number(name: str) -> int:
+    return ["mon", "tue", "wed", "thu", "fri", "sat", "sun"].index(name[:3])
+
+
+def _month_number(name: str) -> int:
+    return ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"].index(name[:3]) + 1
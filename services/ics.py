@@ -0,0 +1,133 @@
+import hashlib
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+DURATION = re.compile(r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+def _unfold(text: str) -> List[str]:
+    """Content lines, with folded continuation lines (leading space or tab) joined back."""
+    lines: List[str] = []
+    for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        if line[:1] in (" ", "\t") and lines:
+            lines[-1] += line[1:]
+        elif line:
+            lines.append(line)
+    return lines
+
+
+def _split(line: str) -> Tuple[str, Dict[str, str], str]:
+    """'DTSTART;TZID=Asia/Kolkata:20300107T093000' -> ('DTSTART', {'TZID': 'Asia/Kolkata'}, '20300107T093000')."""
+    quoted, head_end = False, len(line)
+    for i, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ":" and not quoted:
+            head_end = i
+            break
+    name, *params = line[:head_end].split(";")
+    parameters = {}
+    for param in params:
+        key, _, value = param.partition("=")
+        parameters[key.upper()] = value.strip('"')
+    return name.upper(), parameters, line[head_end + 1:]
+
+
+def _text(value: str) -> str:
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def _when(value: str, params: Dict[str, str], tz: str) -> Dict[str, str]:
+    """A DTSTART/DTEND value as a Calendar API start/end."""
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return {"date": datetime.strptime(value, "%Y%m%d").date().isoformat()}
+    moment = datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        return {"dateTime": moment.isoformat() + "Z"}
+    # Local times are wall-clock times in their TZID, or floating (the user's zone)
+    return {"dateTime": moment.isoformat(), "timeZone": params.get("TZID") or tz}
+
+
+def _duration(value: str) -> Optional[timedelta]:
+    match = DURATION.match(value.strip())
+    if not match:
+        return None
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    delta = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                      minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -delta if sign == "-" else delta
+
+
+def _plus(start: Dict[str, str], delta: timedelta) -> Dict[str, str]:
+    if "date" in start:
+        return {"date": (date.fromisoformat(start["date"]) + delta).isoformat()}
+    value = start["dateTime"]
+    moment = datetime.fromisoformat(value.rstrip("Z")) + delta
+    return {**start, "dateTime": moment.isoformat() + ("Z" if value.endswith("Z") else "")}
+
+
+def parse_ics(text: str, tz: str = "Asia/Kolkata") -> List[Dict[str, Any]]:
+    """
+    The VEVENTs of an iCalendar (RFC 5545) file as Calendar API event
+    bodies for events.import: UID becomes iCalUID, so importing the same
+    file twice updates the events instead of duplicating them.
+
+    RRULE/RDATE/EXDATE lines are passed through as the recurrence.
+    Cancelled events and modified instances of a series (RECURRENCE-ID)
+    are skipped, as are nested components such as VALARM.
+    """
+    events = []
+    stack: List[str] = []
+    props: List[Tuple[str, Dict[str, str], str]] = []
+    for line in _unfold(text):
+        name, params, value = _split(line)
+        if name == "BEGIN":
+            stack.append(value.upper())
+            if stack == ["VCALENDAR", "VEVENT"] or stack == ["VEVENT"]:
+                props = []
+        elif name == "END":
+            if stack and stack[-1] == "VEVENT" and len(stack) <= 2:
+                event = _event(props, tz)
+                if event:
+                    events.append(event)
+            if stack:
+                stack.pop()
+        elif stack and stack[-1] == "VEVENT":
+            props.append((name, params, value))
+    return events
+
+
+def _event(props: List[Tuple[str, Dict[str, str], str]], tz: str) -> Optional[Dict[str, Any]]:
+    fields = {name: (params, value) for name, params, value in props}
+    if "DTSTART" not in fields or "RECURRENCE-ID" in fields:
+        return None
+    if fields.get("STATUS", ({}, ""))[1].upper() == "CANCELLED":
+        return None
+
+    start = _when(fields["DTSTART"][1], fields["DTSTART"][0], tz)
+    if "DTEND" in fields:
+        end = _when(fields["DTEND"][1], fields["DTEND"][0], tz)
+    elif "DURATION" in fields and _duration(fields["DURATION"][1]) is not None:
+        end = _plus(start, _duration(fields["DURATION"][1]))
+    else:
+        # RFC 5545: a date lasts the day, a date-time without an end is an instant
+        end = _plus(start, timedelta(days=1) if "date" in start else timedelta())
+
+    event: Dict[str, Any] = {"summary": _text(fields.get("SUMMARY", ({}, ""))[1]) or "Untitled Event",
+                             "start": start, "end": end}
+    # events.import needs a UID; derive a stable one for files that leave it out
+    event["iCalUID"] = fields["UID"][1] if "UID" in fields else hashlib.sha1(
+        repr(props).encode("utf-8")).hexdigest() + "@promptpilot"
+    for name, key in (("DESCRIPTION", "description"), ("LOCATION", "location")):
+        if name in fields:
+            event[key] = _text(fields[name][1])
+    if fields.get("TRANSP", ({}, ""))[1].upper() == "TRANSPARENT":
+        event["transparency"] = "transparent"
+    recurrence = [
+        name + "".join(f";{key}={value}" for key, value in params.items()) + ":" + value
+        for name, params, value in props if name in ("RRULE", "RDATE", "EXDATE")
+    ]
+    if recurrence:
+        event["recurrence"] = recurrence
+    return event
@@ -0,0 +1,51 @@
+import unittest
+
+from core.agent_router import AgentRouter, KeywordMatcher
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    def test_reports_highest_priority_group(self):
+        matcher = KeywordMatcher([["note"], ["mail"], ["on"]])
+        self.assertEqual(matcher.best_match("mail me on monday, note it"), 0)
+        self.assertEqual(matcher.best_match("mail me on monday"), 1)
+        self.assertEqual(matcher.best_match("on monday"), 2)
+        self.assertEqual(matcher.best_match("hello"), matcher.no_match)
+
+    def test_overlapping_keywords_are_found(self):
+        matcher = KeywordMatcher([["she"], ["hers"], ["his"]])
+        self.assertEqual(matcher.best_match("ushers"), 0)
+        self.assertEqual(matcher.best_match("uhers"), 1)
+
+
+class TestAgentRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = AgentRouter()
+        for key in ["note_taker", "email", "code", "web_search", "file_analyzer", "calendar", "default"]:
+            self.router.register_agent(key, key)
+
+    def test_precedence(self):
+        cases = {
+            "take a note: send email to bob": "note_taker",
+            "send an email to raj@example.com regarding the demo": "email",
+            "write python code for a to-do app": "code",
+            "debug my script, the code crashes": "code",
+            "search for best practices in prompt engineering": "web_search",
+            "analyze this pdf": "file_analyzer",
+            "schedule a call with Sam next Thursday at 3 PM": "calendar",
+            "hey": "default",
+        }
+        for prompt, expected in cases.items():
+            with self.subTest(prompt=prompt):
+                self.assertEqual(self.router.route(prompt), expected)
+
+    def test_substring_semantics_are_preserved(self):
+        # "at" inside "what" still routes to calendar, as before.
+        self.assertEqual(self.router.route("what"), "calendar")
+
+    def test_unregistered_agent_returns_none(self):
+        router = AgentRouter()
+        self.assertIsNone(router.route("take a note"))
+
+
+if __name__ == "__main__":
+    unittest.main()
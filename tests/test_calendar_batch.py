@@ -0,0 +1,181 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import core  # noqa: F401  (agents import core first)
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+from agents.calendar_agent import CalendarAgent
+from benchmarks.bench_calendar_batch import FakeCalendarHttp, synthetic_events
+from services.calendar_batch import CalendarBatch
+from services.calendar_mirror import CalendarMirror
+from services.ics import parse_ics
+
+ICS = """BEGIN:VCALENDAR\r
+VERSION:2.0\r
+BEGIN:VEVENT\r
+UID:algebra@example.edu\r
+SUMMARY:Linear algebra\\, lecture\r
+DESCRIPTION:Room 4\\nBring the proble\r
+ m sheet\r
+DTSTART;TZID=Asia/Kolkata:20300107T093000\r
+DURATION:PT1H30M\r
+RRULE:FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20300501T000000Z\r
+EXDATE;TZID=Asia/Kolkata:20300114T093000\r
+BEGIN:VALARM\r
+TRIGGER:-PT15M\r
+DESCRIPTION:Reminder\r
+END:VALARM\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:exam@example.edu\r
+SUMMARY:Exam week\r
+DTSTART;VALUE=DATE:20300506\r
+DTEND;VALUE=DATE:20300511\r
+TRANSP:TRANSPARENT\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:algebra@example.edu\r
+RECURRENCE-ID;TZID=Asia/Kolkata:20300109T093000\r
+SUMMARY:Linear algebra (moved)\r
+DTSTART;TZID=Asia/Kolkata:20300110T093000\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+SUMMARY:Call\r
+DTSTART:20300108T120000Z\r
+STATUS:CANCELLED\r
+END:VEVENT\r
+END:VCALENDAR\r
+"""
+
+
+class TestParseIcs(unittest.TestCase):
+    def test_events(self):
+        lecture, exam = parse_ics(ICS)
+        self.assertEqual(lecture["iCalUID"], "algebra@example.edu")
+        self.assertEqual(lecture["summary"], "Linear algebra, lecture")
+        self.assertEqual(lecture["description"], "Room 4\nBring the problem sheet")
+        self.assertEqual(lecture["start"], {"dateTime": "2030-01-07T09:30:00", "timeZone": "Asia/Kolkata"})
+        self.assertEqual(lecture["end"], {"dateTime": "2030-01-07T11:00:00", "timeZone": "Asia/Kolkata"})
+        self.assertEqual(lecture["recurrence"], [
+            "RRULE:FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20300501T000000Z",
+            "EXDATE;TZID=Asia/Kolkata:20300114T093000",
+        ])
+        self.assertEqual((exam["start"], exam["end"]), ({"date": "2030-05-06"}, {"date": "2030-05-11"}))
+        self.assertEqual(exam["transparency"], "transparent")
+
+    def test_missing_uid_is_stable(self):
+        text = "BEGIN:VEVENT\nSUMMARY:Call\nDTSTART:20300108T120000Z\nEND:VEVENT\n"
+        event, = parse_ics(text)
+        self.assertEqual(event["end"], {"dateTime": "2030-01-08T12:00:00Z"})
+        self.assertEqual(event["iCalUID"], parse_ics(text)[0]["iCalUID"])
+
+
+class TestCalendarBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.http = FakeCalendarHttp()
+        self.agent = CalendarAgent(llm=None, mirror=CalendarMirror(os.path.join(self.tmpdir.name, "calendar.sqlite3")))
+        self.agent.service = build("calendar", "v3", http=self.http, static_discovery=True)
+        self.agent.authenticated = True
+        self.mirror = self.agent.mirror
+        # Pretend the mirror just synced, so reads do not call events.list on the fake
+        self.mirror.max_age = float("inf")
+        self.mirror._db.execute("INSERT INTO meta (key, value) VALUES ('synced_at', '0')")
+
+    def tearDown(self):
+        self.mirror.close()
+        self.tmpdir.cleanup()
+
+    def test_throttled_calls_are_retried(self):
+        self.http.rate_limited = 3
+        delays = []
+        batch = CalendarBatch(self.agent.service, chunk_size=4, backoff=0.5, sleep=delays.append)
+        events = self.agent.service.events()
+        results = batch.execute([events.insert(calendarId="primary", body={"summary": f"e{i}"}) for i in range(6)])
+        self.assertEqual([result["summary"] for result in results], [f"e{i}" for i in range(6)])
+        # Two chunks, then one retry batch for the three throttled calls
+        self.assertEqual(batch.round_trips, 3)
+        self.assertEqual(len(delays), 1)
+        self.assertTrue(0.5 <= delays[0] <= 1.0)
+
+    def test_retries_give_up(self):
+        self.http.rate_limited = 100
+        batch = CalendarBatch(self.agent.service, max_retries=2, sleep=lambda seconds: None)
+        result, = batch.execute([self.agent.service.events().insert(calendarId="primary", body={})])
+        self.assertIsInstance(result, HttpError)
+        self.assertEqual(batch.round_trips, 3)
+
+    def test_bulk_create_update_delete(self):
+        created, errors = self.agent.create_events(synthetic_events(60))
+        self.assertEqual((len(created), errors), (60, []))
+        self.assertEqual(self.http.round_trips, 2)
+        self.assertEqual(len(self.mirror), 60)
+
+        ids = [event["id"] for event in created]
+        self.mirror.remove(ids[1])  # not mirrored: fetched in a batch of its own
+        updated, errors = self.agent.update_events([(ids[0], {"title": "Moved"}), (ids[1], {"title": "Moved too"}),
+                                                    ("nope", {"title": "Missing"})])
+        self.assertEqual([event["summary"] for event in updated], ["Moved", "Moved too"])
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(self.mirror.get(ids[1])["summary"], "Moved too")
+
+        del self.http.events[ids[2]]  # deleted elsewhere: still counts as deleted
+        deleted, errors = self.agent.delete_events(ids)
+        self.assertEqual((len(deleted), errors), (60, []))
+        self.assertEqual(len(self.mirror), 0)
+
+    def test_commands(self):
+        path = os.path.join(self.tmpdir.name, "timetable.ics")
+        with open(path, "w", encoding="utf-8") as ics_file:
+            ics_file.write(ICS)
+        self.assertEqual(self.agent.process(f"import {path}"), "📥 Imported 2 events.")
+        self.assertEqual(self.agent.process("import missing.ics"), "❗ Could not find missing.ics.")
+
+        self.agent.create_events(synthetic_events(3))
+        response = self.agent.process("delete all events on 2030-01-06")
+        self.assertTrue(response.startswith("⚠️ This will delete 3 events:"))
+        self.assertEqual(len(self.http.events), 5)
+        self.assertEqual(self.agent.process("yes, delete these events"), "🗑️ Deleted 3 events.")
+        self.assertEqual(len(self.http.events), 2)
+        self.assertIn(
+            "Left 1 recurring series alone",
+            self.agent.process("clear my calendar on 2030-01-07")
+        )
+
+        # Anything but a confirmation drops the pending delete
+        self.agent.create_events(synthetic_events(2))
+        self.assertTrue(self.agent.process("clear my calendar on 2030-01-06").startswith("⚠️"))
+        self.agent.process("what's on 2030-01-06")
+        self.assertIsNone(self.agent.pending_deletion)
+        self.assertEqual(len(self.http.events), 4)
+
+        # Agreeing to something else is not a confirmation
+        self.assertTrue(self.agent.process("clear my calendar on 2030-01-06").startswith("⚠️"))
+        self.assertFalse(self.agent.process("sure, schedule lunch tomorrow at 1pm").startswith("🗑️"))
+        self.assertIsNone(self.agent.pending_deletion)
+        self.assertEqual(len(self.http.events), 4)
+
+    def test_single_event_requests_are_not_bulk_deletes(self):
+        tomorrow = (datetime.now(ZoneInfo("Asia/Kolkata")) + timedelta(days=1)).replace(hour=9, minute=0, second=0,
+                                                                                      microsecond=0)
+        self.agent.create_events([
+            {"title": title, "start_datetime": (tomorrow + timedelta(hours=i)).isoformat(),
+             "end_datetime": (tomorrow + timedelta(hours=i, minutes=30)).isoformat()}
+            for i, title in enumerate(["Dentist appointment", "All-hands meeting", "Lunch"])
+        ])
+        for text in ["Remove the dentist appointment from my calendar tomorrow",
+                     "cancel the all-hands meeting tomorrow",
+                     "delete every other standup from my calendar"]:
+            with self.subTest(text=text):
+                self.assertIsNone(self.agent._bulk_command(text))
+        self.assertEqual(self.agent.process("cancel the all-hands meeting tomorrow"), "🗑️ Event deleted.")
+        self.assertEqual(sorted(event["summary"] for event in self.http.events.values()),
+                         ["Dentist appointment", "Lunch"])
+
+
+if __name__ == "__main__":
+    unittest.main()
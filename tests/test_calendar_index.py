@@ -0,0 +1,227 @@
+import os
+import random
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import core  # noqa: F401  (agents import core first)
+
+from agents.calendar_agent import CalendarAgent
+from services.calendar_index import CalendarIndex, normalize_title
+from services.calendar_mirror import CalendarMirror
+from test_calendar_mirror import calendar_service, event, ok
+
+IST = ZoneInfo("Asia/Kolkata")
+
+STANDUP = {
+    "id": "standup", "summary": "Standup",
+    "start": {"dateTime": "2030-01-07T09:30:00+05:30", "timeZone": "Asia/Kolkata"},
+    "end": {"dateTime": "2030-01-07T09:45:00+05:30", "timeZone": "Asia/Kolkata"},
+    "recurrence": ["RRULE:FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"],
+}
+MOVED_STANDUP = {
+    **event("standup_moved", "Standup", "2030-01-09T10:30:00+05:30", "2030-01-09T10:45:00+05:30"),
+    "recurringEventId": "standup", "originalStartTime": {"dateTime": "2030-01-09T09:30:00+05:30"},
+}
+HOLIDAY = {"id": "holiday", "summary": "Holiday", "start": {"date": "2030-01-08"}, "end": {"date": "2030-01-09"}}
+
+
+def ist(*args):
+    return datetime(*args, tzinfo=IST)
+
+
+class TestCalendarIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.mirror = CalendarMirror(os.path.join(self.tmpdir.name, "calendar.sqlite3"))
+        for item in [
+            STANDUP, MOVED_STANDUP, HOLIDAY,
+            event("dentist", "Dentist", "2030-01-08T15:00:00+05:30", "2030-01-08T16:00:00+05:30"),
+            event("offsite", "Team offsite", "2030-01-06T09:00:00+05:30", "2030-01-10T18:00:00+05:30"),
+        ]:
+            self.mirror.upsert(item)
+        self.index = CalendarIndex.from_mirror(self.mirror)
+
+    def tearDown(self):
+        self.mirror.close()
+        self.tmpdir.cleanup()
+
+    def ids(self, occurrences):
+        return [event_id for _, _, event_id in occurrences]
+
+    def test_overlapping_expands_series_and_skips_moved_instances(self):
+        day = self.index.overlapping(ist(2030, 1, 9), ist(2030, 1, 10))
+        self.assertEqual(self.ids(day), ["offsite", "standup_moved"])
+        morning = self.index.overlapping(ist(2030, 1, 8, 6), ist(2030, 1, 8, 12))
+        self.assertEqual(self.ids(morning), ["offsite", "holiday", "standup"])
+        self.assertEqual(morning[2][0], ist(2030, 1, 8, 9, 30))
+        # Years later, only the series is still going
+        self.assertEqual(self.ids(self.index.overlapping(ist(2034, 3, 6), ist(2034, 3, 7))), ["standup"])
+
+    def test_conflicts_ignore_all_day_events(self):
+        conflicts = self.index.conflicts(ist(2030, 1, 8, 15, 30), ist(2030, 1, 8, 17))
+        self.assertEqual(self.ids(conflicts), ["offsite", "dentist"])
+        self.assertEqual(self.ids(self.index.conflicts(ist(2030, 1, 8, 15, 30), ist(2030, 1, 8, 17), "offsite")),
+                         ["dentist"])
+        self.assertEqual(self.index.conflicts(ist(2030, 1, 12, 9), ist(2030, 1, 12, 10)), [])
+
+    def test_matches_a_linear_scan(self):
+        rng = random.Random(3)
+        origin = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        spans = []
+        for i in range(2000):
+            start = origin + timedelta(minutes=rng.randrange(0, 60 * 24 * 365))
+            spans.append((f"e{i}", start, start + timedelta(minutes=rng.choice([0, 15, 30, 60, 240, 60 * 24 * 3]))))
+        rows = [
+            (id_, id_, start.replace(tzinfo=None).isoformat(), end.replace(tzinfo=None).isoformat(), None, None, None, 1)
+            for id_, start, end in spans
+        ]
+        index = CalendarIndex(rows)
+        for _ in range(100):
+            a = origin + timedelta(minutes=rng.randrange(0, 60 * 24 * 365))
+            b = a + timedelta(minutes=rng.randrange(1, 60 * 24))
+            expected = {id_ for id_, start, end in spans if start < b and max(end, start + timedelta(seconds=1)) > a}
+            self.assertEqual(set(self.ids(index.overlapping(a, b))), expected)
+
+    def test_changes_applied_in_place_match_a_rebuild(self):
+        rng = random.Random(5)
+        self.index.COMPACT_AT = 8
+        window = (ist(2030, 1, 1), ist(2030, 3, 1))
+        for step in range(40):
+            event_id = f"e{rng.randrange(12)}"
+            if rng.random() < 0.3:
+                self.mirror.remove(event_id)
+            elif rng.random() < 0.2:
+                self.mirror.upsert({**STANDUP, "id": event_id, "summary": f"Series {step}",
+                                    "recurrence": ["RRULE:FREQ=DAILY;COUNT=5"]})
+            else:
+                start = ist(2030, 1, 1) + timedelta(hours=rng.randrange(24 * 50))
+                self.mirror.upsert(event(event_id, f"Event {step}", start.isoformat(),
+                                         (start + timedelta(minutes=rng.choice([15, 60, 600]))).isoformat()))
+            self.assertTrue(self.index.catch_up(self.mirror))
+            rebuilt = CalendarIndex.from_mirror(self.mirror)
+            self.assertEqual(self.index.overlapping(*window), rebuilt.overlapping(*window))
+            self.assertEqual(len(self.index), len(rebuilt))
+        self.assertEqual(self.index.find_title(f"Event {step}"), rebuilt.find_title(f"Event {step}"))
+
+    def test_deleted_moved_instance_leaves_its_slot_empty(self):
+        # Deleting an instance cancels it: neither the moved time nor the original one has the standup
+        self.mirror.remove("standup_moved")
+        self.assertTrue(self.index.catch_up(self.mirror))
+        day = (ist(2030, 1, 9), ist(2030, 1, 10))
+        self.assertEqual(self.ids(self.index.overlapping(*day)), ["offsite"])
+        self.assertEqual(self.ids(CalendarIndex.from_mirror(self.mirror).overlapping(*day)), ["offsite"])
+
+    def test_next_start(self):
+        self.assertEqual(self.index.next_start("dentist", ist(2030, 1, 8, 15, 30)), ist(2030, 1, 8, 15))
+        self.assertIsNone(self.index.next_start("dentist", ist(2030, 1, 8, 16)))
+        # The moved Wednesday instance is not the series' own
+        self.assertEqual(self.index.next_start("standup", ist(2030, 1, 8, 10)), ist(2030, 1, 10, 9, 30))
+        self.assertEqual(self.index.by_next_occurrence(["standup", "dentist", "holiday"], ist(2030, 1, 8, 12)),
+                         ["holiday", "dentist", "standup"])
+        # Events that are over come last, in the order given
+        self.assertEqual(self.index.by_next_occurrence(["dentist", "holiday", "standup"], ist(2030, 1, 9)),
+                         ["standup", "dentist", "holiday"])
+
+    def test_title_lookup(self):
+        self.assertEqual(normalize_title("  Team Off-site! "), "team off site")
+        self.assertEqual(self.index.find_title("STANDUP"), ["standup", "standup_moved"])
+        self.assertEqual(self.index.find_title("dentst"), ["dentist"])
+        self.assertEqual(self.index.find_title("team ofsite"), ["offsite"])
+        self.assertEqual(self.index.find_title("budget review"), [])
+
+
+class TestCalendarAgentIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.mirror = CalendarMirror(os.path.join(self.tmpdir.name, "calendar.sqlite3"))
+        self.agent = CalendarAgent(llm=None, mirror=self.mirror)
+        self.agent.authenticated = True
+
+    def tearDown(self):
+        self.mirror.close()
+        self.tmpdir.cleanup()
+
+    def test_read_windows(self):
+        now = ist(2030, 1, 8, 14)  # a Tuesday
+        self.assertEqual(CalendarAgent._read_window("what's on tuesday afternoon", now),
+                         (ist(2030, 1, 8, 12), ist(2030, 1, 8, 17)))
+        self.assertEqual(CalendarAgent._read_window("meetings on Monday", now), (ist(2030, 1, 14), ist(2030, 1, 15)))
+        self.assertEqual(CalendarAgent._read_window("anything next week?", now), (ist(2030, 1, 14), ist(2030, 1, 21)))
+        self.assertEqual(CalendarAgent._read_window("plans for 2030-02-01 evening", now),
+                         (ist(2030, 2, 1, 17), ist(2030, 2, 1, 21)))
+        self.assertIsNone(CalendarAgent._read_window("show my events", now))
+
+    def test_lookups_and_conflicts_use_the_index(self):
+        self.agent.service, http = calendar_service([
+            ok({"items": [STANDUP, MOVED_STANDUP, HOLIDAY], "nextSyncToken": "t1"}),
+        ])
+        # An occurrence of a series is found as that one instance
+        self.assertEqual(self.agent.find_event_id("standup", "2030-01-10T09:30:00"), "standup_20300110T040000Z")
+        self.assertEqual(self.agent.find_event_id("STANDUP!", "2030-01-09"), "standup_moved")
+        self.assertIsNone(self.agent.find_event_id("standup", "2030-01-12"))
+        # Similar titles are for reads only
+        self.assertIsNone(self.agent.find_event_id("stand-up", "2030-01-09"))
+        self.assertEqual(self.agent.find_event_id("stand-up", "2030-01-09", fuzzy=True), "standup_moved")
+
+        conflicts = self.agent.find_conflicts(ist(2030, 1, 8, 9), ist(2030, 1, 8, 10))
+        self.assertEqual([e["start"]["dateTime"] for e in conflicts], ["2030-01-08T09:30:00+05:30"])
+        self.assertEqual([e["id"] for e in self.agent.events_between(ist(2030, 1, 8), ist(2030, 1, 9))],
+                         ["holiday", "standup"])
+        self.assertEqual(len(http.requests), 1)
+
+        index = self.agent._index
+        self.mirror.upsert(event("review", "Review", "2030-01-08T09:00:00+05:30", "2030-01-08T10:00:00+05:30"))
+        self.assertEqual(len(self.agent.find_conflicts(ist(2030, 1, 8, 9), ist(2030, 1, 8, 10))), 2)
+        # Caught up in place, not rebuilt
+        self.assertIs(self.agent._index, index)
+
+    def test_title_without_a_date_finds_the_next_occurrence(self):
+        self.agent.service, _ = calendar_service([ok({"items": [
+            event("standup_2020", "Standup", "2020-01-01T09:30:00+05:30", "2020-01-01T09:45:00+05:30"),
+            event("standup_2030", "Standup", "2030-01-01T09:30:00+05:30", "2030-01-01T09:45:00+05:30"),
+            event("standup_2029", "standup", "2029-01-01T09:30:00+05:30", "2029-01-01T09:45:00+05:30"),
+        ], "nextSyncToken": "t1"})])
+        self.assertEqual(self.agent.find_event_id("Standup"), "standup_2029")
+        self.assertEqual(self.agent.find_event_id("Standup", "2020-01-01"), "standup_2020")
+
+    def test_deleting_one_occurrence_keeps_the_series(self):
+        self.agent.service, http = calendar_service([
+            ok({"items": [STANDUP, HOLIDAY], "nextSyncToken": "t1"}),
+            ({"status": "204"}, ""),
+        ])
+        event_id = self.agent.find_event_id("Standup", "2030-01-08")
+        self.assertEqual(event_id, "standup_20300108T040000Z")
+        self.agent.delete_event(event_id)
+        self.assertEqual(http.requests[1][0], "DELETE")
+        self.assertTrue(http.requests[1][2].endswith("/events/standup_20300108T040000Z"))
+
+        self.assertEqual([e["id"] for e in self.agent.events_between(ist(2030, 1, 8), ist(2030, 1, 9))], ["holiday"])
+        self.assertEqual([e["id"] for e in self.agent.events_between(ist(2030, 1, 9), ist(2030, 1, 10))], ["standup"])
+        self.assertEqual(CalendarIndex.from_mirror(self.mirror).overlapping(ist(2030, 1, 8), ist(2030, 1, 9))[0][2],
+                         "holiday")
+        self.assertEqual(len(http.requests), 2)
+
+    def test_sync_records_cancelled_instances(self):
+        cancelled = {"id": "standup_20300108T040000Z", "status": "cancelled", "recurringEventId": "standup",
+                     "originalStartTime": {"dateTime": "2030-01-08T09:30:00+05:30"}}
+        self.agent.service, http = calendar_service([
+            ok({"items": [STANDUP, HOLIDAY], "nextSyncToken": "t1"}),
+            ok({"items": [cancelled], "nextSyncToken": "t2"}),
+            ok({"items": [{"id": "standup", "status": "cancelled"}], "nextSyncToken": "t3"}),
+        ])
+        day = (ist(2030, 1, 8), ist(2030, 1, 9))
+        self.assertEqual([e["id"] for e in self.agent.events_between(*day)], ["holiday", "standup"])
+        self.mirror.sync(self.agent.service)
+        self.assertEqual([e["id"] for e in self.agent.events_between(*day)], ["holiday"])
+        self.assertEqual(self.agent.find_conflicts(ist(2030, 1, 8, 9), ist(2030, 1, 8, 10)), [])
+        self.assertEqual(len(self.mirror.exclusions()), 1)
+
+        # Deleting the series drops its exclusions
+        self.mirror.sync(self.agent.service)
+        self.assertEqual(self.mirror.exclusions(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
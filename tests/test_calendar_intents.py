@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import core  # noqa: F401  (agents import core first)
+from langchain_community.llms.fake import FakeListLLM
+
+from agents.calendar_agent import CalendarAgent
+from services.calendar_intents import CalendarIntentParser
+from services.calendar_mirror import CalendarMirror
+from services.date_parser import DateParser
+from test_calendar_mirror import calendar_service, event, ok
+
+NOW = datetime(2030, 1, 9, 14, 23, tzinfo=ZoneInfo("Asia/Kolkata"))  # a Wednesday
+
+
+class TestCalendarIntentParser(unittest.TestCase):
+    def setUp(self):
+        self.parser = CalendarIntentParser(DateParser())
+
+    def extract(self, text):
+        return self.parser.extract(text, NOW)
+
+    def test_create(self):
+        event = self.extract("Schedule Team Sync tomorrow 10am-11am")
+        self.assertEqual((event["action"], event["title"]), ("create", "Team Sync"))
+        self.assertEqual((event["start_datetime"], event["end_datetime"]),
+                         ("2030-01-10T10:00:00+05:30", "2030-01-10T11:00:00+05:30"))
+        self.assertIsNone(event["recurrence"])
+
+        event = self.extract('create an event called "Design review" on 2030-01-14 at 3:30pm for 30 minutes')
+        self.assertEqual(event["title"], "Design review")
+        self.assertEqual(event["end_datetime"], "2030-01-14T16:00:00+05:30")
+
+    def test_delete_and_reschedule(self):
+        event = self.extract("delete event Team Sync on 2025-06-03")
+        self.assertEqual((event["action"], event["title"], event["start_datetime"][:10]),
+                         ("delete", "Team Sync", "2025-06-03"))
+
+        event = self.extract("move Trip to Goa on jan 20 to jan 22")
+        self.assertEqual((event["action"], event["title"], event["old_start_date"], event["start_datetime"]),
+                         ("update", "Trip to Goa", "2030-01-20", "2030-01-22"))
+        event = self.extract("reschedule Team Sync on 2030-01-10 to Friday 4pm")
+        self.assertEqual(event["start_datetime"], "2030-01-11T16:00:00+05:30")
+
+    def test_read(self):
+        self.assertEqual(self.extract("what's on Tuesday afternoon?")["action"], "read")
+
+    def test_ambiguous_commands_go_to_the_llm(self):
+        for text in [
+            "schedule a meeting with Bob",                             # no date
+            "book flight to delhi tomorrow",                           # no time for a new event
+            "schedule standup every day at 9am",                       # repetition
+            "add mom's birthday on may 5",                             # yearly, per the prompt
+            "schedule call with bob tomorrow at 5pm in the office",    # trailing location
+            "reschedule Team Sync to Friday",                          # which Team Sync?
+            "delete Team Sync the week after next",                    # only dateparser reads this
+            "remind me to call mom tomorrow 6pm",
+        ]:
+            with self.subTest(text=text):
+                self.assertIsNone(self.extract(text))
+
+
+class TestCalendarAgentExtraction(unittest.TestCase):
+    def test_llm_only_for_what_the_rules_leave(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            lunch = '{"action": "create", "title": "Lunch", "start_datetime": "2030-01-10T13:00:00+05:30"}'
+            llm = FakeListLLM(responses=[lunch, lunch])
+            agent = CalendarAgent(llm=llm, mirror=CalendarMirror(os.path.join(tmp, "calendar.sqlite3")))
+            event = agent.extract_event_details("delete event Team Sync on 2030-01-08")
+            self.assertEqual(event["title"], "Team Sync")
+            self.assertEqual(llm.i, 0)
+
+            event = agent.extract_event_details("lunch with the team, tomorrow around one")
+            self.assertEqual(event["end_datetime"], "2030-01-10T14:00:00+05:30")
+            self.assertEqual(llm.i, 1)
+            self.assertEqual(agent.extraction_stats, {"rules": 1, "llm": 1})
+            agent.mirror.close()
+
+    def test_delete_without_a_date_takes_the_next_occurrence(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            llm = FakeListLLM(responses=['{"action": "delete", "title": "Standup", "start_datetime": null}'])
+            mirror = CalendarMirror(os.path.join(tmp, "calendar.sqlite3"))
+            agent = CalendarAgent(llm=llm, mirror=mirror)
+            agent.service, http = calendar_service([
+                ok({"items": [
+                    event("standup_2020", "Standup", "2020-01-01T09:30:00+05:30", "2020-01-01T09:45:00+05:30"),
+                    event("standup_2099", "Standup", "2099-01-01T09:30:00+05:30", "2099-01-01T09:45:00+05:30"),
+                ], "nextSyncToken": "t1"}),
+                ({"status": "204"}, ""),
+            ])
+            agent.authenticated = True
+
+            self.assertEqual(agent.process("please get rid of the standup"), "🗑️ Event deleted.")
+            self.assertEqual(http.requests[1][0], "DELETE")
+            self.assertTrue(http.requests[1][2].endswith("/events/standup_2099"))
+            self.assertIsNotNone(mirror.get("standup_2020"))
+            mirror.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
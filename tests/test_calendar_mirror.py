@@ -0,0 +1,135 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlparse
+
+import core  # noqa: F401  (agents import core first)
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMockSequence
+
+from agents.calendar_agent import CalendarAgent
+from services.calendar_index import CalendarIndex
+from services.calendar_mirror import CalendarMirror
+
+
+def event(id_, title, start="2030-05-01T10:00:00+05:30", end="2030-05-01T11:00:00+05:30", **extra):
+    return {"id": id_, "summary": title, "start": {"dateTime": start}, "end": {"dateTime": end}, **extra}
+
+
+def ok(body):
+    return ({"status": "200"}, json.dumps(body))
+
+
+class RecordingHttp(HttpMockSequence):
+    """HttpMockSequence that remembers the method, query parameters and path of each request."""
+
+    def __init__(self, responses):
+        super().__init__(responses)
+        self.requests = []
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        url = urlparse(uri)
+        self.requests.append((method, {k: v[0] for k, v in parse_qs(url.query).items()}, url.path))
+        return super().request(uri, method, body, headers, *args, **kwargs)
+
+
+def calendar_service(responses):
+    http = RecordingHttp(responses)
+    return build("calendar", "v3", http=http, static_discovery=True), http
+
+
+class TestCalendarMirror(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.mirror = CalendarMirror(os.path.join(self.tmpdir.name, "calendar.sqlite3"))
+
+    def tearDown(self):
+        self.mirror.close()
+        self.tmpdir.cleanup()
+
+    def upcoming(self, now):
+        return [event_id for _, _, event_id in CalendarIndex.from_mirror(self.mirror).upcoming(now)]
+
+    def test_full_then_incremental_sync(self):
+        service, http = calendar_service([
+            ok({"items": [event("a", "Standup")], "nextPageToken": "p2"}),
+            ok({"items": [event("b", "Dentist")], "nextSyncToken": "t1"}),
+            ok({"items": [{"id": "a", "status": "cancelled"}, event("c", "Lunch")], "nextSyncToken": "t2"}),
+        ])
+        self.assertEqual(self.mirror.sync(service), 2)
+        self.assertEqual(http.requests[1][1]["pageToken"], "p2")
+        self.assertEqual(len(self.mirror), 2)
+
+        self.assertEqual(self.mirror.sync(service), 2)
+        self.assertEqual(http.requests[2][1]["syncToken"], "t1")
+        self.assertEqual(http.requests[2][1]["showDeleted"], "true")
+        self.assertIsNone(self.mirror.get("a"))
+        self.assertEqual([e["id"] for e in self.mirror.find_by_title("LUNCH")], ["c"])
+        self.assertEqual(len(self.mirror), 2)
+
+    def test_expired_token_triggers_a_full_resync(self):
+        service, http = calendar_service([
+            ok({"items": [event("a", "Standup"), event("b", "Dentist")], "nextSyncToken": "t1"}),
+            ({"status": "410"}, json.dumps({"error": {"code": 410, "message": "Sync token is no longer valid"}})),
+            ok({"items": [event("b", "Dentist")], "nextSyncToken": "t9"}),
+            ok({"items": [], "nextSyncToken": "t10"}),
+        ])
+        self.mirror.sync(service)
+        self.mirror.sync(service)
+        self.assertNotIn("syncToken", http.requests[2][1])
+        self.assertEqual(self.upcoming(datetime(2030, 1, 1, tzinfo=timezone.utc)), ["b"])
+        self.mirror.sync(service)
+        self.assertEqual(http.requests[3][1]["syncToken"], "t9")
+
+    def test_upcoming_and_staleness(self):
+        service, http = calendar_service([ok({"items": [
+            event("past", "Old", "2020-01-01T10:00:00Z", "2020-01-01T11:00:00Z"),
+            event("later", "Later", "2030-06-01T10:00:00Z", "2030-06-01T11:00:00Z"),
+            event("soon", "Soon", "2030-05-01T10:00:00Z", "2030-05-01T11:00:00Z"),
+            {"id": "day", "summary": "Holiday", "start": {"date": "2030-05-15"}, "end": {"date": "2030-05-16"}},
+        ], "nextSyncToken": "t1"})])
+        self.assertTrue(self.mirror.sync_if_stale(service))
+        # Synced just now: no second request (the mock has no response left to give)
+        self.assertFalse(self.mirror.sync_if_stale(service))
+        self.assertEqual(self.upcoming(datetime(2029, 1, 1, tzinfo=timezone.utc)), ["soon", "day", "later"])
+
+    def test_upcoming_series_are_listed_by_their_next_occurrence(self):
+        self.mirror.upsert_many([
+            event("soon", "Soon", "2023-03-20T10:00:00Z", "2023-03-20T11:00:00Z"),
+            event("weekly", "Weekly", "2022-01-03T09:00:00Z", "2022-01-03T10:00:00Z",
+                  recurrence=["RRULE:FREQ=WEEKLY;UNTIL=20230301T000000Z"]),
+        ])
+        index = CalendarIndex.from_mirror(self.mirror)
+        first = index.upcoming(datetime(2023, 1, 4, tzinfo=timezone.utc))[0]
+        self.assertEqual(first, (datetime(2023, 1, 9, 9, tzinfo=timezone.utc),
+                                 datetime(2023, 1, 9, 10, tzinfo=timezone.utc), "weekly"))
+        # Ended: the series is not upcoming any more
+        self.assertEqual(self.upcoming(datetime(2023, 3, 2, tzinfo=timezone.utc)), ["soon"])
+
+
+class TestCalendarAgentMirror(unittest.TestCase):
+    def test_lookups_are_local_and_writes_go_through(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            mirror = CalendarMirror(os.path.join(tmp, "calendar.sqlite3"))
+            agent = CalendarAgent(llm=None, mirror=mirror)
+            agent.service, http = calendar_service([
+                ok({"items": [event("a", "Standup"), event("b", "Dentist")], "nextSyncToken": "t1"}),
+                ({"status": "204"}, ""),
+            ])
+            agent.authenticated = True
+
+            self.assertEqual(agent.find_event_id("dentist", "2030-05-01"), "b")
+            self.assertIsNone(agent.find_event_id("dentist", "2030-05-02"))
+            self.assertEqual(len(agent.list_events()), 2)
+            self.assertEqual(len(http.requests), 1)
+
+            agent.delete_event("b")
+            self.assertEqual(http.requests[1][0], "DELETE")
+            self.assertIsNone(agent.find_event_id("dentist"))
+            mirror.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
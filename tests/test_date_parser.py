@@ -0,0 +1,70 @@
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from services.date_parser import DateParser
+
+IST = ZoneInfo("Asia/Kolkata")
+NOW = datetime(2030, 1, 9, 14, 23, tzinfo=IST)  # a Wednesday
+
+
+def ist(*args):
+    return datetime(*args, tzinfo=IST)
+
+
+class TestDateParser(unittest.TestCase):
+    def setUp(self):
+        self.parser = DateParser()
+
+    def parse(self, text, now=NOW):
+        return self.parser.parse(text, now)
+
+    def test_iso(self):
+        self.assertEqual(self.parse("2030-01-07T10:00:00+05:30"), ist(2030, 1, 7, 10))
+        self.assertEqual(self.parse("2030-01-07T04:30:00Z"), datetime(2030, 1, 7, 4, 30, tzinfo=timezone.utc))
+        self.assertEqual(self.parse("2030-01-07 10:00"), ist(2030, 1, 7, 10))
+        self.assertEqual(self.parse("2030-01-07"), ist(2030, 1, 7))
+        self.assertEqual(self.parser.stats["iso"], 4)
+
+    def test_grammar(self):
+        cases = {
+            "tomorrow": ist(2030, 1, 10, 14, 23),
+            "Tomorrow at 5 p.m.": ist(2030, 1, 10, 17),
+            "5pm tomorrow": ist(2030, 1, 10, 17),
+            "at noon on Friday": ist(2030, 1, 11, 12),
+            "monday": ist(2030, 1, 14),
+            "wednesday 9am": ist(2030, 1, 9, 9),
+            "next wednesday": ist(2030, 1, 16),
+            "13:45": ist(2030, 1, 9, 13, 45),
+            "in 2 hours": ist(2030, 1, 9, 16, 23),
+            "15th of January 3pm": ist(2030, 1, 15, 15),
+            "Jan 5": ist(2031, 1, 5),
+            "march 3rd, 2031 at 9:30am": ist(2031, 3, 3, 9, 30),
+        }
+        with mock.patch.object(DateParser, "_dateparser", side_effect=AssertionError("fell through")):
+            parser = DateParser()
+            for text, expected in cases.items():
+                with self.subTest(text=text):
+                    self.assertEqual(parser.parse(text, NOW), expected)
+
+    def test_dateparser_results_are_cached_per_day(self):
+        self.assertEqual(self.parse("next week"), ist(2030, 1, 16, 14, 23))
+        # Relative results move with the time of day, from the same cache entry
+        self.assertEqual(self.parse("next week", NOW.replace(hour=18)), ist(2030, 1, 16, 18, 23))
+        self.assertEqual(self.parse("01/20/2030 4pm"), ist(2030, 1, 20, 16))
+        self.assertIsNone(self.parse("13pm"))
+        self.assertIsNone(self.parse("13pm"))
+        info = self.parser.cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 3))
+        self.parse("next week", NOW.replace(day=10))
+        self.assertEqual(self.parser.cache_info().misses, 4)
+        self.assertEqual(self.parser.stats["dateparser"], 4)
+
+    def test_blank(self):
+        self.assertIsNone(self.parse(None))
+        self.assertIsNone(self.parse("  "))
+
+
+if __name__ == "__main__":
+    unittest.main()
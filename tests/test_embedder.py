@@ -0,0 +1,72 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from memory.embedder import CachedEmbeddings, HashingEmbeddings
+
+
+class RecordingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__(dimension=32)
+        self.document_batches = []
+        self.queries = []
+
+    def embed_documents(self, texts):
+        self.document_batches.append(list(texts))
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return super().embed_query(text)
+
+
+class TestCachedEmbeddings(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmpdir.name, "embedding_cache.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_misses_are_batched_into_one_call(self):
+        inner = RecordingEmbeddings()
+        cached = CachedEmbeddings(inner, cache_path=self.cache_path)
+
+        cached.embed_documents(["a", "b"])
+        vectors = cached.embed_documents(["a", "c", "d", "c"])
+
+        self.assertEqual(inner.document_batches, [["a", "b"], ["c", "d"]])
+        self.assertEqual(vectors[1], vectors[3])
+        self.assertEqual(vectors[0], inner._embed("a").tolist())
+        stats = cached.stats()
+        self.assertEqual(stats["misses"], 4)
+        self.assertEqual(stats["hits"], 2)
+
+    def test_queries_and_documents_are_cached_separately(self):
+        inner = RecordingEmbeddings()
+        cached = CachedEmbeddings(inner)
+        cached.embed_documents(["hello"])
+        cached.embed_query("hello")
+        cached.embed_query("hello")
+        self.assertEqual(inner.queries, ["hello"])
+
+    def test_disk_cache_survives_restart(self):
+        CachedEmbeddings(RecordingEmbeddings(), cache_path=self.cache_path).embed_documents(["persist me"])
+
+        inner = RecordingEmbeddings()
+        cached = CachedEmbeddings(inner, cache_path=self.cache_path)
+        vector = asyncio.run(cached.aembed_documents(["persist me"]))[0]
+
+        self.assertEqual(inner.document_batches, [])
+        self.assertEqual(cached.stats()["disk_hits"], 1)
+        self.assertAlmostEqual(vector[0], inner._embed("persist me")[0], places=6)
+
+    def test_lru_is_bounded(self):
+        cached = CachedEmbeddings(RecordingEmbeddings(), max_entries=2)
+        cached.embed_documents(["a", "b", "c"])
+        self.assertEqual(cached.stats()["memory_entries"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
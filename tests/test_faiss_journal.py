@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from memory.embedder import HashingEmbeddings
+from memory.faiss_journal import FaissJournal
+from memory.faiss_store import ThreadSafeFAISS
+from memory.lexical_index import write_lexical_snapshot
+
+
+class TestFaissJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmpdir.name, "faiss_index")
+        self.embeddings = HashingEmbeddings(dimension=32)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def open_store(self):
+        journal = FaissJournal(self.directory, snapshot_interval=3600)
+        return journal, journal.load(ThreadSafeFAISS, self.embeddings)
+
+    def test_new_directory_gets_initial_snapshot(self):
+        journal, store = self.open_store()
+        self.assertEqual(store.index.ntotal, 1)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, "MANIFEST.json")))
+        journal.close()
+
+    def test_log_tail_is_replayed_on_startup(self):
+        journal, store = self.open_store()
+        ids = store.add_texts(["first turn", "second turn"], metadatas=[{"agent": "A"}, {"agent": "B"}])
+        store.delete([ids[0]])
+        journal.close(final_snapshot=False)
+
+        journal, store = self.open_store()
+        self.assertEqual(store.index.ntotal, 2)
+        doc = store.get_by_ids([ids[1]])[0]
+        self.assertEqual(doc.page_content, "second turn")
+        self.assertEqual(doc.metadata, {"agent": "B"})
+        self.assertEqual(store.get_by_ids([ids[0]]), [])
+        journal.close()
+
+    def test_snapshot_compacts_log(self):
+        journal, store = self.open_store()
+        store.add_texts(["before snapshot"])
+        journal.snapshot()
+        store.add_texts(["after snapshot"])
+        logs = sorted(f for f in os.listdir(self.directory) if f.startswith("journal-"))
+        self.assertEqual(len(logs), 1)
+        journal.close(final_snapshot=False)
+
+        journal, store = self.open_store()
+        contents = {store.docstore.search(id_).page_content for id_ in store.index_to_docstore_id.values()}
+        self.assertEqual(contents, {"initial dummy text", "before snapshot", "after snapshot"})
+        self.assertEqual(len(os.listdir(os.path.join(self.directory, "snapshots"))), 1)
+        journal.close()
+
+    def test_delete_during_a_snapshot_keeps_the_mapped_one(self):
+        journal, store = self.open_store()
+        ids = store.add_texts(["first", "second", "third"])
+
+        def delete_then_write(path, state):
+            store.delete([ids[0]])
+            write_lexical_snapshot(path, state)
+
+        # The delete renumbers positions, so the store stays on the snapshot it already reads
+        with mock.patch("memory.faiss_journal.write_lexical_snapshot", delete_then_write):
+            journal.snapshot()
+        store.add_texts(["fourth"])
+        journal.snapshot()
+        self.assertEqual(len(os.listdir(os.path.join(self.directory, "snapshots"))), 1)
+        journal.close()
+
+        journal, store = self.open_store()
+        contents = {store.docstore.search(id_).page_content for id_ in store.index_to_docstore_id.values()}
+        self.assertEqual(contents, {"initial dummy text", "second", "third", "fourth"})
+        journal.close()
+
+    def test_torn_tail_is_discarded(self):
+        journal, store = self.open_store()
+        store.add_texts(["kept"])
+        log_path = journal._log_path(journal._log_number)
+        journal.close(final_snapshot=False)
+        with open(log_path, "ab") as f:
+            f.write(b"\x01\x02\x03partial record")
+
+        journal, store = self.open_store()
+        self.assertEqual(store.index.ntotal, 2)
+        store.add_texts(["appended after recovery"])
+        journal.close(final_snapshot=False)
+
+        journal, store = self.open_store()
+        self.assertEqual(store.index.ntotal, 3)
+        journal.close()
+
+    def test_legacy_index_is_loaded(self):
+        ThreadSafeFAISS.from_texts(["legacy turn"], self.embeddings).save_local(self.directory)
+        journal, store = self.open_store()
+        self.assertEqual(
+            [store.docstore.search(id_).page_content for id_ in store.index_to_docstore_id.values()],
+            ["legacy turn"]
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.directory, "MANIFEST.json")))
+        journal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
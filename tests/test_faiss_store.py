@@ -0,0 +1,40 @@
+import threading
+import unittest
+
+from memory.embedder import HashingEmbeddings
+from memory.faiss_store import ThreadSafeFAISS
+
+
+class TestThreadSafeFAISS(unittest.TestCase):
+    def test_concurrent_adds_and_searches(self):
+        store = ThreadSafeFAISS.from_texts(["initial dummy text"], HashingEmbeddings())
+        errors = []
+
+        def writer(n):
+            try:
+                for i in range(25):
+                    store.add_texts([f"writer {n} turn {i}"], metadatas=[{"agent": f"w{n}"}])
+            except Exception as e:
+                errors.append(e)
+
+        def reader():
+            try:
+                for _ in range(25):
+                    store.similarity_search("writer turn", k=3)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        threads += [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(store.index.ntotal, 1 + 4 * 25)
+        self.assertEqual(len(store.index_to_docstore_id), store.index.ntotal)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from memory.embedder import HashingEmbeddings
+from memory.faiss_journal import FaissJournal
+from memory.faiss_store import ThreadSafeFAISS
+from memory.index_factory import IndexSpec, OverlayIndex, index_kind, maybe_migrate, migrate_store
+
+
+def synthetic_vectors(n, dimension=32, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestIndexSpec(unittest.TestCase):
+    def test_descriptions(self):
+        self.assertEqual(IndexSpec("flat").description(32, 1000), "Flat")
+        self.assertEqual(IndexSpec("hnsw", hnsw_m=16).description(32, 1000), "HNSW16")
+        self.assertEqual(IndexSpec("ivf", nlist=8).description(32, 1000), "IVF8,Flat")
+        self.assertEqual(IndexSpec("ivf", nlist=8, pq_m=8).description(32, 1000), "IVF8,PQ8x8")
+        self.assertEqual(IndexSpec("ivf").nlist_for(390), 10)
+
+    def test_rejects_bad_settings(self):
+        with self.assertRaises(ValueError):
+            IndexSpec("lsh")
+        with self.assertRaises(ValueError):
+            IndexSpec("flat", pq_m=5).description(32, 1000)
+
+    def test_built_indexes_find_exact_neighbours(self):
+        vectors = synthetic_vectors(2000)
+        for spec in (IndexSpec("hnsw"), IndexSpec("ivf", nprobe=64), IndexSpec("ivf", pq_m=8, pq_bits=4)):
+            index = spec.build(vectors)
+            self.assertEqual(index_kind(index), spec.kind)
+            _, found = index.search(vectors[:20], 1)
+            hits = sum(int(found[i, 0]) == i for i in range(20))
+            self.assertGreaterEqual(hits, 18, spec.kind)
+
+
+class TestStoreMigration(unittest.TestCase):
+    def setUp(self):
+        self.embeddings = HashingEmbeddings(dimension=32)
+        self.texts = [f"conversation turn {i} about topic {i % 17}" for i in range(1200)]
+        self.store = ThreadSafeFAISS.from_texts(self.texts, self.embeddings)
+
+    def test_threshold(self):
+        spec = IndexSpec("ivf", nprobe=32)
+        self.assertFalse(maybe_migrate(self.store, spec, threshold=5000))
+        self.assertEqual(index_kind(self.store.index), "flat")
+        self.assertTrue(maybe_migrate(self.store, spec, threshold=1000))
+        self.assertEqual(index_kind(self.store.index), "ivf")
+        self.assertFalse(maybe_migrate(self.store, spec, threshold=1000))
+
+    def test_search_and_delete_after_migration(self):
+        migrate_store(self.store, IndexSpec("hnsw"))
+        self.assertEqual(index_kind(self.store.index), "hnsw")
+        doc = self.store.similarity_search(self.texts[42], k=1)[0]
+        self.assertEqual(doc.page_content, self.texts[42])
+
+        self.store.delete([doc.id])
+        # Approximate indexes tombstone deletes until they are compacted
+        self.assertEqual(self.store.tombstones, {42})
+        self.assertNotIn(self.texts[42], [d.page_content for d in self.store.similarity_search(self.texts[42], k=5)])
+        self.assertEqual(self.store.compact(), 1)
+        self.assertEqual(self.store.index.ntotal, len(self.texts) - 1)
+        self.assertEqual(index_kind(self.store.index), "hnsw")
+        doc = self.store.similarity_search(self.texts[43], k=1)[0]
+        self.assertEqual(doc.page_content, self.texts[43])
+        self.store.add_texts(["a brand new turn"])
+        doc = self.store.similarity_search("a brand new turn", k=1)[0]
+        self.assertEqual(doc.page_content, "a brand new turn")
+
+    def test_journal_migrates_and_persists(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = os.path.join(tmp, "faiss_index")
+            journal = FaissJournal(directory, snapshot_interval=3600,
+                                   index_spec=IndexSpec("ivf", nprobe=32), migration_threshold=1000)
+            store = journal.load(ThreadSafeFAISS, self.embeddings)
+            store.add_texts(self.texts)
+            journal.snapshot()
+            self.assertEqual(index_kind(store.index), "ivf")
+            journal.close()
+
+            journal = FaissJournal(directory, snapshot_interval=3600,
+                                   index_spec=IndexSpec("ivf", nprobe=8), migration_threshold=1000)
+            store = journal.load(ThreadSafeFAISS, self.embeddings)
+            self.assertEqual(index_kind(store.index), "ivf")
+            self.assertIsInstance(store.index, OverlayIndex)
+            self.assertEqual(store.index.base.nprobe, 8)
+            self.assertEqual(store.index.ntotal, len(self.texts) + 1)
+            journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
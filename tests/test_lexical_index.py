@@ -0,0 +1,176 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from langchain.docstore.document import Document
+
+from memory.embedder import HashingEmbeddings
+from memory.faiss_journal import FaissJournal
+from memory.faiss_store import ThreadSafeFAISS
+from memory.hybrid_search import is_lexical_query, reciprocal_rank_fusion
+from memory.index_factory import IndexSpec, migrate_store
+from memory.lexical_index import LEXICAL_FILE, LexicalIndex, tokenize, write_lexical_snapshot
+from memory.memory_writer import MemoryWriter
+from memory.retrieval_context import RetrievalScope
+
+
+TEXTS = {
+    "a": "User: email alice@example.com about the launch\nAssistant: drafted",
+    "b": "User: lunch with Bob on Friday\nAssistant: added to calendar",
+    "c": "User: launch checklist for the launch review\nAssistant: saved note",
+    "d": "User: what is the weather\nAssistant: sunny",
+}
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__(dimension=64)
+        self.query_calls = 0
+
+    def embed_query(self, text):
+        self.query_calls += 1
+        return super().embed_query(text)
+
+    async def aembed_query(self, text):
+        self.query_calls += 1
+        return super().embed_query(text)
+
+
+class TestTokenize(unittest.TestCase):
+    def test_emails_stay_whole_and_stopwords_go(self):
+        self.assertEqual(
+            tokenize("User: Mail Alice@Example.com the INV-2041 report"),
+            ["mail", "alice@example.com", "alice", "example", "com", "inv", "2041", "report"]
+        )
+
+    def test_lexical_queries(self):
+        for query in ['"quarterly review"', "alice@example.com", "INV-2041", "#launch", "config.py"]:
+            self.assertTrue(is_lexical_query(query), query)
+        for query in ["what did I say about the launch", "lunch with Bob", ""]:
+            self.assertFalse(is_lexical_query(query), query)
+
+
+class TestLexicalIndex(unittest.TestCase):
+    def test_bm25_ranking_and_removal(self):
+        index = LexicalIndex()
+        index.add(list(TEXTS), list(TEXTS.values()))
+        ranked = index.search("launch")
+        self.assertEqual([id_ for id_, _ in ranked], ["c", "a"])
+        self.assertEqual(index.search("alice@example.com")[0][0], "a")
+        self.assertEqual(index.search("the what"), [])
+
+        index.remove(["c"])
+        self.assertEqual([id_ for id_, _ in index.search("launch")], ["a"])
+        self.assertEqual(index.count, 3)
+
+    def test_snapshot_plus_changes_scores_like_a_fresh_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = os.path.join(tmp, "first.sqlite3")
+            index = LexicalIndex()
+            index.add(["a", "b", "c"], [TEXTS["a"], TEXTS["b"], TEXTS["c"]])
+            write_lexical_snapshot(first, index.changes())
+
+            index = LexicalIndex(first)
+            index.add(["d"], [TEXTS["d"]])
+            index.remove(["a"])
+            index.add(["a"], ["User: launch moved to May\nAssistant: noted"])
+            expected = LexicalIndex()
+            expected.add(["b", "c", "d", "a"], [TEXTS["b"], TEXTS["c"], TEXTS["d"], "User: launch moved to May\nAssistant: noted"])
+            for query in ["launch", "lunch Bob", "alice@example.com", "weather May"]:
+                self.assertEqual(
+                    [(id_, round(score, 6)) for id_, score in index.search(query)],
+                    [(id_, round(score, 6)) for id_, score in expected.search(query)]
+                )
+
+            second = os.path.join(tmp, "second.sqlite3")
+            write_lexical_snapshot(second, index.changes())
+            reopened = LexicalIndex(second)
+            self.assertEqual((reopened.count, reopened.total_length), (expected.count, expected.total_length))
+            self.assertEqual(reopened.search("launch"), index.search("launch"))
+            self.assertEqual(reopened.search("alice@example.com"), [])
+
+
+class TestStoreLexicalSearch(unittest.TestCase):
+    def setUp(self):
+        self.embeddings = HashingEmbeddings(dimension=32)
+        self.store = ThreadSafeFAISS.from_texts(
+            list(TEXTS.values()), self.embeddings, ids=list(TEXTS),
+            metadatas=[{"agent": "EmailAgent"}, {"agent": "CalendarAgent"}, {"agent": "NoteTakerAgent"}, {}]
+        )
+
+    def test_follows_adds_deletes_and_filters(self):
+        self.assertEqual([doc.id for doc, _ in self.store.lexical_search("launch")], ["c", "a"])
+        self.assertEqual(
+            [doc.id for doc, _ in self.store.lexical_search("launch", filter={"agent": "EmailAgent"})], ["a"]
+        )
+        ids = self.store.add_texts(["User: launch party at noon\nAssistant: ok"])
+        self.assertIn(ids[0], [doc.id for doc, _ in self.store.lexical_search("launch party")])
+
+        self.store.delete(["c"])
+        migrate_store(self.store, IndexSpec("hnsw"))
+        self.store.delete(["a"])
+        self.assertEqual([doc.id for doc, _ in self.store.lexical_search("launch", k=10)], ids)
+
+    def test_snapshot_persists_the_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = os.path.join(tmp, "faiss_index")
+            journal = FaissJournal(directory, snapshot_interval=3600)
+            store = journal.load(ThreadSafeFAISS, self.embeddings)
+            store.add_texts(list(TEXTS.values()), ids=list(TEXTS))
+            journal.snapshot()
+            store.add_texts(["User: invite carol@example.com\nAssistant: sent"], ids=["e"])
+            store.delete(["b"])
+            journal.close(final_snapshot=False)
+
+            journal = FaissJournal(directory, snapshot_interval=3600)
+            store = journal.load(ThreadSafeFAISS, self.embeddings)
+            self.assertTrue(store.lexical_index.path.endswith(LEXICAL_FILE))
+            self.assertEqual(store.lexical_search("alice@example.com")[0][0].id, "a")
+            self.assertEqual(store.lexical_search("carol@example.com")[0][0].id, "e")
+            self.assertEqual(store.lexical_search("lunch Bob"), [])
+            journal.close()
+
+
+class TestHybridRetrieval(unittest.TestCase):
+    def setUp(self):
+        self.embeddings = CountingEmbeddings()
+        texts = [f"User: note {i} about the launch plan\nAssistant: saved" for i in range(30)]
+        texts.append("User: forward the contract to dana@example.com\nAssistant: done")
+        self.store = ThreadSafeFAISS.from_texts(texts, self.embeddings)
+        self.writer = MemoryWriter(self.store, max_delay=60)
+        self.scope = RetrievalScope(self.writer, fetch_k=5)
+        self.embeddings.query_calls = 0
+
+    def tearDown(self):
+        self.writer.close()
+
+    def test_lexical_query_is_not_embedded(self):
+        context = self.scope.open("dana@example.com")
+        docs = asyncio.run(context.asearch(k=3))
+        self.assertEqual(docs[0].page_content.split("\n")[0], "User: forward the contract to dana@example.com")
+        self.assertEqual(context.search(k=2), docs[:2])
+        self.assertEqual(self.embeddings.query_calls, 0)
+        self.scope.close(context)
+        self.assertEqual((self.scope.stats()['avoided_retrievals'], self.scope.stats()['lexical_only']), (1, 1))
+
+    def test_unmatched_lexical_query_falls_back_to_vectors(self):
+        context = self.scope.open("INV-2041")
+        self.assertEqual(len(context.search(k=3)), 3)
+        self.assertEqual(self.embeddings.query_calls, 1)
+
+    def test_queued_turns_are_found_and_results_are_fused(self):
+        self.writer.add("User: book the Zanzibar offsite\nAssistant: booked")
+        context = self.scope.open("when is the Zanzibar offsite")
+        docs = context.search(k=3)
+        self.assertEqual(docs[0].page_content, "User: book the Zanzibar offsite\nAssistant: booked")
+        self.assertEqual(self.embeddings.query_calls, 1)
+
+    def test_reciprocal_rank_fusion(self):
+        a, b, c = (Document(id=id_, page_content=id_) for id_ in "abc")
+        self.assertEqual(reciprocal_rank_fusion([[a, b], [c, b]], k=3)[0], b)
+        self.assertEqual(reciprocal_rank_fusion([[a, b], [c, b]], k=2, weights=[1.0, 0.0]), [a, b])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import core  # noqa: F401  (agents import core first)
+from langchain_community.llms.fake import FakeListLLM
+
+from agents.note_taker_agent import NoteTakerAgent
+from memory.llm_cache import LLMCache, acached_llm_call, cached_llm_call
+
+
+class CountingGenerator:
+    def __init__(self, response="take"):
+        self.response = response
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.response
+
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "llm_cache.sqlite3")
+        self.llm = FakeListLLM(responses=["x"])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_key_covers_template_variables_and_model(self):
+        cache = LLMCache()
+        key = cache.key("Classify {input}", {"input": "a"}, self.llm)
+        self.assertEqual(key, cache.key("Classify {input}", {"input": "a"}, FakeListLLM(responses=["x"])))
+        self.assertNotEqual(key, cache.key("Classify {input}", {"input": "b"}, self.llm))
+        self.assertNotEqual(key, cache.key("Sort {input}", {"input": "a"}, self.llm))
+        self.assertNotEqual(key, cache.key("Classify {input}", {"input": "a"}, FakeListLLM(responses=["y"])))
+
+    def test_hits_survive_a_restart_and_are_counted_per_site(self):
+        generate = CountingGenerator()
+        cache = LLMCache(self.path)
+        for _ in range(3):
+            self.assertEqual(cached_llm_call(cache, "classify", "T {input}", {"input": "a"}, self.llm, generate), "take")
+        cache.close()
+
+        cache = LLMCache(self.path)
+        cached_llm_call(cache, "classify", "T {input}", {"input": "a"}, self.llm, generate)
+        cached_llm_call(cache, "extract", "E {text}", {"text": "a"}, self.llm, generate)
+        self.assertEqual(generate.calls, 2)
+        stats = cache.stats()
+        self.assertEqual(stats["classify"], {"hits": 1, "disk_hits": 1, "misses": 0, "hit_rate": 1.0})
+        self.assertEqual(stats["extract"]["misses"], 1)
+        self.assertEqual(stats["total"]["hit_rate"], 0.5)
+        cache.close()
+
+    def test_expired_and_evicted_entries_are_misses(self):
+        cache = LLMCache(max_entries=2, ttl=60)
+        keys = [cache.key("T", {"i": i}, self.llm) for i in range(3)]
+        with mock.patch("memory.llm_cache.time.time", return_value=1000.0):
+            for key in keys:
+                cache.put(key, "r")
+            self.assertIsNone(cache.get(keys[0]))
+            self.assertEqual(cache.get(keys[2]), "r")
+        with mock.patch("memory.llm_cache.time.time", return_value=1061.0):
+            self.assertIsNone(cache.get(keys[2]))
+
+    def test_rejected_responses_and_disabled_cache(self):
+        cache = LLMCache()
+        generate = CountingGenerator("not json")
+        for _ in range(2):
+            cached_llm_call(cache, "extract", "T", {}, self.llm, generate, accept=lambda response: response.startswith("{"))
+        self.assertEqual(generate.calls, 2)
+        cached_llm_call(None, "extract", "T", {}, self.llm, generate)
+        self.assertEqual(generate.calls, 3)
+
+    def test_async_calls_share_the_cache(self):
+        cache = LLMCache()
+        generate = CountingGenerator()
+
+        async def agenerate():
+            return generate()
+
+        cached_llm_call(cache, "rewrite", "T", {"q": 1}, self.llm, generate)
+        self.assertEqual(asyncio.run(acached_llm_call(cache, "rewrite", "T", {"q": 1}, self.llm, agenerate)), "take")
+        self.assertEqual(generate.calls, 1)
+
+
+class TestNoteTakerClassificationCache(unittest.TestCase):
+    def test_repeated_prompts_are_classified_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            llm = FakeListLLM(responses=["list", "search"])
+            agent = NoteTakerAgent(
+                llm, None, None, None, note_file=os.path.join(tmp, "notes.json"), llm_cache=LLMCache()
+            )
+            # No keyword pattern matches, so the classification chain decides
+            self.assertEqual(agent._parse_command("what have I jotted down"), "list")
+            self.assertEqual(agent._parse_command("what have I jotted down"), "list")
+            self.assertEqual(agent._parse_command("anything on the budget?"), "search")
+            self.assertEqual(agent.llm_cache.stats()["note_classification"]["hits"], 1)
+            agent.notes.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
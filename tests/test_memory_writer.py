@@ -0,0 +1,71 @@
+import time
+import unittest
+
+from memory.embedder import HashingEmbeddings
+from memory.faiss_store import ThreadSafeFAISS
+from memory.memory_writer import MemoryWriter
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__(dimension=64)
+        self.document_batches = []
+
+    def embed_documents(self, texts):
+        self.document_batches.append(len(texts))
+        return super().embed_documents(texts)
+
+
+class TestMemoryWriter(unittest.TestCase):
+    def setUp(self):
+        self.embeddings = CountingEmbeddings()
+        self.store = ThreadSafeFAISS.from_texts(["initial dummy text"], self.embeddings)
+        self.embeddings.document_batches.clear()
+
+    def test_turns_are_written_in_one_batch(self):
+        writer = MemoryWriter(self.store, max_batch_size=100, max_delay=60)
+        for i in range(10):
+            writer.add(f"User: turn {i}", {"agent": "NoteTakerAgent"})
+        self.assertEqual(self.store.index.ntotal, 1)
+
+        writer.flush()
+        self.assertEqual(self.store.index.ntotal, 11)
+        self.assertEqual(self.embeddings.document_batches, [10])
+        self.assertEqual(writer.stats()["batches_written"], 1)
+        writer.close()
+
+    def test_max_batch_size_splits_batches(self):
+        writer = MemoryWriter(self.store, max_batch_size=4, max_delay=60)
+        for i in range(10):
+            writer.add(f"turn {i}")
+        writer.close()
+        self.assertEqual(self.store.index.ntotal, 11)
+        self.assertEqual(sum(self.embeddings.document_batches), 10)
+        self.assertTrue(all(size <= 4 for size in self.embeddings.document_batches))
+
+    def test_max_delay_triggers_write(self):
+        writer = MemoryWriter(self.store, max_batch_size=100, max_delay=0.05)
+        writer.add("quick turn")
+        deadline = time.time() + 5
+        while writer.pending_count() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.store.index.ntotal, 2)
+        writer.close()
+
+    def test_search_sees_pending_writes_without_reembedding(self):
+        writer = MemoryWriter(self.store, max_batch_size=100, max_delay=60)
+        turn_id = writer.add("User: what is the launch date\nAssistant: June 3rd")
+
+        docs = writer.search("launch date", k=1)
+        self.assertEqual(docs[0].id, turn_id)
+
+        writer.flush()
+        docs = writer.search("launch date", k=2)
+        self.assertEqual([d.id for d in docs].count(turn_id), 1)
+        # Vectors computed for the read are reused by the writer.
+        self.assertEqual(self.embeddings.document_batches, [1])
+        writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from memory import index_factory
+from memory.embedder import HashingEmbeddings
+from memory.faiss_store import ThreadSafeFAISS
+from memory.index_factory import IndexSpec, migrate_store
+from memory.metadata_index import MetadataIndex, Prefilter
+
+
+START = datetime(2026, 1, 1)
+AGENTS = ["NoteTakerAgent"] * 16 + ["WebSearchAgent"] * 3 + ["CalendarAgent"]
+
+
+def day(n):
+    return (START + timedelta(days=n)).isoformat()
+
+
+class TestPrefilter(unittest.TestCase):
+    def test_parses_indexed_conditions(self):
+        prefilter = Prefilter.parse({"agent": {"$in": ["A", "B"]}, "timestamp": {"$gte": day(1), "$lt": day(5)}})
+        self.assertEqual(prefilter.agents, {"A", "B"})
+        self.assertEqual((prefilter.lower, prefilter.lower_inclusive), (day(1), True))
+        self.assertEqual((prefilter.upper, prefilter.upper_inclusive), (day(5), False))
+        self.assertFalse(prefilter.residual)
+
+        prefilter = Prefilter.parse({"$and": [{"agent": "A"}, {"agent": ["A", "B"]}, {"topic": "x"}]})
+        self.assertEqual(prefilter.agents, {"A"})
+        self.assertTrue(prefilter.residual)
+
+    def test_unindexable_filters(self):
+        self.assertIsNone(Prefilter.parse({"topic": "x"}))
+        self.assertIsNone(Prefilter.parse({"$or": [{"agent": "A"}, {"agent": "B"}]}))
+        self.assertIsNone(Prefilter.parse(lambda metadata: True))
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def test_select_and_renumber(self):
+        index = MetadataIndex()
+        index.add([{"agent": AGENTS[i % 20], "timestamp": day(i)} for i in range(100)] + [{}])
+        calendar = Prefilter.parse({"agent": "CalendarAgent"})
+        self.assertEqual(index.select(calendar).tolist(), [19, 39, 59, 79, 99])
+
+        recent = Prefilter.parse({"agent": "CalendarAgent", "timestamp": {"$gt": day(40)}})
+        self.assertEqual(index.select(recent).tolist(), [59, 79, 99])
+
+        index.discard([59])
+        self.assertEqual(index.select(recent).tolist(), [79, 99])
+        index.remove(range(0, 50))
+        self.assertEqual(index.select(calendar).tolist(), [29, 49])
+        self.assertEqual(index.size, 51)
+
+    def test_out_of_order_timestamps(self):
+        index = MetadataIndex()
+        index.add([{"timestamp": day(n)} for n in (5, 1, 3)])
+        index.add([{"timestamp": day(2)}])
+        window = Prefilter.parse({"timestamp": {"$gte": day(2), "$lte": day(3)}})
+        self.assertEqual(index.select(window).tolist(), [2, 3])
+
+
+class TestPrefilteredSearch(unittest.TestCase):
+    def setUp(self):
+        self.embeddings = HashingEmbeddings(dimension=32)
+        self.texts = [f"turn {i} about topic {i % 13}" for i in range(2000)]
+        self.metadatas = [{"agent": AGENTS[i % 20], "timestamp": day(i // 10)} for i in range(2000)]
+        self.store = ThreadSafeFAISS.from_texts(self.texts, self.embeddings, metadatas=self.metadatas)
+        self.query = self.embeddings.embed_query("topic 7 from the calendar")
+
+    def distances(self, texts):
+        if not texts:
+            return []
+        vectors = np.array(self.embeddings.embed_documents(texts)).reshape(len(texts), -1)
+        return np.round(((vectors - np.array(self.query)) ** 2).sum(axis=1), 5).tolist()
+
+    def exact(self, filter, k):
+        """Distances of the brute-force top k over every live document that matches."""
+        matches = FAISS._create_filter_func(filter)
+        docs = [self.store.docstore.search(id_) for id_ in set(self.store.index_to_docstore_id.values())]
+        texts = [doc.page_content for doc in docs if not isinstance(doc, str) and matches(doc.metadata)]
+        return sorted(self.distances(texts))[:k]
+
+    def search(self, filter, k=5):
+        docs = self.store.similarity_search_by_vector(self.query, k=k, filter=filter)
+        return self.distances([doc.page_content for doc in docs])
+
+    def test_rare_agent_gets_full_results(self):
+        filter = {"agent": "CalendarAgent"}
+        postfiltered = FAISS.similarity_search_with_score_by_vector(self.store, self.query, k=5, filter=filter)
+        self.assertLess(len(postfiltered), 5)
+        self.assertEqual(self.search(filter), self.exact(filter, 5))
+
+    def test_time_range_and_residual_conditions(self):
+        filter = {"agent": "NoteTakerAgent", "timestamp": {"$gte": day(50), "$lt": day(60)}}
+        self.assertEqual(self.search(filter), self.exact(filter, 5))
+        filter = {"agent": "WebSearchAgent", "topic": "missing"}
+        self.assertEqual(self.search(filter), [])
+
+    def test_selector_path_on_hnsw(self):
+        migrate_store(self.store, IndexSpec("hnsw", ef_search=128))
+        filter = {"agent": {"$in": ["WebSearchAgent", "CalendarAgent"]}}
+        with mock.patch.object(index_factory, "EXACT_SEARCH_LIMIT", 0):
+            found = self.search(filter, k=10)
+        self.assertEqual(len(found), 10)
+        kth = self.exact(filter, 10)[-1]
+        self.assertGreaterEqual(sum(distance <= kth for distance in found), 9)
+
+    def test_index_follows_adds_and_deletes(self):
+        filter = {"agent": "CalendarAgent"}
+        self.search(filter)
+        ids = self.store.add_texts(["calendar sync about topic 7"], metadatas=[{"agent": "CalendarAgent", "timestamp": day(999)}])
+        found = self.store.similarity_search_by_vector(self.query, k=200, filter=filter)
+        self.assertIn("calendar sync about topic 7", [doc.page_content for doc in found])
+        self.store.delete([self.store.index_to_docstore_id[19], ids[0]])
+        self.assertEqual(self.search(filter, k=200), self.exact(filter, 200))
+
+        migrate_store(self.store, IndexSpec("hnsw"))
+        self.store.delete([self.store.index_to_docstore_id[38]])
+        self.assertEqual(self.search(filter, k=200), self.exact(filter, 200))
+        self.store.compact()
+        self.assertEqual(self.search(filter, k=200), self.exact(filter, 200))
+        self.assertEqual(self.store.metadata_index.size, self.store.index.ntotal)
+
+
+if __name__ == "__main__":
+    unittest.main()
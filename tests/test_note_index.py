@@ -0,0 +1,169 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from memory.note_index import NoteIndex, parse_query
+from memory.note_store import open_note_store
+
+
+NOTES = [
+    {"id": "n1", "title": "Start of project", "tags": "#work", "content": "Kickoff with the design team"},
+    {"id": "n2", "title": "Art gallery", "tags": "#personal #art", "content": "Visit on Sunday"},
+    {"id": "n3", "title": "Budget review", "tags": "#work #finance", "content": "Launch budget and art supplies"},
+    {"id": "n4", "title": "Launch plan", "tags": "#work", "content": "Launch checklist, budget owner Kabir"},
+]
+
+
+def ids(results):
+    return [id_ for id_, _ in results]
+
+
+class TestParseQuery(unittest.TestCase):
+    def test_operators_and_tags(self):
+        self.assertEqual(parse_query("launch budget"), ([["launch"], ["budget"]], set()))
+        self.assertEqual(parse_query("launch AND budget OR kabir #Work"), ([["launch", "budget"], ["kabir"]], {"work"}))
+        self.assertEqual(parse_query("tag:finance"), ([], {"finance"}))
+
+
+class TestNoteIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = NoteIndex.build(NOTES)
+
+    def test_whole_words_and_field_weights(self):
+        # "art" no longer matches "start"; a title hit outranks a content hit
+        self.assertEqual(ids(self.index.search("art")), ["n2", "n3"])
+        self.assertEqual(ids(self.index.search("budget"))[0], "n3")
+
+    def test_any_all_and_tag_queries(self):
+        self.assertEqual(set(ids(self.index.search("kickoff gallery"))), {"n1", "n2"})
+        self.assertEqual(set(ids(self.index.search("launch AND budget"))), {"n3", "n4"})
+        self.assertEqual(set(ids(self.index.search("launch AND kabir OR gallery"))), {"n2", "n4"})
+        self.assertEqual(ids(self.index.search("budget #finance")), ["n3"])
+        self.assertEqual(ids(self.index.search("#work")), ["n4", "n3", "n1"])
+        self.assertEqual(self.index.search("#missing"), [])
+
+    def test_incremental_updates(self):
+        self.index.search("launch")
+        self.index.add({"id": "n5", "title": "Launch party", "tags": "#fun", "content": "Cake"})
+        self.assertIn("n5", ids(self.index.search("launch")))
+        self.assertTrue(self.index.remove("n4"))
+        self.assertEqual(set(ids(self.index.search("launch"))), {"n3", "n5"})
+        self.assertEqual(self.index.search("kabir"), [])
+        self.assertEqual(ids(self.index.search("#work")), ["n3", "n1"])
+        self.assertEqual(len(self.index), 4)
+
+    def test_scores_match_a_fresh_build(self):
+        self.index.remove("n1")
+        self.index.add(NOTES[0])
+        fresh = NoteIndex.build(NOTES[1:] + NOTES[:1])
+        for query in ["launch budget", "art", "kickoff design", "launch AND budget"]:
+            self.assertEqual(
+                [(id_, round(score, 9)) for id_, score in self.index.search(query)],
+                [(id_, round(score, 9)) for id_, score in fresh.search(query)]
+            )
+
+    def test_saved_index_loads_and_takes_updates(self):
+        extra = {"id": "n5-added-later", "title": "Launch party", "tags": "#fun #work", "content": "Cake and art"}
+        with tempfile.TemporaryDirectory() as tmp:
+            self.index.save(os.path.join(tmp, "index"), {"seq": 7})
+            loaded = NoteIndex.load(os.path.join(tmp, "index"))
+            self.assertEqual(loaded.meta, {"seq": 7})
+            for index in (self.index, loaded):
+                index.remove("n3")
+                index.add(extra)
+            loaded.save(os.path.join(tmp, "again"))
+            again = NoteIndex.load(os.path.join(tmp, "again"))
+            self.assertIn("n5-added-later", again)
+            self.assertNotIn("n3", again)
+            again.remove("n5-added-later")
+            fresh = NoteIndex.build([NOTES[0], NOTES[1], NOTES[3]])
+            queries = ["launch budget", "art", "launch AND budget", "#work", "art #fun", "cake"]
+            for query in queries:
+                with self.subTest(query=query):
+                    self.assertEqual(loaded.search(query), self.index.search(query))
+                    self.assertEqual(
+                        [(id_, round(score, 9)) for id_, score in again.search(query)],
+                        [(id_, round(score, 9)) for id_, score in fresh.search(query)]
+                    )
+            self.assertEqual(sorted(again.ids()), ["n1", "n2", "n4"])
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b"not an index")
+            f.flush()
+            with self.assertRaises(ValueError):
+                NoteIndex.load(f.name)
+
+
+class TestNoteStoreSearch(unittest.TestCase):
+    def test_other_writers_are_seen(self):
+        for backend in ("sqlite", "jsonl"):
+            with self.subTest(backend=backend), tempfile.TemporaryDirectory() as tmp:
+                store, other = open_note_store(backend, tmp), open_note_store(backend, tmp)
+                store.add_many([{k: v for k, v in note.items() if k != "id"} for note in NOTES])
+                self.assertEqual(store.search("gallery")[0][0]["title"], "Art gallery")
+                self.assertEqual(other.search("gallery")[0][0]["title"], "Art gallery")
+
+                other.add({"title": "Gallery opening", "date": "", "tags": "#art", "content": ""})
+                store.delete([store.find_by_title("Art gallery")[0]["id"]])
+                self.assertEqual([note["title"] for note, _ in store.search("gallery")], ["Gallery opening"])
+                self.assertEqual([note["title"] for note, _ in other.search("gallery")], ["Gallery opening"])
+                store.close()
+                other.close()
+
+    def test_falling_behind_the_change_log_rebuilds(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store, other = open_note_store("sqlite", tmp), open_note_store("sqlite", tmp)
+            other.CHANGE_LOG_LIMIT = 3
+            store.add({"title": "Gallery", "date": "", "tags": "", "content": ""})
+            self.assertEqual(len(store.search("gallery")), 1)
+            for i in range(10):
+                other.add({"title": f"Gallery {i}", "date": "", "tags": "", "content": ""})
+            self.assertEqual(len(store.search("gallery", k=20)), 11)
+            store.close()
+            other.close()
+
+    def test_a_new_process_loads_the_saved_index(self):
+        for backend in ("sqlite", "jsonl"):
+            with self.subTest(backend=backend), tempfile.TemporaryDirectory() as tmp:
+                store = open_note_store(backend, tmp)
+                store.add_many([{k: v for k, v in note.items() if k != "id"} for note in NOTES])
+                self.assertEqual(store.search("gallery")[0][0]["title"], "Art gallery")
+                store.add({"title": "Gallery opening", "date": "", "tags": "#art", "content": ""})
+                store.delete([store.find_by_title("Art gallery")[0]["id"]])
+                store.close()
+
+                restarted = open_note_store(backend, tmp)
+                with mock.patch.object(NoteIndex, "build", side_effect=AssertionError("rebuilt")):
+                    self.assertEqual([note["title"] for note, _ in restarted.search("gallery")], ["Gallery opening"])
+                    self.assertEqual(len(restarted.search("#work")), 3)
+                restarted.close()
+
+    def test_index_is_saved_again_after_enough_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = open_note_store("sqlite", tmp)
+            store.INDEX_SAVE_EVERY = 3
+            store.search("gallery")
+            for i in range(3):
+                store.add({"title": f"Gallery {i}", "date": "", "tags": "", "content": ""})
+            store.search("gallery")
+            self.assertEqual([name for name in os.listdir(tmp) if ".index." in name], ["notes.sqlite3.index.2"])
+            store.close()
+
+    def test_saved_index_of_another_database_is_ignored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = open_note_store("sqlite", tmp)
+            store.add({"title": "Gallery", "date": "", "tags": "", "content": ""})
+            store.search("gallery")
+            store.close()
+            for name in os.listdir(tmp):
+                if name.startswith("notes.sqlite3") and ".index." not in name:
+                    os.remove(os.path.join(tmp, name))
+
+            store = open_note_store("sqlite", tmp)
+            self.assertEqual(store.search("gallery"), [])
+            store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
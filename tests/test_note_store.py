@@ -0,0 +1,180 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from memory.note_store import (
+    JSONLNoteStore,
+    SQLiteNoteStore,
+    migrate_json_notes,
+    note_id,
+    open_note_store,
+)
+
+
+def make_note(i, title=None):
+    return {"title": title or f"Note {i}", "date": "2026-01-01", "tags": "#test", "content": f"content {i}"}
+
+
+class NoteStoreContract:
+    """Behaviour both backends share; subclasses set backend."""
+
+    backend = None
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = self.open()
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def open(self):
+        return open_note_store(self.backend, self.tmpdir.name)
+
+    def test_add_get_find_and_delete(self):
+        ids = self.store.add_many([make_note(1), make_note(2, title="Kabir call"), make_note(3)])
+        self.assertEqual(ids[0], note_id(make_note(1)))
+        self.assertEqual(self.store.get(ids[1])["content"], "content 2")
+        self.assertEqual([note["id"] for note in self.store.find_by_title("KABIR CALL")], [ids[1]])
+
+        self.assertEqual(self.store.add(make_note(1)), ids[0])
+        self.assertEqual(len(self.store), 3)
+
+        self.assertEqual(self.store.delete([ids[1], "missing"]), 1)
+        self.assertIsNone(self.store.get(ids[1]))
+        self.assertEqual(self.store.find_by_title("Kabir call"), [])
+        self.assertEqual([note["title"] for note in self.store.all()], ["Note 1", "Note 3"])
+
+    def test_writes_survive_reopening(self):
+        ids = self.store.add_many([make_note(i) for i in range(5)])
+        self.store.delete(ids[:2])
+        self.store.close()
+        self.store = self.open()
+        self.assertEqual([note["id"] for note in self.store.all()], ids[2:])
+
+    def test_paged_and_filtered_listing(self):
+        notes = [
+            {"title": f"Note {i}", "date": f"2026-01-{i % 5 + 1:02d}", "tags": "#work" if i % 2 else "#home #Work",
+             "content": ""}
+            for i in range(10)
+        ]
+        ids = self.store.add_many(notes)
+        by_date = sorted(range(10), key=lambda i: (notes[i]["date"], i))
+        listed = [note["id"] for note in self.store.iter_notes()]
+        self.assertEqual(listed, [ids[i] for i in by_date])
+        self.assertEqual([note["id"] for note in self.store.iter_notes(offset=3, limit=4)], listed[3:7])
+        self.assertEqual([note["id"] for note in self.store.iter_notes(newest_first=True)], listed[::-1])
+        self.assertEqual(list(self.store.iter_notes(offset=20, limit=5)), [])
+
+        self.assertEqual(self.store.count(), 10)
+        self.assertEqual(self.store.count(tags=["home"]), 5)
+        self.assertEqual(self.store.count(tags=["#HOME", "work"]), 5)
+        self.assertEqual(self.store.count(date_from="2026-01-02", date_to="2026-01-03"), 4)
+        filtered = self.store.iter_notes(limit=1, date_from="2026-01-02", tags=["home"], newest_first=True)
+        self.assertEqual([note["title"] for note in filtered], ["Note 4"])
+
+        self.store.delete(ids[:2])
+        self.assertEqual(self.store.count(tags=["home"]), 4)
+
+    def test_concurrent_writers_do_not_clobber_each_other(self):
+        # Two store objects on one file stand in for the CLI and Streamlit processes
+        other = self.open()
+
+        def write(store, start):
+            for i in range(start, start + 50):
+                store.add(make_note(i))
+
+        threads = [threading.Thread(target=write, args=(store, start))
+                   for store, start in ((self.store, 0), (other, 50), (self.store, 100), (other, 150))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.store), 200)
+        self.assertEqual(len(other), 200)
+        other.close()
+
+
+class TestSQLiteNoteStore(NoteStoreContract, unittest.TestCase):
+    backend = "sqlite"
+
+    def test_uses_wal(self):
+        self.assertIsInstance(self.store, SQLiteNoteStore)
+        mode = self.store._db.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_tags_of_an_older_database_are_backfilled(self):
+        self.store.close()
+        path = os.path.join(self.tmpdir.name, "old.sqlite3")
+        db = sqlite3.connect(path)
+        db.execute("CREATE TABLE notes (id TEXT PRIMARY KEY, title TEXT NOT NULL, date TEXT NOT NULL, "
+                   "tags TEXT NOT NULL, content TEXT NOT NULL)")
+        db.execute("INSERT INTO notes VALUES ('n1', 'Old', '2026-01-01', '#legacy', '')")
+        db.commit()
+        db.close()
+        self.store = SQLiteNoteStore(path)
+        self.assertEqual([note["id"] for note in self.store.iter_notes(tags=["legacy"])], ["n1"])
+
+
+class TestJSONLNoteStore(NoteStoreContract, unittest.TestCase):
+    backend = "jsonl"
+
+    def test_torn_tail_is_dropped(self):
+        self.store.add(make_note(1))
+        self.store.close()
+        with open(self.store.path, "ab") as f:
+            f.write(b'{"op": "add", "note": {"id": "x", "ti')
+        self.store = self.open()
+        self.assertEqual(len(self.store), 1)
+        self.store.add(make_note(2))
+        self.store.close()
+        self.store = self.open()
+        self.assertEqual([note["title"] for note in self.store.all()], ["Note 1", "Note 2"])
+
+    def test_log_is_compacted_and_other_readers_reload(self):
+        self.assertIsInstance(self.store, JSONLNoteStore)
+        reader = self.open()
+        self.store.COMPACT_MIN_RECORDS = 10
+        ids = [self.store.add(make_note(i)) for i in range(20)]
+        self.store.delete(ids[:15])
+        with open(self.store.path, "rb") as f:
+            self.assertEqual(len(f.readlines()), 5)
+        self.assertEqual([note["id"] for note in reader.all()], ids[15:])
+        reader.add(make_note(99))
+        self.assertEqual(len(self.store), 6)
+        reader.close()
+
+
+class TestMigration(unittest.TestCase):
+    def test_legacy_json_is_imported_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "notes.json")
+            legacy = [make_note(1), make_note(2), make_note(1)]
+            with open(json_path, "w") as f:
+                json.dump(legacy, f, indent=2)
+            store = SQLiteNoteStore(os.path.join(tmp, "notes.sqlite3"))
+
+            self.assertEqual(migrate_json_notes(json_path, store), 3)
+            self.assertEqual([note["id"] for note in store.all()], [note_id(make_note(1)), note_id(make_note(2))])
+            self.assertFalse(os.path.exists(json_path))
+            self.assertTrue(os.path.exists(json_path + ".migrated"))
+            self.assertEqual(migrate_json_notes(json_path, store), 0)
+            store.close()
+
+    def test_unreadable_json_is_left_in_place(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "notes.json")
+            with open(json_path, "w") as f:
+                f.write("[{")
+            store = JSONLNoteStore(os.path.join(tmp, "notes.jsonl"))
+            with self.assertLogs("memory.note_store", level="ERROR"):
+                self.assertEqual(migrate_json_notes(json_path, store), 0)
+            self.assertTrue(os.path.exists(json_path))
+            store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import core  # noqa: F401  (agents import core first)
+from langchain_community.llms.fake import FakeListLLM
+
+import config
+from agents.note_taker_agent import NoteTakerAgent
+from memory.embedder import HashingEmbeddings
+from memory.faiss_store import ThreadSafeFAISS
+
+
+NOTES = [
+    {"title": "Launch plan", "date": "2026-01-01", "tags": "#work", "content": "Checklist for the product launch"},
+    {"title": "Dentist", "date": "2026-01-02", "tags": "#health", "content": "Appointment on Friday"},
+]
+
+
+class TestNoteTakerSearch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.embeddings = HashingEmbeddings(dimension=128)
+        # A conversation turn of the agent: same agent, but not a note
+        self.vectorstore = ThreadSafeFAISS.from_texts(
+            ["User: planning the launching party\nAssistant: noted"], self.embeddings,
+            metadatas=[{"agent": "NoteTakerAgent", "timestamp": "2026-01-01T00:00:00"}]
+        )
+        self.agent = NoteTakerAgent(
+            FakeListLLM(responses=["unknown"]), None, self.embeddings, self.vectorstore,
+            note_file=os.path.join(self.tmpdir.name, "notes.json")
+        )
+        for note in NOTES:
+            note = dict(note)
+            self.agent._save_to_local(note)
+            self.agent._save_to_memory(note)
+
+    def tearDown(self):
+        self.agent.notes.close()
+        self.tmpdir.cleanup()
+
+    def note_vectors(self):
+        docs = self.vectorstore.similarity_search("launch", k=10, filter=NoteTakerAgent.NOTE_VECTOR_FILTER)
+        return sorted(doc.metadata["note_id"] for doc in docs)
+
+    def test_vectors_share_the_note_ids(self):
+        self.assertEqual(self.note_vectors(), sorted(note["id"] for note in self.agent.notes.all()))
+
+    def test_semantic_hits_are_merged_with_keyword_hits(self):
+        # "launching" is not an indexed word; only the note vectors find the launch plan
+        self.assertEqual(self.agent.notes.search("launching"), [])
+        response = self.agent._search_notes("find notes about launching", k=1)
+        self.assertIn("Launch plan", response)
+        self.assertNotIn("party", response)
+
+        response = self.agent._search_notes("find notes about dentist")
+        self.assertTrue(response.startswith("📝 Dentist"))
+
+    def test_exact_queries_skip_the_embedding(self):
+        self.assertFalse(self.agent._wants_semantic_search("launch #work", []))
+        self.assertFalse(self.agent._wants_semantic_search("launch AND checklist", []))
+        self.assertTrue(self.agent._wants_semantic_search("launch", []))
+
+    def test_delete_removes_the_vectors(self):
+        response = self.agent._delete_note("delete note Launch plan")
+        self.assertIn("Deleted 1 note", response)
+        self.assertEqual(self.note_vectors(), [self.agent.notes.all()[0]["id"]])
+        self.assertNotIn("Launch plan", self.agent._search_notes("find notes about launching"))
+
+    def test_delete_by_keyword_needs_every_word(self):
+        self.assertIn("No notes found", self.agent._delete_note("delete note about friday launch"))
+        response = self.agent._delete_note("delete note about Friday appointment")
+        self.assertIn("Deleted 1 note(s) related to 'Friday appointment': Dentist", response)
+        self.assertEqual([note["title"] for note in self.agent.notes.all()], ["Launch plan"])
+
+
+class TestNoteTakerListing(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.agent = NoteTakerAgent(
+            FakeListLLM(responses=["unknown"]), None, None, None,
+            note_file=os.path.join(self.tmpdir.name, "notes.json")
+        )
+
+    def tearDown(self):
+        self.agent.notes.close()
+        self.tmpdir.cleanup()
+
+    def test_list_options(self):
+        today = datetime(2026, 3, 12)  # a Thursday
+        options = NoteTakerAgent._list_options(
+            "show notes tagged #work from 2026-01-01 to 2026-01-31 newest first page 2", today
+        )
+        self.assertEqual(options, {"page": 2, "tags": ["work"], "date_from": "2026-01-01",
+                                   "date_to": "2026-01-31", "newest_first": True})
+        self.assertEqual(NoteTakerAgent._list_options("list notes tagged travel", today)["tags"], ["travel"])
+        self.assertEqual(NoteTakerAgent._list_options("show notes this week", today)["date_from"], "2026-03-09")
+        self.assertEqual(NoteTakerAgent._list_options("show notes last 7 days", today)["date_from"], "2026-03-06")
+        self.assertEqual(NoteTakerAgent._list_options("show my notes", today),
+                         {"page": 1, "tags": [], "date_from": None, "date_to": None, "newest_first": False})
+
+    def test_pages_read_only_their_slice(self):
+        self.agent.notes.add_many(
+            {"title": f"Note {i}", "date": "2026-01-01", "tags": "#a" if i % 2 else "#b", "content": ""}
+            for i in range(45)
+        )
+        with mock.patch.object(config, "NOTES_PAGE_SIZE", 20), \
+                mock.patch.object(self.agent.notes, "all", side_effect=AssertionError("read every note")):
+            page = self.agent._list_notes("show notes page 3")
+            self.assertTrue(page.startswith("📒 Notes 41–45 of 45 (page 3 of 3)"))
+            self.assertEqual(page.count("📝"), 5)
+            self.assertIn("Note 44", page)
+            self.assertIn("Notes 1–20 of 22", self.agent._list_notes("show notes tagged #a"))
+            self.assertEqual(self.agent._list_notes("show notes tagged #c"), "No notes found.")
+
+            async def collect():
+                return [chunk async for chunk in self.agent.astream("show notes page 2 newest first")]
+
+            chunks = asyncio.run(collect())
+            self.assertEqual(len(chunks), 21)
+            self.assertIn("Note 24", chunks[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from core.agent_router import AgentRouter
+from core.orchestrator import Orchestrator
+from memory.embedder import HashingEmbeddings
+from memory.faiss_store import ThreadSafeFAISS
+from memory.retrieval_context import RetrievalPolicy
+
+
+class EchoAgent:
+    def __init__(self):
+        self.threads = []
+
+    def process(self, prompt, context):
+        self.threads.append(threading.current_thread().name)
+        return f"echo: {prompt}"
+
+
+class SlowAsyncAgent:
+    async def aprocess(self, prompt, context):
+        await asyncio.sleep(0.2)
+        return f"async: {prompt} ({len(context['history'])} memories)"
+
+    def process(self, prompt, context):
+        raise AssertionError("sync path should not be used")
+
+
+class CountingAgent:
+    """Sync agent that records how many calls overlap."""
+
+    def __init__(self, thread_safe=True):
+        self.thread_safe = thread_safe
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def process(self, prompt, context):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return f"done: {prompt}"
+
+
+class ContextAgent:
+    """Sync agent that looks up memory the way BaseAgent subclasses do."""
+
+    def process(self, prompt, context):
+        retrieval = context['retrieval']
+        return f"{len(retrieval.search(2))} of {len(context['history'])} memories"
+
+
+class NoMemoryAgent:
+    retrieval_policy = RetrievalPolicy.none()
+
+    def process(self, prompt, context):
+        return f"{len(context['history'])} memories"
+
+
+class OwnTurnsAgent:
+    retrieval_policy = RetrievalPolicy.filtered(k=3, agent="OwnTurnsAgent")
+
+    def process(self, prompt, context):
+        return " | ".join(doc.metadata["agent"] for doc in context['history'])
+
+
+class StreamingAgent:
+    async def astream(self, prompt, context):
+        for word in ["Hello", ", ", "world"]:
+            await asyncio.sleep(0.05)
+            yield word
+
+    def process(self, prompt, context):
+        raise AssertionError("streaming path should be used")
+
+
+def build_orchestrator(**agents):
+    embeddings = HashingEmbeddings()
+    vectorstore = ThreadSafeFAISS.from_texts(["initial dummy text"], embeddings)
+    router = AgentRouter()
+    for key, agent in agents.items():
+        router.register_agent(key, agent)
+    return Orchestrator(embeddings=embeddings, vectorstore=vectorstore, router=router)
+
+
+class TestProcessPrompt(unittest.TestCase):
+    def test_sync_wrapper_returns_response_dict(self):
+        agent = EchoAgent()
+        orchestrator = build_orchestrator(note_taker=agent)
+        result = orchestrator.process_prompt("take a note about launch")
+
+        self.assertEqual(result["response"], "echo: take a note about launch")
+        self.assertEqual(result["agent"], "EchoAgent")
+        self.assertIn("processing_time", result)
+        # Sync agents are moved off the event loop thread.
+        self.assertNotEqual(agent.threads[0], "orchestrator-loop")
+        self.assertEqual(
+            [turn["role"] for turn in orchestrator.get_conversation_history()],
+            ["user", "assistant"]
+        )
+        orchestrator.flush()
+        self.assertEqual(orchestrator.vectorstore.index.ntotal, 2)
+
+    def test_prompt_is_embedded_and_searched_once(self):
+        orchestrator = build_orchestrator(note_taker=ContextAgent())
+        result = orchestrator.process_prompt("take a note about launch")
+        self.assertEqual(result["response"], "1 of 1 memories")
+        self.assertEqual(
+            result["retrieval"], {'policy': 'top-3', 'embed_calls': 1, 'searches': 1, 'lookups': 2}
+        )
+        self.assertEqual(orchestrator.retrieval.stats()["requests"], 1)
+
+    def test_agent_without_memory_skips_retrieval(self):
+        orchestrator = build_orchestrator(code=NoMemoryAgent())
+        result = orchestrator.process_prompt("write python code for a parser")
+        self.assertEqual(result["response"], "0 memories")
+        self.assertEqual(
+            result["retrieval"], {'policy': 'none', 'embed_calls': 0, 'searches': 0, 'lookups': 0}
+        )
+        stats = orchestrator.retrieval.stats()
+        self.assertEqual(stats["avoided_retrievals"], 1)
+        self.assertEqual(stats["avoided_rate"], 1.0)
+        self.assertEqual(stats["by_policy"], {'none': 1})
+
+    def test_filtered_policy_reads_only_matching_memories(self):
+        orchestrator = build_orchestrator(note_taker=OwnTurnsAgent(), code=EchoAgent())
+        orchestrator.process_prompt("take a note about launch")
+        orchestrator.process_prompt("write python code for launch", agent="code")
+        result = orchestrator.process_prompt("take a note about the launch date")
+        self.assertEqual(result["response"], "OwnTurnsAgent")
+        self.assertEqual(result["retrieval"]["searches"], 1)
+
+    def test_injected_router_opens_no_llm_cache(self):
+        orchestrator = build_orchestrator(note_taker=EchoAgent())
+        self.assertIsNone(orchestrator.llm_cache)
+        self.assertEqual(orchestrator.llm_cache_stats(), {})
+
+    def test_no_agent_reports_error(self):
+        orchestrator = build_orchestrator()
+        result = orchestrator.process_prompt("hello")
+        self.assertIn("error", result)
+        self.assertNotIn("response", result)
+
+    def test_many_prompts_in_flight_on_one_loop(self):
+        orchestrator = build_orchestrator(note_taker=SlowAsyncAgent())
+        prompts = [f"note {i}" for i in range(20)]
+
+        async def run_all():
+            return await asyncio.gather(*(orchestrator.process_prompt_async(p) for p in prompts))
+
+        start = time.perf_counter()
+        results = asyncio.run(run_all())
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 2.0)
+        self.assertEqual([r["response"].split(" (")[0] for r in results], [f"async: {p}" for p in prompts])
+        history = orchestrator.get_conversation_history()
+        for user_turn, assistant_turn in zip(history[::2], history[1::2]):
+            self.assertTrue(assistant_turn["content"].startswith(f"async: {user_turn['content']}"))
+
+
+class TestProcessPrompts(unittest.TestCase):
+    def test_results_keep_input_order_and_shape(self):
+        agent = CountingAgent()
+        orchestrator = build_orchestrator(note_taker=agent)
+        prompts = [f"note {i}" for i in range(24)] + ["hello"]
+
+        results = orchestrator.process_prompts(prompts, max_workers=4)
+
+        self.assertEqual([r.get("response") for r in results[:-1]], [f"done: {p}" for p in prompts[:-1]])
+        self.assertIn("error", results[-1])
+        for result in results:
+            self.assertIn("processing_time", result)
+        self.assertLessEqual(agent.max_active, 4)
+        self.assertGreater(agent.max_active, 1)
+
+        stats = orchestrator.last_batch_stats
+        self.assertEqual(stats["prompts"], 25)
+        self.assertEqual(stats["errors"], 1)
+        self.assertGreater(stats["prompts_per_sec"], 0)
+
+        self.assertEqual(len(orchestrator.get_conversation_history()), 24 * 2 + 1)
+        orchestrator.flush()
+        self.assertEqual(orchestrator.vectorstore.index.ntotal, 25)
+
+    def test_non_thread_safe_agents_are_serialized(self):
+        agent = CountingAgent(thread_safe=False)
+        orchestrator = build_orchestrator(calendar=agent)
+        orchestrator.process_prompts([f"meeting {i}" for i in range(8)], max_workers=8)
+        self.assertEqual(agent.max_active, 1)
+
+
+class TestStreamPrompt(unittest.TestCase):
+    def test_chunks_then_result(self):
+        orchestrator = build_orchestrator(code=StreamingAgent())
+        events = list(orchestrator.stream_prompt("write python code for a parser"))
+
+        self.assertEqual([e["chunk"] for e in events[:-1]], ["Hello", ", ", "world"])
+        self.assertTrue(all(e["agent"] == "StreamingAgent" for e in events[:-1]))
+        result = events[-1]
+        self.assertEqual(result["response"], "Hello, world")
+        self.assertLess(result["time_to_first_token"], result["processing_time"])
+        # Memory is persisted once the stream completes.
+        orchestrator.flush()
+        self.assertEqual(orchestrator.vectorstore.index.ntotal, 2)
+
+    def test_non_streaming_agent_yields_one_chunk(self):
+        orchestrator = build_orchestrator(note_taker=EchoAgent())
+        events = list(orchestrator.stream_prompt("take a note"))
+        self.assertEqual(events[0], {"chunk": "echo: take a note", "agent": "EchoAgent"})
+        self.assertIsNotNone(events[-1]["time_to_first_token"])
+
+    def test_explicit_agent_bypasses_routing(self):
+        orchestrator = build_orchestrator(note_taker=EchoAgent(), code=StreamingAgent())
+        result = orchestrator.process_prompt("take a note", agent="code")
+        self.assertEqual(result["agent"], "StreamingAgent")
+
+
+class TestHistory(unittest.TestCase):
+    def test_load_history_adds_turns_and_keeps_the_store(self):
+        orchestrator = build_orchestrator(note_taker=EchoAgent())
+        store = orchestrator.vectorstore
+        orchestrator.process_prompt("take a note about launch")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "history.json")
+            orchestrator.save_history(path)
+            with open(path, encoding="utf-8") as f:
+                history = json.load(f)
+            # A failed prompt's unanswered turn, then one more exchange
+            history += [{"role": "user", "content": "oops"}, {"role": "user", "content": "hello"},
+                        {"role": "assistant", "content": "hi", "agent": "EchoAgent", "timestamp": "2030-01-01T00:00:00"}]
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(history, f)
+            orchestrator.load_history(path)
+
+        self.assertIs(orchestrator.vectorstore, store)
+        self.assertIs(orchestrator.memory_writer.vectorstore, store)
+        self.assertEqual(len(orchestrator.get_conversation_history()), 5)
+        # The dummy text and the first exchange are kept; only the new exchange is added
+        self.assertEqual(store.index.ntotal, 3)
+        doc = store.similarity_search("User: hello\nAssistant: hi", k=1)[0]
+        self.assertEqual(doc.metadata, {"timestamp": "2030-01-01T00:00:00", "agent": "EchoAgent"})
+
+
+if __name__ == "__main__":
+    unittest.main()
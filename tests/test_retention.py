@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from memory.embedder import HashingEmbeddings
+from memory.faiss_journal import FaissJournal
+from memory.faiss_store import ThreadSafeFAISS
+from memory.index_factory import IndexSpec, OverlayIndex, index_kind, migrate_store
+from memory.retention import RetentionManager, RetentionPolicy, RetentionRule, expired_ids
+
+
+NOW = datetime(2026, 6, 1, 12, 0)
+
+
+def turn(agent, days_ago):
+    return {"agent": agent, "timestamp": (NOW - timedelta(days=days_ago)).isoformat()}
+
+
+class TestExpiredIds(unittest.TestCase):
+    def setUp(self):
+        self.store = ThreadSafeFAISS.from_texts(["initial dummy text"], HashingEmbeddings(dimension=32))
+        texts, metadatas = [], []
+        for day in range(10):
+            texts += [f"calendar turn {day}", f"code turn {day}"]
+            metadatas += [turn("CalendarAgent", day), turn("CodeAgent", day)]
+        texts.append("note about launch")
+        metadatas.append({"agent": "NoteTakerAgent", "note_id": "note-1", "date": "2020-01-01"})
+        self.ids = dict(zip(texts, self.store.add_texts(texts, metadatas=metadatas)))
+
+    def test_age_and_count_rules_per_agent(self):
+        policy = RetentionPolicy(
+            RetentionRule(max_age=5 * 86400),
+            {"CodeAgent": RetentionRule(max_count=3)}
+        )
+        expired = set(expired_ids(self.store, policy, NOW))
+        self.assertEqual(expired, {self.ids[f"calendar turn {day}"] for day in range(6, 10)}
+                         | {self.ids[f"code turn {day}"] for day in range(3, 10)})
+
+    def test_notes_and_untimed_documents_are_kept(self):
+        policy = RetentionPolicy(RetentionRule(max_age=0, max_count=0))
+        self.assertEqual(len(expired_ids(self.store, policy, NOW)), 20)
+
+
+class TestRetentionManager(unittest.TestCase):
+    def setUp(self):
+        self.embeddings = HashingEmbeddings(dimension=32)
+        self.texts = [f"turn {i} about topic {i % 7}" for i in range(400)]
+        self.metadatas = [turn("WebSearchAgent", 400 - i) for i in range(400)]
+        self.policy = RetentionPolicy(RetentionRule(max_age=100 * 86400))
+
+    def test_flat_sweep_deletes_immediately(self):
+        store = ThreadSafeFAISS.from_texts(self.texts, self.embeddings, metadatas=self.metadatas)
+        result = RetentionManager(store, self.policy).sweep(NOW)
+        self.assertEqual(result["evicted"], 300)
+        self.assertEqual(store.index.ntotal, 100)
+        self.assertEqual(store.tombstones, set())
+
+    def test_hnsw_sweep_tombstones_then_compacts(self):
+        store = ThreadSafeFAISS.from_texts(self.texts, self.embeddings, metadatas=self.metadatas)
+        migrate_store(store, IndexSpec("hnsw"))
+        manager = RetentionManager(store, self.policy, compaction_threshold=1000)
+
+        self.assertEqual(manager.sweep(NOW)["compacted"], 0)
+        self.assertEqual((store.index.ntotal, len(store.tombstones)), (400, 300))
+        found = store.similarity_search(self.texts[10], k=5)
+        self.assertEqual(len(found), 5)
+        self.assertTrue(all(doc.page_content in self.texts[300:] for doc in found))
+
+        manager.compaction_threshold = 100
+        self.assertEqual(manager.sweep(NOW)["compacted"], 300)
+        self.assertEqual((store.index.ntotal, store.tombstones), (100, set()))
+        self.assertEqual(index_kind(store.index), "hnsw")
+        self.assertEqual(store.similarity_search(self.texts[350], k=1)[0].page_content, self.texts[350])
+        self.assertEqual(manager.stats()["evicted"], 300)
+        self.assertEqual(manager.stats()["compactions"], 1)
+
+    def test_tombstones_survive_a_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = os.path.join(tmp, "faiss_index")
+            journal = FaissJournal(directory, snapshot_interval=3600,
+                                   index_spec=IndexSpec("hnsw"), migration_threshold=100)
+            store = journal.load(ThreadSafeFAISS, self.embeddings)
+            store.add_texts(self.texts, metadatas=self.metadatas)
+            journal.snapshot()
+            RetentionManager(store, self.policy).sweep(NOW)
+            journal.close()
+
+            journal = FaissJournal(directory, snapshot_interval=3600,
+                                   index_spec=IndexSpec("hnsw"), migration_threshold=100)
+            store = journal.load(ThreadSafeFAISS, self.embeddings)
+            self.assertIsInstance(store.index, OverlayIndex)
+            self.assertEqual(len(store.tombstones), 300)
+            self.assertIn(store.similarity_search(self.texts[0], k=3)[0].page_content, self.texts[300:])
+
+            self.assertEqual(store.compact(IndexSpec("hnsw")), 300)
+            self.assertEqual(store.index.ntotal, 101)
+            journal.close()
+
+            journal = FaissJournal(directory, snapshot_interval=3600,
+                                   index_spec=IndexSpec("hnsw"), migration_threshold=100)
+            store = journal.load(ThreadSafeFAISS, self.embeddings)
+            self.assertEqual((store.index.ntotal, store.tombstones), (101, set()))
+            journal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
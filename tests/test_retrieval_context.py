@@ -0,0 +1,107 @@
+import asyncio
+import unittest
+
+from langchain.memory import VectorStoreRetrieverMemory
+
+from memory.embedder import HashingEmbeddings
+from memory.faiss_store import ThreadSafeFAISS
+from memory.memory_writer import MemoryWriter
+from memory.retrieval_context import RetrievalPolicy, RetrievalScope
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__(dimension=64)
+        self.query_calls = 0
+
+    def embed_query(self, text):
+        self.query_calls += 1
+        return super().embed_query(text)
+
+    async def aembed_query(self, text):
+        self.query_calls += 1
+        return super().embed_query(text)
+
+
+class CountingStore(ThreadSafeFAISS):
+    searches = 0
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        CountingStore.searches += 1
+        return super().similarity_search_with_score_by_vector(embedding, k=k, **kwargs)
+
+
+class TestRetrievalContext(unittest.TestCase):
+    def setUp(self):
+        self.embeddings = CountingEmbeddings()
+        texts = [f"User: note {i} about the launch plan\nAssistant: saved" for i in range(10)]
+        self.store = CountingStore.from_texts(texts, self.embeddings)
+        self.writer = MemoryWriter(self.store, max_delay=60)
+        self.scope = RetrievalScope(self.writer, fetch_k=5)
+        self.embeddings.query_calls = 0
+        CountingStore.searches = 0
+
+    def tearDown(self):
+        self.writer.close()
+
+    def test_consumers_share_one_embedding_and_search(self):
+        prompt = "what did I note about the launch plan"
+        memory = VectorStoreRetrieverMemory(retriever=self.scope.as_retriever(k=4))
+        context = self.scope.open(prompt)
+
+        history = asyncio.run(context.asearch(k=3))
+        agent_context = context.search(k=2)
+        memory_docs = memory.load_memory_variables({"prompt": prompt})["history"]
+
+        self.assertEqual((len(history), len(agent_context)), (3, 2))
+        self.assertEqual(agent_context, history[:2])
+        self.assertIn(history[0].page_content, memory_docs)
+        self.assertEqual(self.embeddings.query_calls, 1)
+        self.assertEqual(CountingStore.searches, 1)
+        self.assertEqual(context.stats(), {'policy': None, 'embed_calls': 1, 'searches': 1, 'lookups': 3})
+
+        self.scope.close(context)
+        self.assertEqual(self.scope.stats()['searches_per_request'], 1.0)
+
+    def test_wider_request_reuses_the_embedding(self):
+        context = self.scope.open("launch plan")
+        context.search(k=3)
+        self.assertEqual(len(context.search(k=8)), 8)
+        self.assertEqual(len(context.search(k=6)), 6)
+        self.assertEqual(self.embeddings.query_calls, 1)
+        self.assertEqual(CountingStore.searches, 2)
+
+    def test_unrelated_queries_fall_back_to_a_search(self):
+        context = self.scope.open("launch plan")
+        self.assertEqual(len(self.scope.search("something else", k=2)), 2)
+        self.assertEqual(context.stats()['lookups'], 0)
+        self.assertEqual(self.scope.stats()['uncached_searches'], 1)
+
+    def test_filters_share_the_embedding_but_not_results(self):
+        self.writer.add("User: buy milk\nAssistant: noted", {"agent": "NoteTakerAgent"})
+        context = self.scope.open("launch plan")
+        everything = context.search(k=3)
+        notes = context.search(k=3, filter={"agent": "NoteTakerAgent"})
+        self.assertEqual(len(everything), 3)
+        self.assertEqual([doc.metadata["agent"] for doc in notes], ["NoteTakerAgent"])
+        self.assertEqual(context.search(k=1, filter={"agent": "NoteTakerAgent"}), notes)
+        self.assertEqual(self.embeddings.query_calls, 1)
+        self.assertEqual(CountingStore.searches, 2)
+
+    def test_none_policy_is_an_avoided_retrieval(self):
+        first = self.scope.open("write a parser")
+        self.assertEqual(asyncio.run(first.aretrieve(RetrievalPolicy.none())), [])
+        self.scope.close(first)
+        second = self.scope.open("launch plan")
+        asyncio.run(second.aretrieve(RetrievalPolicy.top_k(2)))
+        self.scope.close(second)
+
+        stats = self.scope.stats()
+        self.assertEqual(self.embeddings.query_calls, 1)
+        self.assertEqual((stats['requests'], stats['avoided_retrievals']), (2, 1))
+        self.assertEqual(stats['avoided_rate'], 0.5)
+        self.assertEqual(stats['by_policy'], {'none': 1, 'top-2': 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
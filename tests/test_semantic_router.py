@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from core.agent_router import AgentRouter
+from core.semantic_router import SemanticRouter
+from memory.embedder import HashingEmbeddings
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__(dimension=256)
+        self.document_calls = 0
+
+    def embed_documents(self, texts):
+        self.document_calls += 1
+        return super().embed_documents(texts)
+
+
+class TestHashingEmbeddings(unittest.TestCase):
+    def test_is_deterministic_and_normalized(self):
+        emb = HashingEmbeddings(dimension=64)
+        a = emb.embed_query("schedule a meeting")
+        self.assertEqual(a, HashingEmbeddings(dimension=64).embed_query("schedule a meeting"))
+        self.assertAlmostEqual(sum(x * x for x in a), 1.0, places=5)
+
+
+class TestSemanticRouter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmpdir.name, "router_centroids.npz")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_classifies_close_prompts(self):
+        router = SemanticRouter(HashingEmbeddings(), threshold=0.2, cache_path=self.cache_path)
+        self.assertEqual(router.classify("send an email to alex@example.com about the demo")[0], "email")
+        self.assertEqual(router.classify("reschedule the team sync to Monday at 10")[0], "calendar")
+
+    def test_below_threshold_returns_none(self):
+        router = SemanticRouter(HashingEmbeddings(), threshold=0.99, cache_path=self.cache_path)
+        key, score = router.classify("qwerty zxcv")
+        self.assertIsNone(key)
+        self.assertLess(score, 0.99)
+
+    def test_centroids_are_cached_on_disk(self):
+        first = CountingEmbeddings()
+        SemanticRouter(first, cache_path=self.cache_path).build()
+        self.assertEqual(first.document_calls, 1)
+        self.assertTrue(os.path.exists(self.cache_path))
+
+        second = CountingEmbeddings()
+        router = SemanticRouter(second, cache_path=self.cache_path)
+        router.build()
+        self.assertEqual(second.document_calls, 0)
+        self.assertEqual(router.centroids.shape[0], len(router.keys))
+
+        # Changing exemplars invalidates the cache.
+        router.set_exemplars("code", ["refactor this class"])
+        router.build()
+        self.assertEqual(second.document_calls, 1)
+
+    def test_agent_router_falls_back_to_keywords(self):
+        semantic = SemanticRouter(HashingEmbeddings(), threshold=0.99, cache_path=self.cache_path)
+        router = AgentRouter(semantic_router=semantic)
+        for key in ["note_taker", "email", "code", "web_search", "file_analyzer", "calendar"]:
+            router.register_agent(key, key)
+        self.assertEqual(router.route("take a note about the launch"), "note_taker")
+
+        semantic.threshold = 0.2
+        # The keyword cascade would pick calendar here because of "on".
+        self.assertEqual(router.route("write down that the launch is on friday"), "note_taker")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import faiss
+import numpy as np
+from langchain.docstore.document import Document
+
+from memory.embedder import HashingEmbeddings
+from memory.faiss_journal import FaissJournal
+from memory.faiss_store import ThreadSafeFAISS
+from memory.index_factory import OverlayIndex, read_index_mmap
+from memory.sqlite_docstore import SQLiteDocstore, SQLiteIndexMap, snapshot_state, write_snapshot
+
+
+class TestSQLiteDocstore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "docstore.sqlite3")
+        docstore = SQLiteDocstore()
+        docstore.add({"a": Document(page_content="alpha", metadata={"agent": "A"}),
+                      "b": Document(page_content="beta")})
+        write_snapshot(self.path, snapshot_state(docstore, {0: "a", 1: "b"}))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_lookups_by_id(self):
+        docstore = SQLiteDocstore(self.path)
+        doc = docstore.search("a")
+        self.assertEqual((doc.id, doc.page_content, doc.metadata), ("a", "alpha", {"agent": "A"}))
+        self.assertEqual(docstore.search("missing"), "ID missing not found.")
+        with self.assertRaises(ValueError):
+            docstore.add({"b": Document(page_content="again")})
+
+        positions = SQLiteIndexMap(self.path)
+        self.assertEqual((len(positions), positions[1]), (2, "b"))
+        positions[2] = "c"
+        self.assertEqual(positions.values(), ["a", "b", "c"])
+
+    def test_changes_are_folded_into_the_next_file(self):
+        docstore = SQLiteDocstore(self.path)
+        positions = SQLiteIndexMap(self.path)
+        docstore.delete(["a"])
+        docstore.add({"c": Document(page_content="gamma")})
+        next_path = os.path.join(self.tmpdir.name, "next.sqlite3")
+        write_snapshot(next_path, snapshot_state(docstore, {0: "b", 1: "c"}))
+
+        docstore = SQLiteDocstore(next_path)
+        self.assertEqual(docstore.search("a"), "ID a not found.")
+        self.assertEqual(docstore.search("c").page_content, "gamma")
+        self.assertEqual(SQLiteIndexMap(next_path).values(), ["b", "c"])
+        self.assertEqual(positions.values(), ["a", "b"])
+
+
+class TestOverlayIndex(unittest.TestCase):
+    def test_search_spans_base_and_delta(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((200, 16)).astype(np.float32)
+        base = faiss.IndexFlatL2(16)
+        base.add(vectors[:150])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.faiss")
+            faiss.write_index(base, path)
+            overlay = OverlayIndex(read_index_mmap(path))
+            overlay.add(vectors[150:])
+
+            exact = faiss.IndexFlatL2(16)
+            exact.add(vectors)
+            _, expected = exact.search(vectors[::20], 5)
+            _, found = overlay.search(vectors[::20], 5)
+            np.testing.assert_array_equal(found, expected)
+            np.testing.assert_allclose(overlay.reconstruct_n(140, 20), vectors[140:160])
+            self.assertEqual(overlay.materialize().ntotal, 200)
+
+    def test_builds_without_mmap_read_the_file(self):
+        base = faiss.IndexFlatL2(4)
+        base.add(np.eye(4, dtype=np.float32))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.faiss")
+            faiss.write_index(base, path)
+            # faiss-cpu 1.7.4, the pinned version, has no IO_FLAG_MMAP_IFC
+            with mock.patch.object(faiss, "IO_FLAG_MMAP_IFC", None):
+                self.assertEqual(read_index_mmap(path).ntotal, 4)
+
+
+class TestMappedStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmpdir.name, "faiss_index")
+        self.embeddings = HashingEmbeddings(dimension=32)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def open_store(self):
+        journal = FaissJournal(self.directory, snapshot_interval=3600)
+        return journal, journal.load(ThreadSafeFAISS, self.embeddings)
+
+    def test_snapshot_is_mapped_without_pickle(self):
+        journal, store = self.open_store()
+        ids = store.add_texts(["first turn", "second turn"], metadatas=[{"agent": "A"}, {}])
+        journal.snapshot()
+        store.add_texts(["third turn"])
+        self.assertIsInstance(store.index, OverlayIndex)
+        self.assertEqual(store.index.delta.ntotal, 1)
+        self.assertIsInstance(store.docstore, SQLiteDocstore)
+        journal.close()
+
+        snapshots = os.path.join(self.directory, "snapshots")
+        files = os.listdir(os.path.join(snapshots, os.listdir(snapshots)[0]))
+        self.assertEqual(sorted(files), ["docstore.sqlite3", "index.faiss", "lexical.sqlite3"])
+
+        journal, store = self.open_store()
+        self.assertEqual(store.index.ntotal, 4)
+        self.assertEqual(store.similarity_search("third turn", k=1)[0].page_content, "third turn")
+        self.assertEqual(store.get_by_ids([ids[0]])[0].metadata, {"agent": "A"})
+
+        store.delete([ids[1]])
+        self.assertEqual(store.index.ntotal, 3)
+        self.assertEqual(store.get_by_ids([ids[1]]), [])
+        journal.close()
+
+        journal, store = self.open_store()
+        contents = [store.docstore.search(id_).page_content for id_ in store.index_to_docstore_id.values()]
+        self.assertEqual(contents, ["initial dummy text", "first turn", "third turn"])
+        journal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()